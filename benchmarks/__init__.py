@@ -0,0 +1,4 @@
+"""
+Benchmarks for the NBG Python SDK. Run each one as a module from the root of
+the repository, e.g. ``python -m benchmarks.signing``.
+"""
@@ -0,0 +1,74 @@
+"""
+Benchmarks the JSON codecs installed on large transaction payloads, both for
+encoding request bodies and decoding response bodies.
+
+    $ python -m benchmarks.json_codecs
+"""
+
+from datetime import datetime, timedelta
+import argparse
+import timeit
+
+from nbg.base import codec
+
+
+def transactions_body(transactions: int) -> dict:
+    date = datetime(2020, 1, 1)
+    return {
+        "header": {"ID": "0f0b8f0c-7a1b-4e5c-9a3e-ad5b2bbd2f43"},
+        "payload": {
+            "transactions": [
+                {
+                    "id": f"{index:012d}",
+                    "amount": index * 1.25,
+                    "currency": "EUR",
+                    "date": date + timedelta(minutes=index),
+                    "description": "ΠΛΗΡΩΜΗ ΜΕ ΚΑΡΤΑ",
+                }
+                for index in range(transactions)
+            ]
+        },
+    }
+
+
+def measure(function, number: int) -> float:
+    """
+    Returns the best time per call of the given function in milliseconds.
+    """
+    timings = timeit.repeat(function, number=number, repeat=5)
+    return min(timings) / number * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--number", type=int, default=10)
+    arguments = parser.parse_args()
+
+    codecs = []
+
+    for name in codec.JSON_CODECS:
+        try:
+            codecs.append(codec.get_codec(name))
+        except ImportError:
+            print(f"{name} is not installed")
+
+    print("Cost per payload in ms")
+    print(
+        f"  {'transactions':>12} {'codec':>8} {'size':>10} {'encode':>8} {'decode':>8}"
+    )
+
+    for transactions in (1000, 10000, 100000):
+        body = transactions_body(transactions)
+
+        for json_codec in codecs:
+            encoded_body = json_codec.dumps(body)
+            encoding = measure(lambda: json_codec.dumps(body), arguments.number)
+            decoding = measure(lambda: json_codec.loads(encoded_body), arguments.number)
+            print(
+                f"  {transactions:>12} {json_codec.name:>8} "
+                f"{len(encoded_body) // 1024:>7} KB {encoding:>8.2f} {decoding:>8.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
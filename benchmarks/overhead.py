@@ -0,0 +1,139 @@
+"""
+Benchmarks the CPU time and the memory allocated by each stage of an API
+call, which are answered in-process so that only the work of the client is
+measured.
+
+    $ python -m benchmarks.overhead
+    $ python -m benchmarks.overhead --signed
+
+The allocation budgets of ``nbg/base/client_test.py`` guard the same stages.
+"""
+
+import argparse
+import json
+import timeit
+import tracemalloc
+import uuid
+
+from requests import Response
+from requests.adapters import BaseAdapter
+
+from nbg.base import client, utils
+from nbg.emulator.server import generate_signing_key
+
+
+URL_PATH = "account/transactions"
+DATA = {"userId": "user", "account": "12345678901", "dateFrom": "2020-01-01"}
+
+
+class LocalAdapter(BaseAdapter):
+    """
+    Transport adapter that answers every request with the same response.
+    """
+
+    content = json.dumps(
+        {"exception": None, "payload": {"accounts": [{"account": "12345678901"}]}}
+    ).encode("utf-8")
+
+    def send(self, request, **kwargs):
+        response = Response()
+        response.status_code = 200
+        response.encoding = "utf-8"
+        response._content = self.content
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+def measure(function, number: int) -> float:
+    """
+    Returns the best time per call of the given function in microseconds.
+    """
+    timings = timeit.repeat(function, number=number, repeat=5)
+    return min(timings) / number * 1e6
+
+
+def allocated(function) -> int:
+    """
+    Returns the peak memory in bytes allocated by a single call of the given
+    function, after a warm-up call.
+    """
+    function()
+    tracemalloc.start()
+
+    try:
+        baseline, _ = tracemalloc.get_traced_memory()
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return peak - baseline
+
+
+def stages(base_client: client.BaseClient) -> dict:
+    """
+    Returns a function that runs each stage of an API call in isolation.
+    """
+    request_id = str(uuid.uuid4())
+    request_body = base_client._prepare_request_body(request_id, "POST", DATA)
+    body = utils.encode_request_body(request_body, base_client.json_codec)
+    url, headers, body = base_client._prepare_request("POST", URL_PATH, DATA)
+    response = base_client.request(
+        "POST", url, headers=headers, auth=base_client.request_auth, data=body
+    )
+    return {
+        "request id": lambda: str(uuid.uuid4()),
+        "request body": lambda: utils.encode_request_body(
+            base_client._prepare_request_body(request_id, "POST", DATA),
+            base_client.json_codec,
+        ),
+        "headers": lambda: base_client._prepare_request_headers(request_id, body),
+        "url": lambda: f"{base_client.base_url}/{URL_PATH}",
+        "prepare request": lambda: base_client._prepare_request(
+            "POST", URL_PATH, DATA
+        ),
+        "send": lambda: base_client.request(
+            "POST", url, headers=headers, auth=base_client.request_auth, data=body
+        ),
+        "validate response": lambda: utils.validate_response(
+            response, base_client.json_codec
+        ),
+        "process response": lambda: base_client._process_response(response),
+        "api call": lambda: base_client._api_request("POST", URL_PATH, DATA),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--number", type=int, default=2000)
+    parser.add_argument(
+        "--signed", action="store_true", help="Sign requests and verify responses."
+    )
+    arguments = parser.parse_args()
+
+    base_client = client.BaseClient("client-id", "client-secret")
+    base_client._sandbox_base_url = "https://sandbox.nbg.test"
+    base_client.mount("https://", LocalAdapter())
+    base_client.set_access_token("access-token")
+    base_client.set_sandbox("sandbox-id")
+    base_client.set_consent_id("consent-id")
+
+    if arguments.signed:
+        base_client.set_tpp_private_key(generate_signing_key()[0].decode("ascii"))
+        base_client.set_response_verification(False)
+
+    print("Cost per call")
+    print(f"  {'stage':>20} {'time':>11} {'allocated':>12}")
+
+    for name, function in stages(base_client).items():
+        print(
+            f"  {name:>20} {measure(function, arguments.number):>8.2f} us "
+            f"{allocated(function):>9,d} B"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmarks typed resources against the plain dicts they wrap, on large
+transaction lists: the memory they add on top of the decoded payload and the
+time it takes to access their fields.
+
+    $ python -m benchmarks.resources
+"""
+
+import argparse
+import timeit
+import tracemalloc
+
+from nbg import resources
+from nbg.base import codec
+
+from .json_codecs import transactions_body
+
+
+def measure(function, number: int) -> float:
+    """
+    Returns the best time per call of the given function in milliseconds.
+    """
+    timings = timeit.repeat(function, number=number, repeat=5)
+    return min(timings) / number * 1e3
+
+
+def allocated(function) -> int:
+    """
+    Returns the bytes allocated by the given function and kept alive by its
+    result.
+    """
+    tracemalloc.start()
+
+    try:
+        result = function()
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    del result
+    return size
+
+
+def sum_dicts(payload: dict):
+    return sum(transaction["amount"] for transaction in payload["transactions"])
+
+
+def sum_resources(payload: dict):
+    transaction_list = resources.TransactionList(payload)
+    return sum(transaction.amount for transaction in transaction_list.transactions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--number", type=int, default=10)
+    arguments = parser.parse_args()
+
+    json_codec = codec.get_codec()
+
+    print("Cost per payload")
+    print(
+        f"  {'transactions':>12} {'payload':>10} {'wrapped':>10} "
+        f"{'dict sum':>10} {'typed sum':>10}"
+    )
+
+    for transactions in (1000, 10000, 100000):
+        body = json_codec.dumps(transactions_body(transactions))
+        payload = json_codec.loads(body)["payload"]
+        payload_size = allocated(lambda: json_codec.loads(body)["payload"])
+        wrapped_size = allocated(
+            lambda: list(resources.TransactionList(payload).transactions)
+        )
+        dict_sum = measure(lambda: sum_dicts(payload), arguments.number)
+        typed_sum = measure(lambda: sum_resources(payload), arguments.number)
+        print(
+            f"  {transactions:>12} {payload_size // 1024:>7} KB "
+            f"{wrapped_size // 1024:>7} KB {dict_sum:>7.2f} ms {typed_sum:>7.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmarks the per-request cost of signing request bodies, by parsing the
+private key on every request (``jose.jws.sign``) and by reusing the parsed
+key of a ``JWSSigner``, for each installed crypto backend.
+
+    $ python -m benchmarks.signing
+"""
+
+import argparse
+import timeit
+
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jws
+
+from nbg.auth import signature
+
+BODY = {
+    "header": {
+        "ID": "0f0b8f0c-7a1b-4e5c-9a3e-ad5b2bbd2f43",
+        "application": "72F01708-BE1E-4567-926E-8C87D03CA551",
+    },
+    "payload": {
+        "userId": "your_user_id",
+        "account": "8000123456",
+        "dateFrom": "2020-01-01T00:00:00.000Z",
+        "dateTo": "2020-12-31T00:00:00.000Z",
+    },
+}
+
+
+def generate_private_key(key_size: int) -> str:
+    key = rsa.generate_private_key(65537, key_size, default_backend())
+    return key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.TraditionalOpenSSL,
+        serialization.NoEncryption(),
+    ).decode()
+
+
+def measure(function, number: int) -> float:
+    """
+    Returns the best time per call of the given function in microseconds.
+    """
+    timings = timeit.repeat(function, number=number, repeat=5)
+    return min(timings) / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--number", type=int, default=200)
+    parser.add_argument("--key-size", type=int, default=2048)
+    arguments = parser.parse_args()
+
+    private_key = generate_private_key(arguments.key_size)
+    results = [
+        (
+            "jose.jws.sign (parses key per request)",
+            measure(
+                lambda: jws.sign(BODY, private_key, algorithm="RS256"),
+                arguments.number,
+            ),
+        )
+    ]
+
+    for backend in signature.CRYPTO_BACKENDS:
+        signer = signature.JWSSigner(private_key, backend)
+
+        try:
+            signer.detached_signature(BODY)
+        except ImportError:
+            continue
+
+        results.append(
+            (
+                f"JWSSigner, {backend} backend (cached key)",
+                measure(lambda: signer.detached_signature(BODY), arguments.number),
+            )
+        )
+
+    baseline = results[0][1]
+    print(f"RSA-{arguments.key_size} signing cost per request")
+
+    for name, microseconds in results:
+        print(f"  {name:<45} {microseconds:10.1f} µs  {baseline / microseconds:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
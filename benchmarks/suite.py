@@ -0,0 +1,404 @@
+"""
+Benchmarks API calls end to end against the emulator of ``nbg.emulator``, and
+compares the results with a stored baseline. Exits with status 1 when any
+metric regresses past the threshold.
+
+    $ python -m benchmarks.suite
+    $ python -m benchmarks.suite --save
+    $ python -m benchmarks.suite --threshold 0.1 --only throughput
+
+Each scenario runs in a fresh process, so that its peak RSS is its own, while
+the emulator runs in another one. Baselines depend on the machine they were
+measured on, so they should be saved and compared on the same machine, e.g.
+on a dedicated CI runner with ``--baseline benchmarks/baselines/ci.json``.
+"""
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import time
+import typing
+
+from requests.adapters import HTTPAdapter
+
+from nbg.account_information import AccountInformationPSD2Client
+from nbg.emulator import DataProfile, Emulator, SandboxData
+from nbg.emulator.server import generate_signing_key
+
+
+BASELINES_PATH = os.path.join(os.path.dirname(__file__), "baselines")
+DEFAULT_BASELINE = os.path.join(BASELINES_PATH, "default.json")
+
+SANDBOX_ID = "benchmarks"
+LARGE_SANDBOX_ID = "benchmarks-large"
+DATE_FROM = datetime(2019, 1, 1)
+DATE_TO = datetime(2021, 1, 1)
+
+# Whether a higher value of each metric is better, to tell regressions apart.
+METRICS = {
+    "p50_ms": False,
+    "p95_ms": False,
+    "p99_ms": False,
+    "rps": True,
+    "peak_rss_mb": False,
+}
+
+
+def percentile(timings: typing.List[float], fraction: float) -> float:
+    """
+    Returns the given percentile of the timings, by nearest rank.
+    """
+    timings = sorted(timings)
+    index = max(0, int(round(fraction * len(timings) + 0.5)) - 1)
+    return timings[min(index, len(timings) - 1)]
+
+
+def peak_rss_mb() -> float:
+    """
+    Returns the peak resident set size of the current process in MB.
+    """
+    try:
+        import resource
+    except ImportError:  # Windows
+        return 0.0
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak_rss / (2 ** 20 if sys.platform == "darwin" else 2 ** 10)
+
+
+def summarize(timings: typing.List[float], elapsed: float) -> dict:
+    return {
+        "p50_ms": percentile(timings, 0.50) * 1e3,
+        "p95_ms": percentile(timings, 0.95) * 1e3,
+        "p99_ms": percentile(timings, 0.99) * 1e3,
+        "rps": len(timings) / elapsed,
+    }
+
+
+def serve_emulator(connection, large_transactions: int):
+    """
+    Runs the emulator until the other end of the connection sends anything.
+    """
+    large_sandbox = SandboxData(
+        LARGE_SANDBOX_ID,
+        profile=DataProfile(
+            accounts=1,
+            foreign_currency_accounts=0,
+            cards=0,
+            transactions=large_transactions,
+        ),
+    )
+    emulator = Emulator(sandboxes={LARGE_SANDBOX_ID: large_sandbox})
+
+    with emulator.start() as running_emulator:
+        connection.send((running_emulator.url, emulator.certificate))
+        connection.recv()
+
+
+def client(
+    url: str, certificate: bytes, options: dict, signed: bool = True
+) -> AccountInformationPSD2Client:
+    """
+    Returns a client of the emulator, which signs requests and verifies
+    responses when ``signed``.
+    """
+    benchmark_client = AccountInformationPSD2Client(
+        client_id="client-id",
+        client_secret="client-secret",
+        connection_limit=options["max_concurrency"],
+    )
+    # The emulator is served over HTTP, whose default pool is smaller.
+    benchmark_client.mount(
+        "http://", HTTPAdapter(pool_maxsize=options["max_concurrency"])
+    )
+    benchmark_client.set_base_url(url)
+    benchmark_client.set_nbg_certificate(certificate)
+    benchmark_client.set_access_token("access-token")
+    benchmark_client.set_sandbox(SANDBOX_ID)
+
+    if signed:
+        benchmark_client.set_tpp_private_key(options["tpp_private_key"])
+
+    return benchmark_client
+
+
+def time_calls(call, number: int, concurrency: int = 1) -> dict:
+    """
+    Calls the given function ``number`` times from ``concurrency`` threads,
+    after a warm-up call, and returns the latency percentiles and throughput.
+    """
+    call(0)
+
+    def timed_call(index: int) -> float:
+        started = time.perf_counter()
+        call(index)
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+
+    if concurrency == 1:
+        timings = [timed_call(index) for index in range(number)]
+    else:
+        with ThreadPoolExecutor(concurrency) as executor:
+            timings = list(executor.map(timed_call, range(number)))
+
+    return summarize(timings, time.perf_counter() - started)
+
+
+def single_call(url: str, certificate: bytes, options: dict) -> dict:
+    benchmark_client = client(url, certificate, options)
+    return time_calls(
+        lambda _: benchmark_client.accounts("user"), options["number"]
+    )
+
+
+def throughput(concurrency: int):
+    def scenario(url: str, certificate: bytes, options: dict) -> dict:
+        benchmark_client = client(url, certificate, options)
+        users = options["users"]
+
+        # Generates every user in the emulator before timing.
+        for index in range(users):
+            benchmark_client.accounts(f"user-{index}")
+
+        return time_calls(
+            lambda index: benchmark_client.accounts(f"user-{index % users}"),
+            options["number"] * max(1, concurrency // 4),
+            concurrency,
+        )
+
+    return scenario
+
+
+def large_payload(url: str, certificate: bytes, options: dict) -> dict:
+    benchmark_client = client(url, certificate, options).for_user(
+        "access-token", sandbox_id=LARGE_SANDBOX_ID
+    )
+    account = benchmark_client.accounts("user").accounts[0].account
+    return time_calls(
+        lambda _: benchmark_client.account_transactions(
+            "user", account, DATE_FROM, DATE_TO
+        ),
+        max(3, options["number"] // 50),
+    )
+
+
+def signing(signed: bool):
+    def scenario(url: str, certificate: bytes, options: dict) -> dict:
+        benchmark_client = client(url, certificate, options, signed=signed)
+        account = benchmark_client.accounts("user").accounts[0].account
+        return time_calls(
+            lambda _: benchmark_client.account_transactions(
+                "user", account, DATE_FROM, DATE_TO
+            ),
+            options["number"],
+        )
+
+    return scenario
+
+
+def sandbox_import_export(url: str, certificate: bytes, options: dict) -> dict:
+    benchmark_client = client(url, certificate, options)
+    sandbox_id = f"{SANDBOX_ID}-{os.getpid()}"
+    benchmark_client.create_sandbox(sandbox_id)
+    user_client = benchmark_client.for_user("access-token", sandbox_id=sandbox_id)
+
+    for index in range(options["users"]):
+        user_client.accounts(f"user-{index}")
+
+    def call(_):
+        export = benchmark_client.export_sandbox(sandbox_id)
+        benchmark_client.import_sandbox(sandbox_id, export)
+
+    try:
+        return time_calls(call, max(3, options["number"] // 20))
+    finally:
+        benchmark_client.delete_sandbox(sandbox_id)
+
+
+SCENARIOS = {
+    "single_call": single_call,
+    "throughput[1]": throughput(1),
+    "throughput[4]": throughput(4),
+    "throughput[16]": throughput(16),
+    "throughput[64]": throughput(64),
+    "large_payload": large_payload,
+    "signing[enabled]": signing(True),
+    "signing[disabled]": signing(False),
+    "sandbox_import_export": sandbox_import_export,
+}
+
+
+def run_scenario(name: str, url: str, certificate: bytes, options: dict) -> dict:
+    """
+    Runs the given scenario and returns its metrics, including the peak RSS
+    of the current process.
+    """
+    metrics = SCENARIOS[name](url, certificate, options)
+    metrics["peak_rss_mb"] = peak_rss_mb()
+    return {metric: round(value, 3) for metric, value in metrics.items()}
+
+
+def run(names: typing.List[str], options: dict) -> typing.Dict[str, dict]:
+    """
+    Runs the given scenarios against an emulator, each in a fresh process.
+    """
+    context = multiprocessing.get_context("spawn")
+    connection, emulator_connection = context.Pipe()
+    emulator_process = context.Process(
+        target=serve_emulator,
+        args=(emulator_connection, options["large_transactions"]),
+        daemon=True,
+    )
+    emulator_process.start()
+    results = {}
+
+    try:
+        url, certificate = connection.recv()
+
+        for name in names:
+            with ProcessPoolExecutor(1, mp_context=context) as executor:
+                results[name] = executor.submit(
+                    run_scenario, name, url, certificate, options
+                ).result()
+
+            print(format_metrics(name, results[name]), flush=True)
+    finally:
+        connection.send(None)
+        emulator_process.join(10)
+
+    return results
+
+
+def compare(
+    results: typing.Dict[str, dict], baseline: typing.Dict[str, dict], threshold: float
+) -> typing.List[str]:
+    """
+    Returns the regressions of the results against the baseline, i.e. each
+    metric that got worse by more than the ``threshold`` fraction.
+    """
+    regressions = []
+
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            baseline_value = baseline.get(name, {}).get(metric)
+
+            if not baseline_value or metric not in METRICS:
+                continue
+
+            change = (value - baseline_value) / baseline_value
+
+            if METRICS[metric]:
+                change = -change
+
+            if change > threshold:
+                regressions.append(
+                    f"{name} {metric}: {value:.2f} vs {baseline_value:.2f} "
+                    f"in the baseline ({change:+.0%} worse)"
+                )
+
+    return regressions
+
+
+def format_metrics(name: str, metrics: dict) -> str:
+    return (
+        f"  {name:>22} {metrics['p50_ms']:>8.2f} {metrics['p95_ms']:>8.2f} "
+        f"{metrics['p99_ms']:>8.2f} {metrics['rps']:>8.0f} "
+        f"{metrics['peak_rss_mb']:>8.1f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--number", type=int, default=500)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--large-transactions", type=int, default=50000)
+    parser.add_argument(
+        "--only", action="append", help="Run the scenarios with the given prefix."
+    )
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument(
+        "--save", action="store_true", help="Save the results as the baseline."
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="The fraction by which a metric may get worse than the baseline.",
+    )
+    arguments = parser.parse_args()
+
+    names = [
+        name
+        for name in SCENARIOS
+        if not arguments.only
+        or any(name.startswith(prefix) for prefix in arguments.only)
+    ]
+    options = {
+        "number": arguments.number,
+        "users": arguments.users,
+        "large_transactions": arguments.large_transactions,
+        "max_concurrency": 64,
+        "tpp_private_key": generate_signing_key()[0].decode("ascii"),
+    }
+
+    print("Latency in ms, throughput in requests per second, peak RSS in MB")
+    print(
+        f"  {'scenario':>22} {'p50':>8} {'p95':>8} {'p99':>8} {'rps':>8} {'rss':>8}"
+    )
+    results = run(names, options)
+
+    if arguments.save:
+        os.makedirs(os.path.dirname(arguments.baseline), exist_ok=True)
+
+        with open(arguments.baseline, "w") as baseline_file:
+            json.dump(
+                {
+                    "machine": {
+                        "python": platform.python_version(),
+                        "platform": platform.platform(),
+                        "cpus": os.cpu_count(),
+                    },
+                    "options": {
+                        key: options[key]
+                        for key in ("number", "users", "large_transactions")
+                    },
+                    "results": results,
+                },
+                baseline_file,
+                indent=2,
+                sort_keys=True,
+            )
+
+        print(f"Saved the baseline to {arguments.baseline}")
+        return
+
+    if not os.path.exists(arguments.baseline):
+        print(f"There is no baseline at {arguments.baseline}, save one with --save")
+        return
+
+    with open(arguments.baseline) as baseline_file:
+        baseline = json.load(baseline_file)
+
+    for key, value in baseline["options"].items():
+        if options[key] != value:
+            print(f"The baseline was measured with --{key.replace('_', '-')} {value}")
+
+    regressions = compare(results, baseline["results"], arguments.threshold)
+
+    if regressions:
+        print(f"Regressions past {arguments.threshold:.0%}:")
+        print("\n".join(f"  {regression}" for regression in regressions))
+        sys.exit(1)
+
+    print(f"No regressions past {arguments.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Benchmarks the overhead of timing instrumentation on API calls, which are
+answered in-process so that only the work of the client is measured.
+
+    $ python -m benchmarks.telemetry
+"""
+
+import argparse
+import json
+import timeit
+
+from requests import Response
+from requests.adapters import BaseAdapter
+
+from nbg.base import client, telemetry
+
+
+class LocalAdapter(BaseAdapter):
+    """
+    Transport adapter that answers every request with the same payload.
+    """
+
+    content = json.dumps({"payload": {"accounts": []}}).encode("utf-8")
+
+    def send(self, request, **kwargs):
+        response = Response()
+        response.status_code = 200
+        response.encoding = "utf-8"
+        response._content = self.content
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+def measure(function, number: int) -> float:
+    """
+    Returns the best time per call of the given function in microseconds.
+    """
+    timings = timeit.repeat(function, number=number, repeat=5)
+    return min(timings) / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--number", type=int, default=2000)
+    arguments = parser.parse_args()
+
+    base_client = client.BaseClient("client-id", "client-secret")
+    base_client._sandbox_base_url = "https://sandbox.nbg.test"
+    base_client.mount("https://", LocalAdapter())
+    base_client.set_access_token("access-token")
+    base_client.set_sandbox("sandbox-id")
+
+    def call():
+        base_client._api_request("POST", "account/list", {"userId": "user"})
+
+    configurations = [
+        ("no instrumentation", None),
+        ("no hooks", telemetry.Instrumentation()),
+        ("prometheus", telemetry.Instrumentation([telemetry.PrometheusExporter()])),
+    ]
+
+    print("Time per call")
+
+    for name, instrumentation in configurations:
+        base_client.set_instrumentation(instrumentation)
+        print(f"  {name:>20} {measure(call, arguments.number):>8.1f} us")
+
+
+if __name__ == "__main__":
+    main()
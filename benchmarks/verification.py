@@ -0,0 +1,99 @@
+"""
+Benchmarks the per-response cost of verifying QSeal response signatures, by
+reading and parsing the certificate on every response and by reusing the
+cached public key of a ``JWSVerifier``, next to the cost of decoding the
+response JSON.
+
+    $ python -m benchmarks.verification
+"""
+
+from datetime import datetime
+import argparse
+import json
+import timeit
+
+from cryptography import x509
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+
+from nbg.auth import signature
+
+
+def generate_key_and_certificate(key_size: int):
+    key = rsa.generate_private_key(65537, key_size, default_backend())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "nbg.benchmark")])
+    certificate = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(1)
+        .not_valid_before(datetime(2020, 1, 1))
+        .not_valid_after(datetime(2030, 1, 1))
+        .sign(key, hashes.SHA256(), default_backend())
+    )
+    private_key = key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.TraditionalOpenSSL,
+        serialization.NoEncryption(),
+    )
+    return private_key, certificate.public_bytes(serialization.Encoding.DER)
+
+
+def response_body(transactions: int) -> bytes:
+    payload = {
+        "transactions": [
+            {
+                "id": f"{index:012d}",
+                "amount": index * 1.25,
+                "currency": "EUR",
+                "date": "2020-01-01T00:00:00.000Z",
+                "description": "CARD PAYMENT",
+            }
+            for index in range(transactions)
+        ]
+    }
+    return json.dumps({"payload": payload, "exception": None}).encode("utf-8")
+
+
+def measure(function, number: int) -> float:
+    """
+    Returns the best time per call of the given function in microseconds.
+    """
+    timings = timeit.repeat(function, number=number, repeat=5)
+    return min(timings) / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--number", type=int, default=50)
+    arguments = parser.parse_args()
+
+    private_key, certificate = generate_key_and_certificate(2048)
+    signer = signature.JWSSigner(private_key)
+    verifier = signature.JWSVerifier(certificate)
+
+    print("Per-response cost in µs")
+    print(f"  {'body':>10} {'uncached':>10} {'cached':>10} {'json':>10}")
+
+    for transactions in (10, 1000, 10000):
+        body = response_body(transactions)
+        detached_signature = signer.detached_signature(body)
+        uncached = measure(
+            lambda: signature.JWSVerifier(certificate).verify(detached_signature, body),
+            arguments.number,
+        )
+        cached = measure(
+            lambda: verifier.verify(detached_signature, body), arguments.number
+        )
+        decoding = measure(lambda: json.loads(body), arguments.number)
+        print(
+            f"  {len(body) // 1024:>7} KB {uncached:>10.1f} {cached:>10.1f} "
+            f"{decoding:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,33 +1,16 @@
 from datetime import datetime
+import functools
+import typing
 
 from .base import client, decorators
+from . import resources, snapshots, windows
 
 
-class AccountInformationPSD2Client(client.BaseClient):
+class AccountInformationPSD2Mixin:
     """
-    The AccountInformationPSD2Client is the Python interface for
-    NBG's Account Information API.
-
-    :param client_id: The Client ID you received for your NBG application.
-    :type client_id: string
-    :param client_secret: The Client Secret you received for your
-                          NBG application.
-    :type client_secret: string
-    :param production: Whether the client should run in
-                       production mode (``True``) or sandbox mode (``False``).
-                       Defaults to ``False``.
-    :type production: bool
-
-    ---
-    **Usage**
-
-        .. code-block:: python
-
-            from nbg.account_information import AccountInformationPSD2Client
-            client = AccountInformationPSD2Client(
-                client_id="your_app_client_id",
-                client_secret="your_app_client_secret",
-            )
+    Implements the endpoints of NBG's Account Information API. It is shared by
+    the synchronous :class:`AccountInformationPSD2Client` and its asynchronous
+    counterpart in :mod:`nbg.aio`.
     """
 
     _production_base_url = "https://services.nbg.gr/apis/account.info/v2.1"
@@ -49,7 +32,35 @@ class AccountInformationPSD2Client(client.BaseClient):
         "https://my.nbg.gr/sandbox.psd2.consent.v2.1/account.info/authorize"
     )
 
-    def accounts(self, user_id: str) -> dict:
+    _cache_ttls = {
+        "account/list": 300,
+        "account/details": 300,
+        "account/beneficiaries": 300,
+        "card/list": 300,
+        "card/details": 300,
+        "foreign-currency-account/list": 300,
+    }
+
+    _read_paths = frozenset(
+        {
+            "account/list",
+            "account/beneficiaries",
+            "account/details",
+            "account/transactions",
+            "card/list",
+            "card/details",
+            "card/transactions",
+            "foreign-currency-account/list",
+            "foreign-currency-account/beneficiaries",
+            "foreign-currency-account/details",
+            "foreign-currency-account/transactions",
+            "scheduled-payments/list",
+            "standing-orders/list",
+        }
+    )
+
+    @decorators.api_call
+    def accounts(self, user_id: str) -> resources.AccountList:
         """
         List domestic accounts in Εuro for the given user.
 
@@ -67,7 +78,10 @@ class AccountInformationPSD2Client(client.BaseClient):
         data = {"userId": user_id}
         return self._api_request("POST", "account/list", data)
 
-    def account_beneficiaries(self, user_id: str, iban: str) -> dict:
+    @decorators.api_call
+    def account_beneficiaries(
+        self, user_id: str, iban: str
+    ) -> resources.BeneficiaryList:
         """
         List beneficiaries of a domestic account.
 
@@ -89,7 +103,8 @@ class AccountInformationPSD2Client(client.BaseClient):
         data = {"userId": user_id, "iban": iban}
         return self._api_request("POST", "account/beneficiaries", data)
 
-    def account_details(self, user_id: str, account: str) -> dict:
+    @decorators.api_call
+    def account_details(self, user_id: str, account: str) -> resources.AccountDetails:
         """
         Retrieve details of a domestic account.
 
@@ -111,9 +126,10 @@ class AccountInformationPSD2Client(client.BaseClient):
         data = {"userId": user_id, "account": account}
         return self._api_request("POST", "account/details", data)
 
+    @decorators.api_call
     def account_transactions(
         self, user_id: str, account: str, date_from: datetime, date_to: datetime
-    ) -> dict:
+    ) -> resources.TransactionList:
         """
         List transactions of a domestic account in a given time period.
 
@@ -147,7 +163,57 @@ class AccountInformationPSD2Client(client.BaseClient):
         }
         return self._api_request("POST", "account/transactions", data)
 
-    def cards(self, user_id: str) -> dict:
+    def iter_account_transactions(
+        self, user_id: str, account: str, date_from: datetime, date_to: datetime
+    ) -> typing.Iterator[dict]:
+        """
+        Iterate over the transactions of a domestic account in a given time
+        period, while they are being downloaded. Unlike
+        :meth:`account_transactions`, the response is parsed incrementally, so
+        memory usage stays flat regardless of the number of transactions and the
+        first transaction is available before the download finishes. In the
+        asynchronous client, this returns an asynchronous iterator.
+
+        The signature of the response can only be verified once it has been
+        downloaded in full, so ``InvalidResponseSignature`` is raised at the
+        end of the iteration, after all transactions have been yielded. Do not
+        act on the transactions before the iteration completes.
+
+        :param user_id: The user ID of user owning the account.
+        :type user_id: string
+        :param account: The number of the domestic account.
+        :type account: string
+        :param date_from: The datetime after which to look for transactions.
+        :type date_from: datetime
+        :param date_to: The datetime until which to look for transactions.
+        :type date_to: datetime
+
+        ---
+        **Usage**
+
+        .. code-block:: python
+
+            from datetime import datetime
+            transactions = client.iter_account_transactions(
+                user_id="your_user_id",
+                account="8000123456",
+                date_from=datetime(2020, 1, 1),
+                date_to=datetime(2020, 12, 31),
+            )
+
+            for transaction in transactions:
+                print(transaction)
+        """
+        data = {
+            "userId": user_id,
+            "account": account,
+            "dateFrom": date_from,
+            "dateTo": date_to,
+        }
+        return self._api_stream("POST", "account/transactions", data, "transactions")
+
+    @decorators.api_call
+    def cards(self, user_id: str) -> resources.CardList:
         """
         List of credit and debit cards for the given user.
 
@@ -166,7 +232,8 @@ class AccountInformationPSD2Client(client.BaseClient):
         data = {"userId": user_id}
         return self._api_request("POST", "card/list", data)
 
-    def card_details(self, user_id: str, card_number: str) -> dict:
+    @decorators.api_call
+    def card_details(self, user_id: str, card_number: str) -> resources.CardDetails:
         """
         Retrieve detailed information for the given credit or debit card.
 
@@ -188,9 +255,10 @@ class AccountInformationPSD2Client(client.BaseClient):
         data = {"userId": user_id, "cardNumber": card_number}
         return self._api_request("POST", "card/details", data)
 
+    @decorators.api_call
     def card_transactions(
         self, user_id: str, card_number: str, date_from: datetime, date_to: datetime
-    ) -> dict:
+    ) -> resources.TransactionList:
         """
         List transactions of a credit or debit cart in a given time period.
 
@@ -223,7 +291,57 @@ class AccountInformationPSD2Client(client.BaseClient):
         }
         return self._api_request("POST", "card/transactions", data)
 
-    def foreign_currency_accounts(self, user_id: str) -> dict:
+    def iter_card_transactions(
+        self, user_id: str, card_number: str, date_from: datetime, date_to: datetime
+    ) -> typing.Iterator[dict]:
+        """
+        Iterate over the transactions of a credit or debit card in a given time
+        period, while they are being downloaded. Unlike
+        :meth:`card_transactions`, the response is parsed incrementally, so
+        memory usage stays flat regardless of the number of transactions and the
+        first transaction is available before the download finishes. In the
+        asynchronous client, this returns an asynchronous iterator.
+
+        The signature of the response can only be verified once it has been
+        downloaded in full, so ``InvalidResponseSignature`` is raised at the
+        end of the iteration, after all transactions have been yielded. Do not
+        act on the transactions before the iteration completes.
+
+        :param user_id: The user ID of user owning the card.
+        :type user_id: string
+        :param card_number: The number of the card.
+        :type card_number: string
+        :param date_from: The datetime after which to look for transactions.
+        :type date_from: datetime
+        :param date_to: The datetime until which to look for transactions.
+        :type date_to: datetime
+
+        ---
+        **Usage**
+
+        .. code-block:: python
+
+            from datetime import datetime
+            transactions = client.iter_card_transactions(
+                user_id="your_user_id",
+                card_number="4111111111111111",
+                date_from=datetime(2020, 1, 1),
+                date_to=datetime(2020, 12, 31),
+            )
+
+            for transaction in transactions:
+                print(transaction)
+        """
+        data = {
+            "userId": user_id,
+            "cardNumber": card_number,
+            "dateFrom": date_from,
+            "dateTo": date_to,
+        }
+        return self._api_stream("POST", "card/transactions", data, "transactions")
+
+    @decorators.api_call
+    def foreign_currency_accounts(self, user_id: str) -> resources.AccountList:
         """
         List accounts in foreign currencies (e.g. USD) for the given user.
 
@@ -240,9 +358,10 @@ class AccountInformationPSD2Client(client.BaseClient):
         data = {"userId": user_id}
         return self._api_request("POST", "foreign-currency-account/list", data)
 
+    @decorators.api_call
     def foreign_currency_account_beneficiaries(
         self, user_id: str, account: str
-    ) -> dict:
+    ) -> resources.BeneficiaryList:
         """
         List beneficiaries of a foreign currency account.
 
@@ -264,7 +383,10 @@ class AccountInformationPSD2Client(client.BaseClient):
         data = {"userId": user_id, "account": account}
         return self._api_request("POST", "foreign-currency-account/beneficiaries", data)
 
-    def foreign_currency_account_details(self, user_id: str, account: str) -> dict:
+    @decorators.api_call
+    def foreign_currency_account_details(
+        self, user_id: str, account: str
+    ) -> resources.AccountDetails:
         """
         Retrieve details of a foreign currency account.
 
@@ -286,9 +408,10 @@ class AccountInformationPSD2Client(client.BaseClient):
         data = {"userId": user_id, "account": account}
         return self._api_request("POST", "foreign-currency-account/details", data)
 
+    @decorators.api_call
     def foreign_currency_account_transactions(
         self, user_id: str, account: str, date_from: datetime, date_to: datetime
-    ) -> dict:
+    ) -> resources.TransactionList:
         """
         List transactions of a foreign currency account in a given time period.
 
@@ -322,9 +445,62 @@ class AccountInformationPSD2Client(client.BaseClient):
         }
         return self._api_request("POST", "foreign-currency-account/transactions", data)
 
+    def iter_foreign_currency_account_transactions(
+        self, user_id: str, account: str, date_from: datetime, date_to: datetime
+    ) -> typing.Iterator[dict]:
+        """
+        Iterate over the transactions of a foreign currency account in a given
+        time period, while they are being downloaded. Unlike
+        :meth:`foreign_currency_account_transactions`, the response is parsed
+        incrementally, so memory usage stays flat regardless of the number of
+        transactions and the first transaction is available before the download
+        finishes. In the asynchronous client, this returns an asynchronous
+        iterator.
+
+        The signature of the response can only be verified once it has been
+        downloaded in full, so ``InvalidResponseSignature`` is raised at the
+        end of the iteration, after all transactions have been yielded. Do not
+        act on the transactions before the iteration completes.
+
+        :param user_id: The user ID of user owning the account.
+        :type user_id: string
+        :param account: The number of the foreign currency account.
+        :type account: string
+        :param date_from: The datetime after which to look for transactions.
+        :type date_from: datetime
+        :param date_to: The datetime until which to look for transactions.
+        :type date_to: datetime
+
+        ---
+        **Usage**
+
+        .. code-block:: python
+
+            from datetime import datetime
+            transactions = client.iter_foreign_currency_account_transactions(
+                user_id="your_user_id",
+                account="8000123456",
+                date_from=datetime(2020, 1, 1),
+                date_to=datetime(2020, 12, 31),
+            )
+
+            for transaction in transactions:
+                print(transaction)
+        """
+        data = {
+            "userId": user_id,
+            "account": account,
+            "dateFrom": date_from,
+            "dateTo": date_to,
+        }
+        return self._api_stream(
+            "POST", "foreign-currency-account/transactions", data, "transactions"
+        )
+
+    @decorators.api_call
     def scheduled_payments(
         self, user_id: str, account: str, date_from: datetime, date_to: datetime
-    ) -> dict:
+    ) -> resources.ScheduledPaymentList:
         """
         List scheduled payments of a domestic account in a given time period.
 
@@ -358,9 +534,10 @@ class AccountInformationPSD2Client(client.BaseClient):
         }
         return self._api_request("POST", "scheduled-payments/list", data)
 
+    @decorators.api_call
     def standing_orders(
         self, user_id: str, account: str, date_from: datetime, date_to: datetime
-    ) -> dict:
+    ) -> resources.StandingOrderList:
         """
         List standing orders of a domestic account in a given time period.
 
@@ -393,3 +570,127 @@ class AccountInformationPSD2Client(client.BaseClient):
             "dateTo": date_to,
         }
         return self._api_request("POST", "standing-orders/list", data)
+
+
+class AccountInformationPSD2Client(AccountInformationPSD2Mixin, client.BaseClient):
+    """
+    The AccountInformationPSD2Client is the Python interface for
+    NBG's Account Information API.
+
+    :param client_id: The Client ID you received for your NBG application.
+    :type client_id: string
+    :param client_secret: The Client Secret you received for your
+                          NBG application.
+    :type client_secret: string
+    :param production: Whether the client should run in
+                       production mode (``True``) or sandbox mode (``False``).
+                       Defaults to ``False``.
+    :type production: bool
+    :param connection_limit: The maximum number of connections to keep in the
+                             pool. Defaults to ``10``.
+    :type connection_limit: int
+
+    ---
+    **Usage**
+
+        .. code-block:: python
+
+            from nbg.account_information import AccountInformationPSD2Client
+            client = AccountInformationPSD2Client(
+                client_id="your_app_client_id",
+                client_secret="your_app_client_secret",
+            )
+    """
+
+    def snapshot(
+        self, user_id: str, date_from: datetime, date_to: datetime, max_workers: int = 8
+    ) -> snapshots.Snapshot:
+        """
+        Fetch all accounts, cards and foreign currency accounts of the given user,
+        along with their details, beneficiaries and transactions in the given
+        time period. Independent requests run concurrently on a pool of threads,
+        so a snapshot takes about as long as its slowest chain of requests.
+        Failed requests do not abort the snapshot; they are reported in its
+        ``errors``.
+
+        :param user_id: The user ID of the corresponding user.
+        :type user_id: string
+        :param date_from: The datetime after which to look for transactions.
+        :type date_from: datetime
+        :param date_to: The datetime until which to look for transactions.
+        :type date_to: datetime
+        :param max_workers: The maximum number of concurrent requests.
+                            Defaults to ``8``.
+        :type max_workers: int
+
+        ---
+        **Usage**
+
+        .. code-block:: python
+
+            from datetime import datetime
+            snapshot = client.snapshot(
+                user_id="your_user_id",
+                date_from=datetime(2020, 1, 1),
+                date_to=datetime(2020, 12, 31),
+            )
+            snapshot["accounts"]
+            snapshot["account_transactions"]["8000123456"]
+            snapshot.errors  # e.g. {("card_details", "4111111111111111"): ...}
+        """
+        return snapshots.take_snapshot(self, user_id, date_from, date_to, max_workers)
+
+    def backfill(
+        self,
+        endpoint: str,
+        date_from: datetime,
+        date_to: datetime,
+        policy: windows.WindowPolicy = None,
+        max_workers: int = 4,
+        **kwargs,
+    ) -> dict:
+        """
+        Fetch a long time period from one of the endpoints that accept a
+        ``date_from``/``date_to`` range, i.e. ``account_transactions``,
+        ``card_transactions``, ``foreign_currency_account_transactions``,
+        ``scheduled_payments`` and ``standing_orders``. The period is split in
+        windows, which are fetched concurrently and sized adaptively according
+        to the size and duration of their responses. The responses are stitched
+        in chronological order into a single payload, without the records
+        returned twice at window boundaries.
+
+        :param endpoint: The name of the endpoint method, e.g.
+                         ``"account_transactions"``.
+        :type endpoint: string
+        :param date_from: The datetime after which to look for records.
+        :type date_from: datetime
+        :param date_to: The datetime until which to look for records.
+        :type date_to: datetime
+        :param policy: The window sizing policy. Defaults to
+                       :class:`WindowPolicy() <nbg.windows.WindowPolicy>`.
+        :type policy: nbg.windows.WindowPolicy
+        :param max_workers: The maximum number of windows fetched concurrently.
+                            Defaults to ``4``.
+        :type max_workers: int
+        :param kwargs: The rest of the arguments of the endpoint, e.g.
+                       ``user_id`` and ``account``.
+
+        ---
+        **Usage**
+
+        .. code-block:: python
+
+            from datetime import datetime
+            client.backfill(
+                "account_transactions",
+                user_id="your_user_id",
+                account="8000123456",
+                date_from=datetime(2015, 1, 1),
+                date_to=datetime(2020, 12, 31),
+            )
+        """
+        if endpoint not in windows.WINDOWED_ENDPOINTS:
+            raise ValueError(f"Cannot backfill {endpoint} in windows.")
+
+        call = functools.partial(getattr(self, endpoint), **kwargs)
+        return windows.fetch_windowed(call, date_from, date_to, policy, max_workers)
@@ -0,0 +1,5 @@
+"""
+Asynchronous clients for NBG APIs, built on top of ``aiohttp``.
+"""
+
+from .account_information import AccountInformationPSD2Client
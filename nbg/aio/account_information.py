@@ -0,0 +1,142 @@
+from datetime import datetime
+import functools
+
+from .. import account_information, snapshots, windows
+from . import client
+
+
+class AccountInformationPSD2Client(
+    account_information.AccountInformationPSD2Mixin, client.AsyncBaseClient
+):
+    """
+    The asynchronous AccountInformationPSD2Client is the ``asyncio`` interface
+    for NBG's Account Information API. It exposes the same methods as
+    :class:`nbg.account_information.AccountInformationPSD2Client`, but each API
+    call returns a coroutine.
+
+    :param client_id: The Client ID you received for your NBG application.
+    :type client_id: string
+    :param client_secret: The Client Secret you received for your
+                          NBG application.
+    :type client_secret: string
+    :param production: Whether the client should run in
+                       production mode (``True``) or sandbox mode (``False``).
+                       Defaults to ``False``.
+    :type production: bool
+    :param connection_limit: The maximum number of simultaneous connections
+                             in the pool. ``0`` means no limit.
+                             Defaults to ``100``.
+    :type connection_limit: int
+
+    ---
+    **Usage**
+
+        .. code-block:: python
+
+            from nbg.aio import AccountInformationPSD2Client
+
+            async with AccountInformationPSD2Client(
+                client_id="your_app_client_id",
+                client_secret="your_app_client_secret",
+            ) as client:
+                client.set_access_token("access_token_of_your_user")
+                accounts = await client.accounts(user_id="your_user_id")
+    """
+
+    async def snapshot(
+        self,
+        user_id: str,
+        date_from: datetime,
+        date_to: datetime,
+        max_concurrency: int = 8,
+    ) -> snapshots.Snapshot:
+        """
+        Fetch all accounts, cards and foreign currency accounts of the given user,
+        along with their details, beneficiaries and transactions in the given
+        time period. Independent requests run concurrently on the event loop,
+        so a snapshot takes about as long as its slowest chain of requests.
+        Failed requests do not abort the snapshot; they are reported in its
+        ``errors``.
+
+        :param user_id: The user ID of the corresponding user.
+        :type user_id: string
+        :param date_from: The datetime after which to look for transactions.
+        :type date_from: datetime
+        :param date_to: The datetime until which to look for transactions.
+        :type date_to: datetime
+        :param max_concurrency: The maximum number of requests in flight.
+                                Defaults to ``8``.
+        :type max_concurrency: int
+
+        ---
+        **Usage**
+
+        .. code-block:: python
+
+            from datetime import datetime
+            snapshot = await client.snapshot(
+                user_id="your_user_id",
+                date_from=datetime(2020, 1, 1),
+                date_to=datetime(2020, 12, 31),
+            )
+        """
+        return await snapshots.take_snapshot_async(
+            self, user_id, date_from, date_to, max_concurrency
+        )
+
+    async def backfill(
+        self,
+        endpoint: str,
+        date_from: datetime,
+        date_to: datetime,
+        policy: windows.WindowPolicy = None,
+        max_concurrency: int = 4,
+        **kwargs,
+    ) -> dict:
+        """
+        Fetch a long time period from one of the endpoints that accept a
+        ``date_from``/``date_to`` range, i.e. ``account_transactions``,
+        ``card_transactions``, ``foreign_currency_account_transactions``,
+        ``scheduled_payments`` and ``standing_orders``. The period is split in
+        windows, which are fetched concurrently and sized adaptively according
+        to the size and duration of their responses. The responses are stitched
+        in chronological order into a single payload, without the records
+        returned twice at window boundaries.
+
+        :param endpoint: The name of the endpoint method, e.g.
+                         ``"account_transactions"``.
+        :type endpoint: string
+        :param date_from: The datetime after which to look for records.
+        :type date_from: datetime
+        :param date_to: The datetime until which to look for records.
+        :type date_to: datetime
+        :param policy: The window sizing policy. Defaults to
+                       :class:`WindowPolicy() <nbg.windows.WindowPolicy>`.
+        :type policy: nbg.windows.WindowPolicy
+        :param max_concurrency: The maximum number of windows in flight.
+                                Defaults to ``4``.
+        :type max_concurrency: int
+        :param kwargs: The rest of the arguments of the endpoint, e.g.
+                       ``user_id`` and ``account``.
+
+        ---
+        **Usage**
+
+        .. code-block:: python
+
+            from datetime import datetime
+            await client.backfill(
+                "account_transactions",
+                user_id="your_user_id",
+                account="8000123456",
+                date_from=datetime(2015, 1, 1),
+                date_to=datetime(2020, 12, 31),
+            )
+        """
+        if endpoint not in windows.WINDOWED_ENDPOINTS:
+            raise ValueError(f"Cannot backfill {endpoint} in windows.")
+
+        call = functools.partial(getattr(self, endpoint), **kwargs)
+        return await windows.fetch_windowed_async(
+            call, date_from, date_to, policy, max_concurrency
+        )
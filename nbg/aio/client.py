@@ -0,0 +1,508 @@
+"""
+NBG asynchronous base client module. This is used internally to create
+``asyncio`` clients for all supported NBG APIs.
+"""
+
+import asyncio
+import codecs
+import functools
+import time
+import typing
+
+from requests import Response
+from requests.structures import CaseInsensitiveDict
+import aiohttp
+
+from ..base import client, exceptions, hedging, streaming, telemetry, timeouts
+
+
+def _as_requests_response(
+    client_response: aiohttp.ClientResponse, content: bytes
+) -> Response:
+    """
+    Wraps a fully read ``aiohttp`` response into a ``requests`` response, so
+    that response validation and exceptions are shared with the synchronous
+    clients.
+    """
+    response = Response()
+    response.status_code = client_response.status
+    response.headers = CaseInsensitiveDict(client_response.headers)
+    response.url = str(client_response.url)
+    response.encoding = client_response.charset
+    response.reason = client_response.reason
+    response._content = content
+    return response
+
+
+class AsyncBaseClient(client.BaseClientMixin):
+    """
+    Asynchronous base client for NBG APIs. All API calls return coroutines and
+    share a single pool of connections, which is created lazily inside the
+    running event loop.
+
+    :param connection_limit: The maximum number of simultaneous connections
+                             in the pool. ``0`` means no limit.
+                             Defaults to ``100``.
+    :type connection_limit: int
+    """
+
+    _retry_exceptions = (aiohttp.ClientConnectionError, asyncio.TimeoutError)
+    _unsent_exceptions = (aiohttp.ClientConnectorError,)
+
+    def __init__(
+        self,
+        client_id: str,
+        client_secret: str,
+        production: bool = False,
+        connection_limit: int = 100,
+    ):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.production = production
+        self.connection_limit = connection_limit
+        self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """
+        Returns the ``aiohttp`` session, holding the connection pool of the
+        current client. User views share the session of their client.
+        """
+        if self.is_user_view:
+            return self._parent_client.session
+
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.connection_limit)
+            self._session = aiohttp.ClientSession(connector=connector)
+
+        return self._session
+
+    async def close(self):
+        """
+        Closes all pooled connections of the current client. User views share
+        the connection pool of their client, so closing them has no effect.
+
+        ---
+        **Usage**
+
+        .. code-block:: python
+
+            await client.close()
+        """
+        if not self.is_user_view and self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _access_token_async(self) -> str:
+        """
+        Returns the access token of the current client, like ``access_token``,
+        but reads and refreshes the tokens of its token manager, if any,
+        without blocking the event loop.
+        """
+        if self._token_user is not None:
+            return await self._token_manager.access_token_async(self._token_user)
+
+        return self._access_token
+
+    async def _send(
+        self,
+        method: str,
+        url_path: str,
+        url: str,
+        headers: dict,
+        body: bytes,
+        timings: telemetry.RequestTimings = None,
+        deadline: timeouts.Deadline = None,
+    ) -> aiohttp.ClientResponse:
+        """
+        Sends the given request, retrying it according to the retry policy of
+        the client until its deadline, and returns the response before reading
+        its body.
+        """
+        retry_call = self._start_retry(url_path)
+
+        if deadline is None:
+            deadline = self.timeout.start(url_path)
+
+        while True:
+            lane_permit = permit = None
+
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire_async(url_path)
+
+            if self.priority_scheduler is not None:
+                lane_permit = await self.priority_scheduler.acquire_async(
+                    self.priority, url_path
+                )
+
+            if self.concurrency_limiter is not None:
+                try:
+                    permit = await self.concurrency_limiter.acquire_async(url_path)
+                except BaseException:
+                    self._release_slots(lane_permit, None)
+                    raise
+
+            if timings is not None and (
+                self.rate_limiter is not None
+                or lane_permit is not None
+                or permit is not None
+            ):
+                timings.mark(telemetry.RATE_LIMIT)
+
+            try:
+                connect_timeout, read_timeout = deadline.timeouts()
+            except exceptions.DeadlineExceeded:
+                # e.g. the call waited for its slots past its deadline.
+                self._release_slots(lane_permit, permit)
+                raise
+
+            # The deadline also covers reading the body of the response.
+            timeout = aiohttp.ClientTimeout(
+                total=deadline.remaining,
+                sock_connect=connect_timeout,
+                sock_read=read_timeout,
+            )
+
+            try:
+                client_response = await self.session.request(
+                    method, url, headers=headers, data=body, timeout=timeout
+                )
+            except asyncio.CancelledError:
+                # e.g. the losing attempt of a hedged call.
+                self._release_slots(lane_permit, permit)
+                raise
+            except Exception as exception:
+                self._release_slots(lane_permit, permit, exception=exception)
+
+                if timings is not None:
+                    timings.mark(telemetry.TRANSFER)
+
+                if retry_call is None:
+                    raise
+
+                delay = retry_call.next_delay(exception=exception)
+
+                if delay is None or not deadline.allows(delay):
+                    raise
+            else:
+                self._release_slots(lane_permit, permit, client_response.status)
+
+                if timings is not None:
+                    timings.mark(telemetry.TRANSFER)
+                    timings.status = client_response.status
+
+                if retry_call is None:
+                    return client_response
+
+                response = _as_requests_response(client_response, b"")
+                delay = retry_call.next_delay(response=response)
+
+                if delay is None or not deadline.allows(delay):
+                    return client_response
+
+                client_response.release()
+
+            await asyncio.sleep(delay)
+
+            if timings is not None:
+                timings.retries += 1
+                timings.mark(telemetry.RETRY_WAIT)
+
+    async def _api_request(
+        self,
+        method: str,
+        url_path: str,
+        data: dict = {},
+        headers: client.DICT_OR_LIST_OF_DICTS = {},
+    ) -> dict:
+        cache_entry, cached_payload = self._get_cached_response(url_path, data)
+
+        if cached_payload is not None:
+            return cached_payload
+
+        request = functools.partial(
+            self._fetch, method, url_path, data, headers, cache_entry
+        )
+        coalescing_key = self._coalescing_key(method, url_path, data, headers)
+
+        if coalescing_key is None:
+            return await request()
+
+        return await self._request_coalescer.call_async(
+            coalescing_key, url_path, request
+        )
+
+    async def _fetch(
+        self,
+        method: str,
+        url_path: str,
+        data: dict,
+        headers: client.DICT_OR_LIST_OF_DICTS,
+        cache_entry: typing.Optional[tuple],
+    ) -> dict:
+        timings = self._start_timings(method, url_path)
+        circuit_call = None
+
+        try:
+            circuit_call = self._start_circuit(url_path)
+            attempt = functools.partial(
+                self._attempt,
+                method,
+                url_path,
+                data,
+                headers,
+                self.timeout.start(url_path),
+            )
+            hedging_policy = self._hedging_for(url_path)
+
+            if hedging_policy is None:
+                response, payload = await attempt(timings)
+            else:
+                response, payload = await self._hedge(
+                    hedging_policy, url_path, attempt, timings
+                )
+        except Exception as exception:
+            if circuit_call is not None:
+                circuit_call.finish(exception)
+
+            if timings is not None:
+                self._finish_timings(timings, exception)
+
+            raise
+
+        if circuit_call is not None:
+            circuit_call.finish()
+
+        if cache_entry is not None:
+            self._cache_response(cache_entry, url_path, payload)
+
+        if timings is not None:
+            timings.response_size = len(response.content)
+            self._finish_timings(timings)
+
+        return payload
+
+    async def _attempt(
+        self,
+        method: str,
+        url_path: str,
+        data: dict,
+        headers: client.DICT_OR_LIST_OF_DICTS,
+        deadline: timeouts.Deadline,
+        timings: typing.Optional[telemetry.RequestTimings],
+    ) -> typing.Tuple[Response, dict]:
+        """
+        Sends a single attempt of an API call, including its retries, and
+        returns its response along with its payload.
+        """
+        url, _headers, body = self._prepare_request(
+            method, url_path, data, headers, timings
+        )
+        access_token = await self._access_token_async()
+        _headers["Authorization"] = f"Bearer {access_token}"
+
+        if timings is not None:
+            timings.mark(telemetry.AUTH)
+
+        async with await self._send(
+            method, url_path, url, _headers, body, timings, deadline
+        ) as client_response:
+            content = await client_response.read()
+
+        if timings is not None:
+            timings.mark(telemetry.TRANSFER)
+
+        response = _as_requests_response(client_response, content)
+        return response, self._process_response(response, timings=timings)
+
+    async def _hedge(
+        self,
+        hedging_policy: hedging.HedgingPolicy,
+        url_path: str,
+        attempt: typing.Callable,
+        timings: typing.Optional[telemetry.RequestTimings],
+    ) -> typing.Tuple[Response, dict]:
+        """
+        Sends the given attempt of a read-only call and, if it takes longer
+        than the hedging delay of its endpoint, a second one, returning the
+        first answer of either and cancelling the other.
+        """
+        delay = hedging_policy.delay(url_path)
+
+        async def timed_attempt(timings=None):
+            started_at = time.monotonic()
+            result = await attempt(timings)
+            hedging_policy.record(url_path, time.monotonic() - started_at)
+            return result
+
+        if delay is None:
+            return await timed_attempt(timings)
+
+        # Attempts run concurrently, so each one records its own timings and
+        # those of the attempt answering the call get merged into its timings.
+        attempt_timings = {}
+
+        def start() -> asyncio.Future:
+            timings_of_attempt = (
+                None
+                if timings is None
+                else telemetry.RequestTimings(timings.method, url_path)
+            )
+            task = asyncio.ensure_future(timed_attempt(timings_of_attempt))
+            attempt_timings[task] = timings_of_attempt
+            return task
+
+        primary = winner = start()
+        tasks = [primary]
+
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+
+            if not done and hedging_policy.take_hedge(url_path):
+                hedge = start()
+                tasks.append(hedge)
+                pending = set(tasks)
+                winner = None
+
+                while pending and winner is None:
+                    done, pending = await asyncio.wait(
+                        pending, return_when=asyncio.FIRST_COMPLETED
+                    )
+
+                    for task in done:
+                        if task.exception() is None:
+                            winner = task
+
+                            if task is hedge:
+                                hedging_policy.hedge_won(url_path)
+
+                            break
+
+                if winner is None:
+                    winner = primary
+
+            await asyncio.wait([winner])
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled():
+                    # Retrieves the exception of the other attempt, if any.
+                    task.exception()
+
+        if timings is not None:
+            timings.merge(attempt_timings[winner])
+
+        return winner.result()
+
+    async def _api_stream(
+        self,
+        method: str,
+        url_path: str,
+        data: dict = {},
+        records_key: str = "transactions",
+        chunk_size: int = 16384,
+    ) -> typing.AsyncIterator[dict]:
+        timings = self._start_timings(method, url_path)
+        circuit_call = None
+
+        try:
+            # Streamed calls last as long as their consumer, so they are
+            # never slow for the circuit breaker.
+            circuit_call = self._start_circuit(url_path, track_duration=False)
+
+            async for record in self._stream(
+                method, url_path, data, records_key, chunk_size, timings
+            ):
+                yield record
+        except Exception as exception:
+            if circuit_call is not None:
+                circuit_call.finish(exception)
+
+            if timings is not None:
+                self._finish_timings(timings, exception)
+
+            raise
+        except GeneratorExit:
+            if circuit_call is not None:
+                circuit_call.finish()
+
+            raise
+
+        if circuit_call is not None:
+            circuit_call.finish()
+
+        if timings is not None:
+            self._finish_timings(timings)
+
+    async def _stream(
+        self,
+        method: str,
+        url_path: str,
+        data: dict,
+        records_key: str,
+        chunk_size: int,
+        timings: typing.Optional[telemetry.RequestTimings],
+    ) -> typing.AsyncIterator[dict]:
+        url, _headers, body = self._prepare_request(method, url_path, data, {}, timings)
+        access_token = await self._access_token_async()
+        _headers["Authorization"] = f"Bearer {access_token}"
+
+        if timings is not None:
+            timings.mark(telemetry.AUTH)
+
+        async with await self._send(
+            method, url_path, url, _headers, body, timings
+        ) as client_response:
+            response = _as_requests_response(client_response, b"")
+
+            if response.status_code == 401:
+                raise exceptions.NotAuthenticatedRequest(response)
+
+            verification = None
+
+            if self._should_verify_response(response):
+                verification = self.streaming_verification(response)
+
+            parser = streaming.PayloadRecordParser(records_key)
+            decoder = codecs.getincrementaldecoder(client_response.charset or "utf-8")()
+            response_size = 0
+
+            try:
+                async for chunk in client_response.content.iter_chunked(chunk_size):
+                    response_size += len(chunk)
+
+                    if verification is not None:
+                        verification.update(chunk)
+
+                    for record in parser.feed(decoder.decode(chunk)):
+                        yield record
+
+                for record in parser.feed(decoder.decode(b"", final=True)):
+                    yield record
+
+                envelope = parser.close()
+            except ValueError:
+                raise exceptions.InvalidResponse(
+                    response, "Response body is not valid JSON."
+                )
+
+        if timings is not None:
+            # Streamed records are parsed while they are transferred.
+            timings.mark(telemetry.TRANSFER)
+            timings.response_size = response_size
+
+        if verification is not None:
+            self.check_response_verification(response, verification)
+
+            if timings is not None:
+                timings.mark(telemetry.VERIFY)
+
+        buffered_response = streaming.buffered_response(response, envelope)
+        self._process_response(buffered_response, verify=False, timings=timings)
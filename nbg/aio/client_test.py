@@ -0,0 +1,358 @@
+from datetime import datetime
+import asyncio
+
+import pytest
+
+aiohttp = pytest.importorskip("aiohttp")
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from .. import resources
+from ..auth import tokens
+from ..base import (
+    coalescing,
+    concurrency,
+    exceptions,
+    hedging,
+    priorities,
+    retry,
+    telemetry,
+    timeouts,
+)
+from . import account_information
+
+
+def _run(coroutine):
+    loop = asyncio.new_event_loop()
+
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+async def _echo_handler(request: web.Request) -> web.Response:
+    body = await request.json()
+    headers = {key: value for key, value in request.headers.items()}
+    payload = {"path": request.path, "body": body, "headers": headers}
+    return web.json_response({"payload": payload})
+
+
+async def _transactions_handler(request: web.Request) -> web.Response:
+    transactions = [{"id": index} for index in range(1000)]
+    return web.json_response({"payload": {"transactions": transactions}})
+
+
+async def _unauthorized_handler(request: web.Request) -> web.Response:
+    return web.json_response({}, status=401)
+
+
+async def _request_payloads(
+    handler, calls, retry_policy=None, coalescer=None, instrumentation=None
+):
+    app = web.Application()
+    app.router.add_route("*", "/{tail:.*}", handler)
+
+    async with TestServer(app) as server:
+        client = account_information.AccountInformationPSD2Client(
+            client_id="client-id", client_secret="client-secret"
+        )
+        client._sandbox_base_url = str(server.make_url("/sandbox"))
+        client.set_access_token("access-token")
+        client.set_consent_id("consent-id")
+        client.set_sandbox("sandbox-id")
+        client.set_retry_policy(retry_policy)
+        client.set_request_coalescer(coalescer)
+        client.set_instrumentation(instrumentation)
+
+        async with client:
+            return await asyncio.gather(
+                *[call(client) for call in calls], return_exceptions=True
+            )
+
+
+def test_async_api_request_headers_and_body():
+    """
+    Ensure that the asynchronous client sends the same envelope and headers
+    as the synchronous one.
+    """
+    (payload,) = _run(
+        _request_payloads(_echo_handler, [lambda client: client.accounts("user")])
+    )
+
+    assert isinstance(payload, resources.AccountList)
+    assert payload["path"] == "/sandbox/account/list"
+    assert payload["body"]["payload"] == {"userId": "user"}
+    assert payload["body"]["header"]["application"] == "client-id"
+    assert payload["headers"]["Authorization"] == "Bearer access-token"
+    assert payload["headers"]["Consent-Id"] == "consent-id"
+    assert payload["headers"]["X-Consent-Check"] == "true"
+    assert payload["headers"]["X-Certificate-Check"] == "false"
+    assert payload["headers"]["sandbox_id"] == "sandbox-id"
+    assert payload["headers"]["Request-Id"] == payload["body"]["header"]["ID"]
+
+
+def test_async_api_requests_run_concurrently():
+    """
+    Ensure that concurrent calls on the same client all receive their own
+    response.
+    """
+    calls = [
+        (lambda user_id: lambda client: client.accounts(user_id))(f"user-{index}")
+        for index in range(20)
+    ]
+    payloads = _run(_request_payloads(_echo_handler, calls))
+
+    assert [payload["body"]["payload"]["userId"] for payload in payloads] == [
+        f"user-{index}" for index in range(20)
+    ]
+
+
+def test_async_api_request_not_authenticated():
+    """
+    Ensure that responses are validated like in the synchronous client.
+    """
+    (exception,) = _run(
+        _request_payloads(
+            _unauthorized_handler, [lambda client: client.accounts("user")]
+        )
+    )
+
+    assert isinstance(exception, exceptions.NotAuthenticatedRequest)
+    assert exception.response.status_code == 401
+
+
+def test_async_for_user_shares_session():
+    """
+    Ensure that user views of asynchronous clients share their connection pool.
+    """
+
+    async def get_sessions():
+        async with account_information.AccountInformationPSD2Client(
+            client_id="client-id", client_secret="client-secret"
+        ) as client:
+            view = client.for_user("user-access-token")
+            return view.session, client.session
+
+    view_session, client_session = _run(get_sessions())
+
+    assert view_session is client_session
+    assert client_session.closed
+
+
+def test_async_api_stream():
+    """
+    Ensure that asynchronous streamed API requests yield the records of the
+    response.
+    """
+
+    async def collect(client):
+        return [
+            record
+            async for record in client.iter_account_transactions(
+                "user", "account", datetime(2020, 1, 1), datetime(2020, 12, 31)
+            )
+        ]
+
+    (records,) = _run(_request_payloads(_transactions_handler, [collect]))
+
+    assert records == [{"id": index} for index in range(1000)]
+
+
+def test_async_api_request_retries():
+    """
+    Ensure that asynchronous clients retry transient failures like the
+    synchronous ones.
+    """
+    statuses = [503, 502]
+
+    async def flaky_handler(request: web.Request) -> web.Response:
+        if statuses:
+            return web.Response(status=statuses.pop(0), headers={"Retry-After": "0"})
+
+        return await _echo_handler(request)
+
+    retry_policy = retry.RetryPolicy(backoff_base=0)
+    (payload,) = _run(
+        _request_payloads(
+            flaky_handler, [lambda client: client.accounts("user")], retry_policy
+        )
+    )
+
+    assert payload["path"] == "/sandbox/account/list"
+    assert retry_policy.stats == {"account/list": {"retries": 2, "exhausted": 0}}
+
+
+def test_async_api_request_coalescing():
+    requests_received = []
+
+    async def counting_handler(request: web.Request) -> web.Response:
+        requests_received.append(request.path)
+        return await _echo_handler(request)
+
+    coalescer = coalescing.RequestCoalescer()
+    payloads = _run(
+        _request_payloads(
+            counting_handler,
+            [lambda client: client.accounts("user")] * 3
+            + [lambda client: client.cards("user")],
+            coalescer=coalescer,
+        )
+    )
+
+    assert payloads[0] == payloads[1] == payloads[2]
+    assert sorted(requests_received) == ["/sandbox/account/list", "/sandbox/card/list"]
+    assert coalescer.stats["account/list"] == {"requests": 1, "coalesced": 2}
+
+
+def test_async_api_request_timings():
+    recorded_timings = []
+    instrumentation = telemetry.Instrumentation(hooks=[recorded_timings.append])
+
+    async def collect(client):
+        return [
+            record
+            async for record in client.iter_account_transactions(
+                "user", "account", datetime(2020, 1, 1), datetime(2020, 12, 31)
+            )
+        ]
+
+    _run(
+        _request_payloads(
+            _transactions_handler,
+            [lambda client: client.accounts("user"), collect],
+            instrumentation=instrumentation,
+        )
+    )
+    timings = {timings.url_path: timings for timings in recorded_timings}
+
+    assert timings["account/list"].status == 200
+    assert timings["account/list"].response_size > 0
+    assert telemetry.TRANSFER in timings["account/list"].phases
+    assert telemetry.DECODE in timings["account/list"].phases
+    assert timings["account/transactions"].response_size > 10000
+
+
+def test_async_api_request_timeout():
+    async def slow_handler(request: web.Request) -> web.Response:
+        await asyncio.sleep(1)
+        return await _echo_handler(request)
+
+    timeout = timeouts.Timeout(total=0.1)
+    (exception,) = _run(
+        _request_payloads(
+            slow_handler, [lambda client: client.with_timeout(timeout).accounts("user")]
+        )
+    )
+
+    assert isinstance(exception, asyncio.TimeoutError)
+
+
+def test_async_api_request_hedging():
+    """
+    Ensure that a slow call gets hedged and answered by the faster attempt,
+    while the slow one gets cancelled.
+    """
+    requests_received = []
+
+    async def slow_first_handler(request: web.Request) -> web.Response:
+        requests_received.append(request.path)
+
+        if len(requests_received) == 1:
+            await asyncio.sleep(5)
+
+        return await _echo_handler(request)
+
+    hedging_policy = hedging.HedgingPolicy(initial_delay=0.05, min_delay=0)
+    recorded_timings = []
+
+    async def call(client):
+        client.set_hedging_policy(hedging_policy)
+        client.set_instrumentation(
+            telemetry.Instrumentation(hooks=[recorded_timings.append])
+        )
+        return await client.accounts("user")
+
+    loop = asyncio.new_event_loop()
+
+    try:
+        started_at = loop.time()
+        (payload,) = loop.run_until_complete(
+            _request_payloads(slow_first_handler, [call])
+        )
+        elapsed = loop.time() - started_at
+    finally:
+        loop.close()
+
+    assert payload["path"] == "/sandbox/account/list"
+    assert elapsed < 1
+    assert len(requests_received) == 2
+    assert hedging_policy.stats["account/list"]["hedges_won"] == 1
+    assert recorded_timings[0].status == 200
+    assert telemetry.AUTH in recorded_timings[0].phases
+
+
+def test_async_api_request_concurrency_limit():
+    """
+    Ensure that calls over the limit of requests in flight wait for a slot.
+    """
+    in_flight = []
+    max_in_flight = []
+
+    async def counting_handler(request: web.Request) -> web.Response:
+        in_flight.append(request.path)
+        max_in_flight.append(len(in_flight))
+        await asyncio.sleep(0.01)
+        in_flight.pop()
+        return await _echo_handler(request)
+
+    concurrency_limiter = concurrency.ConcurrencyLimiter(initial_limit=2, max_limit=2)
+
+    async def call(client):
+        client.set_concurrency_limiter(concurrency_limiter)
+        return await client.accounts("user")
+
+    payloads = _run(_request_payloads(counting_handler, [call] * 6))
+
+    assert all(payload["path"] == "/sandbox/account/list" for payload in payloads)
+    assert max(max_in_flight) == 2
+    assert concurrency_limiter.stats["account/list"]["in_flight"] == 0
+
+
+def test_async_api_request_deadline_releases_slots():
+    """
+    Ensure that calls whose deadline passes before they are sent give back
+    their slots.
+    """
+    concurrency_limiter = concurrency.ConcurrencyLimiter(
+        initial_limit=1, max_limit=1, blocking=False
+    )
+    priority_scheduler = priorities.PriorityScheduler(capacity=1, blocking=False)
+    timeout = timeouts.Timeout(total=1e-6)
+
+    async def call(client):
+        client.set_concurrency_limiter(concurrency_limiter)
+        client.set_priority_scheduler(priority_scheduler)
+        return await client.with_timeout(timeout).accounts("user")
+
+    results = _run(_request_payloads(_echo_handler, [call] * 2))
+
+    assert all(isinstance(result, exceptions.DeadlineExceeded) for result in results)
+    assert concurrency_limiter.stats["account/list"]["in_flight"] == 0
+    assert concurrency_limiter.stats["account/list"]["rejected"] == 0
+    assert priority_scheduler.stats["interactive"]["in_flight"] == 0
+    assert priority_scheduler.stats["interactive"]["granted"] == 2
+
+
+def test_async_api_request_token_manager():
+    token_manager = tokens.TokenManager("client-id", "client-secret")
+    token_manager.store.set("user", tokens.TokenSet("managed-access-token"))
+
+    async def call(client):
+        client.set_token_manager(token_manager, user="user")
+        return await client.accounts("user")
+
+    (payload,) = _run(_request_payloads(_echo_handler, [call]))
+
+    assert payload["headers"]["Authorization"] == "Bearer managed-access-token"
@@ -2,6 +2,7 @@
 Utilities for authorising requests, based on the consents framework.
 """
 
+from ..base import decorators
 from . import oauth, signature
 
 
@@ -67,6 +68,7 @@ class ConsentClient(oauth.OAuthClientMixin, signature.SignedClientMixin):
         """
         self._consent_id = consent_id
 
+    @decorators.api_call
     def generate_consent(self) -> dict:
         """
         Generate a consent ID for use by the current client.
@@ -81,6 +83,7 @@ class ConsentClient(oauth.OAuthClientMixin, signature.SignedClientMixin):
         headers = [self.environment_headers, self.signature_headers]
         return self._api_request("POST", "consents/request-access", data, headers)
 
+    @decorators.api_call
     def get_consent_information(self, consent_id: str, user_id: str) -> dict:
         """
         Returns information for the requested consent.
@@ -109,6 +112,7 @@ class ConsentClient(oauth.OAuthClientMixin, signature.SignedClientMixin):
         headers = [self.environment_headers, self.signature_headers]
         return self._api_request("POST", "consents/info", data, headers)
 
+    @decorators.api_call
     def delete_consent(self, consent_id: str, user_id: str, tan_number: str) -> dict:
         """
         Delete the requested consent.
@@ -18,3 +18,19 @@ class OAuthTokenException(Exception):
 
     def __str__(self):
         return self.message
+
+
+class InvalidResponseSignature(Exception):
+    """
+    This exception is being raised when the QSeal signature of a response is
+    missing or does not match the response body.
+    """
+
+    message: str
+
+    def __init__(self, response, message: str):
+        self.response = response
+        self.message = message
+
+    def __str__(self):
+        return self.message
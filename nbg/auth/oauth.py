@@ -2,12 +2,14 @@
 Utilities for authenticating requests based on OAuth 2 and OpenID Connect.
 """
 
+import typing
+
 from requests import Request
 from requests.auth import AuthBase
 from requests.exceptions import HTTPError
 import requests
 
-from . import exceptions
+from . import exceptions, tokens
 
 
 class AccessTokenAuth(requests.auth.AuthBase):
@@ -34,11 +36,15 @@ class OAuthClientMixin:
     client_secret: str
     scopes: str
 
+    _token_set = None
+    _token_manager = None
+    _token_user = None
+
     def _exchange_authorization_code(
         self, authorization_code: str, redirect_uri: str
     ) -> dict:
-        return requests.post(
-            "https://my.nbg.gr/identity/connect/token",
+        return tokens.token_session().post(
+            tokens.TOKEN_URL,
             headers={"cache-control": "no-cache"},
             data={
                 "client_id": self.client_id,
@@ -52,10 +58,58 @@ class OAuthClientMixin:
     @property
     def access_token(self) -> str:
         """
-        Returns the access token of the current client.
+        Returns the access token of the current client. If a token manager has
+        been set, the access token is refreshed ahead of its expiry.
         """
+        if self._token_user is not None:
+            return self._token_manager.access_token(self._token_user)
+
         return self._access_token
 
+    @property
+    def token_set(self) -> typing.Optional[tokens.TokenSet]:
+        """
+        Returns the full token set of the current client, i.e. its access token
+        along with its refresh token and expiry, if known.
+        """
+        if self._token_user is not None:
+            return self._token_manager.token_set(self._token_user)
+
+        return self._token_set
+
+    @property
+    def token_manager(self) -> typing.Optional[tokens.TokenManager]:
+        """
+        Returns the token manager of the current client, if any.
+        """
+        return self._token_manager
+
+    def set_token_manager(self, token_manager: tokens.TokenManager, user: str = None):
+        """
+        Sets the token manager of the current client. If a user is given, the
+        client authenticates its requests with the access token of that user,
+        as kept valid by the token manager.
+
+        :param token_manager: The token manager to use, or ``None`` to stop
+                              using one.
+        :type token_manager: nbg.auth.tokens.TokenManager
+        :param user: The user whose tokens should be used.
+        :type user: string
+
+        **Usage**
+
+        .. code-block:: python
+
+            from nbg.auth.tokens import TokenManager
+            token_manager = TokenManager(
+                client_id="your_app_client_id",
+                client_secret="your_app_client_secret",
+            )
+            client.set_token_manager(token_manager, user="your_user_id")
+        """
+        self._token_manager = token_manager
+        self._token_user = user if token_manager is not None else None
+
     @property
     def request_auth(self) -> AccessTokenAuth:
         """
@@ -116,14 +170,19 @@ class OAuthClientMixin:
             client.set_access_token("the_access_token_of_a_user")
         """
         self._access_token = access_token
+        self._token_set = None
+        self._token_user = None
         return access_token
 
     def set_access_token_from_authorization_code(
-        self, authorization_code: str, redirect_uri: str
+        self, authorization_code: str, redirect_uri: str, user: str = None
     ):
         """
         Exchanges an authorization code with an access token and sets the
-        access token accordingly for the current client.
+        access token accordingly for the current client. The full token set
+        is kept in ``token_set``. If the client has a token manager, the token
+        set is also stored by it under the given user, whose access token is
+        then kept valid for the client.
 
         :param authorization_code: The authorization code you received
                                    as a GET parameter.
@@ -131,6 +190,8 @@ class OAuthClientMixin:
         :param redirect_uri: The redirect URI for which you requested the
                              authorization code.
         :type redirect_uri: string
+        :param user: The user whose tokens are stored by the token manager.
+        :type user: string
 
         **Usage**
 
@@ -141,6 +202,15 @@ class OAuthClientMixin:
                 redirect_uri="https://myapp.example.com/complete/nbg/",
             )
         """
+        if self._token_manager is not None and user is not None:
+            token_set = self._token_manager.exchange_authorization_code(
+                user, authorization_code, redirect_uri
+            )
+            self.set_access_token(token_set.access_token)
+            self._token_set = token_set
+            self._token_user = user
+            return token_set.access_token
+
         try:
             access_token_response = self._exchange_authorization_code(
                 authorization_code, redirect_uri
@@ -151,5 +221,7 @@ class OAuthClientMixin:
             error = access_token_response_body["error"]
             raise exceptions.OAuthTokenException(error, e)
 
-        access_token = access_token_response_body["access_token"]
-        return self.set_access_token(access_token)
+        token_set = tokens.TokenSet.from_response(access_token_response_body)
+        self.set_access_token(token_set.access_token)
+        self._token_set = token_set
+        return token_set.access_token
@@ -3,9 +3,245 @@ Utilities for request signing and response verification based on QSeal
 certificates.
 """
 
+import base64
+import functools
+import hashlib
+import json
 import os
+import threading
+import typing
 
-from jose import jws
+from jose import jwk
+
+from . import exceptions
+
+SIGN_FUNCTION = typing.Callable[[bytes], bytes]
+
+
+def _cryptography_backend(private_key: typing.Union[str, bytes]) -> SIGN_FUNCTION:
+    from cryptography.hazmat.backends import default_backend
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import padding
+
+    if isinstance(private_key, str):
+        private_key = private_key.encode("utf-8")
+
+    key = serialization.load_pem_private_key(
+        private_key, password=None, backend=default_backend()
+    )
+    return lambda message: key.sign(message, padding.PKCS1v15(), hashes.SHA256())
+
+
+def _jose_backend(private_key: typing.Union[str, bytes]) -> SIGN_FUNCTION:
+    key = jwk.construct(private_key, "RS256")
+    return key.sign
+
+
+# Crypto backends to load private keys with, from the fastest to the slowest.
+CRYPTO_BACKENDS = {
+    "cryptography": _cryptography_backend,
+    "jose": _jose_backend,
+}
+
+
+def _base64url_encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+class JWSSigner:
+    """
+    Creates detached RS256 JSON Web Signatures with a private key. The key is
+    parsed once, on first use, by the given crypto backend, or the fastest one
+    installed, and then reused for all signatures.
+
+    :param private_key: The PEM-encoded private key.
+    :type private_key: string
+    :param backend: The name of the crypto backend, one of ``CRYPTO_BACKENDS``.
+                    Defaults to the fastest one installed.
+    :type backend: string
+    """
+
+    encoded_header = _base64url_encode(
+        json.dumps(
+            {"alg": "RS256", "typ": "JWT"}, separators=(",", ":"), sort_keys=True
+        ).encode("utf-8")
+    )
+
+    def __init__(self, private_key: typing.Union[str, bytes], backend: str = None):
+        self.private_key = private_key
+        self.backend = backend
+        self._sign = None
+        self._lock = threading.Lock()
+
+    def _load_key(self) -> SIGN_FUNCTION:
+        if self.backend is not None:
+            return CRYPTO_BACKENDS[self.backend](self.private_key)
+
+        for backend_name, backend in CRYPTO_BACKENDS.items():
+            try:
+                sign = backend(self.private_key)
+            except ImportError:
+                continue
+
+            self.backend = backend_name
+            return sign
+
+        raise ImportError("No crypto backend is installed to sign requests.")
+
+    def sign(self, message: bytes) -> bytes:
+        """
+        Returns the RS256 signature of the given message.
+        """
+        if self._sign is None:
+            with self._lock:
+                if self._sign is None:
+                    self._sign = self._load_key()
+
+        return self._sign(message)
+
+    def detached_signature(self, payload: typing.Union[dict, bytes]) -> str:
+        """
+        Returns the detached JWS (``header..signature``) of the given payload.
+        Dictionaries are encoded as compact JSON.
+        """
+        if isinstance(payload, dict):
+            payload = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+        signing_input = b".".join([self.encoded_header, _base64url_encode(payload)])
+        signature = _base64url_encode(self.sign(signing_input))
+        return f"{self.encoded_header.decode()}..{signature.decode()}"
+
+
+def _base64url_decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+class StreamingVerification:
+    """
+    Verifies a detached JWS against a payload that is received in chunks. The
+    payload is base64url-encoded and hashed incrementally, so it never has to be
+    held in memory as a whole.
+    """
+
+    def __init__(self, verifier: "JWSVerifier", detached_signature: str):
+        self.verifier = verifier
+        encoded_header, self.signature = verifier.split(detached_signature)
+        self.digest = hashlib.sha256(encoded_header.encode("ascii") + b".")
+        self.remainder = b""
+
+    def update(self, chunk: bytes):
+        data = self.remainder + chunk
+        cutoff = len(data) - len(data) % 3
+        self.digest.update(_base64url_encode(data[:cutoff]))
+        self.remainder = data[cutoff:]
+
+    def verify(self) -> bool:
+        self.digest.update(_base64url_encode(self.remainder))
+        self.remainder = b""
+        return self.verifier.verify_digest(self.digest.digest(), self.signature)
+
+
+class JWSVerifier:
+    """
+    Verifies detached RS256 JSON Web Signatures with the public key of an X.509
+    certificate, in PEM or DER format. The certificate is parsed once, on first
+    use, and its public key is reused for all verifications.
+
+    :param certificate: The X.509 certificate of the signer.
+    :type certificate: bytes
+    """
+
+    def __init__(self, certificate: bytes):
+        self.certificate = certificate
+        self._public_key = None
+        self._lock = threading.Lock()
+
+    @property
+    def public_key(self):
+        if self._public_key is None:
+            with self._lock:
+                if self._public_key is None:
+                    self._public_key = self._load_public_key()
+
+        return self._public_key
+
+    def _load_public_key(self):
+        from cryptography import x509
+        from cryptography.hazmat.backends import default_backend
+
+        if self.certificate.lstrip().startswith(b"-----BEGIN"):
+            certificate = x509.load_pem_x509_certificate(
+                self.certificate, default_backend()
+            )
+        else:
+            certificate = x509.load_der_x509_certificate(
+                self.certificate, default_backend()
+            )
+
+        return certificate.public_key()
+
+    def split(self, detached_signature: str) -> typing.Tuple[str, bytes]:
+        """
+        Returns the encoded header and the decoded signature of the given
+        detached JWS. Raises ``ValueError`` if it is not a detached RS256 JWS.
+        """
+        encoded_header, payload, encoded_signature = detached_signature.split(".")
+        header = json.loads(_base64url_decode(encoded_header))
+
+        if payload or header.get("alg") != "RS256":
+            raise ValueError("Not a detached RS256 JWS.")
+
+        return encoded_header, _base64url_decode(encoded_signature)
+
+    def verify_digest(self, digest: bytes, signature: bytes) -> bool:
+        """
+        Returns whether the signature matches the given SHA-256 digest of the
+        JWS signing input.
+        """
+        from cryptography.exceptions import InvalidSignature
+        from cryptography.hazmat.primitives import hashes
+        from cryptography.hazmat.primitives.asymmetric import padding, utils
+
+        try:
+            self.public_key.verify(
+                signature, digest, padding.PKCS1v15(), utils.Prehashed(hashes.SHA256())
+            )
+        except InvalidSignature:
+            return False
+
+        return True
+
+    def verify(self, detached_signature: str, payload: bytes) -> bool:
+        """
+        Returns whether the given detached JWS is a valid signature of the given
+        payload.
+        """
+        verification = self.streaming(detached_signature)
+        verification.update(payload)
+        return verification.verify()
+
+    def streaming(self, detached_signature: str) -> StreamingVerification:
+        """
+        Returns a verification of the given detached JWS, to be fed with the
+        payload in chunks.
+        """
+        return StreamingVerification(self, detached_signature)
+
+
+@functools.lru_cache(maxsize=None)
+def _nbg_certificate(environment: str) -> bytes:
+    certificate_file_name = f"nbg-qseal-{environment}.cer"
+    certificate_file_path = os.path.join(
+        os.path.dirname(__file__), "certs", certificate_file_name,
+    )
+
+    with open(certificate_file_path, "rb") as certificate_file:
+        return certificate_file.read()
+
+
+@functools.lru_cache(maxsize=None)
+def _nbg_verifier(environment: str) -> JWSVerifier:
+    return JWSVerifier(_nbg_certificate(environment))
 
 
 class SignedClientMixin:
@@ -15,22 +251,59 @@ class SignedClientMixin:
     """
 
     _tpp_private_key: str = None
+    _tpp_signer: JWSSigner = None
     _tpp_certificate: str = None
+    _verify_responses: bool = True
+    _nbg_certificate_verifier: JWSVerifier = None
 
     @property
     def nbg_certificate(self):
         """
         Returns the NBG certificate used to verify responses according
-        to the configured environment (production or sandbox).
+        to the configured environment (production or sandbox), unless it has
+        been set via ``set_nbg_certificate``.
         """
-        environment = "production" if self.production else "sandbox"
-        certificate_file_name = f"nbg-qseal-{environment}.cer"
-        certificate_file_path = os.path.join(
-            os.path.dirname(__file__), "certs", certificate_file_name,
-        )
+        if self._nbg_certificate_verifier is not None:
+            return self._nbg_certificate_verifier.certificate
 
-        with open(certificate_file_path, "rb") as certificate_file:
-            return certificate_file.read()
+        return _nbg_certificate(self._nbg_environment)
+
+    @property
+    def _nbg_environment(self) -> str:
+        return "production" if self.production else "sandbox"
+
+    @property
+    def nbg_verifier(self) -> JWSVerifier:
+        """
+        Returns the verifier of NBG response signatures according to the
+        configured environment. Certificates are read and parsed once per
+        environment and shared by all clients.
+        """
+        if self._nbg_certificate_verifier is not None:
+            return self._nbg_certificate_verifier
+
+        return _nbg_verifier(self._nbg_environment)
+
+    def set_nbg_certificate(self, certificate: bytes):
+        """
+        Sets the certificate used to verify the signatures of responses, in
+        place of the bundled NBG certificate, e.g. the certificate of the
+        emulator of :mod:`nbg.emulator`.
+
+        :param certificate: The X.509 certificate in PEM or DER format, or
+                            ``None`` to use the bundled NBG certificate.
+        :type certificate: bytes
+
+        ---
+        **Usage**
+
+        .. code-block:: python
+
+            client.set_nbg_certificate(emulator.certificate)
+        """
+        self._nbg_certificate_verifier = (
+            JWSVerifier(certificate) if certificate is not None else None
+        )
 
     @property
     def signing_enabled(self):
@@ -42,6 +315,15 @@ class SignedClientMixin:
         """
         return self.production or self.tpp_private_key
 
+    @property
+    def response_verification_enabled(self) -> bool:
+        """
+        Returns whether the signatures of responses are verified. Verification
+        is enabled along with request signing, unless it has been disabled via
+        ``set_response_verification``.
+        """
+        return bool(self.signing_enabled) and self._verify_responses
+
     @property
     def tpp_private_key(self):
         """
@@ -57,12 +339,87 @@ class SignedClientMixin:
         """
         return self._tpp_certificate
 
-    def set_tpp_private_key(self, tpp_private_key: str):
+    @property
+    def tpp_signer(self) -> JWSSigner:
+        """
+        Returns the signer of the current client, which reuses the parsed TPP
+        private key for all requests.
+        """
+        return self._tpp_signer
+
+    def set_tpp_private_key(self, tpp_private_key: str, crypto_backend: str = None):
         """
         Loads the TPP private key used by the current client instance to sign
-        requests to the server.
+        requests to the server. The key is parsed once and reused for all
+        requests, by the given crypto backend or the fastest one installed.
+
+        :param tpp_private_key: The PEM-encoded TPP private key.
+        :type tpp_private_key: string
+        :param crypto_backend: The crypto backend to sign requests with, i.e.
+                               ``"cryptography"`` or ``"jose"``. Defaults to the
+                               fastest one installed.
+        :type crypto_backend: string
         """
         self._tpp_private_key = tpp_private_key
+        self._tpp_signer = (
+            JWSSigner(tpp_private_key, crypto_backend) if tpp_private_key else None
+        )
+
+    def set_response_verification(self, enabled: bool):
+        """
+        Enables or disables the verification of response signatures, when
+        request signing is enabled.
+        """
+        self._verify_responses = enabled
+
+    def response_signature(self, response) -> str:
+        """
+        Returns the detached JWS signature of the given response. Raises
+        ``InvalidResponseSignature`` if the response is not signed.
+        """
+        detached_signature = response.headers.get("Signature")
+
+        if not detached_signature:
+            raise exceptions.InvalidResponseSignature(
+                response, "The response is not signed."
+            )
+
+        return detached_signature
+
+    def streaming_verification(self, response) -> StreamingVerification:
+        """
+        Returns a verification of the signature of the given response, to be fed
+        with its body in chunks, as it gets downloaded.
+        """
+        detached_signature = self.response_signature(response)
+
+        try:
+            return self.nbg_verifier.streaming(detached_signature)
+        except ValueError:
+            raise exceptions.InvalidResponseSignature(
+                response, "The response signature is malformed."
+            )
+
+    def verify_response_signature(self, response):
+        """
+        Verifies that the QSeal signature of the given response matches its body
+        and raises ``InvalidResponseSignature`` otherwise.
+        """
+        verification = self.streaming_verification(response)
+        verification.update(response.content)
+        self.check_response_verification(response, verification)
+
+    def check_response_verification(
+        self, response, verification: StreamingVerification
+    ):
+        """
+        Raises ``InvalidResponseSignature`` if the given verification, fed with
+        the whole body of the given response, fails.
+        """
+        if not verification.verify():
+            raise exceptions.InvalidResponseSignature(
+                response, "The response signature does not match its body."
+            )
 
     def set_tpp_certificate(self, tpp_certificate: str):
         """
@@ -71,17 +428,19 @@ class SignedClientMixin:
         """
         self._tpp_certificate = tpp_certificate
 
-    def signature_headers(self, body: dict) -> dict:
+    def signature_headers(self, body: typing.Union[dict, bytes]) -> dict:
         """
         Return the required QSeal signature headers, based on the provided
-        request body.
+        request body. The body should be the encoded bytes sent to the server,
+        so that the signature matches them exactly.
         """
         headers = {"X-Certificate-Check": "true" if self.signing_enabled else "false"}
 
         if self.signing_enabled:
-            signed_payload = jws.sign(body, self.tpp_private_key, algorithm="RS256")
-            header, payload, signature = signed_payload.split(".")
-            headers["Signature"] = f"{header}..{signature}"
+            if self.tpp_signer is None:
+                raise ValueError("Set a TPP private key to sign requests.")
+
+            headers["Signature"] = self.tpp_signer.detached_signature(body)
 
         if self.tpp_certificate:
             headers["TPP-Signature-Certificate"] = self.tpp_certificate
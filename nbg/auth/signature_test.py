@@ -1,9 +1,13 @@
+from datetime import datetime
 from unittest import mock
 import os
 
+from requests import Response
+
+from jose import jws
 import pytest
 
-from . import signature
+from . import exceptions, signature
 
 
 @pytest.fixture
@@ -11,6 +15,55 @@ def client():
     return signature.SignedClientMixin()
 
 
+@pytest.fixture(scope="module")
+def rsa_key():
+    """
+    Return a freshly generated RSA private key.
+    """
+    rsa = pytest.importorskip("cryptography.hazmat.primitives.asymmetric.rsa")
+    from cryptography.hazmat.backends import default_backend
+
+    return rsa.generate_private_key(65537, 2048, default_backend())
+
+
+@pytest.fixture(scope="module")
+def rsa_private_key(rsa_key) -> str:
+    """
+    Return the PEM encoding of the generated RSA private key.
+    """
+    from cryptography.hazmat.primitives import serialization
+
+    return rsa_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.TraditionalOpenSSL,
+        serialization.NoEncryption(),
+    ).decode()
+
+
+@pytest.fixture(scope="module")
+def certificate(rsa_key) -> bytes:
+    """
+    Return a self-signed DER certificate of the generated RSA key.
+    """
+    from cryptography import x509
+    from cryptography.hazmat.backends import default_backend
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.x509.oid import NameOID
+
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "nbg.test")])
+    certificate = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(rsa_key.public_key())
+        .serial_number(1)
+        .not_valid_before(datetime(2020, 1, 1))
+        .not_valid_after(datetime(2021, 1, 1))
+        .sign(rsa_key, hashes.SHA256(), default_backend())
+    )
+    return certificate.public_bytes(serialization.Encoding.DER)
+
+
 def test_nbg_certificate(client):
     """
     Ensure that the signed client always returns the appropriate NBG
@@ -57,8 +110,8 @@ def test_signature_headers(client):
     the provided request body.
     """
     request_body = {}
-    jws_signature = "some_header.some_payload.some_signature"
-    jws_detached_signature = "some_header..some_signature"
+    encoded_header = signature.JWSSigner.encoded_header.decode()
+    jws_detached_signature = f"{encoded_header}..c29tZV9zaWduYXR1cmU"
     tpp_private_key = "secret-key"
     tpp_certificate = "this-is-a-certificate"
     expected_signature_headers = {
@@ -71,10 +124,127 @@ def test_signature_headers(client):
     client.set_tpp_certificate(tpp_certificate)
 
     with mock.patch("nbg.auth.signature.SignedClientMixin.signing_enabled", True):
-        with mock.patch("jose.jws.sign", return_value=jws_signature) as sign_mock:
+        with mock.patch(
+            "nbg.auth.signature.JWSSigner.sign", return_value=b"some_signature"
+        ) as sign_mock:
             signature_headers = client.signature_headers(request_body)
 
-    sign_mock.assert_called_once_with(
-        request_body, tpp_private_key, algorithm="RS256",
-    )
+    sign_mock.assert_called_once_with(f"{encoded_header}.e30".encode())
     assert signature_headers == expected_signature_headers
+
+
+@pytest.mark.parametrize("crypto_backend", list(signature.CRYPTO_BACKENDS))
+def test_jws_signer(crypto_backend, rsa_private_key):
+    """
+    Ensure that all crypto backends create the same detached signature as
+    `jose`.
+    """
+    body = {"header": {"ID": "request-id"}, "payload": {"userId": "user-id"}}
+    signer = signature.JWSSigner(rsa_private_key, crypto_backend)
+    header, payload, jws_signature = jws.sign(
+        body, rsa_private_key, algorithm="RS256"
+    ).split(".")
+
+    assert signer.detached_signature(body) == f"{header}..{jws_signature}"
+    assert signer.detached_signature(body) == f"{header}..{jws_signature}"
+    assert signer.backend == crypto_backend
+
+
+def test_jws_signer_picks_installed_backend(rsa_private_key):
+    """
+    Ensure that signers pick the first crypto backend installed.
+    """
+    signer = signature.JWSSigner(rsa_private_key)
+    signer.detached_signature(b"payload")
+
+    assert signer.backend == list(signature.CRYPTO_BACKENDS)[0]
+
+
+def _signed_response(private_key: str, body: bytes, signed_body: bytes = None):
+    signer = signature.JWSSigner(private_key)
+    response = Response()
+    response.status_code = 200
+    response._content = body
+    response.headers["Signature"] = signer.detached_signature(signed_body or body)
+    return response
+
+
+def test_jws_verifier(rsa_private_key, certificate):
+    """
+    Ensure that verifiers accept valid detached signatures, whether the payload
+    is verified at once or in chunks, and reject invalid ones.
+    """
+    payload = b'{"payload":{"transactions":[' + b'{"id":1},' * 1000 + b"{}]}}"
+    detached_signature = signature.JWSSigner(rsa_private_key).detached_signature(
+        payload
+    )
+    verifier = signature.JWSVerifier(certificate)
+
+    assert verifier.verify(detached_signature, payload)
+    assert not verifier.verify(detached_signature, payload + b" ")
+
+    for chunk_size in (1, 2, 3, 7, 4096):
+        verification = verifier.streaming(detached_signature)
+
+        for position in range(0, len(payload), chunk_size):
+            verification.update(payload[position : position + chunk_size])
+
+        assert verification.verify()
+
+
+def test_nbg_verifier_is_cached(client):
+    """
+    Ensure that NBG certificates are parsed once per environment.
+    """
+    client.production = False
+    sandbox_verifier = client.nbg_verifier
+
+    other_client = signature.SignedClientMixin()
+    other_client.production = False
+
+    assert client.nbg_verifier is sandbox_verifier
+    assert other_client.nbg_verifier is sandbox_verifier
+    assert sandbox_verifier.public_key.key_size == 2048
+
+    client.production = True
+
+    assert client.nbg_verifier is not sandbox_verifier
+
+
+def test_verify_response_signature(client, rsa_private_key, certificate):
+    """
+    Ensure that signed clients verify the signatures of NBG responses.
+    """
+    verifier = signature.JWSVerifier(certificate)
+    body = b'{"payload": {}}'
+
+    with mock.patch("nbg.auth.signature.SignedClientMixin.nbg_verifier", verifier):
+        client.verify_response_signature(_signed_response(rsa_private_key, body))
+
+        with pytest.raises(exceptions.InvalidResponseSignature):
+            client.verify_response_signature(
+                _signed_response(rsa_private_key, body, b'{"payload": 1}')
+            )
+
+        unsigned_response = _signed_response(rsa_private_key, body)
+        del unsigned_response.headers["Signature"]
+
+        with pytest.raises(exceptions.InvalidResponseSignature):
+            client.verify_response_signature(unsigned_response)
+
+
+def test_set_nbg_certificate(client, rsa_private_key, certificate):
+    """
+    Ensure that responses can be verified with a certificate other than the
+    bundled NBG certificate, e.g. the one of the emulator.
+    """
+    client.production = False
+    client.set_nbg_certificate(certificate)
+    body = b'{"payload": {}}'
+
+    assert client.nbg_certificate == certificate
+
+    client.verify_response_signature(_signed_response(rsa_private_key, body))
+    client.set_nbg_certificate(None)
+
+    assert client.nbg_verifier is signature._nbg_verifier("sandbox")
@@ -0,0 +1,556 @@
+"""
+Management of the OAuth tokens of users. Token sets, i.e. access tokens along
+with their refresh tokens and expiry, are persisted in a pluggable store and
+refreshed ahead of their expiry, so that users do not have to authorize again
+after a restart and requests are never sent with expired access tokens.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import contextlib
+import json
+import os
+import tempfile
+import threading
+import time
+import typing
+
+from requests.adapters import HTTPAdapter
+from requests.exceptions import HTTPError
+import requests
+
+from . import exceptions
+from ..base import utils
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+
+TOKEN_URL = "https://my.nbg.gr/identity/connect/token"
+
+_token_session = None
+_token_session_lock = threading.Lock()
+
+
+def token_session() -> requests.Session:
+    """
+    Returns the session shared by all requests to the token endpoint that are
+    not sent by a token manager, so that they reuse pooled connections.
+    """
+    global _token_session
+
+    with _token_session_lock:
+        if _token_session is None:
+            _token_session = requests.Session()
+
+        return _token_session
+
+
+class TokenSet:
+    """
+    The tokens returned by the token endpoint for a user. ``expires_at`` is
+    the UNIX time at which the access token expires, if known.
+    """
+
+    __slots__ = (
+        "access_token",
+        "refresh_token",
+        "expires_at",
+        "token_type",
+        "scope",
+        "id_token",
+    )
+
+    def __init__(
+        self,
+        access_token: str,
+        refresh_token: str = None,
+        expires_at: float = None,
+        token_type: str = "Bearer",
+        scope: str = None,
+        id_token: str = None,
+    ):
+        self.access_token = access_token
+        self.refresh_token = refresh_token
+        self.expires_at = expires_at
+        self.token_type = token_type
+        self.scope = scope
+        self.id_token = id_token
+
+    def __eq__(self, other):
+        return isinstance(other, TokenSet) and self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        return f"TokenSet(expires_at={self.expires_at!r})"
+
+    @classmethod
+    def from_response(cls, body: dict, now: float = None) -> "TokenSet":
+        """
+        Returns the token set of the given response body of the token endpoint.
+        """
+        now = time.time() if now is None else now
+        expires_in = body.get("expires_in")
+        return cls(
+            access_token=body["access_token"],
+            refresh_token=body.get("refresh_token"),
+            expires_at=now + float(expires_in) if expires_in is not None else None,
+            token_type=body.get("token_type", "Bearer"),
+            scope=body.get("scope"),
+            id_token=body.get("id_token"),
+        )
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "TokenSet":
+        return cls(**data)
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def expires_within(self, seconds: float, now: float = None) -> bool:
+        """
+        Returns whether the access token expires within the given seconds.
+        """
+        if self.expires_at is None:
+            return False
+
+        now = time.time() if now is None else now
+        return self.expires_at - now <= seconds
+
+
+class TokenStore:
+    """
+    Base class for token stores, which persist the token sets of users.
+    """
+
+    def get(self, user: str) -> typing.Optional[TokenSet]:
+        """
+        Returns the token set of the given user, if any.
+        """
+        raise NotImplementedError()
+
+    def set(self, user: str, token_set: TokenSet):
+        """
+        Stores the token set of the given user.
+        """
+        raise NotImplementedError()
+
+    def delete(self, user: str):
+        """
+        Deletes the token set of the given user.
+        """
+        raise NotImplementedError()
+
+    def users(self) -> typing.List[str]:
+        """
+        Returns the users with stored token sets.
+        """
+        raise NotImplementedError()
+
+    @contextlib.contextmanager
+    def refresh_lock(self, user: str):
+        """
+        Locks the token set of the given user while it gets refreshed, across
+        all processes sharing the store, so that a rotated refresh token is
+        never used twice. Stores of a single process need no lock, as token
+        managers already refresh each token set in one thread at a time.
+        """
+        yield
+
+
+class MemoryTokenStore(TokenStore):
+    """
+    Stores token sets in the memory of the current process.
+    """
+
+    def __init__(self):
+        self._token_sets = {}
+        self._lock = threading.Lock()
+
+    def get(self, user: str) -> typing.Optional[TokenSet]:
+        with self._lock:
+            return self._token_sets.get(user)
+
+    def set(self, user: str, token_set: TokenSet):
+        with self._lock:
+            self._token_sets[user] = token_set
+
+    def delete(self, user: str):
+        with self._lock:
+            self._token_sets.pop(user, None)
+
+    def users(self) -> typing.List[str]:
+        with self._lock:
+            return list(self._token_sets)
+
+
+class SQLiteTokenStore(TokenStore):
+    """
+    Stores token sets in an SQLite database at the given path, which can be
+    shared by all processes of a host.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._connections = utils.SQLiteConnections(path)
+        self._connections.get().execute(
+            "CREATE TABLE IF NOT EXISTS nbg_tokens ("
+            "user TEXT PRIMARY KEY, token_set TEXT)"
+        )
+
+    def get(self, user: str) -> typing.Optional[TokenSet]:
+        row = (
+            self._connections.get()
+            .execute("SELECT token_set FROM nbg_tokens WHERE user = ?", (user,))
+            .fetchone()
+        )
+        return TokenSet.from_dict(json.loads(row[0])) if row is not None else None
+
+    def set(self, user: str, token_set: TokenSet):
+        self._connections.get().execute(
+            "INSERT OR REPLACE INTO nbg_tokens (user, token_set) VALUES (?, ?)",
+            (user, json.dumps(token_set.to_dict())),
+        )
+
+    def delete(self, user: str):
+        self._connections.get().execute(
+            "DELETE FROM nbg_tokens WHERE user = ?", (user,)
+        )
+
+    def users(self) -> typing.List[str]:
+        rows = self._connections.get().execute("SELECT user FROM nbg_tokens")
+        return [user for (user,) in rows]
+
+    @contextlib.contextmanager
+    def refresh_lock(self, user: str):
+        # The reads and writes of the refresh share the connection of the
+        # thread, so they run in the same write transaction.
+        connection = self._connections.get()
+        connection.execute("BEGIN IMMEDIATE")
+
+        try:
+            yield
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+        connection.execute("COMMIT")
+
+
+class JSONFileTokenStore(TokenStore):
+    """
+    Stores token sets in a JSON file at the given path. Access to the file is
+    serialized with an exclusive lock on ``<path>.lock``, so that it can be
+    shared by all processes of a host, and the file is replaced atomically.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _locked(self, update: typing.Callable[[dict], typing.Any]):
+        with self._lock, open(f"{self.path}.lock", "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+
+            try:
+                with open(self.path) as token_file:
+                    token_sets = json.load(token_file)
+            except FileNotFoundError:
+                token_sets = {}
+
+            original_token_sets = dict(token_sets)
+            result = update(token_sets)
+
+            if token_sets != original_token_sets:
+                directory = os.path.dirname(os.path.abspath(self.path))
+                descriptor, temporary_path = tempfile.mkstemp(dir=directory)
+
+                with os.fdopen(descriptor, "w") as temporary_file:
+                    json.dump(token_sets, temporary_file)
+
+                os.replace(temporary_path, self.path)
+
+            return result
+
+    def get(self, user: str) -> typing.Optional[TokenSet]:
+        data = self._locked(lambda token_sets: token_sets.get(user))
+        return TokenSet.from_dict(data) if data is not None else None
+
+    def set(self, user: str, token_set: TokenSet):
+        self._locked(lambda token_sets: token_sets.update({user: token_set.to_dict()}))
+
+    def delete(self, user: str):
+        self._locked(lambda token_sets: token_sets.pop(user, None))
+
+    def users(self) -> typing.List[str]:
+        return self._locked(list)
+
+    @contextlib.contextmanager
+    def refresh_lock(self, user: str):
+        # A lock file of its own, as reads and writes of the token file take
+        # the lock of ``<path>.lock`` while refreshing.
+        with open(f"{self.path}.refresh.lock", "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+
+            yield
+
+
+class TokenManager:
+    """
+    Obtains, stores and refreshes the token sets of users. Access tokens that
+    expire within ``refresh_ahead`` seconds get refreshed in the background,
+    while the current access token is still used, and access tokens that
+    expire within ``refresh_margin`` seconds get refreshed before they are
+    returned. Requests to the token endpoint share a pool of connections.
+
+    Token sets are kept in memory, so that API calls do not read the store.
+    The store is read on a miss and before each refresh, so that token sets
+    refreshed by other processes sharing the store are picked up then.
+
+    :param client_id: The Client ID of your NBG application.
+    :type client_id: string
+    :param client_secret: The Client Secret of your NBG application.
+    :type client_secret: string
+    :param store: Where to persist token sets. Defaults to a
+                  :class:`MemoryTokenStore`.
+    :type store: TokenStore
+    :param refresh_ahead: Defaults to ``300`` seconds.
+    :type refresh_ahead: float
+    :param refresh_margin: Defaults to ``30`` seconds.
+    :type refresh_margin: float
+
+    ---
+    **Usage**
+
+    .. code-block:: python
+
+        from nbg.auth.tokens import SQLiteTokenStore, TokenManager
+
+        token_manager = TokenManager(
+            client_id="your_app_client_id",
+            client_secret="your_app_client_secret",
+            store=SQLiteTokenStore("tokens.sqlite3"),
+        )
+        token_manager.exchange_authorization_code(
+            user="your_user_id",
+            authorization_code="the_authorization_code_you_received",
+            redirect_uri="https://myapp.example.com/complete/nbg/",
+        )
+        client.set_token_manager(token_manager, user="your_user_id")
+    """
+
+    def __init__(
+        self,
+        client_id: str,
+        client_secret: str,
+        store: TokenStore = None,
+        refresh_ahead: float = 300,
+        refresh_margin: float = 30,
+        token_url: str = TOKEN_URL,
+    ):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.store = store or MemoryTokenStore()
+        self.refresh_ahead = refresh_ahead
+        self.refresh_margin = refresh_margin
+        self.token_url = token_url
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_maxsize=4))
+        self.refresh_errors = {}
+        self._token_sets = {}
+        self._user_locks = {}
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._executor = None
+        self._stopped = threading.Event()
+        self._refresher = None
+
+    def _user_lock(self, user: str) -> threading.Lock:
+        with self._lock:
+            return self._user_locks.setdefault(user, threading.Lock())
+
+    def request_tokens(self, data: dict) -> TokenSet:
+        """
+        Requests a token set from the token endpoint with the given grant.
+        """
+        data = dict(data, client_id=self.client_id, client_secret=self.client_secret)
+        response = self.session.post(
+            self.token_url, headers={"cache-control": "no-cache"}, data=data
+        )
+
+        try:
+            body = response.json()
+            response.raise_for_status()
+        except HTTPError as e:
+            raise exceptions.OAuthTokenException(body.get("error", str(e)), e)
+        except ValueError as e:
+            raise exceptions.OAuthTokenException("Invalid token response.", e)
+
+        return TokenSet.from_response(body)
+
+    def exchange_authorization_code(
+        self, user: str, authorization_code: str, redirect_uri: str
+    ) -> TokenSet:
+        """
+        Exchanges an authorization code of the given user with a token set,
+        which gets stored.
+        """
+        token_set = self.request_tokens(
+            {
+                "grant_type": "authorization_code",
+                "code": authorization_code,
+                "redirect_uri": redirect_uri,
+            }
+        )
+        self._store(user, token_set)
+        return token_set
+
+    def _store(self, user: str, token_set: TokenSet):
+        self.store.set(user, token_set)
+        self._token_sets[user] = token_set
+
+    def _load(self, user: str) -> TokenSet:
+        token_set = self.store.get(user)
+
+        if token_set is None:
+            self._token_sets.pop(user, None)
+            raise exceptions.OAuthTokenException(
+                f"No tokens are stored for user {user}.", None
+            )
+
+        self._token_sets[user] = token_set
+        return token_set
+
+    def token_set(self, user: str) -> TokenSet:
+        """
+        Returns the token set of the given user, reading it from the store only
+        if it is not kept in memory yet.
+        """
+        token_set = self._token_sets.get(user)
+        return token_set if token_set is not None else self._load(user)
+
+    def refresh(self, user: str, force: bool = True) -> TokenSet:
+        """
+        Refreshes the token set of the given user with its refresh token. Unless
+        ``force`` is set, token sets that have already been refreshed, e.g. by
+        another thread or process, are returned as they are.
+        """
+        with self._user_lock(user), self.store.refresh_lock(user):
+            # Another process may have refreshed the token set meanwhile.
+            token_set = self._load(user)
+
+            if not (force or token_set.expires_within(self.refresh_ahead)):
+                return token_set
+
+            if not token_set.refresh_token:
+                raise exceptions.OAuthTokenException(
+                    f"The tokens of user {user} cannot be refreshed.", None
+                )
+
+            refreshed_token_set = self.request_tokens(
+                {
+                    "grant_type": "refresh_token",
+                    "refresh_token": token_set.refresh_token,
+                }
+            )
+
+            # Refresh tokens are not necessarily rotated.
+            if refreshed_token_set.refresh_token is None:
+                refreshed_token_set.refresh_token = token_set.refresh_token
+
+            self._store(user, refreshed_token_set)
+            self.refresh_errors.pop(user, None)
+            return refreshed_token_set
+
+    def _refresh_in_background(self, user: str):
+        with self._lock:
+            if user in self._pending:
+                return
+
+            self._pending.add(user)
+
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=2)
+
+        self._executor.submit(self._background_refresh, user)
+
+    def _background_refresh(self, user: str):
+        try:
+            self.refresh(user, force=False)
+        except Exception as exception:
+            # The access token is still valid, so the refresh is retried
+            # when it is next requested.
+            self.refresh_errors[user] = exception
+        finally:
+            with self._lock:
+                self._pending.discard(user)
+
+    def access_token(self, user: str) -> str:
+        """
+        Returns a valid access token of the given user, refreshing it if
+        needed.
+        """
+        token_set = self.token_set(user)
+
+        if token_set.expires_within(self.refresh_margin):
+            token_set = self.refresh(user, force=False)
+        elif token_set.expires_within(self.refresh_ahead):
+            self._refresh_in_background(user)
+
+        return token_set.access_token
+
+    async def access_token_async(self, user: str) -> str:
+        """
+        Returns a valid access token of the given user, like
+        :meth:`access_token`, without blocking the running event loop. Token
+        sets that are not kept in memory yet or that must be refreshed first
+        get read and refreshed in the default executor of the loop.
+        """
+        token_set = self._token_sets.get(user)
+
+        if token_set is None or token_set.expires_within(self.refresh_margin):
+            loop = asyncio.get_event_loop()
+            return await loop.run_in_executor(None, self.access_token, user)
+
+        # The token set is in memory, so at most a background refresh starts.
+        return self.access_token(user)
+
+    def refresh_expiring(self):
+        """
+        Refreshes the token sets of all stored users that expire within
+        ``refresh_ahead`` seconds, so that the refresh tokens of idle users
+        are also kept alive.
+        """
+        for user in self.store.users():
+            token_set = self.store.get(user)
+
+            if token_set is not None and token_set.expires_within(self.refresh_ahead):
+                self._background_refresh(user)
+
+    def start(self, interval: float = 60):
+        """
+        Starts a daemon thread that calls :meth:`refresh_expiring` every
+        ``interval`` seconds, until :meth:`close` is called.
+        """
+
+        def run():
+            while not self._stopped.wait(interval):
+                self.refresh_expiring()
+
+        self._refresher = threading.Thread(target=run, daemon=True)
+        self._refresher.start()
+
+    def close(self):
+        """
+        Stops refreshing tokens in the background and closes the pooled
+        connections to the token endpoint.
+        """
+        self._stopped.set()
+
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
+        self.session.close()
@@ -0,0 +1,261 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+import asyncio
+import threading
+import time
+
+import pytest
+
+from . import exceptions, oauth, tokens
+
+
+@pytest.fixture(params=["memory", "sqlite", "json"])
+def store(request, tmp_path) -> tokens.TokenStore:
+    if request.param == "memory":
+        return tokens.MemoryTokenStore()
+
+    if request.param == "sqlite":
+        return tokens.SQLiteTokenStore(str(tmp_path / "tokens.sqlite3"))
+
+    return tokens.JSONFileTokenStore(str(tmp_path / "tokens.json"))
+
+
+class DummyTokenEndpoint:
+    """
+    Answers token requests with a new token set, which expires in
+    ``expires_in`` seconds, and records the grants it receives.
+    """
+
+    def __init__(self, expires_in: int = 3600):
+        self.expires_in = expires_in
+        self.grants = []
+        self.threads = []
+        self._lock = threading.Lock()
+
+    def post(self, url, headers=None, data=None):
+        with self._lock:
+            self.grants.append(data)
+            self.threads.append(threading.get_ident())
+            index = len(self.grants)
+
+        response = mock.MagicMock()
+        response.json.return_value = {
+            "access_token": f"access-token-{index}",
+            "refresh_token": f"refresh-token-{index}",
+            "expires_in": self.expires_in,
+            "token_type": "Bearer",
+        }
+        return response
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def token_manager(store: tokens.TokenStore) -> tokens.TokenManager:
+    token_manager = tokens.TokenManager("client-id", "client-secret", store=store)
+    token_manager.session = DummyTokenEndpoint()
+    yield token_manager
+    token_manager.close()
+
+
+def test_token_set_from_response():
+    token_set = tokens.TokenSet.from_response(
+        {"access_token": "access", "refresh_token": "refresh", "expires_in": 60},
+        now=1000,
+    )
+
+    assert token_set.expires_at == 1060
+    assert token_set.expires_within(10, now=1055)
+    assert not token_set.expires_within(10, now=1000)
+    assert tokens.TokenSet.from_dict(token_set.to_dict()) == token_set
+    assert not tokens.TokenSet("access").expires_within(60)
+
+
+def test_store(store: tokens.TokenStore):
+    token_set = tokens.TokenSet("access", "refresh", 1000.0)
+    store.set("user", token_set)
+    store.set("other-user", tokens.TokenSet("other-access"))
+
+    assert store.get("user") == token_set
+    assert sorted(store.users()) == ["other-user", "user"]
+
+    store.delete("user")
+
+    assert store.get("user") is None
+    assert store.users() == ["other-user"]
+
+
+def test_exchange_authorization_code(token_manager: tokens.TokenManager):
+    token_set = token_manager.exchange_authorization_code(
+        "user", "authorization-code", "https://redirect.test"
+    )
+
+    assert token_manager.store.get("user") == token_set
+    assert token_manager.access_token("user") == "access-token-1"
+    assert token_manager.session.grants == [
+        {
+            "grant_type": "authorization_code",
+            "code": "authorization-code",
+            "redirect_uri": "https://redirect.test",
+            "client_id": "client-id",
+            "client_secret": "client-secret",
+        }
+    ]
+
+    with pytest.raises(exceptions.OAuthTokenException):
+        token_manager.access_token("unknown-user")
+
+
+def test_access_token_refreshes_expired_tokens(token_manager: tokens.TokenManager):
+    """
+    Ensure that access tokens about to expire are refreshed once before they
+    are returned, even when requested concurrently.
+    """
+    expired_token_set = tokens.TokenSet("expired", "refresh", time.time() + 10)
+    token_manager.store.set("user", expired_token_set)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        access_tokens = list(
+            executor.map(lambda _: token_manager.access_token("user"), range(8))
+        )
+
+    assert access_tokens == ["access-token-1"] * 8
+    assert token_manager.session.grants[0]["grant_type"] == "refresh_token"
+    assert token_manager.session.grants[0]["refresh_token"] == "refresh"
+    assert len(token_manager.session.grants) == 1
+
+
+def test_access_token_refreshes_in_background(token_manager: tokens.TokenManager):
+    """
+    Ensure that access tokens expiring soon are still returned, while they get
+    refreshed in the background.
+    """
+    token_manager.store.set(
+        "user", tokens.TokenSet("current", "refresh", time.time() + 120)
+    )
+
+    assert token_manager.access_token("user") == "current"
+
+    token_manager._executor.shutdown(wait=True)
+
+    assert token_manager.access_token("user") == "access-token-1"
+
+
+def test_access_token_is_kept_in_memory(token_manager: tokens.TokenManager):
+    """
+    Ensure that the store is only read on a miss and before refreshing, when
+    token sets refreshed by other processes get picked up.
+    """
+    now = time.time()
+    token_manager.store.set("user", tokens.TokenSet("current", "refresh", now + 3600))
+
+    with mock.patch.object(
+        token_manager.store, "get", wraps=token_manager.store.get
+    ) as store_get:
+        for _ in range(10):
+            assert token_manager.access_token("user") == "current"
+
+        assert store_get.call_count == 1
+
+        # Another process refreshes the token set, which expires soon here.
+        token_manager.store.set(
+            "user", tokens.TokenSet("refreshed", "refresh-2", now + 3600)
+        )
+        token_manager._token_sets["user"].expires_at = now + 10
+
+        assert token_manager.access_token("user") == "refreshed"
+        assert store_get.call_count == 2
+
+    assert token_manager.session.grants == []
+
+
+def test_refresh_is_locked_across_processes(store: tokens.TokenStore):
+    """
+    Ensure that token managers sharing a store, e.g. in different processes,
+    refresh each token set once, so that rotated refresh tokens are never
+    used twice.
+    """
+    if isinstance(store, tokens.MemoryTokenStore):
+        pytest.skip("Memory stores cannot be shared across processes.")
+
+    token_endpoint = DummyTokenEndpoint()
+    token_managers = [
+        tokens.TokenManager("client-id", "client-secret", store=store) for _ in range(4)
+    ]
+
+    for token_manager in token_managers:
+        token_manager.session = token_endpoint
+
+    store.set("user", tokens.TokenSet("expired", "refresh", time.time() + 10))
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        access_tokens = list(
+            executor.map(lambda manager: manager.access_token("user"), token_managers)
+        )
+
+    assert access_tokens == ["access-token-1"] * 4
+    assert len(token_endpoint.grants) == 1
+
+
+def test_access_token_async(token_manager: tokens.TokenManager):
+    """
+    Ensure that token sets get read and refreshed off the event loop.
+    """
+    token_manager.store.set(
+        "user", tokens.TokenSet("expired", "refresh", time.time() + 10)
+    )
+    loop = asyncio.new_event_loop()
+
+    try:
+        access_tokens = [
+            loop.run_until_complete(token_manager.access_token_async("user"))
+            for _ in range(2)
+        ]
+    finally:
+        loop.close()
+
+    assert access_tokens == ["access-token-1"] * 2
+    assert token_manager.session.threads != [threading.get_ident()]
+    assert len(token_manager.session.grants) == 1
+
+
+def test_refresh_expiring(token_manager: tokens.TokenManager):
+    now = time.time()
+    token_manager.store.set("idle", tokens.TokenSet("a", "refresh", now + 60))
+    token_manager.store.set("fresh", tokens.TokenSet("b", "refresh", now + 3600))
+    token_manager.store.set("broken", tokens.TokenSet("c", None, now + 60))
+    token_manager.refresh_expiring()
+
+    assert token_manager.store.get("idle").access_token == "access-token-1"
+    assert token_manager.store.get("fresh").access_token == "b"
+    assert isinstance(
+        token_manager.refresh_errors["broken"], exceptions.OAuthTokenException
+    )
+
+
+def test_client_token_manager(token_manager: tokens.TokenManager):
+    """
+    Ensure that clients keep the full token set and use the access token of
+    their user, as refreshed by the token manager.
+    """
+    client = oauth.OAuthClientMixin()
+    client.client_id = "client-id"
+    client.client_secret = "client-secret"
+    client.set_token_manager(token_manager)
+    client.set_access_token_from_authorization_code(
+        "authorization-code", "https://redirect.test", user="user"
+    )
+
+    assert client.access_token == "access-token-1"
+    assert client.token_set.refresh_token == "refresh-token-1"
+
+    token_manager.refresh("user")
+
+    assert client.access_token == "access-token-2"
+    assert client.request_auth.access_token == "access-token-2"
+
+    client.set_access_token("static-access-token")
+
+    assert client.access_token == "static-access-token"
+    assert client.token_set is None
@@ -0,0 +1,134 @@
+"""
+Batches of independent API calls, e.g. the details of each card of a user,
+which run concurrently on a shared pool of threads. Within a batch, every API
+method of the client returns a future instead of blocking, so that sequential
+loops of calls can run in parallel by wrapping them in a ``with`` block.
+"""
+
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor, wait
+import functools
+import typing
+
+
+class Batch:
+    """
+    Queues the API calls made through it on a pool of ``max_workers`` threads,
+    and returns a ``concurrent.futures.Future`` for each one of them. Calls run
+    as soon as a thread is free, and the batch waits for all of them when its
+    ``with`` block exits. Exceptions of calls never abort the batch: they are
+    raised by the ``result()`` of their futures, and reported in ``results``
+    and ``errors``. Other methods of the client, e.g. ``set_timeout``, are not
+    queued and run right away.
+
+    If the ``with`` block itself raises, the calls that have not started yet
+    get cancelled.
+
+    Batches get created with :meth:`batch() <nbg.base.client.BaseClient.batch>`,
+    and make the calls on the client, or client view, that created them.
+
+    :param client: The client making the calls.
+    :type client: nbg.base.client.BaseClient
+    :param max_workers: The maximum number of calls running concurrently.
+                        Defaults to ``8``.
+    :type max_workers: int
+
+    ---
+    **Usage**
+
+    .. code-block:: python
+
+        with client.batch(max_workers=8) as batch:
+            details = [
+                batch.card_details(user_id="your_user_id", card_number=number)
+                for number in card_numbers
+            ]
+
+        batch.results  # card details or exceptions, in call order
+        details[0].result()  # card details of the first card, or raises
+    """
+
+    def __init__(self, client, max_workers: int = 8):
+        self._client = client
+        self.max_workers = max_workers
+        self.futures = []
+        self._executor = None
+
+    def __enter__(self) -> "Batch":
+        self._executor = ThreadPoolExecutor(
+            self.max_workers, thread_name_prefix="nbg-batch"
+        )
+        return self
+
+    def __exit__(self, exception_type, exception, traceback):
+        if exception is not None:
+            for future in self.futures:
+                future.cancel()
+
+        self._executor.shutdown(wait=True)
+        self._executor = None
+
+    def __getattr__(self, name: str):
+        attribute = getattr(self._client, name)
+
+        if not getattr(attribute, "is_api_call", False):
+            return attribute
+
+        @functools.wraps(attribute)
+        def submit(*args, **kwargs) -> Future:
+            return self.submit(attribute, *args, **kwargs)
+
+        return submit
+
+    def submit(self, call: typing.Callable, *args, **kwargs) -> Future:
+        """
+        Queues the given call with the given arguments, e.g. a function making
+        several API calls, and returns its future.
+        """
+        if self._executor is None:
+            raise RuntimeError("Batches accept calls only inside their with block.")
+
+        future = self._executor.submit(call, *args, **kwargs)
+        self.futures.append(future)
+        return future
+
+    def wait(self, timeout: float = None):
+        """
+        Waits for the calls queued so far, for at most ``timeout`` seconds.
+        """
+        wait(self.futures, timeout)
+
+    @property
+    def results(self) -> list:
+        """
+        Returns the result of each call in call order, or its exception if it
+        failed or got cancelled.
+        """
+        self.wait()
+        results = []
+
+        for future in self.futures:
+            exception = _exception(future)
+            results.append(future.result() if exception is None else exception)
+
+        return results
+
+    @property
+    def errors(self) -> typing.Dict[int, BaseException]:
+        """
+        Returns the exception of each call that failed or got cancelled, keyed
+        by its index in call order.
+        """
+        self.wait()
+        exceptions = {}
+
+        for index, future in enumerate(self.futures):
+            exception = _exception(future)
+
+            if exception is not None:
+                exceptions[index] = exception
+
+        return exceptions
+
+
+def _exception(future: Future) -> typing.Optional[BaseException]:
+    return CancelledError() if future.cancelled() else future.exception()
@@ -0,0 +1,88 @@
+from concurrent.futures import CancelledError, Future
+import threading
+import time
+
+import pytest
+
+from . import batches, decorators
+
+
+LATENCY = 0.05
+
+
+class DummyClient:
+    """
+    Client that answers card details after a fixed latency, and fails for
+    unknown cards.
+    """
+
+    client_id = "client-id"
+
+    def __init__(self):
+        self.threads = set()
+        self.timeout = None
+
+    def set_timeout(self, timeout: float):
+        self.timeout = timeout
+
+    @decorators.api_call
+    def card_details(self, user_id: str, card_number: str) -> dict:
+        self.threads.add(threading.get_ident())
+        time.sleep(LATENCY)
+
+        if card_number == "unknown":
+            raise KeyError(card_number)
+
+        return {"userId": user_id, "cardNumber": card_number}
+
+
+def test_batch_results_in_call_order():
+    client = DummyClient()
+    card_numbers = ["4111", "unknown", "4222", "4333"]
+    started_at = time.monotonic()
+
+    with batches.Batch(client, max_workers=4) as batch:
+        details = [batch.card_details("user", number) for number in card_numbers]
+
+        assert all(isinstance(future, Future) for future in details)
+
+    assert time.monotonic() - started_at < LATENCY * 3
+    assert all(future.done() for future in details)
+    assert len(client.threads) == 4
+    results = batch.results
+
+    assert [results[0]["cardNumber"], results[2]["cardNumber"]] == ["4111", "4222"]
+    assert isinstance(results[1], KeyError)
+    assert list(batch.errors) == [1]
+    assert details[3].result() == {"userId": "user", "cardNumber": "4333"}
+
+    with pytest.raises(KeyError):
+        details[1].result()
+
+
+def test_batch_attributes():
+    client = DummyClient()
+
+    with batches.Batch(client, max_workers=1) as batch:
+        assert batch.client_id == "client-id"
+        assert batch.card_details.__name__ == "card_details"
+        assert batch.set_timeout(5) is None and client.timeout == 5
+        future = batch.submit(lambda: [client.card_details("user", "4111")])
+
+    assert future.result() == [{"userId": "user", "cardNumber": "4111"}]
+
+    with pytest.raises(RuntimeError):
+        batch.card_details("user", "4111")
+
+
+def test_batch_cancels_pending_calls_on_exception():
+    with pytest.raises(ZeroDivisionError):
+        with batches.Batch(DummyClient(), max_workers=1) as batch:
+            for number in ("4111", "4222", "4333"):
+                batch.card_details("user", number)
+
+            1 / 0
+
+    assert batch.results[0]["cardNumber"] == "4111"
+    assert isinstance(batch.results[2], CancelledError)
+    assert list(batch.errors) == [1, 2]
@@ -0,0 +1,319 @@
+"""
+Response caching for endpoints whose data change slowly, e.g. lists of
+accounts and cards. Caching is opt-in and is enabled per client via
+``set_response_cache``.
+"""
+
+from collections import OrderedDict
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import typing
+
+from . import codec, utils
+
+
+class CacheBackend:
+    """
+    Base class for response cache backends. Backends store encoded payloads
+    under opaque keys, along with the URL path and user they belong to, so that
+    entries can be invalidated per endpoint or per user.
+    """
+
+    def get(self, key: str) -> typing.Optional[bytes]:
+        """
+        Returns the value stored under the given key, or ``None`` if it is
+        missing or expired.
+        """
+        raise NotImplementedError()
+
+    def set(self, key: str, value: bytes, ttl: float, url_path: str, user: str):
+        """
+        Stores the given value under the given key for ``ttl`` seconds.
+        """
+        raise NotImplementedError()
+
+    def invalidate(self, url_path: str = None, user: str = None):
+        """
+        Deletes all entries matching the given URL path and user. Omitted
+        arguments match all entries.
+        """
+        raise NotImplementedError()
+
+    def clear(self):
+        """
+        Deletes all entries.
+        """
+        self.invalidate()
+
+
+class MemoryCacheBackend(CacheBackend):
+    """
+    Stores responses in the memory of the current process, evicting the least
+    recently used entries when more than ``max_entries`` are stored.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: str) -> typing.Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None:
+                return None
+
+            value, expires_at, url_path, user = entry
+
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl: float, url_path: str, user: str):
+        with self._lock:
+            expires_at = time.monotonic() + ttl
+            self._entries[key] = (value, expires_at, url_path, user)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, url_path: str = None, user: str = None):
+        with self._lock:
+            for key, (_, _, entry_url_path, entry_user) in list(self._entries.items()):
+                if url_path not in (None, entry_url_path):
+                    continue
+
+                if user not in (None, entry_user):
+                    continue
+
+                del self._entries[key]
+
+
+class DiskCacheBackend(CacheBackend):
+    """
+    Stores responses in an SQLite database at the given path, evicting the
+    least recently used entries when more than ``max_entries`` are stored.
+    The database can be shared by all processes of a host.
+
+    Hits update the last access of their entry at most once every
+    ``touch_interval`` seconds, so that most of them only read the database.
+    The order of eviction is therefore only accurate to that interval.
+    """
+
+    def __init__(self, path: str, max_entries: int = 10000, touch_interval: float = 1):
+        self.path = path
+        self.max_entries = max_entries
+        self.touch_interval = touch_interval
+        self._connections = utils.SQLiteConnections(path)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS nbg_response_cache ("
+            "key TEXT PRIMARY KEY, value BLOB, url_path TEXT, user TEXT, "
+            "expires_at REAL, accessed_at REAL)"
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS nbg_response_cache_accessed_at "
+            "ON nbg_response_cache (accessed_at)"
+        )
+
+    @property
+    def _connection(self) -> sqlite3.Connection:
+        return self._connections.get()
+
+    def __len__(self):
+        (count,) = self._connection.execute(
+            "SELECT COUNT(*) FROM nbg_response_cache"
+        ).fetchone()
+        return count
+
+    def get(self, key: str) -> typing.Optional[bytes]:
+        now = time.time()
+        row = self._connection.execute(
+            "SELECT value, accessed_at FROM nbg_response_cache "
+            "WHERE key = ? AND expires_at > ?",
+            (key, now),
+        ).fetchone()
+
+        if row is None:
+            return None
+
+        value, accessed_at = row
+
+        if now - accessed_at >= self.touch_interval:
+            self._connection.execute(
+                "UPDATE nbg_response_cache SET accessed_at = ? WHERE key = ?",
+                (now, key),
+            )
+
+        return bytes(value)
+
+    def set(self, key: str, value: bytes, ttl: float, url_path: str, user: str):
+        now = time.time()
+        connection = self._connection
+        connection.execute(
+            "INSERT OR REPLACE INTO nbg_response_cache "
+            "(key, value, url_path, user, expires_at, accessed_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (key, sqlite3.Binary(value), url_path, user, now + ttl, now),
+        )
+        connection.execute(
+            "DELETE FROM nbg_response_cache WHERE expires_at <= ? OR key IN ("
+            "SELECT key FROM nbg_response_cache ORDER BY accessed_at DESC "
+            "LIMIT -1 OFFSET ?)",
+            (now, self.max_entries),
+        )
+
+    def invalidate(self, url_path: str = None, user: str = None):
+        self._connection.execute(
+            "DELETE FROM nbg_response_cache "
+            "WHERE (? IS NULL OR url_path = ?) AND (? IS NULL OR user = ?)",
+            (url_path, url_path, user, user),
+        )
+
+
+class SharedMemoryCacheBackend(DiskCacheBackend):
+    """
+    Stores responses in an SQLite database on a memory-backed file system
+    (``/dev/shm`` where available), so that pre-forked processes of a host,
+    e.g. web server workers, share a single cache without touching the disk.
+    Caches with the same ``name`` are shared.
+    """
+
+    def __init__(
+        self, name: str = "nbg", max_entries: int = 10000, touch_interval: float = 1
+    ):
+        path = utils.shared_memory_path(f"{name}-response-cache.sqlite3")
+        super().__init__(path, max_entries, touch_interval)
+
+
+class ResponseCache:
+    """
+    Caches API responses per endpoint, request payload, environment, user and
+    consent.
+
+    :param backend: Where to store responses. Defaults to a
+                    :class:`MemoryCacheBackend`.
+    :type backend: CacheBackend
+    :param ttls: Seconds for which responses of each URL path are cached, e.g.
+                 ``{"account/list": 60}``. These override the defaults of the
+                 client. Responses of URL paths without TTL are not cached.
+    :type ttls: dict
+    """
+
+    def __init__(self, backend: CacheBackend = None, ttls: dict = None):
+        self.backend = backend or MemoryCacheBackend()
+        self.ttls = ttls or {}
+        self.hits = {}
+        self.misses = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def user_key(access_token: str, consent_id: str = None) -> str:
+        """
+        Returns the key of a user, without exposing their credentials.
+        """
+        credentials = f"{access_token}:{consent_id}".encode("utf-8")
+        return hashlib.sha256(credentials).hexdigest()
+
+    @staticmethod
+    def key(base_url: str, url_path: str, payload: dict, user: str) -> str:
+        """
+        Returns the cache key of a request.
+        """
+        request = json.dumps(
+            [base_url, url_path, payload, user], sort_keys=True, default=str
+        )
+        return hashlib.sha256(request.encode("utf-8")).hexdigest()
+
+    def ttl(self, url_path: str, default_ttls: dict = {}) -> typing.Optional[float]:
+        """
+        Returns the TTL of the given URL path, or ``None`` if it is not cached.
+        """
+        return self.ttls.get(url_path, default_ttls.get(url_path))
+
+    def _count(self, counters: dict, url_path: str):
+        with self._lock:
+            counters[url_path] = counters.get(url_path, 0) + 1
+
+    def get(
+        self, key: str, url_path: str, json_codec: codec.JSONCodec = None
+    ) -> typing.Optional[dict]:
+        """
+        Returns the cached response of the given key, decoded with the given
+        JSON codec, or ``None`` if it is not cached.
+        """
+        value = self.backend.get(key)
+
+        if value is None:
+            self._count(self.misses, url_path)
+            return None
+
+        self._count(self.hits, url_path)
+        return (json_codec or codec.get_codec()).loads(value)
+
+    def set(
+        self,
+        key: str,
+        payload: dict,
+        ttl: float,
+        url_path: str,
+        user: str,
+        json_codec: codec.JSONCodec = None,
+    ):
+        """
+        Caches the given response for ``ttl`` seconds, encoded with the given
+        JSON codec.
+        """
+        value = (json_codec or codec.get_codec()).dumps(payload)
+        self.backend.set(key, value, ttl, url_path, user)
+
+    def invalidate(self, url_path: str = None, user: str = None):
+        """
+        Deletes the cached responses of the given URL path and user key, as
+        returned by :meth:`user_key`. Omitted arguments match all responses.
+
+        ---
+        **Usage**
+
+        .. code-block:: python
+
+            cache.invalidate(url_path="account/list")
+            cache.invalidate(user=cache.user_key(access_token, consent_id))
+        """
+        self.backend.invalidate(url_path, user)
+
+    def clear(self):
+        """
+        Deletes all cached responses.
+        """
+        self.backend.clear()
+
+    @property
+    def stats(self) -> dict:
+        """
+        Returns the total hits and misses of the cache, along with the hits and
+        misses of each URL path.
+        """
+        with self._lock:
+            url_paths = sorted(set(self.hits) | set(self.misses))
+            return {
+                "hits": sum(self.hits.values()),
+                "misses": sum(self.misses.values()),
+                "url_paths": {
+                    url_path: {
+                        "hits": self.hits.get(url_path, 0),
+                        "misses": self.misses.get(url_path, 0),
+                    }
+                    for url_path in url_paths
+                },
+            }
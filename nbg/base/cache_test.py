@@ -0,0 +1,109 @@
+from unittest import mock
+import os
+import time
+
+import pytest
+
+from . import cache
+
+
+@pytest.fixture(params=["memory", "disk", "shared_memory"])
+def backend(request, tmp_path) -> cache.CacheBackend:
+    if request.param == "memory":
+        backend = cache.MemoryCacheBackend(max_entries=3)
+    elif request.param == "disk":
+        backend = cache.DiskCacheBackend(str(tmp_path / "cache.sqlite3"), 3, 0)
+    else:
+        backend = cache.SharedMemoryCacheBackend(f"nbg-test-{tmp_path.name}", 3, 0)
+
+    yield backend
+
+    if request.param == "shared_memory":
+        os.remove(backend.path)
+
+
+def test_backend_get_and_set(backend: cache.CacheBackend):
+    """
+    Ensure that backends return stored values until they expire.
+    """
+    backend.set("key", b"value", 60, "account/list", "user")
+    backend.set("expired-key", b"value", 0.01, "account/list", "user")
+    time.sleep(0.02)
+
+    assert backend.get("key") == b"value"
+    assert backend.get("expired-key") is None
+    assert backend.get("missing-key") is None
+
+
+def test_backend_lru_eviction(backend: cache.CacheBackend):
+    """
+    Ensure that backends evict the least recently used entries.
+    """
+    for key in ("a", "b", "c"):
+        backend.set(key, key.encode(), 60, "account/list", "user")
+        time.sleep(0.001)
+
+    backend.get("a")
+    time.sleep(0.001)
+    backend.set("d", b"d", 60, "account/list", "user")
+
+    assert backend.get("b") is None
+    assert [backend.get(key) for key in ("a", "c", "d")] == [b"a", b"c", b"d"]
+
+
+def test_disk_backend_touch_interval(tmp_path):
+    """
+    Ensure that hits update the last access of disk entries at most once per
+    touch interval.
+    """
+    backend = cache.DiskCacheBackend(str(tmp_path / "cache.sqlite3"), 2, 60)
+    backend.set("a", b"a", 120, "account/list", "user")
+    statements = []
+    backend._connection.set_trace_callback(statements.append)
+
+    for _ in range(3):
+        assert backend.get("a") == b"a"
+
+    assert not [statement for statement in statements if "UPDATE" in statement]
+
+    with mock.patch.object(cache.time, "time", return_value=time.time() + 60):
+        assert backend.get("a") == b"a"
+        assert backend.get("a") == b"a"
+
+    assert len([statement for statement in statements if "UPDATE" in statement]) == 1
+
+
+def test_backend_invalidate(backend: cache.CacheBackend):
+    """
+    Ensure that entries can be invalidated per URL path and per user.
+    """
+    backend.set("a", b"a", 60, "account/list", "user-1")
+    backend.set("b", b"b", 60, "card/list", "user-1")
+    backend.set("c", b"c", 60, "card/list", "user-2")
+
+    backend.invalidate(url_path="card/list", user="user-2")
+    assert [backend.get(key) for key in ("a", "b", "c")] == [b"a", b"b", None]
+
+    backend.invalidate(user="user-1")
+    assert [backend.get(key) for key in ("a", "b")] == [None, None]
+
+
+def test_response_cache_stats():
+    """
+    Ensure that response caches count hits and misses per URL path.
+    """
+    response_cache = cache.ResponseCache(ttls={"account/list": 60})
+    user = response_cache.user_key("access-token", "consent-id")
+    key = response_cache.key("https://nbg.test", "account/list", {}, user)
+
+    assert response_cache.get(key, "account/list") is None
+
+    response_cache.set(key, {"accounts": []}, 60, "account/list", user)
+
+    assert response_cache.get(key, "account/list") == {"accounts": []}
+    assert response_cache.backend.get(key) == b'{"accounts":[]}'
+    assert response_cache.stats == {
+        "hits": 1,
+        "misses": 1,
+        "url_paths": {"account/list": {"hits": 1, "misses": 1}},
+    }
@@ -0,0 +1,411 @@
+"""
+Circuit breaking of API calls, so that clients stop calling an endpoint of NBG
+APIs that keeps failing or responding slowly, instead of piling requests onto
+it. Each endpoint of each environment, i.e. each base URL and URL path, has its
+own circuit. Circuit breaking is opt-in and is enabled per client via
+``set_circuit_breaker``.
+"""
+
+from collections import deque
+import threading
+import time
+import typing
+
+from . import exceptions
+
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Calls rejected by the client itself never reach NBG, so they say nothing
+# about its health. Deadlines are only checked before sending an attempt.
+CLIENT_REJECTIONS = (
+    exceptions.RateLimitExceeded,
+    exceptions.ConcurrencyLimitExceeded,
+    exceptions.DeadlineExceeded,
+)
+
+
+class StateChange:
+    """
+    The change of state of a circuit, as passed to the hooks of a
+    :class:`CircuitBreaker`.
+    """
+
+    __slots__ = (
+        "url",
+        "url_path",
+        "previous_state",
+        "state",
+        "failure_rate",
+        "slow_call_rate",
+    )
+
+    def __init__(
+        self,
+        url: str,
+        url_path: str,
+        previous_state: str,
+        state: str,
+        failure_rate: float,
+        slow_call_rate: float,
+    ):
+        self.url = url
+        self.url_path = url_path
+        self.previous_state = previous_state
+        self.state = state
+        self.failure_rate = failure_rate
+        self.slow_call_rate = slow_call_rate
+
+    def __repr__(self):
+        return f"StateChange({self.url}: {self.previous_state} -> {self.state})"
+
+
+class _Circuit:
+    """
+    The state of the circuit of a single endpoint.
+    """
+
+    def __init__(self, url_path: str, window_size: int):
+        self.url_path = url_path
+        self.state = CLOSED
+        self.outcomes = deque(maxlen=window_size)
+        self.failures = 0
+        self.slow_calls = 0
+        self.opened_at = 0.0
+        self.trials = 0
+        self.trial_successes = 0
+        self.rejected = 0
+
+    @property
+    def failure_rate(self) -> float:
+        return self.failures / len(self.outcomes) if self.outcomes else 0.0
+
+    @property
+    def slow_call_rate(self) -> float:
+        return self.slow_calls / len(self.outcomes) if self.outcomes else 0.0
+
+    def add_outcome(self, failed: bool, slow: bool):
+        if len(self.outcomes) == self.outcomes.maxlen:
+            evicted_failed, evicted_slow = self.outcomes[0]
+            self.failures -= evicted_failed
+            self.slow_calls -= evicted_slow
+
+        self.outcomes.append((failed, slow))
+        self.failures += failed
+        self.slow_calls += slow
+
+    def clear(self):
+        self.outcomes.clear()
+        self.failures = self.slow_calls = 0
+        self.trials = self.trial_successes = 0
+
+
+class CircuitBreaker:
+    """
+    Breaks the circuit of an endpoint when too many of its recent calls failed
+    or were slow, so that further calls fail immediately with ``CircuitOpen``.
+    After ``open_duration``, the circuit becomes half-open and lets a few trial
+    calls through: it closes once they all succeed, or opens again as soon as
+    one of them fails or is slow.
+
+    Calls fail when they raise one of the connection errors and timeouts of the
+    HTTP library of the client, or get a response with a 5xx status. Other
+    errors of NBG APIs, e.g. ``ResponseException``, mean that the endpoint is
+    healthy and count as successful calls.
+
+    State changes are passed to hooks, i.e. callables accepting a
+    :class:`StateChange`, e.g. to stop accepting work that needs an endpoint
+    while its circuit is open. Exceptions raised by hooks are counted in
+    ``hook_errors`` and never fail the call.
+
+    :param failure_rate_threshold: The fraction of failed calls in the window
+                                   at which the circuit opens. Defaults to
+                                   ``0.5``.
+    :type failure_rate_threshold: float
+    :param slow_call_rate_threshold: The fraction of slow calls in the window
+                                     at which the circuit opens. Defaults to
+                                     ``1.0``.
+    :type slow_call_rate_threshold: float
+    :param slow_call_duration: The seconds after which a call is slow,
+                               including its retries. Defaults to ``10``.
+    :type slow_call_duration: float
+    :param window_size: The number of recent calls of each endpoint the rates
+                        are computed over. Defaults to ``20``.
+    :type window_size: int
+    :param minimum_calls: The number of calls in the window before the circuit
+                          may open. Defaults to ``10``.
+    :type minimum_calls: int
+    :param open_duration: The seconds a circuit stays open, before letting
+                          trial calls through. Defaults to ``30``.
+    :type open_duration: float
+    :param half_open_calls: The trial calls that must succeed for a half-open
+                            circuit to close. Defaults to ``3``.
+    :type half_open_calls: int
+    :param failure_exceptions: The exception classes that count as failures.
+                               Defaults to the connection errors and timeouts
+                               of the HTTP library of the client.
+    :type failure_exceptions: tuple
+    :param hooks: The hooks to call on every state change.
+    :type hooks: list
+
+    ---
+    **Usage**
+
+    .. code-block:: python
+
+        from nbg.base.circuitbreaker import CircuitBreaker, OPEN
+
+        def on_state_change(change):
+            if change.state == OPEN:
+                print(f"{change.url_path} is unavailable, shedding load")
+
+        client.set_circuit_breaker(
+            CircuitBreaker(
+                failure_rate_threshold=0.3,
+                slow_call_duration=5,
+                hooks=[on_state_change],
+            )
+        )
+    """
+
+    def __init__(
+        self,
+        failure_rate_threshold: float = 0.5,
+        slow_call_rate_threshold: float = 1.0,
+        slow_call_duration: float = 10,
+        window_size: int = 20,
+        minimum_calls: int = 10,
+        open_duration: float = 30,
+        half_open_calls: int = 3,
+        failure_exceptions: typing.Tuple[type, ...] = None,
+        hooks: typing.Iterable[typing.Callable] = (),
+    ):
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.slow_call_duration = slow_call_duration
+        self.window_size = window_size
+        self.minimum_calls = max(1, min(minimum_calls, window_size))
+        self.open_duration = open_duration
+        self.half_open_calls = max(1, half_open_calls)
+        self.failure_exceptions = failure_exceptions
+        self.hooks = list(hooks)
+        self.hook_errors = 0
+        self._circuits = {}
+        self._lock = threading.Lock()
+
+    def add_hook(self, hook: typing.Callable[[StateChange], typing.Any]):
+        """
+        Adds a hook, which gets called on every state change of a circuit.
+        """
+        self.hooks = self.hooks + [hook]
+
+    def remove_hook(self, hook: typing.Callable[[StateChange], typing.Any]):
+        """
+        Removes a hook added earlier.
+        """
+        self.hooks = [other_hook for other_hook in self.hooks if other_hook != hook]
+
+    def _circuit(self, url: str, url_path: str) -> _Circuit:
+        circuit = self._circuits.get(url)
+
+        if circuit is None:
+            circuit = self._circuits[url] = _Circuit(url_path, self.window_size)
+
+        return circuit
+
+    def _transition(
+        self, url: str, circuit: _Circuit, state: str, now: float
+    ) -> StateChange:
+        change = StateChange(
+            url,
+            circuit.url_path,
+            circuit.state,
+            state,
+            circuit.failure_rate,
+            circuit.slow_call_rate,
+        )
+        circuit.state = state
+        circuit.clear()
+
+        if state == OPEN:
+            circuit.opened_at = now
+
+        return change
+
+    def _notify(self, change: typing.Optional[StateChange]):
+        if change is None:
+            return
+
+        # Hooks are replaced rather than mutated, so they can be iterated
+        # while other threads add or remove hooks.
+        for hook in self.hooks:
+            try:
+                hook(change)
+            except Exception:
+                self.hook_errors += 1
+
+    def state(self, url: str) -> str:
+        """
+        Returns the state of the circuit of the given URL.
+        """
+        with self._lock:
+            circuit = self._circuits.get(url)
+            return CLOSED if circuit is None else circuit.state
+
+    def start(
+        self,
+        url: str,
+        url_path: str,
+        failure_exceptions: typing.Tuple[type, ...] = (),
+        track_duration: bool = True,
+    ) -> "CircuitCall":
+        """
+        Returns a new call to the given URL, or raises ``CircuitOpen`` if its
+        circuit is open. Calls that do not ``track_duration``, e.g. streamed
+        calls whose duration depends on their consumer, are never slow.
+        """
+        change = None
+        now = time.monotonic()
+
+        with self._lock:
+            circuit = self._circuit(url, url_path)
+
+            if circuit.state == OPEN:
+                retry_after = circuit.opened_at + self.open_duration - now
+
+                if retry_after > 0:
+                    circuit.rejected += 1
+                    raise exceptions.CircuitOpen(url, retry_after)
+
+                change = self._transition(url, circuit, HALF_OPEN, now)
+
+            trial = circuit.state == HALF_OPEN
+
+            if trial:
+                if circuit.trials >= self.half_open_calls:
+                    circuit.rejected += 1
+                    raise exceptions.CircuitOpen(url, 0.0)
+
+                circuit.trials += 1
+
+        self._notify(change)
+
+        if self.failure_exceptions is not None:
+            failure_exceptions = self.failure_exceptions
+
+        return CircuitCall(
+            self, url, url_path, trial, failure_exceptions, track_duration
+        )
+
+    def _record(self, call: "CircuitCall", failed: bool, slow: bool, ignored: bool):
+        change = None
+        now = time.monotonic()
+
+        with self._lock:
+            circuit = self._circuit(call.url, call.url_path)
+
+            if circuit.state == HALF_OPEN and call.trial:
+                if ignored:
+                    circuit.trials -= 1
+                elif failed or slow:
+                    circuit.add_outcome(failed, slow)
+                    change = self._transition(call.url, circuit, OPEN, now)
+                else:
+                    circuit.trial_successes += 1
+
+                    if circuit.trial_successes >= self.half_open_calls:
+                        change = self._transition(call.url, circuit, CLOSED, now)
+            elif circuit.state == CLOSED and not (ignored or call.trial):
+                circuit.add_outcome(failed, slow)
+
+                if len(circuit.outcomes) >= self.minimum_calls and (
+                    circuit.failure_rate >= self.failure_rate_threshold
+                    or circuit.slow_call_rate >= self.slow_call_rate_threshold
+                ):
+                    change = self._transition(call.url, circuit, OPEN, now)
+
+        self._notify(change)
+
+    def is_failure(
+        self, exception: Exception, failure_exceptions: typing.Tuple[type, ...] = ()
+    ) -> bool:
+        """
+        Returns whether the given exception of a call means that its endpoint
+        failed.
+        """
+        if isinstance(exception, failure_exceptions):
+            return True
+
+        status = getattr(getattr(exception, "response", None), "status_code", None)
+        return isinstance(status, int) and status >= 500
+
+    def reset(self, url: str = None):
+        """
+        Closes the circuit of the given URL, or of all URLs, and forgets their
+        recent calls.
+        """
+        with self._lock:
+            if url is None:
+                self._circuits.clear()
+            else:
+                self._circuits.pop(url, None)
+
+    @property
+    def stats(self) -> dict:
+        """
+        Returns the state of the circuit of each URL, along with the failure
+        and slow call rates of its recent calls and the calls it rejected.
+        """
+        with self._lock:
+            return {
+                url: {
+                    "state": circuit.state,
+                    "calls": len(circuit.outcomes),
+                    "failure_rate": circuit.failure_rate,
+                    "slow_call_rate": circuit.slow_call_rate,
+                    "rejected": circuit.rejected,
+                }
+                for url, circuit in sorted(self._circuits.items())
+            }
+
+
+class CircuitCall:
+    """
+    Tracks a single API call let through by a :class:`CircuitBreaker`.
+    """
+
+    def __init__(
+        self,
+        breaker: CircuitBreaker,
+        url: str,
+        url_path: str,
+        trial: bool,
+        failure_exceptions: typing.Tuple[type, ...],
+        track_duration: bool,
+    ):
+        self.breaker = breaker
+        self.url = url
+        self.url_path = url_path
+        self.trial = trial
+        self.failure_exceptions = failure_exceptions
+        self.track_duration = track_duration
+        self.started_at = time.monotonic()
+
+    def finish(self, exception: Exception = None):
+        """
+        Records the outcome of the call, i.e. whether it failed with the given
+        exception or was slow. Calls rejected by the client itself, e.g. by its
+        rate limiter, its concurrency limiter or because their deadline passed
+        before they were sent, are not recorded.
+        """
+        ignored = isinstance(exception, CLIENT_REJECTIONS)
+        failed = exception is not None and self.breaker.is_failure(
+            exception, self.failure_exceptions
+        )
+        slow = (
+            self.track_duration
+            and time.monotonic() - self.started_at >= self.breaker.slow_call_duration
+        )
+        self.breaker._record(self, failed, slow, ignored)
@@ -0,0 +1,141 @@
+from unittest import mock
+
+import pytest
+
+from . import circuitbreaker, exceptions
+
+
+URL = "https://sandbox.nbg.test/account/transactions"
+
+
+class ServerError(Exception):
+    def __init__(self, status_code: int):
+        self.response = mock.Mock(status_code=status_code)
+
+
+@pytest.fixture
+def clock():
+    with mock.patch.object(circuitbreaker.time, "monotonic") as monotonic:
+        monotonic.return_value = 1000.0
+        yield monotonic
+
+
+def call(breaker: circuitbreaker.CircuitBreaker, exception: Exception = None):
+    breaker.start(URL, "account/transactions", (ConnectionError,)).finish(exception)
+
+
+def test_circuit_opens_on_failure_rate(clock):
+    changes = []
+    breaker = circuitbreaker.CircuitBreaker(
+        window_size=4, minimum_calls=4, hooks=[changes.append]
+    )
+
+    call(breaker)
+    call(breaker, ConnectionError())
+    call(breaker, exceptions.RateLimitExceeded("account/transactions", 1))
+    call(breaker, ServerError(404))
+
+    assert breaker.state(URL) == circuitbreaker.CLOSED
+
+    call(breaker, ServerError(503))
+
+    assert breaker.state(URL) == circuitbreaker.OPEN
+    assert [(change.previous_state, change.state) for change in changes] == [
+        (circuitbreaker.CLOSED, circuitbreaker.OPEN)
+    ]
+    assert changes[0].failure_rate == 0.5
+
+    with pytest.raises(exceptions.CircuitOpen) as exception_info:
+        call(breaker)
+
+    assert exception_info.value.retry_after == 30
+    assert breaker.stats[URL]["rejected"] == 1
+    assert breaker.state("https://sandbox.nbg.test/account/list") == (
+        circuitbreaker.CLOSED
+    )
+
+
+def test_circuit_opens_on_slow_call_rate(clock):
+    breaker = circuitbreaker.CircuitBreaker(
+        slow_call_rate_threshold=0.5,
+        slow_call_duration=2,
+        window_size=2,
+        minimum_calls=2,
+    )
+    slow_call = breaker.start(URL, "account/transactions")
+    clock.return_value += 3
+    slow_call.finish()
+
+    assert breaker.state(URL) == circuitbreaker.CLOSED
+
+    streamed_call = breaker.start(URL, "account/transactions", track_duration=False)
+    clock.return_value += 3
+    streamed_call.finish()
+
+    assert breaker.state(URL) == circuitbreaker.OPEN
+
+
+def test_half_open_circuit(clock):
+    changes = []
+    breaker = circuitbreaker.CircuitBreaker(
+        window_size=2,
+        minimum_calls=2,
+        open_duration=10,
+        half_open_calls=2,
+        hooks=[lambda change: changes.append(change.state)],
+    )
+    call(breaker, ConnectionError())
+    call(breaker, ConnectionError())
+    clock.return_value += 10
+    trial_calls = [breaker.start(URL, "account/transactions") for _ in range(2)]
+
+    assert breaker.state(URL) == circuitbreaker.HALF_OPEN
+
+    with pytest.raises(exceptions.CircuitOpen):
+        call(breaker)
+
+    trial_calls[0].finish()
+    trial_calls[1].finish(ServerError(500))
+
+    assert breaker.state(URL) == circuitbreaker.OPEN
+
+    clock.return_value += 10
+
+    # Calls rejected by the client do not count as trials.
+    for exception in (
+        exceptions.RateLimitExceeded("account/transactions", 1),
+        exceptions.ConcurrencyLimitExceeded("account/transactions", 1),
+        exceptions.DeadlineExceeded("account/transactions", 1),
+    ):
+        call(breaker, exception)
+
+    assert breaker.state(URL) == circuitbreaker.HALF_OPEN
+
+    call(breaker)
+    call(breaker)
+
+    assert changes == [
+        circuitbreaker.OPEN,
+        circuitbreaker.HALF_OPEN,
+        circuitbreaker.OPEN,
+        circuitbreaker.HALF_OPEN,
+        circuitbreaker.CLOSED,
+    ]
+    assert breaker.stats[URL]["calls"] == 0
+
+
+def test_hook_errors(clock):
+    def failing_hook(change):
+        raise RuntimeError()
+
+    breaker = circuitbreaker.CircuitBreaker(window_size=1, hooks=[failing_hook])
+    call(breaker, ConnectionError())
+
+    assert breaker.state(URL) == circuitbreaker.OPEN
+    assert breaker.hook_errors == 1
+
+    breaker.remove_hook(failing_hook)
+    breaker.reset()
+
+    assert breaker.state(URL) == circuitbreaker.CLOSED
+    assert breaker.stats == {}
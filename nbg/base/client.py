@@ -3,15 +3,38 @@ NBG base client module. This is used internally to create clients for all
 supported NBG APIs.
 """
 
+from concurrent import futures
+import functools
 import json
+import threading
+import time
 import typing
 import uuid
 
 from requests import Request, Response, Session
+from requests.adapters import DEFAULT_POOLSIZE, HTTPAdapter
 from requests.auth import AuthBase
+from requests.cookies import RequestsCookieJar
 import requests
 
-from . import environment, exceptions, utils
+from . import (
+    batches,
+    cache,
+    circuitbreaker,
+    coalescing,
+    codec,
+    concurrency,
+    environment,
+    exceptions,
+    hedging,
+    priorities,
+    ratelimit,
+    retry,
+    streaming,
+    telemetry,
+    timeouts,
+    utils,
+)
 from ..auth import consent
 
 
@@ -19,39 +42,875 @@ LIST_OF_DICTS = typing.List[dict]
 DICT_OR_LIST_OF_DICTS = typing.Union[dict, LIST_OF_DICTS]
 
 
-class BaseClient(
-    Session, consent.ConsentClient, environment.EnvironmentClientMixin,
-):
-    def __init__(self, client_id: str, client_secret: str, production: bool = False):
-        super().__init__()
-        self.client_id = client_id
-        self.client_secret = client_secret
-        self.production = production
+class BaseClientMixin(consent.ConsentClient, environment.EnvironmentClientMixin):
+    """
+    Prepares NBG API requests and processes their responses, independently
+    of the HTTP transport used to send them. It is shared by the synchronous
+    :class:`BaseClient` and the asynchronous clients of :mod:`nbg.aio`.
+    """
+
+    client_id: str
+    client_secret: str
+    production: bool
+
+    _parent_client = None
+    _response_cache = None
+    _json_codec = None
+    _retry_policy = None
+    _rate_limiter = None
+    _circuit_breaker = None
+    _concurrency_limiter = None
+    _priority_scheduler = None
+    _priority = None
+    _hedging_policy = None
+    _timeout = timeouts.Timeout()
+    _request_coalescer = None
+    _instrumentation = None
+
+    # Seconds for which responses of each URL path are cached by default, when
+    # a response cache has been set.
+    _cache_ttls = {}
+
+    # URL paths whose calls are not idempotent, so retrying them could e.g.
+    # create a second consent.
+    _non_idempotent_paths = frozenset(
+        {"consents/request-access", "consents/delete", "sandbox"}
+    )
+
+    # URL paths of read-only calls, which may get hedged.
+    _read_paths = frozenset()
+
+    # Exceptions of the HTTP transport that get retried by default, and those
+    # among them that are raised before the request reaches NBG.
+    _retry_exceptions = ()
+    _unsent_exceptions = ()
+
+    def __setattr__(self, name: str, value):
+        if self._parent_client is not None:
+            raise exceptions.FrozenClientError(name)
+
+        super().__setattr__(name, value)
+
+    @property
+    def is_user_view(self) -> bool:
+        """
+        Returns whether the current client is an immutable user view, as
+        returned by :meth:`for_user`.
+        """
+        return self._parent_client is not None
+
+    def _init_user_view(self, view):
+        """
+        Hook for transports to adjust the attributes of a new user view,
+        before it gets frozen.
+        """
+
+    def for_user(
+        self, access_token: str, consent_id: str = None, sandbox_id: str = None
+    ):
+        """
+        Returns an immutable view of the current client, which authorises its
+        requests with the given user credentials. The view is cheap to create
+        and shares the connection pool, configuration and keys of the current
+        client, so that many users can be served concurrently by a single
+        client without calling ``set_access_token`` or ``set_consent_id``.
+
+        :param access_token: The access token of the user.
+        :type access_token: string
+        :param consent_id: The consent ID provided by the user. Defaults to
+                           ``None``, which means that requests will not be
+                           checked against a consent.
+        :type consent_id: string
+        :param sandbox_id: The sandbox to target. Defaults to ``None``, which
+                           means the sandbox of the current client.
+        :type sandbox_id: string
+
+        ---
+        **Usage**
+
+        .. code-block:: python
+
+            user_client = client.for_user(
+                access_token="access_token_of_your_user",
+                consent_id="consent_id_of_your_user",
+            )
+            user_client.accounts(user_id="your_user_id")
+        """
+        parent_client = self._parent_client or self
+        view = object.__new__(type(self))
+        view.__dict__.update(self.__dict__)
+        view.__dict__["_access_token"] = access_token
+        view.__dict__["_token_user"] = None
+        view.__dict__["_consent_id"] = consent_id
+
+        if sandbox_id is not None:
+            view.__dict__["_sandbox_id"] = sandbox_id
+
+        self._init_user_view(view)
+        view.__dict__["_parent_client"] = parent_client
+        return view
+
+    def _prepare_request_headers(
+        self,
+        request_id: str,
+        body: bytes,
+        headers: DICT_OR_LIST_OF_DICTS = {},
+        timings: telemetry.RequestTimings = None,
+    ) -> dict:
+        _headers = {
+            "Request-Id": request_id,
+            "Client-Id": self.client_id,
+            "Content-Type": "application/json",
+        }
+
+        signature_headers = self.signature_headers(body)
+        _headers.update(signature_headers)
+
+        if timings is not None:
+            timings.mark(telemetry.SIGN)
+
+        _headers.update(self.consent_headers)
+
+        _headers.update(self.environment_headers)
+
+        list_of_headers = [headers] if isinstance(headers, dict) else headers
+
+        for header_set in list_of_headers:
+            if callable(header_set):
+                header_set = header_set(body)
+
+            _headers.update(header_set)
+
+        if timings is not None:
+            timings.mark(telemetry.HEADERS)
+
+        return _headers
+
+    @property
+    def json_codec(self) -> codec.JSONCodec:
+        """
+        Returns the JSON codec used by the current client to encode requests and
+        decode responses. Defaults to the fastest one installed.
+        """
+        return self._json_codec or codec.get_codec()
+
+    def set_json_codec(self, json_codec: typing.Union[str, codec.JSONCodec]):
+        """
+        Sets the JSON codec used by the current client to encode requests and
+        decode responses.
+
+        :param json_codec: A codec, or the name of one in ``JSON_CODECS``, i.e.
+                           ``"orjson"`` or ``"json"``.
+        :type json_codec: nbg.base.codec.JSONCodec
+
+        ---
+        **Usage**
+
+        .. code-block:: python
+
+            client.set_json_codec("json")
+        """
+        if isinstance(json_codec, str):
+            json_codec = codec.get_codec(json_codec)
+
+        self._json_codec = json_codec
+
+    @property
+    def response_cache(self) -> typing.Optional[cache.ResponseCache]:
+        """
+        Returns the response cache of the current client, if any.
+        """
+        return self._response_cache
+
+    def set_response_cache(self, response_cache: cache.ResponseCache):
+        """
+        Sets the cache for the responses of the current client. Only responses
+        of URL paths with a TTL, either by the client or the cache, get cached.
+        User views of the client share its cache.
+
+        :param response_cache: The response cache to use, or ``None`` to
+                               disable caching.
+        :type response_cache: nbg.base.cache.ResponseCache
+
+        ---
+        **Usage**
+
+        .. code-block:: python
+
+            from nbg.base.cache import ResponseCache, SharedMemoryCacheBackend
+            client.set_response_cache(
+                ResponseCache(
+                    backend=SharedMemoryCacheBackend(),
+                    ttls={"account/list": 60},
+                )
+            )
+        """
+        self._response_cache = response_cache
+
+    @property
+    def retry_policy(self) -> typing.Optional[retry.RetryPolicy]:
+        """
+        Returns the retry policy of the current client, if any.
+        """
+        return self._retry_policy
+
+    def set_retry_policy(self, retry_policy: retry.RetryPolicy):
+        """
+        Sets the policy for retrying failed API calls of the current client.
+        User views of the client share its policy and its retry counts.
+
+        :param retry_policy: The retry policy to use, or ``None`` to disable
+                             retries.
+        :type retry_policy: nbg.base.retry.RetryPolicy
+
+        ---
+        **Usage**
+
+        .. code-block:: python
+
+            from nbg.base.retry import RetryPolicy
+            client.set_retry_policy(RetryPolicy(max_retries=3, budget=30))
+            client.retry_policy.stats
+        """
+        self._retry_policy = retry_policy
+
+    @property
+    def rate_limiter(self) -> typing.Optional[ratelimit.RateLimiter]:
+        """
+        Returns the rate limiter of the current client, if any.
+        """
+        return self._rate_limiter
+
+    def set_rate_limiter(self, rate_limiter: ratelimit.RateLimiter):
+        """
+        Sets the rate limiter consulted before sending each request of the
+        current client, including retries. User views of the client share its
+        rate limiter.
+
+        :param rate_limiter: The rate limiter to use, or ``None`` to disable
+                             rate limiting.
+        :type rate_limiter: nbg.base.ratelimit.RateLimiter
+
+        ---
+        **Usage**
+
+        .. code-block:: python
+
+            from nbg.base.ratelimit import RateLimiter
+            client.set_rate_limiter(RateLimiter(rate=10, blocking=False))
+        """
+        self._rate_limiter = rate_limiter
+
+    @property
+    def concurrency_limiter(self) -> typing.Optional[concurrency.ConcurrencyLimiter]:
+        """
+        Returns the concurrency limiter of the current client, if any.
+        """
+        return self._concurrency_limiter
+
+    def set_concurrency_limiter(
+        self, concurrency_limiter: concurrency.ConcurrencyLimiter
+    ):
+        """
+        Sets the concurrency limiter of the requests of the current client,
+        including retries, which adapts the requests in flight to each endpoint
+        to its latency and failures. User views of the client share its
+        concurrency limiter.
+
+        :param concurrency_limiter: The concurrency limiter to use, or ``None``
+                                    to disable concurrency limiting.
+        :type concurrency_limiter: nbg.base.concurrency.ConcurrencyLimiter
+
+        ---
+        **Usage**
+
+        .. code-block:: python
+
+            from nbg.base.concurrency import ConcurrencyLimiter
+            client.set_concurrency_limiter(ConcurrencyLimiter(max_wait=5))
+            client.concurrency_limiter.stats
+        """
+        self._concurrency_limiter = concurrency_limiter
+
+    @property
+    def priority_scheduler(self) -> typing.Optional[priorities.PriorityScheduler]:
+        """
+        Returns the priority scheduler of the current client, if any.
+        """
+        return self._priority_scheduler
+
+    def set_priority_scheduler(self, priority_scheduler: priorities.PriorityScheduler):
+        """
+        Sets the priority scheduler of the requests of the current client,
+        including retries, which shares the requests in flight among the lanes
+        of the client views returned by :meth:`with_priority`. User views of
+        the client share its priority scheduler.
+
+        :param priority_scheduler: The priority scheduler to use, or ``None``
+                                   to disable priority scheduling.
+        :type priority_scheduler: nbg.base.priorities.PriorityScheduler
+
+        ---
+        **Usage**
+
+        .. code-block:: python
+
+            from nbg.base.priorities import PriorityScheduler
+            client.set_priority_scheduler(PriorityScheduler(capacity=20))
+            client.priority_scheduler.stats
+        """
+        self._priority_scheduler = priority_scheduler
+
+    @property
+    def priority(self) -> typing.Optional[str]:
+        """
+        Returns the lane of the requests of the current client, or ``None`` for
+        the default lane of its priority scheduler.
+        """
+        return self._priority
+
+    def with_priority(self, lane: str):
+        """
+        Returns an immutable view of the current client, whose requests go
+        through the given lane of its priority scheduler, e.g. ``"background"``
+        for batch jobs sharing the client with interactive calls. The view is
+        cheap to create and shares everything else with the current client.
+
+        :param lane: The name of the lane of the calls of the view.
+        :type lane: string
+
+        ---
+        **Usage**
+
+        .. code-block:: python
+
+            from datetime import datetime
+
+            background_client = client.with_priority("background")
+            background_client.backfill(
+                "account_transactions",
+                user_id="your_user_id",
+                account="8000123456",
+                date_from=datetime(2015, 1, 1),
+                date_to=datetime(2020, 12, 31),
+            )
+        """
+        view = object.__new__(type(self))
+        view.__dict__.update(self.__dict__)
+        view.__dict__["_priority"] = lane
+        self._init_user_view(view)
+        view.__dict__["_parent_client"] = self._parent_client or self
+        return view
+
+    @property
+    def timeout(self) -> timeouts.Timeout:
+        """
+        Returns the timeout of the API calls of the current client.
+        """
+        return self._timeout
+
+    def set_timeout(self, timeout: timeouts.Timeout):
+        """
+        Sets the default timeout of the API calls of the current client, i.e.
+        their connect and read timeouts and their total deadline. Defaults to
+        connect and read timeouts of 10 and 60 seconds, without a deadline.
+        User views of the client share its timeout.
+
+        :param timeout: The timeout to use.
+        :type timeout: nbg.base.timeouts.Timeout
+
+        ---
+        **Usage**
+
+        .. code-block:: python
+
+            from nbg.base.timeouts import Timeout
+            client.set_timeout(Timeout(connect=3.05, read=20, total=30))
+        """
+        self._timeout = timeout
+
+    def with_timeout(self, timeout: timeouts.Timeout):
+        """
+        Returns an immutable view of the current client, whose API calls have
+        the given timeout instead of the default one, e.g. for calls that serve
+        a page and have a tighter deadline. The view is cheap to create and
+        shares everything else with the current client.
+
+        :param timeout: The timeout of the calls of the view.
+        :type timeout: nbg.base.timeouts.Timeout
+
+        ---
+        **Usage**
+
+        .. code-block:: python
+
+            from nbg.base.timeouts import Timeout
+
+            page_timeout = Timeout(connect=1, read=2, total=3)
+            client.with_timeout(page_timeout).accounts(user_id="your_user_id")
+        """
+        view = object.__new__(type(self))
+        view.__dict__.update(self.__dict__)
+        view.__dict__["_timeout"] = timeout
+        self._init_user_view(view)
+        view.__dict__["_parent_client"] = self._parent_client or self
+        return view
+
+    @property
+    def hedging_policy(self) -> typing.Optional[hedging.HedgingPolicy]:
+        """
+        Returns the hedging policy of the current client, if any.
+        """
+        return self._hedging_policy
+
+    def set_hedging_policy(self, hedging_policy: hedging.HedgingPolicy):
+        """
+        Sets the policy for hedging the read-only API calls of the current
+        client, i.e. for sending a second attempt of calls that take longer
+        than usual and using the first answer. User views of the client share
+        its policy.
+
+        :param hedging_policy: The hedging policy to use, or ``None`` to
+                               disable hedging.
+        :type hedging_policy: nbg.base.hedging.HedgingPolicy
+
+        ---
+        **Usage**
+
+        .. code-block:: python
+
+            from nbg.base.hedging import HedgingPolicy
+            client.set_hedging_policy(HedgingPolicy(budget=0.05))
+            client.hedging_policy.stats
+        """
+        self._hedging_policy = hedging_policy
+
+    def _hedging_for(self, url_path: str) -> typing.Optional[hedging.HedgingPolicy]:
+        if self._hedging_policy is None or url_path not in self._read_paths:
+            return None
+
+        return self._hedging_policy
+
+    @property
+    def circuit_breaker(self) -> typing.Optional[circuitbreaker.CircuitBreaker]:
+        """
+        Returns the circuit breaker of the current client, if any.
+        """
+        return self._circuit_breaker
+
+    def set_circuit_breaker(self, circuit_breaker: circuitbreaker.CircuitBreaker):
+        """
+        Sets the circuit breaker of the API calls of the current client, which
+        reach NBG. Calls to an endpoint whose circuit is open raise
+        ``CircuitOpen`` without being sent. User views of the client share its
+        circuit breaker.
+
+        :param circuit_breaker: The circuit breaker to use, or ``None`` to
+                                disable circuit breaking.
+        :type circuit_breaker: nbg.base.circuitbreaker.CircuitBreaker
+
+        ---
+        **Usage**
+
+        .. code-block:: python
+
+            from nbg.base.circuitbreaker import CircuitBreaker
+            client.set_circuit_breaker(CircuitBreaker(open_duration=60))
+            client.circuit_breaker.stats
+        """
+        self._circuit_breaker = circuit_breaker
+
+    @property
+    def instrumentation(self) -> typing.Optional[telemetry.Instrumentation]:
+        """
+        Returns the instrumentation of the current client, if any.
+        """
+        return self._instrumentation
+
+    def set_instrumentation(self, instrumentation: telemetry.Instrumentation):
+        """
+        Sets the instrumentation recording the timings of each API call of the
+        current client that reaches NBG, including streamed calls. User views
+        of the client share its instrumentation.
+
+        :param instrumentation: The instrumentation to use, or ``None`` to
+                                disable it.
+        :type instrumentation: nbg.base.telemetry.Instrumentation
+
+        ---
+        **Usage**
+
+        .. code-block:: python
+
+            from nbg.base.telemetry import Instrumentation
+            client.set_instrumentation(
+                Instrumentation(hooks=[lambda timings: print(timings.phases)])
+            )
+        """
+        self._instrumentation = instrumentation
+
+    def _start_timings(
+        self, method: str, url_path: str
+    ) -> typing.Optional[telemetry.RequestTimings]:
+        if self._instrumentation is None:
+            return None
+
+        return self._instrumentation.start(method, url_path)
+
+    def _finish_timings(
+        self, timings: telemetry.RequestTimings, exception: Exception = None
+    ):
+        self._instrumentation.finish(timings, exception)
+
+    def _start_circuit(
+        self, url_path: str, track_duration: bool = True
+    ) -> typing.Optional[circuitbreaker.CircuitCall]:
+        if self._circuit_breaker is None:
+            return None
+
+        return self._circuit_breaker.start(
+            f"{self.base_url}/{url_path}",
+            url_path,
+            failure_exceptions=self._retry_exceptions,
+            track_duration=track_duration,
+        )
+
+    def _release_slots(
+        self,
+        lane_permit: typing.Optional[priorities.LanePermit],
+        permit: typing.Optional[concurrency.ConcurrencyPermit],
+        status: int = None,
+        exception: Exception = None,
+    ):
+        if lane_permit is not None:
+            lane_permit.release()
+
+        if permit is not None:
+            # Connection errors and timeouts mean that NBG may be overloaded.
+            permit.release(
+                status, overloaded=isinstance(exception, self._retry_exceptions)
+            )
+
+    def _start_retry(self, url_path: str) -> typing.Optional[retry.RetryCall]:
+        retry_policy = self.retry_policy
+
+        if retry_policy is None:
+            return None
+
+        return retry_policy.start(
+            url_path,
+            idempotent=url_path not in self._non_idempotent_paths,
+            retry_exceptions=self._retry_exceptions,
+            unsent_exceptions=self._unsent_exceptions,
+        )
+
+    def _request_key(self, url_path: str, data) -> typing.Tuple[str, str]:
+        """
+        Returns the key of the given request, which identifies its endpoint,
+        payload, environment and credentials, along with the key of its user.
+        """
+        # Users with managed tokens keep their key when their tokens refresh.
+        credentials = self._token_user or getattr(self, "_access_token", None)
+        user = cache.ResponseCache.user_key(credentials, self.consent_id)
+        request = [data, self.environment_headers]
+        return cache.ResponseCache.key(self.base_url, url_path, request, user), user
+
+    @property
+    def request_coalescer(self) -> typing.Optional[coalescing.RequestCoalescer]:
+        """
+        Returns the request coalescer of the current client, if any.
+        """
+        return self._request_coalescer
+
+    def set_request_coalescer(self, request_coalescer: coalescing.RequestCoalescer):
+        """
+        Sets the coalescer of identical concurrent requests of the current
+        client. Requests that are not idempotent are never coalesced. User
+        views of the client share its coalescer, so identical requests of the
+        same user share a single round trip.
 
-    def _prepare_request_headers(self, request_id: str) -> dict:
-        headers = {"Request-Id": request_id}
+        :param request_coalescer: The request coalescer to use, or ``None`` to
+                                  disable coalescing.
+        :type request_coalescer: nbg.base.coalescing.RequestCoalescer
 
-        return headers
+        ---
+        **Usage**
+
+        .. code-block:: python
+
+            from nbg.base.coalescing import RequestCoalescer
+            client.set_request_coalescer(RequestCoalescer())
+        """
+        self._request_coalescer = request_coalescer
+
+    def _coalescing_key(
+        self, method: str, url_path: str, data: dict, headers
+    ) -> typing.Optional[str]:
+        """
+        Returns the key under which the given request gets coalesced, or
+        ``None`` if it should not be coalesced.
+        """
+        if self._request_coalescer is None or url_path in self._non_idempotent_paths:
+            return None
+
+        # Callable headers, e.g. signatures, are computed from the payload,
+        # which is part of the key already.
+        list_of_headers = [headers] if isinstance(headers, dict) else headers
+        headers = [
+            header_set for header_set in list_of_headers if not callable(header_set)
+        ]
+        key, _ = self._request_key(url_path, [method, data, headers])
+        return key
+
+    def _get_cached_response(
+        self, url_path: str, data: dict
+    ) -> typing.Tuple[typing.Optional[tuple], typing.Optional[dict]]:
+        """
+        Returns the cache entry of the given request, if it should be cached,
+        along with its cached payload, if any.
+        """
+        response_cache = self._response_cache
+
+        if response_cache is None:
+            return None, None
+
+        ttl = response_cache.ttl(url_path, self._cache_ttls)
+
+        if not ttl:
+            return None, None
+
+        key, user = self._request_key(url_path, data)
+        return (key, ttl, user), response_cache.get(key, url_path, self.json_codec)
+
+    def _cache_response(self, cache_entry: tuple, url_path: str, payload: dict):
+        key, ttl, user = cache_entry
+        self._response_cache.set(key, payload, ttl, url_path, user, self.json_codec)
+
+    def _prepare_request(
+        self,
+        method: str,
+        url_path: str,
+        data: dict = {},
+        headers: DICT_OR_LIST_OF_DICTS = {},
+        timings: telemetry.RequestTimings = None,
+    ) -> typing.Tuple[str, dict, bytes]:
+        request_id = str(uuid.uuid4())
+        body = utils.encode_request_body(
+            self._prepare_request_body(request_id, method, data), self.json_codec
+        )
+
+        if timings is not None:
+            timings.request_id = request_id
+            timings.mark(telemetry.PREPARE_BODY)
+
+        _headers = self._prepare_request_headers(request_id, body, headers, timings)
+        url = f"{self.base_url}/{url_path}"
+        return url, _headers, body
 
     def _prepare_request_body(self, request_id: str, method: str, data: dict) -> dict:
-        payload = utils.serialize_request_payload(data)
+        # Datetimes in the payload get serialized by the JSON codec.
         body = {
             "header": {"ID": request_id, "application": self.client_id},
-            "payload": payload,
+            "payload": data,
         }
         return body
 
-    def _process_response(self, response: Response) -> dict:
-        data = utils.validate_response(response)
+    def _should_verify_response(self, response: Response) -> bool:
+        return self.response_verification_enabled and response.status_code < 400
+
+    def _process_response(
+        self,
+        response: Response,
+        verify: bool = True,
+        timings: telemetry.RequestTimings = None,
+    ) -> dict:
+        if verify and self._should_verify_response(response):
+            self.verify_response_signature(response)
+
+            if timings is not None:
+                timings.mark(telemetry.VERIFY)
+
+        data = utils.validate_response(response, self.json_codec)
+
+        if timings is not None:
+            timings.mark(telemetry.DECODE)
 
         if data.get("Message"):
-            raise exceptions.GenericResponseError(response)
+            raise exceptions.GenericResponseError(response, data)
 
         if data.get("exception"):
-            raise exceptions.ResponseException(response)
+            raise exceptions.ResponseException(response, data)
 
         return data["payload"]
 
+
+class BaseClient(Session, BaseClientMixin):
+    _retry_exceptions = (
+        requests.exceptions.ConnectionError,
+        requests.exceptions.Timeout,
+    )
+    _unsent_exceptions = (requests.exceptions.ConnectTimeout,)
+
+    def __init__(
+        self,
+        client_id: str,
+        client_secret: str,
+        production: bool = False,
+        connection_limit: int = DEFAULT_POOLSIZE,
+    ):
+        super().__init__()
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.production = production
+        self.connection_limit = connection_limit
+        self.mount("https://", HTTPAdapter(pool_maxsize=connection_limit))
+
+    def _init_user_view(self, view):
+        # Cookies are the only state that `requests` keeps per session, so
+        # they should never be shared between users.
+        view.__dict__["cookies"] = RequestsCookieJar()
+
+    def close(self):
+        """
+        Closes all pooled connections of the current client. User views share
+        the connection pool of their client, so closing them has no effect.
+        """
+        if not self.is_user_view:
+            super().close()
+
+    def batch(self, max_workers: int = 8) -> batches.Batch:
+        """
+        Returns a batch of API calls of the current client, to be used as a
+        context manager. Within the batch, every API method returns a future
+        instead of blocking, and the calls run concurrently on a pool of
+        ``max_workers`` threads. The batch waits for all of them when the
+        ``with`` block exits, and its ``results`` hold the result or exception
+        of each call, in call order.
+
+        :param max_workers: The maximum number of calls running concurrently,
+                            which should not exceed the connection limit of
+                            the client. Defaults to ``8``.
+        :type max_workers: int
+
+        ---
+        **Usage**
+
+        .. code-block:: python
+
+            with client.batch(max_workers=8) as batch:
+                for consent_id in consent_ids:
+                    batch.get_consent_information(consent_id, user_id="your_user_id")
+
+            consents = batch.results
+        """
+        return batches.Batch(self, max_workers)
+
+    def _send(
+        self,
+        method: str,
+        url_path: str,
+        url: str,
+        headers: dict,
+        body: bytes,
+        timings: telemetry.RequestTimings = None,
+        deadline: timeouts.Deadline = None,
+        cancelled: threading.Event = None,
+        **kwargs,
+    ) -> Response:
+        """
+        Sends the given request, retrying it according to the retry policy of
+        the client, until its deadline. Once ``cancelled`` is set, e.g. because
+        another attempt answered the call, it raises ``CancelledError`` instead
+        of retrying.
+        """
+        retry_call = self._start_retry(url_path)
+        auth = self.request_auth
+
+        if deadline is None:
+            deadline = self.timeout.start(url_path)
+
+        if timings is not None:
+            timings.mark(telemetry.AUTH)
+
+        while True:
+            lane_permit = permit = None
+
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(url_path)
+
+            if self.priority_scheduler is not None:
+                lane_permit = self.priority_scheduler.acquire(self.priority, url_path)
+
+            if self.concurrency_limiter is not None:
+                try:
+                    permit = self.concurrency_limiter.acquire(url_path)
+                except BaseException:
+                    self._release_slots(lane_permit, None)
+                    raise
+
+            if timings is not None and (
+                self.rate_limiter is not None
+                or lane_permit is not None
+                or permit is not None
+            ):
+                timings.mark(telemetry.RATE_LIMIT)
+
+            try:
+                timeout = deadline.timeouts()
+            except exceptions.DeadlineExceeded:
+                # e.g. the call waited for its slots past its deadline.
+                self._release_slots(lane_permit, permit)
+                raise
+
+            try:
+                response = self.request(
+                    method,
+                    url,
+                    headers=headers,
+                    auth=auth,
+                    data=body,
+                    timeout=timeout,
+                    **kwargs,
+                )
+            except Exception as exception:
+                self._release_slots(lane_permit, permit, exception=exception)
+
+                if timings is not None:
+                    timings.mark(telemetry.TRANSFER)
+
+                if retry_call is None:
+                    raise
+
+                delay = retry_call.next_delay(exception=exception)
+
+                if delay is None or not deadline.allows(delay):
+                    raise
+            else:
+                self._release_slots(lane_permit, permit, response.status_code)
+
+                if timings is not None:
+                    timings.mark(telemetry.TRANSFER)
+                    timings.status = response.status_code
+
+                if retry_call is None:
+                    return response
+
+                delay = retry_call.next_delay(response=response)
+
+                if delay is None or not deadline.allows(delay):
+                    return response
+
+                response.close()
+
+            if cancelled is None:
+                time.sleep(delay)
+            elif cancelled.wait(delay):
+                raise futures.CancelledError()
+
+            if timings is not None:
+                timings.retries += 1
+                timings.mark(telemetry.RETRY_WAIT)
+
     def _api_request(
         self,
         method: str,
@@ -59,27 +918,238 @@ class BaseClient(
         data: dict = {},
         headers: DICT_OR_LIST_OF_DICTS = {},
     ) -> dict:
-        request_id = str(uuid.uuid4())
-        body = self._prepare_request_body(request_id, method, data)
-        auth = self.request_auth
+        cache_entry, cached_payload = self._get_cached_response(url_path, data)
 
-        _headers = {"Request-Id": request_id, "Client-Id": self.client_id}
+        if cached_payload is not None:
+            return cached_payload
 
-        signature_headers = self.signature_headers(body)
-        _headers.update(signature_headers)
+        request = functools.partial(
+            self._fetch, method, url_path, data, headers, cache_entry
+        )
+        coalescing_key = self._coalescing_key(method, url_path, data, headers)
 
-        _headers.update(self.consent_headers)
+        if coalescing_key is None:
+            return request()
 
-        _headers.update(self.environment_headers)
+        return self._request_coalescer.call(coalescing_key, url_path, request)
 
-        list_of_headers = [headers] if isinstance(headers, dict) else headers
+    def _fetch(
+        self,
+        method: str,
+        url_path: str,
+        data: dict,
+        headers: DICT_OR_LIST_OF_DICTS,
+        cache_entry: typing.Optional[tuple],
+    ) -> dict:
+        timings = self._start_timings(method, url_path)
+        circuit_call = None
 
-        for header_set in list_of_headers:
-            if callable(header_set):
-                header_set = header_set(body)
+        try:
+            circuit_call = self._start_circuit(url_path)
+            attempt = functools.partial(
+                self._attempt,
+                method,
+                url_path,
+                data,
+                headers,
+                self.timeout.start(url_path),
+            )
+            hedging_policy = self._hedging_for(url_path)
 
-            _headers.update(header_set)
+            if hedging_policy is None:
+                response, payload = attempt(timings)
+            else:
+                response, payload = self._hedge(
+                    hedging_policy, url_path, attempt, timings
+                )
+        except Exception as exception:
+            if circuit_call is not None:
+                circuit_call.finish(exception)
 
-        url = f"{self.base_url}/{url_path}"
-        response = self.request(method, url, headers=_headers, auth=auth, json=body)
-        return self._process_response(response)
+            if timings is not None:
+                self._finish_timings(timings, exception)
+
+            raise
+
+        if circuit_call is not None:
+            circuit_call.finish()
+
+        if cache_entry is not None:
+            self._cache_response(cache_entry, url_path, payload)
+
+        if timings is not None:
+            timings.response_size = len(response.content)
+            self._finish_timings(timings)
+
+        return payload
+
+    def _attempt(
+        self,
+        method: str,
+        url_path: str,
+        data: dict,
+        headers: DICT_OR_LIST_OF_DICTS,
+        deadline: timeouts.Deadline,
+        timings: typing.Optional[telemetry.RequestTimings],
+        cancelled: threading.Event = None,
+    ) -> typing.Tuple[Response, dict]:
+        """
+        Sends a single attempt of an API call, including its retries, and
+        returns its response along with its payload.
+        """
+        url, _headers, body = self._prepare_request(
+            method, url_path, data, headers, timings
+        )
+        response = self._send(
+            method, url_path, url, _headers, body, timings, deadline, cancelled
+        )
+        return response, self._process_response(response, timings=timings)
+
+    def _hedge(
+        self,
+        hedging_policy: hedging.HedgingPolicy,
+        url_path: str,
+        attempt: typing.Callable,
+        timings: typing.Optional[telemetry.RequestTimings],
+    ) -> typing.Tuple[Response, dict]:
+        """
+        Sends the given attempt of a read-only call and, if it takes longer
+        than the hedging delay of its endpoint, a second one, returning the
+        first answer of either. The other attempt is cancelled before its next
+        retry, but may still finish the request it has in flight.
+        """
+        delay = hedging_policy.delay(url_path)
+
+        def timed_attempt(timings=None, cancelled=None):
+            started_at = time.monotonic()
+            result = attempt(timings, cancelled)
+            hedging_policy.record(url_path, time.monotonic() - started_at)
+            return result
+
+        if delay is None:
+            return timed_attempt(timings)
+
+        # Attempts run concurrently, so each one records its own timings and
+        # those of the attempt answering the call get merged into its timings.
+        executor = hedging_policy.executor
+        attempts = {}
+
+        def submit() -> futures.Future:
+            attempt_timings = (
+                None
+                if timings is None
+                else telemetry.RequestTimings(timings.method, url_path)
+            )
+            cancelled = threading.Event()
+            future = executor.submit(timed_attempt, attempt_timings, cancelled)
+            attempts[future] = attempt_timings, cancelled
+            return future
+
+        primary = winner = submit()
+        done, pending = futures.wait([primary], timeout=delay)
+
+        if not done and hedging_policy.take_hedge(url_path):
+            hedge = submit()
+            pending = {primary, hedge}
+            winner = None
+
+            while pending and winner is None:
+                done, pending = futures.wait(
+                    pending, return_when=futures.FIRST_COMPLETED
+                )
+
+                for future in done:
+                    if future.exception() is None:
+                        winner = future
+
+                        if future is hedge:
+                            hedging_policy.hedge_won(url_path)
+
+                        break
+
+            if winner is None:
+                winner = primary
+
+            for future, (_, cancelled) in attempts.items():
+                if future is not winner:
+                    cancelled.set()
+
+        futures.wait([winner])
+
+        if timings is not None:
+            timings.merge(attempts[winner][0])
+
+        return winner.result()
+
+    def _api_stream(
+        self,
+        method: str,
+        url_path: str,
+        data: dict = {},
+        records_key: str = "transactions",
+    ) -> typing.Iterator[dict]:
+        timings = self._start_timings(method, url_path)
+        circuit_call = None
+
+        try:
+            # Streamed calls last as long as their consumer, so they are
+            # never slow for the circuit breaker.
+            circuit_call = self._start_circuit(url_path, track_duration=False)
+            yield from self._stream(method, url_path, data, records_key, timings)
+        except Exception as exception:
+            if circuit_call is not None:
+                circuit_call.finish(exception)
+
+            if timings is not None:
+                self._finish_timings(timings, exception)
+
+            raise
+        except GeneratorExit:
+            if circuit_call is not None:
+                circuit_call.finish()
+
+            raise
+
+        if circuit_call is not None:
+            circuit_call.finish()
+
+        if timings is not None:
+            self._finish_timings(timings)
+
+    def _stream(
+        self,
+        method: str,
+        url_path: str,
+        data: dict,
+        records_key: str,
+        timings: typing.Optional[telemetry.RequestTimings],
+    ) -> typing.Iterator[dict]:
+        url, _headers, body = self._prepare_request(method, url_path, data, {}, timings)
+        response = self._send(
+            method, url_path, url, _headers, body, timings, stream=True
+        )
+
+        verification = None
+
+        if self._should_verify_response(response):
+            verification = self.streaming_verification(response)
+
+        with response:
+            envelope = yield from streaming.iter_response_records(
+                response, records_key, verification=verification
+            )
+
+        if timings is not None:
+            # Streamed records are parsed while they are transferred.
+            timings.mark(telemetry.TRANSFER)
+            content_length = response.headers.get("Content-Length")
+            timings.response_size = int(content_length) if content_length else None
+
+        if verification is not None:
+            self.check_response_verification(response, verification)
+
+            if timings is not None:
+                timings.mark(telemetry.VERIFY)
+
+        buffered_response = streaming.buffered_response(response, envelope)
+        self._process_response(buffered_response, verify=False, timings=timings)
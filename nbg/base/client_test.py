@@ -0,0 +1,859 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from unittest import mock
+import base64
+import io
+import json
+import threading
+import time
+import tracemalloc
+
+from requests import Response
+from requests.adapters import BaseAdapter
+import requests
+import pytest
+
+from ..auth import exceptions as auth_exceptions
+from . import (
+    cache,
+    circuitbreaker,
+    client,
+    codec,
+    coalescing,
+    concurrency,
+    exceptions,
+    hedging,
+    priorities,
+    ratelimit,
+    retry,
+    telemetry,
+    timeouts,
+)
+
+
+class EchoAdapter(BaseAdapter):
+    """
+    Transport adapter that answers every request with its own headers and
+    body as the response payload.
+    """
+
+    requests_sent = 0
+
+    def send(self, request, **kwargs):
+        self.requests_sent += 1
+        payload = {
+            "headers": dict(request.headers),
+            "body": json.loads(request.body),
+            "raw_body": request.body.decode("utf-8"),
+        }
+        response = Response()
+        response.status_code = 200
+        response.encoding = "utf-8"
+        response._content = json.dumps({"payload": payload}).encode("utf-8")
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+class StreamAdapter(BaseAdapter):
+    """
+    Transport adapter that answers every request with a streamed body.
+    """
+
+    def __init__(self, body: dict):
+        super().__init__()
+        self.body = body
+
+    def send(self, request, stream=False, **kwargs):
+        response = Response()
+        response.status_code = 200
+        response.encoding = "utf-8"
+        response.raw = io.BytesIO(json.dumps(self.body).encode("utf-8"))
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+class FlakyAdapter(EchoAdapter):
+    """
+    Transport adapter that fails with each of the given responses or
+    exceptions, before answering like the echo adapter.
+    """
+
+    def __init__(self, failures: list):
+        super().__init__()
+        self.failures = list(failures)
+
+    def send(self, request, **kwargs):
+        if not self.failures:
+            return super().send(request, **kwargs)
+
+        self.requests_sent += 1
+        failure = self.failures.pop(0)
+
+        if isinstance(failure, Exception):
+            raise failure
+
+        response = Response()
+        response.status_code = failure
+        response.headers["Retry-After"] = "0"
+        response._content = b"Service Unavailable"
+        response.request = request
+        return response
+
+
+class SlowAdapter(EchoAdapter):
+    """
+    Transport adapter that waits for each of the given delays before answering
+    like the echo adapter, and records the timeout of each request.
+    """
+
+    def __init__(self, delays: list):
+        super().__init__()
+        self.delays = list(delays)
+        self.timeouts = []
+
+    def send(self, request, timeout=None, **kwargs):
+        self.timeouts.append(timeout)
+
+        if self.delays:
+            time.sleep(self.delays.pop(0))
+
+        return super().send(request, **kwargs)
+
+
+@pytest.fixture
+def base_client() -> client.BaseClient:
+    base_client = client.BaseClient("client-id", "client-secret")
+    base_client._sandbox_base_url = "https://sandbox.nbg.test"
+    base_client.mount("https://", EchoAdapter())
+    base_client.set_access_token("client-access-token")
+    base_client.set_sandbox("client-sandbox-id")
+    return base_client
+
+
+def test_for_user_credentials(base_client: client.BaseClient):
+    """
+    Ensure that user views authorise requests with their own credentials and
+    leave the credentials of their client intact.
+    """
+    view = base_client.for_user("user-access-token", consent_id="user-consent-id")
+    payload = view._api_request("POST", "account/list", {"userId": "user"})
+
+    assert payload["headers"]["Authorization"] == "Bearer user-access-token"
+    assert payload["headers"]["Consent-Id"] == "user-consent-id"
+    assert payload["headers"]["sandbox_id"] == "client-sandbox-id"
+    assert base_client.access_token == "client-access-token"
+    assert base_client.consent_id is None
+
+    other_view = view.for_user("other-access-token", sandbox_id="other-sandbox-id")
+    payload = other_view._api_request("POST", "account/list", {"userId": "user"})
+
+    assert payload["headers"]["Authorization"] == "Bearer other-access-token"
+    assert payload["headers"]["X-Consent-Check"] == "false"
+    assert payload["headers"]["sandbox_id"] == "other-sandbox-id"
+
+
+def test_for_user_shares_connection_pool(base_client: client.BaseClient):
+    """
+    Ensure that user views share the connection pool of their client, but not
+    its cookies.
+    """
+    view = base_client.for_user("user-access-token")
+
+    assert view.adapters is base_client.adapters
+    assert view.cookies is not base_client.cookies
+    assert view._parent_client is base_client
+    assert view.for_user("another-token")._parent_client is base_client
+
+
+def test_for_user_is_immutable(base_client: client.BaseClient):
+    """
+    Ensure that user views cannot be modified.
+    """
+    view = base_client.for_user("user-access-token")
+
+    with pytest.raises(exceptions.FrozenClientError):
+        view.set_access_token("another-access-token")
+
+    with pytest.raises(exceptions.FrozenClientError):
+        view.set_consent_id("another-consent-id")
+
+    assert view.access_token == "user-access-token"
+    assert view.is_user_view and not base_client.is_user_view
+
+
+def test_for_user_concurrent_requests(base_client: client.BaseClient):
+    """
+    Ensure that concurrent requests of different users never mix up their
+    credentials.
+    """
+
+    def request_as_user(index):
+        view = base_client.for_user(f"token-{index}", consent_id=f"consent-{index}")
+        payload = view._api_request("POST", "account/list", {"userId": index})
+        return index, payload
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        results = list(executor.map(request_as_user, range(200)))
+
+    for index, payload in results:
+        assert payload["headers"]["Authorization"] == f"Bearer token-{index}"
+        assert payload["headers"]["Consent-Id"] == f"consent-{index}"
+        assert payload["body"]["payload"] == {"userId": index}
+
+
+def test_api_stream(base_client: client.BaseClient):
+    """
+    Ensure that streamed API requests yield the records of the response.
+    """
+    transactions = [{"id": index} for index in range(10)]
+    body = {"exception": None, "payload": {"transactions": transactions}}
+    base_client.mount("https://", StreamAdapter(body))
+
+    records = base_client._api_stream("POST", "account/transactions", {})
+
+    assert list(records) == transactions
+
+
+def test_api_stream_exception(base_client: client.BaseClient):
+    """
+    Ensure that streamed API requests raise response exceptions.
+    """
+    exception = {"id": "1", "sev": "2", "desc": "Oops", "cat": "3", "code": "4"}
+    base_client.mount("https://", StreamAdapter({"exception": exception}))
+
+    with pytest.raises(exceptions.ResponseException) as exception_info:
+        list(base_client._api_stream("POST", "account/transactions", {}))
+
+    assert exception_info.value.description == "Oops"
+
+
+def test_response_cache(base_client: client.BaseClient):
+    """
+    Ensure that cached responses are reused per URL path, payload and user,
+    and that they are encoded with the JSON codec of the client.
+    """
+    adapter = EchoAdapter()
+    base_client.mount("https://", adapter)
+    base_client.set_response_cache(cache.ResponseCache(ttls={"account/list": 60}))
+    json_codec = mock.Mock(wraps=codec.StandardJSONCodec())
+    base_client.set_json_codec(json_codec)
+    view = base_client.for_user("user-access-token")
+
+    first_payload = base_client._api_request("POST", "account/list", {"userId": "1"})
+    second_payload = base_client._api_request("POST", "account/list", {"userId": "1"})
+    base_client._api_request("POST", "account/list", {"userId": "2"})
+    view._api_request("POST", "account/list", {"userId": "1"})
+    base_client._api_request("POST", "card/list", {"userId": "1"})
+    base_client._api_request("POST", "card/list", {"userId": "1"})
+
+    assert first_payload == second_payload
+    assert adapter.requests_sent == 5
+    assert base_client.response_cache.stats["hits"] == 1
+    assert mock.call(first_payload) in json_codec.dumps.call_args_list
+
+    base_client.response_cache.invalidate(url_path="account/list")
+    base_client._api_request("POST", "account/list", {"userId": "1"})
+
+    assert adapter.requests_sent == 6
+
+
+def test_api_request_signs_sent_bytes(base_client: client.BaseClient):
+    """
+    Ensure that the request body is encoded once and that exactly the sent
+    bytes get signed.
+    """
+    base_client.set_tpp_private_key("private-key")
+    base_client.set_response_verification(False)
+    data = {"userId": "user", "dateFrom": datetime(2020, 1, 1), "name": "Ελλάδα"}
+
+    with mock.patch(
+        "nbg.auth.signature.JWSSigner.sign", return_value=b"signature"
+    ) as sign_mock:
+        payload = base_client._api_request("POST", "account/transactions", data)
+
+    (signing_input,) = sign_mock.call_args[0]
+    encoded_header, encoded_body = signing_input.split(b".")
+    signed_body = base64.urlsafe_b64decode(
+        encoded_body + b"=" * (-len(encoded_body) % 4)
+    )
+
+    assert signed_body.decode("utf-8") == payload["raw_body"]
+    assert payload["headers"]["Content-Type"] == "application/json"
+    assert payload["headers"]["Signature"].startswith(encoded_header.decode())
+    assert payload["body"]["payload"]["dateFrom"] == "2020-01-01T00:00:00.000Z"
+
+
+def test_api_request_verifies_responses(base_client: client.BaseClient):
+    """
+    Ensure that unsigned responses are rejected, when signing is enabled.
+    """
+    base_client.set_tpp_private_key("private-key")
+
+    with mock.patch("nbg.auth.signature.JWSSigner.sign", return_value=b"signature"):
+        with pytest.raises(auth_exceptions.InvalidResponseSignature):
+            base_client._api_request("POST", "account/list", {})
+
+
+def test_api_request_retries(base_client: client.BaseClient):
+    """
+    Ensure that transient failures get retried, with the same request ID,
+    and that retries are counted per URL path.
+    """
+    adapter = FlakyAdapter([503, requests.exceptions.ConnectionError()])
+    base_client.mount("https://", adapter)
+    base_client.set_retry_policy(retry.RetryPolicy(backoff_base=0))
+
+    payload = base_client._api_request("POST", "account/list", {"userId": "user"})
+
+    assert adapter.requests_sent == 3
+    assert payload["body"]["header"]["ID"] == payload["headers"]["Request-Id"]
+    assert base_client.retry_policy.stats == {
+        "account/list": {"retries": 2, "exhausted": 0}
+    }
+
+
+def test_api_request_retries_exhausted(base_client: client.BaseClient):
+    adapter = FlakyAdapter([503, 503, 503])
+    base_client.mount("https://", adapter)
+    base_client.set_retry_policy(
+        retry.RetryPolicy(backoff_base=0, endpoint_retries={"account/list": 1})
+    )
+
+    with pytest.raises(exceptions.InvalidResponse):
+        base_client._api_request("POST", "account/list", {"userId": "user"})
+
+    assert adapter.requests_sent == 2
+    assert base_client.retry_policy.stats == {
+        "account/list": {"retries": 1, "exhausted": 1}
+    }
+
+
+def test_api_request_non_idempotent_retries(base_client: client.BaseClient):
+    """
+    Ensure that non-idempotent calls are only retried when the request did not
+    reach NBG or NBG rejected it without processing it.
+    """
+    base_client.set_retry_policy(retry.RetryPolicy(backoff_base=0))
+
+    for failure, exception_class in [
+        (503, exceptions.InvalidResponse),
+        (requests.exceptions.ReadTimeout(), requests.exceptions.ReadTimeout),
+    ]:
+        adapter = FlakyAdapter([failure])
+        base_client.mount("https://", adapter)
+
+        with pytest.raises(exception_class):
+            base_client._api_request("POST", "consents/delete", {})
+
+        assert adapter.requests_sent == 1
+
+    adapter = FlakyAdapter([429, requests.exceptions.ConnectTimeout()])
+    base_client.mount("https://", adapter)
+    base_client._api_request("POST", "consents/delete", {})
+
+    assert adapter.requests_sent == 3
+
+
+def test_api_request_rate_limit(base_client: client.BaseClient):
+    """
+    Ensure that the rate limiter is consulted before sending each request.
+    """
+    adapter = EchoAdapter()
+    base_client.mount("https://", adapter)
+    base_client.set_rate_limiter(
+        ratelimit.RateLimiter(endpoint_rates={"account/list": 1}, blocking=False)
+    )
+
+    base_client._api_request("POST", "account/list", {"userId": "user"})
+    base_client._api_request("POST", "account/details", {"userId": "user"})
+
+    with pytest.raises(exceptions.RateLimitExceeded):
+        base_client.for_user("user-access-token")._api_request(
+            "POST", "account/list", {"userId": "user"}
+        )
+
+    assert adapter.requests_sent == 2
+
+
+def test_api_request_circuit_breaker(base_client: client.BaseClient):
+    """
+    Ensure that calls to an endpoint whose circuit is open fail without being
+    sent, while other endpoints are still called.
+    """
+    adapter = FlakyAdapter([503, requests.exceptions.ConnectionError()])
+    base_client.mount("https://", adapter)
+    base_client.set_circuit_breaker(
+        circuitbreaker.CircuitBreaker(window_size=2, minimum_calls=2)
+    )
+
+    with pytest.raises(exceptions.InvalidResponse):
+        base_client._api_request("POST", "account/list", {"userId": "user"})
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        base_client._api_request("POST", "account/list", {"userId": "user"})
+
+    with pytest.raises(exceptions.CircuitOpen) as exception_info:
+        base_client.for_user("user-access-token")._api_request(
+            "POST", "account/list", {"userId": "user"}
+        )
+
+    assert exception_info.value.url == "https://sandbox.nbg.test/account/list"
+    assert base_client._api_request("POST", "account/details", {"userId": "user"})
+    assert adapter.requests_sent == 3
+
+
+def test_api_request_concurrency_limit(base_client: client.BaseClient):
+    """
+    Ensure that calls over the limit of requests in flight fail fast, and that
+    overloaded responses decrease the limit.
+    """
+    base_client.mount("https://", SlowAdapter([0.2]))
+    concurrency_limiter = concurrency.ConcurrencyLimiter(
+        initial_limit=1, blocking=False
+    )
+    base_client.set_concurrency_limiter(concurrency_limiter)
+
+    with ThreadPoolExecutor(1) as executor:
+        slow_call = executor.submit(
+            base_client._api_request, "POST", "account/list", {"userId": "user"}
+        )
+
+        while concurrency_limiter.stats.get("account/list", {}).get("in_flight") != 1:
+            time.sleep(0.001)
+
+        with pytest.raises(exceptions.ConcurrencyLimitExceeded):
+            base_client.for_user("user-access-token")._api_request(
+                "POST", "account/list", {"userId": "user"}
+            )
+
+        assert base_client._api_request("POST", "account/details", {"userId": "user"})
+        assert slow_call.result()
+
+    base_client.mount("https://", FlakyAdapter([503]))
+    concurrency_limiter = concurrency.ConcurrencyLimiter(initial_limit=4)
+    base_client.set_concurrency_limiter(concurrency_limiter)
+
+    with pytest.raises(exceptions.InvalidResponse):
+        base_client._api_request("POST", "account/list", {"userId": "user"})
+
+    assert concurrency_limiter.stats["account/list"]["limit"] == 2
+    assert concurrency_limiter.stats["account/list"]["in_flight"] == 0
+
+
+def test_api_request_priority(base_client: client.BaseClient):
+    """
+    Ensure that requests go through the lane of their client view, and that
+    background calls cannot take the capacity reserved for interactive ones.
+    """
+    priority_scheduler = priorities.PriorityScheduler(
+        capacity=2,
+        lanes=[
+            priorities.Lane("interactive", reserved=1),
+            priorities.Lane("background"),
+        ],
+        blocking=False,
+    )
+    base_client.set_priority_scheduler(priority_scheduler)
+    background_client = base_client.with_priority("background")
+    background_client._api_request("POST", "account/list", {"userId": "user"})
+    permit = priority_scheduler.acquire("background")
+
+    with pytest.raises(exceptions.ConcurrencyLimitExceeded):
+        background_client._api_request("POST", "account/list", {"userId": "user"})
+
+    assert base_client._api_request("POST", "account/list", {"userId": "user"})
+    assert background_client.is_user_view
+    assert background_client.priority == "background"
+    assert base_client.priority is None
+    assert priority_scheduler.stats["interactive"]["granted"] == 1
+    assert priority_scheduler.stats["background"]["granted"] == 2
+    assert priority_scheduler.stats["background"]["in_flight"] == 1
+
+    permit.release()
+
+
+def test_batch(base_client: client.BaseClient):
+    """
+    Ensure that the calls of a batch run concurrently on user views, and that
+    their results come back in call order.
+    """
+    base_client.mount("https://", SlowAdapter([0.1] * 4))
+    user_client = base_client.for_user("user-access-token")
+    consent_ids = [f"consent-{index}" for index in range(4)]
+    started_at = time.monotonic()
+
+    with user_client.batch(max_workers=4) as batch:
+        for consent_id in consent_ids:
+            batch.get_consent_information(consent_id, user_id="user")
+
+        sandbox = batch.create_sandbox("sandbox-id")
+
+        assert isinstance(sandbox, Future)
+
+    assert time.monotonic() - started_at < 0.3
+    assert [
+        payload["body"]["payload"]["consentId"] for payload in batch.results[:4]
+    ] == consent_ids
+    assert sandbox.result()["body"]["payload"] == {"sandboxId": "sandbox-id"}
+    assert batch.results[0]["headers"]["Authorization"] == "Bearer user-access-token"
+    assert batch.errors == {}
+
+
+def test_api_request_timeouts(base_client: client.BaseClient):
+    adapter = SlowAdapter([])
+    base_client.mount("https://", adapter)
+    base_client._api_request("POST", "account/list", {"userId": "user"})
+    base_client.set_timeout(timeouts.Timeout(connect=3, read=None))
+    base_client._api_request("POST", "account/list", {"userId": "user"})
+    user_client = base_client.for_user("user-access-token").with_timeout(
+        timeouts.Timeout(connect=0.5, read=10, total=1)
+    )
+    user_client._api_request("POST", "account/list", {"userId": "user"})
+
+    assert adapter.timeouts[:2] == [(10, 60), (3, None)]
+    assert adapter.timeouts[2][0] == 0.5
+    assert 0.9 < adapter.timeouts[2][1] <= 1
+    assert user_client.is_user_view
+    assert user_client.access_token == "user-access-token"
+    assert base_client.timeout.connect == 3
+
+
+def test_api_request_deadline_stops_retries(base_client: client.BaseClient):
+    adapter = FlakyAdapter([requests.exceptions.ConnectionError()] * 2)
+    base_client.mount("https://", adapter)
+    base_client.set_retry_policy(retry.RetryPolicy(backoff_base=0.2))
+    base_client.set_timeout(timeouts.Timeout(total=0.05))
+
+    with mock.patch.object(retry.random, "uniform", side_effect=lambda a, b: b):
+        with pytest.raises(requests.exceptions.ConnectionError):
+            base_client._api_request("POST", "account/list", {"userId": "user"})
+
+    assert adapter.requests_sent == 1
+
+    base_client.set_timeout(timeouts.Timeout(total=0))
+
+    with pytest.raises(exceptions.DeadlineExceeded):
+        base_client._api_request("POST", "account/list", {"userId": "user"})
+
+
+def test_api_request_deadline_releases_slots(base_client: client.BaseClient):
+    """
+    Ensure that calls whose deadline passes before they are sent give back
+    their slots.
+    """
+    concurrency_limiter = concurrency.ConcurrencyLimiter(
+        initial_limit=1, max_limit=1, blocking=False
+    )
+    base_client.set_concurrency_limiter(concurrency_limiter)
+    base_client.set_timeout(timeouts.Timeout(total=1e-6))
+
+    for _ in range(2):
+        with pytest.raises(exceptions.DeadlineExceeded):
+            base_client._api_request("POST", "account/list", {"userId": "user"})
+
+    assert concurrency_limiter.stats["account/list"]["in_flight"] == 0
+    assert concurrency_limiter.stats["account/list"]["rejected"] == 0
+
+    priority_scheduler = priorities.PriorityScheduler(capacity=1, blocking=False)
+    base_client.set_priority_scheduler(priority_scheduler)
+
+    for _ in range(2):
+        with pytest.raises(exceptions.DeadlineExceeded):
+            base_client._api_request("POST", "account/list", {"userId": "user"})
+
+    assert priority_scheduler.stats["interactive"]["in_flight"] == 0
+    assert priority_scheduler.stats["interactive"]["granted"] == 2
+
+
+def test_api_request_hedging(base_client: client.BaseClient):
+    """
+    Ensure that slow read-only calls get hedged, within the budget, and get
+    the answer of the faster attempt.
+    """
+    adapter = SlowAdapter([0.5, 0, 0.5, 0.5])
+    base_client.mount("https://", adapter)
+    base_client._read_paths = frozenset({"account/list"})
+    hedging_policy = hedging.HedgingPolicy(
+        initial_delay=0.05, min_delay=0, max_hedges=1
+    )
+    base_client.set_hedging_policy(hedging_policy)
+
+    started_at = time.monotonic()
+    payload = base_client._api_request("POST", "account/list", {"userId": "user"})
+
+    assert time.monotonic() - started_at < 0.4
+    assert payload["body"]["payload"] == {"userId": "user"}
+    assert hedging_policy.stats["account/list"]["hedges_won"] == 1
+
+    # The budget has been spent, so the next slow call does not get hedged.
+    base_client._api_request("POST", "account/list", {"userId": "user"})
+    base_client._api_request("POST", "account/details", {"userId": "user"})
+
+    assert hedging_policy.stats["account/list"]["hedged"] == 1
+    assert "account/details" not in hedging_policy.stats
+    hedging_policy.close()
+
+
+def test_api_request_hedging_timings(base_client: client.BaseClient):
+    """
+    Ensure that hedged calls record the timings of the attempt answering them,
+    and that the other attempt stops retrying once the call is answered.
+    """
+    requests_sent = []
+
+    class HedgedAdapter(EchoAdapter):
+        def send(self, request, **kwargs):
+            requests_sent.append(request)
+            index = len(requests_sent) - 1
+
+            if index == 0:
+                time.sleep(0.3)
+
+            if index < 2:
+                return FlakyAdapter([503]).send(request, **kwargs)
+
+            return super().send(request, **kwargs)
+
+    recorded_timings = []
+    base_client.mount("https://", HedgedAdapter())
+    base_client._read_paths = frozenset({"account/list"})
+    base_client.set_retry_policy(retry.RetryPolicy(backoff_base=0))
+    base_client.set_instrumentation(
+        telemetry.Instrumentation(hooks=[recorded_timings.append])
+    )
+    hedging_policy = hedging.HedgingPolicy(initial_delay=0.05, min_delay=0)
+    base_client.set_hedging_policy(hedging_policy)
+
+    payload = base_client._api_request("POST", "account/list", {"userId": "user"})
+    (timings,) = recorded_timings
+
+    assert timings.status == 200
+    assert timings.request_id == payload["headers"]["Request-Id"]
+    assert timings.retries == 1
+    assert {telemetry.AUTH, telemetry.RETRY_WAIT} <= set(timings.phases)
+
+    # The slow attempt gets its 503 response, but does not retry it.
+    time.sleep(0.4)
+
+    assert len(requests_sent) == 3
+    hedging_policy.close()
+
+
+def test_api_request_coalescing(base_client: client.BaseClient):
+    """
+    Ensure that identical concurrent requests of the same user are coalesced,
+    unlike requests of other users and non-idempotent requests.
+    """
+    release = threading.Event()
+
+    class BlockingEchoAdapter(EchoAdapter):
+        def send(self, request, **kwargs):
+            release.wait()
+            return super().send(request, **kwargs)
+
+    adapter = BlockingEchoAdapter()
+    base_client.mount("https://", adapter)
+    base_client.set_request_coalescer(coalescing.RequestCoalescer())
+    coalescer = base_client.request_coalescer
+    views = [base_client.for_user(f"access-token-{index % 2}") for index in range(6)]
+
+    with ThreadPoolExecutor(max_workers=6) as executor:
+        futures = [
+            executor.submit(view._api_request, "POST", "account/list", {})
+            for view in views
+        ]
+
+        while sum(coalescer.stats.get("account/list", {}).values()) < 6:
+            pass
+
+        release.set()
+        payloads = [future.result() for future in futures]
+
+    assert adapter.requests_sent == 2
+    assert coalescer.stats == {"account/list": {"requests": 2, "coalesced": 4}}
+    assert payloads[0] is payloads[2] and payloads[0] is not payloads[1]
+
+    base_client._api_request("POST", "consents/delete", {})
+
+    assert "consents/delete" not in coalescer.stats
+
+    # Signature headers are bound methods of each view, so they are not part
+    # of the key.
+    keys = {
+        client._coalescing_key(
+            "POST", "account/list", {}, [{"Header": "1"}, client.signature_headers]
+        )
+        for client in (base_client, base_client.with_timeout(timeouts.Timeout()))
+    }
+
+    assert len(keys) == 1
+
+
+def test_api_request_timings(base_client: client.BaseClient):
+    """
+    Ensure that the timings of each phase of API calls are passed to hooks,
+    along with the details of their requests and responses.
+    """
+    recorded_timings = []
+    base_client.mount("https://", FlakyAdapter([503]))
+    base_client.set_retry_policy(retry.RetryPolicy(backoff_base=0))
+    base_client.set_instrumentation(
+        telemetry.Instrumentation(hooks=[recorded_timings.append])
+    )
+
+    payload = base_client._api_request("POST", "account/list", {"userId": "user"})
+    (timings,) = recorded_timings
+
+    assert timings.url_path == "account/list"
+    assert timings.status == 200
+    assert timings.request_id == payload["headers"]["Request-Id"]
+    assert timings.response_size > 0
+    assert timings.retries == 1
+    assert timings.exception is None
+    assert [phase for phase, _, _ in timings.spans] == [
+        telemetry.PREPARE_BODY,
+        telemetry.SIGN,
+        telemetry.HEADERS,
+        telemetry.AUTH,
+        telemetry.TRANSFER,
+        telemetry.RETRY_WAIT,
+        telemetry.TRANSFER,
+        telemetry.DECODE,
+    ]
+    assert sum(timings.phases.values()) <= timings.duration
+
+
+def test_api_request_timings_exception(base_client: client.BaseClient):
+    recorded_timings = []
+    base_client.mount("https://", FlakyAdapter([503]))
+    base_client.set_instrumentation(
+        telemetry.Instrumentation(hooks=[recorded_timings.append])
+    )
+
+    with pytest.raises(exceptions.InvalidResponse) as exception_info:
+        base_client._api_request("POST", "account/list", {"userId": "user"})
+
+    (timings,) = recorded_timings
+
+    assert timings.status == 503
+    assert timings.exception is exception_info.value
+
+
+def test_api_stream_timings(base_client: client.BaseClient):
+    recorded_timings = []
+    transactions = [{"id": index} for index in range(10)]
+    body = {"exception": None, "payload": {"transactions": transactions}}
+    base_client.mount("https://", StreamAdapter(body))
+    base_client.set_instrumentation(
+        telemetry.Instrumentation(hooks=[recorded_timings.append])
+    )
+
+    records = base_client._api_stream("POST", "account/transactions", {})
+
+    assert list(records) == transactions
+    assert recorded_timings[0].status == 200
+    assert set(recorded_timings[0].phases) == {
+        telemetry.PREPARE_BODY,
+        telemetry.SIGN,
+        telemetry.HEADERS,
+        telemetry.AUTH,
+        telemetry.TRANSFER,
+        telemetry.DECODE,
+    }
+
+
+# Peak bytes allocated by each stage of a small API call, with some headroom
+# over what CPython 3.6 to 3.11 allocate. Raise them only deliberately, along
+# with the results of `python -m benchmarks.overhead`.
+ALLOCATION_BUDGETS = {
+    "prepare_request": 4 * 1024,
+    "process_response": 1024,
+    "api_request": 24 * 1024,
+}
+
+
+class ConstantAdapter(BaseAdapter):
+    """
+    Transport adapter that answers every request with the same response.
+    """
+
+    content = b'{"exception": null, "payload": {"accounts": []}}'
+
+    def send(self, request, **kwargs):
+        response = Response()
+        response.status_code = 200
+        response.encoding = "utf-8"
+        response._content = self.content
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+def allocated(function) -> int:
+    """
+    Returns the peak bytes allocated by a single call of the given function,
+    after a warm-up call.
+    """
+    function()
+    tracemalloc.start()
+
+    try:
+        baseline, _ = tracemalloc.get_traced_memory()
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return peak - baseline
+
+
+def test_allocation_budgets(base_client: client.BaseClient):
+    base_client.mount("https://", ConstantAdapter())
+    base_client.set_consent_id("consent-id")
+    data = {"userId": "user", "dateFrom": datetime(2020, 1, 1)}
+    url, headers, body = base_client._prepare_request("POST", "account/list", data)
+    response = base_client.request("POST", url, headers=headers, data=body)
+    stages = {
+        "prepare_request": lambda: base_client._prepare_request(
+            "POST", "account/list", data
+        ),
+        "process_response": lambda: base_client._process_response(response),
+        "api_request": lambda: base_client._api_request("POST", "account/list", data),
+    }
+
+    for stage, function in stages.items():
+        assert allocated(function) <= ALLOCATION_BUDGETS[stage], stage
+
+
+def test_api_request_retains_no_memory(base_client: client.BaseClient):
+    base_client.mount("https://", ConstantAdapter())
+
+    def call():
+        base_client._api_request("POST", "account/list", {"userId": "user"})
+
+    for _ in range(10):
+        call()
+
+    tracemalloc.start()
+
+    try:
+        baseline, _ = tracemalloc.get_traced_memory()
+
+        for _ in range(200):
+            call()
+
+        retained, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    # A few bytes per call at most, for the caches of the standard library,
+    # while keeping any object of a call alive would retain hundreds.
+    assert retained - baseline < 2048
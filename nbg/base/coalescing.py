@@ -0,0 +1,122 @@
+"""
+Single-flight coalescing of identical API calls. Concurrent calls with the
+same endpoint, payload and credentials share a single in-flight request and
+all of them receive its payload or its exception. Coalescing is opt-in and is
+enabled per client via ``set_request_coalescer``.
+"""
+
+import asyncio
+import threading
+import typing
+
+
+class _InFlightRequest:
+    __slots__ = ("done", "payload", "exception")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.payload = None
+        self.exception = None
+
+
+class RequestCoalescer:
+    """
+    Tracks in-flight requests by key, for both threaded and ``asyncio``
+    clients. Coalesced calls receive the same payload object, which should be
+    treated as read-only.
+
+    ---
+    **Usage**
+
+    .. code-block:: python
+
+        from nbg.base.coalescing import RequestCoalescer
+
+        client.set_request_coalescer(RequestCoalescer())
+        client.request_coalescer.stats
+    """
+
+    def __init__(self):
+        self.requests = {}
+        self.coalesced = {}
+        self._in_flight = {}
+        self._tasks = {}
+        self._lock = threading.Lock()
+
+    def _count(self, counters: dict, url_path: str):
+        counters[url_path] = counters.get(url_path, 0) + 1
+
+    def call(self, key: str, url_path: str, request: typing.Callable) -> dict:
+        """
+        Calls ``request`` and returns its payload, unless an identical request
+        is already in flight, in which case its outcome is shared instead.
+        """
+        with self._lock:
+            in_flight = self._in_flight.get(key)
+            is_leader = in_flight is None
+
+            if is_leader:
+                in_flight = self._in_flight[key] = _InFlightRequest()
+                self._count(self.requests, url_path)
+            else:
+                self._count(self.coalesced, url_path)
+
+        if not is_leader:
+            in_flight.done.wait()
+
+            if in_flight.exception is not None:
+                raise in_flight.exception
+
+            return in_flight.payload
+
+        try:
+            in_flight.payload = request()
+        except BaseException as exception:
+            in_flight.exception = exception
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+            in_flight.done.set()
+
+        return in_flight.payload
+
+    async def call_async(
+        self, key: str, url_path: str, request: typing.Callable[[], typing.Awaitable]
+    ) -> dict:
+        """
+        Awaits ``request()`` and returns its payload, like :meth:`call`. The
+        request runs in its own task, so that cancelling one of the coalesced
+        calls does not cancel the others.
+        """
+        loop = asyncio.get_event_loop()
+        task_key = (id(loop), key)
+
+        with self._lock:
+            task = self._tasks.get(task_key)
+
+            if task is None:
+                task = self._tasks[task_key] = asyncio.ensure_future(request())
+                task.add_done_callback(lambda _: self._tasks.pop(task_key, None))
+                self._count(self.requests, url_path)
+            else:
+                self._count(self.coalesced, url_path)
+
+        return await asyncio.shield(task)
+
+    @property
+    def stats(self) -> dict:
+        """
+        Returns the requests sent for each URL path and the calls that were
+        coalesced into them.
+        """
+        with self._lock:
+            url_paths = sorted(set(self.requests) | set(self.coalesced))
+            return {
+                url_path: {
+                    "requests": self.requests.get(url_path, 0),
+                    "coalesced": self.coalesced.get(url_path, 0),
+                }
+                for url_path in url_paths
+            }
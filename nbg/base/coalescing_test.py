@@ -0,0 +1,94 @@
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import threading
+
+import pytest
+
+from . import coalescing
+
+
+def test_call_coalesces_concurrent_calls():
+    """
+    Ensure that calls with the same key share the in-flight request, while
+    calls with other keys do not.
+    """
+    coalescer = coalescing.RequestCoalescer()
+    release = threading.Event()
+    requests_sent = []
+
+    def request():
+        requests_sent.append(1)
+        release.wait()
+        return {"accounts": []}
+
+    with ThreadPoolExecutor(max_workers=6) as executor:
+        futures = [
+            executor.submit(coalescer.call, key, "account/list", request)
+            for key in ["user-1"] * 5 + ["user-2"]
+        ]
+
+        while sum(coalescer.stats["account/list"].values()) < 6:
+            pass
+
+        release.set()
+        payloads = [future.result() for future in futures]
+
+    assert len(requests_sent) == 2
+    assert all(payload is payloads[0] for payload in payloads[:5])
+    assert coalescer.stats == {"account/list": {"requests": 2, "coalesced": 4}}
+
+    # Finished requests are not shared with later calls.
+    coalescer.call("user-1", "account/list", request)
+
+    assert len(requests_sent) == 3
+
+
+def test_call_shares_exceptions():
+    coalescer = coalescing.RequestCoalescer()
+    started = threading.Event()
+    release = threading.Event()
+
+    def request():
+        started.set()
+        release.wait()
+        raise ValueError("failed")
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        leader = executor.submit(coalescer.call, "key", "account/list", request)
+        started.wait()
+        follower = executor.submit(coalescer.call, "key", "account/list", request)
+
+        while coalescer.stats["account/list"]["coalesced"] < 1:
+            pass
+
+        release.set()
+
+        for future in (leader, follower):
+            with pytest.raises(ValueError):
+                future.result()
+
+
+def test_call_async_coalesces_concurrent_calls():
+    coalescer = coalescing.RequestCoalescer()
+    requests_sent = []
+
+    async def request():
+        requests_sent.append(1)
+        await asyncio.sleep(0.01)
+        return {"cards": []}
+
+    async def calls():
+        return await asyncio.gather(
+            *[coalescer.call_async("key", "card/list", request) for _ in range(5)]
+        )
+
+    loop = asyncio.new_event_loop()
+
+    try:
+        payloads = loop.run_until_complete(calls())
+    finally:
+        loop.close()
+
+    assert len(requests_sent) == 1
+    assert all(payload is payloads[0] for payload in payloads)
+    assert coalescer.stats == {"card/list": {"requests": 1, "coalesced": 4}}
@@ -0,0 +1,106 @@
+"""
+JSON codecs used to encode request bodies and decode response bodies. The
+fastest JSON library installed is picked automatically, falling back to the
+``json`` module of the standard library.
+"""
+
+from datetime import datetime
+import json
+import typing
+
+
+def _serialize_datetime(datetime_instance: datetime) -> str:
+    iso_datetime = datetime_instance.isoformat(timespec="milliseconds")
+    return f"{iso_datetime}Z"
+
+
+def _default(value):
+    """
+    Serializes the values that JSON does not support, to match the format
+    requested by NBG APIs. Serializations:
+      - datetime: (Z-suffixed ISO format)
+    """
+    if isinstance(value, datetime):
+        return _serialize_datetime(value)
+
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class JSONCodec:
+    """
+    Base class for JSON codecs. Codecs encode to compact UTF-8 JSON and
+    raise ``ValueError`` when decoding invalid JSON.
+    """
+
+    name = ""
+
+    def dumps(self, data) -> bytes:
+        raise NotImplementedError()
+
+    def loads(self, data: typing.Union[bytes, str]):
+        raise NotImplementedError()
+
+
+class StandardJSONCodec(JSONCodec):
+    """
+    JSON codec based on the ``json`` module of the standard library.
+    """
+
+    name = "json"
+
+    def dumps(self, data) -> bytes:
+        return json.dumps(data, separators=(",", ":"), default=_default).encode("utf-8")
+
+    def loads(self, data: typing.Union[bytes, str]):
+        return json.loads(data)
+
+
+class OrjsonCodec(JSONCodec):
+    """
+    JSON codec based on ``orjson``.
+    """
+
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+
+        self._orjson = orjson
+
+    def dumps(self, data) -> bytes:
+        return self._orjson.dumps(
+            data, default=_default, option=self._orjson.OPT_PASSTHROUGH_DATETIME
+        )
+
+    def loads(self, data: typing.Union[bytes, str]):
+        return self._orjson.loads(data)
+
+
+# JSON codecs, from the fastest to the slowest.
+JSON_CODECS = {
+    "orjson": OrjsonCodec,
+    "json": StandardJSONCodec,
+}
+
+_default_codec = None
+
+
+def get_codec(name: str = None) -> JSONCodec:
+    """
+    Returns the JSON codec with the given name, or the fastest one installed.
+    """
+    global _default_codec
+
+    if name is not None:
+        return JSON_CODECS[name]()
+
+    if _default_codec is None:
+        for codec_class in JSON_CODECS.values():
+            try:
+                _default_codec = codec_class()
+            except ImportError:
+                continue
+
+            break
+
+    return _default_codec
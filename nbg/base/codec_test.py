@@ -0,0 +1,62 @@
+from datetime import datetime
+
+import pytest
+
+from . import codec
+
+
+def _available_codecs():
+    codecs = []
+
+    for name in codec.JSON_CODECS:
+        try:
+            codecs.append(codec.get_codec(name))
+        except ImportError:
+            pass
+
+    return codecs
+
+
+@pytest.mark.parametrize("json_codec", _available_codecs(), ids=lambda c: c.name)
+def test_codec_round_trip(json_codec: codec.JSONCodec):
+    """
+    Ensure that all codecs encode compact JSON, serialize datetimes at any
+    depth in the format of NBG APIs and decode what they encode.
+    """
+    data = {
+        "dateFrom": datetime(1906, 12, 9),
+        "transactions": [{"date": datetime(2020, 1, 2, 3, 4, 5, 6000)}],
+        "amount": 12.5,
+        "name": "Εθνική",
+    }
+    encoded_data = json_codec.dumps(data)
+
+    assert b", " not in encoded_data and b": " not in encoded_data
+    assert json_codec.loads(encoded_data) == {
+        "dateFrom": "1906-12-09T00:00:00.000Z",
+        "transactions": [{"date": "2020-01-02T03:04:05.006Z"}],
+        "amount": 12.5,
+        "name": "Εθνική",
+    }
+
+
+@pytest.mark.parametrize("json_codec", _available_codecs(), ids=lambda c: c.name)
+def test_codec_errors(json_codec: codec.JSONCodec):
+    """
+    Ensure that all codecs raise the same errors.
+    """
+    with pytest.raises(ValueError):
+        json_codec.loads(b"I am not JSON")
+
+    with pytest.raises(TypeError):
+        json_codec.dumps({"unsupported": object()})
+
+
+def test_get_codec():
+    """
+    Ensure that the fastest codec installed is the default one.
+    """
+    default_codec = codec.get_codec()
+
+    assert default_codec is codec.get_codec()
+    assert default_codec.name == _available_codecs()[0].name
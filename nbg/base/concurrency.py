@@ -0,0 +1,349 @@
+"""
+Adaptive limits of the requests in flight to each endpoint of NBG APIs, which
+follow the capacity of NBG instead of a fixed number of workers. Limits grow
+additively while responses stay fast and get cut multiplicatively on timeouts
+and on 429 or 5xx responses (AIMD). Concurrency limiting is opt-in and is
+enabled per client via ``set_concurrency_limiter``.
+"""
+
+from collections import deque
+import asyncio
+import threading
+import time
+import typing
+
+from . import exceptions
+
+
+# Responses with these statuses mean that NBG is overloaded.
+OVERLOAD_STATUSES = (429,)
+
+
+class _Waiter:
+    """
+    A call waiting for a slot, either in a thread or in an event loop.
+    """
+
+    __slots__ = ("granted", "event", "loop", "future")
+
+    def __init__(self, loop: asyncio.AbstractEventLoop = None):
+        self.granted = False
+        self.loop = loop
+
+        if loop is None:
+            self.event = threading.Event()
+            self.future = None
+        else:
+            self.event = None
+            self.future = loop.create_future()
+
+    def grant(self):
+        self.granted = True
+
+        if self.loop is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(_resolve, self.future)
+
+
+def _resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+class _Endpoint:
+    """
+    The limit and the calls of a single endpoint.
+    """
+
+    def __init__(self, limit: float):
+        self.limit = limit
+        self.in_flight = 0
+        self.waiters = deque()
+        self.min_latency = None
+        self.decreased_at = 0.0
+        self.rejected = 0
+        self.decreases = 0
+
+
+class ConcurrencyPermit:
+    """
+    A slot for a single request, which must be released once its response
+    arrives or it fails.
+    """
+
+    __slots__ = ("limiter", "url_path", "started_at")
+
+    def __init__(self, limiter: "ConcurrencyLimiter", url_path: str):
+        self.limiter = limiter
+        self.url_path = url_path
+        self.started_at = time.monotonic()
+
+    def release(self, status: int = None, overloaded: bool = False):
+        """
+        Releases the slot, given the status of the response, if any, or
+        whether the request failed in a way that means that NBG is overloaded,
+        e.g. with a timeout. Slots released without a status, e.g. of requests
+        that were never sent, leave the limit as is.
+        """
+        if status is not None and (status in OVERLOAD_STATUSES or status >= 500):
+            overloaded = True
+
+        self.limiter._release(self, overloaded, status is not None)
+
+
+class ConcurrencyLimiter:
+    """
+    Limits the requests in flight to each URL path, adapting each limit to the
+    latency and the failures of its requests.
+
+    After each fast response, i.e. one within ``latency_tolerance`` times the
+    lowest latency seen, the limit of a busy endpoint grows by ``increase``
+    divided by the limit, so that it grows by ``increase`` for every limit's
+    worth of calls. After a timeout or a 429 or 5xx response, it gets
+    multiplied by ``decrease_factor``, once for all the requests that were in
+    flight at the time. Slow responses leave it as is.
+
+    Calls over the limit wait for a slot in order, or raise
+    ``ConcurrencyLimitExceeded`` immediately when the limiter is not blocking,
+    its queue is full or they waited for ``max_wait``.
+
+    :param initial_limit: The starting limit of each URL path. Defaults to
+                          ``10``.
+    :type initial_limit: float
+    :param min_limit: The lowest limit. Defaults to ``1``.
+    :type min_limit: float
+    :param max_limit: The highest limit. Defaults to ``100``.
+    :type max_limit: float
+    :param increase: The growth of the limit per limit's worth of fast
+                     responses. Defaults to ``1``.
+    :type increase: float
+    :param decrease_factor: The factor the limit gets multiplied by when NBG
+                            is overloaded. Defaults to ``0.5``.
+    :type decrease_factor: float
+    :param latency_tolerance: How many times slower than the lowest latency
+                              of an endpoint its responses can be and still
+                              count as fast. Defaults to ``2``.
+    :type latency_tolerance: float
+    :param latency_threshold: The seconds within which responses count as fast,
+                              instead of using ``latency_tolerance``.
+    :type latency_threshold: float
+    :param blocking: Whether calls over the limit wait for a slot, or raise
+                     ``ConcurrencyLimitExceeded`` immediately. Defaults to
+                     ``True``.
+    :type blocking: bool
+    :param max_queue: The most calls that may wait for a slot of each URL
+                      path. Defaults to no limit.
+    :type max_queue: int
+    :param max_wait: The most seconds a call may wait for a slot. Defaults to
+                     no limit.
+    :type max_wait: float
+
+    ---
+    **Usage**
+
+    .. code-block:: python
+
+        from nbg.base.concurrency import ConcurrencyLimiter
+
+        client.set_concurrency_limiter(
+            ConcurrencyLimiter(initial_limit=20, max_limit=200, max_wait=5)
+        )
+        client.concurrency_limiter.stats
+    """
+
+    def __init__(
+        self,
+        initial_limit: float = 10,
+        min_limit: float = 1,
+        max_limit: float = 100,
+        increase: float = 1,
+        decrease_factor: float = 0.5,
+        latency_tolerance: float = 2,
+        latency_threshold: float = None,
+        blocking: bool = True,
+        max_queue: int = None,
+        max_wait: float = None,
+    ):
+        self.initial_limit = initial_limit
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self.latency_threshold = latency_threshold
+        self.blocking = blocking
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def _endpoint(self, url_path: str) -> _Endpoint:
+        endpoint = self._endpoints.get(url_path)
+
+        if endpoint is None:
+            endpoint = self._endpoints[url_path] = _Endpoint(
+                min(self.max_limit, max(self.min_limit, self.initial_limit))
+            )
+
+        return endpoint
+
+    def _grant(self, endpoint: _Endpoint):
+        while endpoint.waiters and endpoint.in_flight < int(endpoint.limit):
+            endpoint.in_flight += 1
+            endpoint.waiters.popleft().grant()
+
+    def _enqueue(
+        self, url_path: str, blocking: bool, loop: asyncio.AbstractEventLoop = None
+    ) -> typing.Tuple[ConcurrencyPermit, typing.Optional[_Waiter]]:
+        """
+        Takes a slot of the given URL path, or returns the waiter that will
+        get it.
+        """
+        with self._lock:
+            endpoint = self._endpoint(url_path)
+
+            if not endpoint.waiters and endpoint.in_flight < int(endpoint.limit):
+                endpoint.in_flight += 1
+                return ConcurrencyPermit(self, url_path), None
+
+            if not blocking or (
+                self.max_queue is not None and len(endpoint.waiters) >= self.max_queue
+            ):
+                endpoint.rejected += 1
+                raise exceptions.ConcurrencyLimitExceeded(url_path, int(endpoint.limit))
+
+            waiter = _Waiter(loop)
+            endpoint.waiters.append(waiter)
+            return None, waiter
+
+    def _abandon(self, url_path: str, waiter: _Waiter) -> bool:
+        """
+        Removes the given waiter from the queue, giving back its slot if it
+        was granted meanwhile. Returns whether it had been granted a slot.
+        """
+        with self._lock:
+            endpoint = self._endpoint(url_path)
+
+            if waiter.granted:
+                endpoint.in_flight -= 1
+                self._grant(endpoint)
+                return True
+
+            endpoint.waiters.remove(waiter)
+            endpoint.rejected += 1
+            return False
+
+    def acquire(self, url_path: str, blocking: bool = None) -> ConcurrencyPermit:
+        """
+        Takes a slot for a request to the given URL path, waiting for one if
+        the limiter is blocking. ``blocking`` overrides the limiter default.
+        """
+        blocking = self.blocking if blocking is None else blocking
+        permit, waiter = self._enqueue(url_path, blocking)
+
+        if waiter is None:
+            return permit
+
+        if not waiter.event.wait(self.max_wait) and not waiter.granted:
+            self._abandon(url_path, waiter)
+            raise exceptions.ConcurrencyLimitExceeded(
+                url_path, int(self._endpoint(url_path).limit)
+            )
+
+        return ConcurrencyPermit(self, url_path)
+
+    async def acquire_async(
+        self, url_path: str, blocking: bool = None
+    ) -> ConcurrencyPermit:
+        """
+        Takes a slot for a request to the given URL path, like :meth:`acquire`,
+        but waits without blocking the running event loop.
+        """
+        blocking = self.blocking if blocking is None else blocking
+        loop = asyncio.get_event_loop()
+        permit, waiter = self._enqueue(url_path, blocking, loop)
+
+        if waiter is None:
+            return permit
+
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), self.max_wait)
+        except asyncio.TimeoutError:
+            if not self._abandon(url_path, waiter):
+                raise exceptions.ConcurrencyLimitExceeded(
+                    url_path, int(self._endpoint(url_path).limit)
+                )
+
+            # The slot was granted just as the wait timed out.
+            return ConcurrencyPermit(self, url_path)
+        except asyncio.CancelledError:
+            self._abandon(url_path, waiter)
+            raise
+
+        return ConcurrencyPermit(self, url_path)
+
+    def _release(self, permit: ConcurrencyPermit, overloaded: bool, answered: bool):
+        now = time.monotonic()
+        latency = now - permit.started_at
+
+        with self._lock:
+            endpoint = self._endpoint(permit.url_path)
+            busy = endpoint.in_flight * 2 >= endpoint.limit
+            endpoint.in_flight -= 1
+
+            if overloaded:
+                # Requests sent before the last decrease were all in flight
+                # when NBG got overloaded, so they only decrease it once.
+                if permit.started_at >= endpoint.decreased_at:
+                    endpoint.limit = max(
+                        self.min_limit, endpoint.limit * self.decrease_factor
+                    )
+                    endpoint.decreased_at = now
+                    endpoint.decreases += 1
+            elif answered:
+                # The lowest latency creeps up, to follow lasting changes of
+                # the latency of NBG.
+                endpoint.min_latency = (
+                    latency
+                    if endpoint.min_latency is None
+                    else min(latency, endpoint.min_latency * 1.001)
+                )
+                threshold = (
+                    self.latency_threshold
+                    if self.latency_threshold is not None
+                    else endpoint.min_latency * self.latency_tolerance
+                )
+
+                if busy and latency <= threshold:
+                    endpoint.limit = min(
+                        self.max_limit, endpoint.limit + self.increase / endpoint.limit
+                    )
+
+            self._grant(endpoint)
+
+    def limit(self, url_path: str) -> int:
+        """
+        Returns the current limit of the given URL path.
+        """
+        with self._lock:
+            return int(self._endpoint(url_path).limit)
+
+    @property
+    def stats(self) -> dict:
+        """
+        Returns the current limit of each URL path, along with its requests in
+        flight, its queued calls, the calls it rejected and how many times its
+        limit was decreased.
+        """
+        with self._lock:
+            return {
+                url_path: {
+                    "limit": int(endpoint.limit),
+                    "in_flight": endpoint.in_flight,
+                    "queued": len(endpoint.waiters),
+                    "rejected": endpoint.rejected,
+                    "decreases": endpoint.decreases,
+                }
+                for url_path, endpoint in sorted(self._endpoints.items())
+            }
@@ -0,0 +1,156 @@
+from unittest import mock
+import asyncio
+import threading
+import time
+
+import pytest
+
+from . import concurrency, exceptions
+
+
+URL_PATH = "account/transactions"
+
+
+@pytest.fixture
+def clock():
+    with mock.patch.object(concurrency.time, "monotonic") as monotonic:
+        monotonic.return_value = 1000.0
+        yield monotonic
+
+
+def test_limit_grows_while_latency_is_healthy(clock):
+    limiter = concurrency.ConcurrencyLimiter(initial_limit=2, max_limit=3)
+
+    for _ in range(4):
+        permits = [limiter.acquire(URL_PATH) for _ in range(2)]
+        clock.return_value += 0.1
+
+        for permit in permits:
+            permit.release(200)
+
+    assert limiter.limit(URL_PATH) == 3
+
+    # Slow responses leave the limit as is.
+    limiter = concurrency.ConcurrencyLimiter(initial_limit=2, latency_tolerance=2)
+    permits = [limiter.acquire(URL_PATH) for _ in range(2)]
+    clock.return_value += 0.1
+    permits[0].release(200)
+    permits = [permits[1], limiter.acquire(URL_PATH)]
+    clock.return_value += 1
+
+    for permit in permits:
+        permit.release(200)
+
+    assert limiter.stats[URL_PATH]["limit"] == 2
+
+    # Requests that were never sent say nothing about the latency of NBG.
+    limiter = concurrency.ConcurrencyLimiter(initial_limit=2, max_limit=3)
+    permits = [limiter.acquire(URL_PATH) for _ in range(2)]
+
+    for permit in permits:
+        permit.release()
+
+    assert limiter._endpoint(URL_PATH).min_latency is None
+
+
+def test_limit_decreases_once_per_congestion(clock):
+    limiter = concurrency.ConcurrencyLimiter(initial_limit=8)
+    permits = [limiter.acquire(URL_PATH) for _ in range(4)]
+    clock.return_value += 0.1
+    permits[0].release(503)
+    permits[1].release(overloaded=True)
+    permits[2].release(404)
+
+    assert limiter.limit(URL_PATH) == 4
+
+    clock.return_value += 0.1
+    limiter.acquire(URL_PATH).release(429)
+    permits[3].release(500)
+
+    assert limiter.stats[URL_PATH] == {
+        "limit": 2,
+        "in_flight": 0,
+        "queued": 0,
+        "rejected": 0,
+        "decreases": 2,
+    }
+
+    for _ in range(3):
+        limiter.acquire(URL_PATH).release(503)
+
+    assert limiter.limit(URL_PATH) == 1
+
+
+def test_fail_fast():
+    limiter = concurrency.ConcurrencyLimiter(initial_limit=1, blocking=False)
+    permit = limiter.acquire(URL_PATH)
+
+    with pytest.raises(exceptions.ConcurrencyLimitExceeded) as exception_info:
+        limiter.acquire(URL_PATH)
+
+    assert exception_info.value.limit == 1
+    assert limiter.acquire("account/list")
+
+    permit.release(200)
+
+    assert limiter.acquire(URL_PATH)
+    assert limiter.stats[URL_PATH]["rejected"] == 1
+
+
+def test_queued_calls():
+    limiter = concurrency.ConcurrencyLimiter(
+        initial_limit=1, max_limit=1, max_queue=1, max_wait=5
+    )
+    permit = limiter.acquire(URL_PATH)
+    permits = []
+    waiting = threading.Thread(target=lambda: permits.append(limiter.acquire(URL_PATH)))
+    waiting.start()
+
+    while limiter.stats[URL_PATH]["queued"] == 0:
+        time.sleep(0.001)
+
+    with pytest.raises(exceptions.ConcurrencyLimitExceeded):
+        limiter.acquire(URL_PATH)
+
+    permit.release(200)
+    waiting.join()
+
+    assert len(permits) == 1
+    assert limiter.stats[URL_PATH]["in_flight"] == 1
+
+    limiter.max_wait = 0.01
+
+    with pytest.raises(exceptions.ConcurrencyLimitExceeded):
+        limiter.acquire(URL_PATH)
+
+    assert limiter.stats[URL_PATH]["queued"] == 0
+    assert limiter.stats[URL_PATH]["rejected"] == 2
+
+
+def test_acquire_async():
+    limiter = concurrency.ConcurrencyLimiter(
+        initial_limit=1, max_limit=1, max_wait=0.05
+    )
+    order = []
+
+    async def call(index: int, seconds: float):
+        permit = await limiter.acquire_async(URL_PATH)
+        order.append(index)
+        await asyncio.sleep(seconds)
+        permit.release(200)
+
+    async def calls():
+        return await asyncio.gather(
+            call(0, 0.01), call(1, 0.1), call(2, 0), return_exceptions=True
+        )
+
+    loop = asyncio.new_event_loop()
+
+    try:
+        results = loop.run_until_complete(calls())
+    finally:
+        loop.close()
+
+    assert order == [0, 1]
+    assert isinstance(results[2], exceptions.ConcurrencyLimitExceeded)
+    assert limiter.stats[URL_PATH]["in_flight"] == 0
@@ -1,16 +1,31 @@
+import functools
 import inspect
 
 
+async def _await_response(awaitable, response_type: type):
+    response_payload = await awaitable
+    return response_type(response_payload)
+
+
 def api_call(method: callable):
     """
     Mark a client method as an API call. This enables each NBG API client
     to serialise server responses, based on the provided type annotations.
+    Methods of asynchronous clients return awaitables, which resolve to the
+    serialised response. API calls are marked with ``is_api_call``, e.g. for
+    batches to tell them apart from the other methods of clients.
     """
     method_signature = inspect.signature(method)
     response_type = method_signature.return_annotation
 
+    @functools.wraps(method)
     def wrapper_method(*args, **kwargs):
         response_payload = method(*args, **kwargs)
+
+        if inspect.isawaitable(response_payload):
+            return _await_response(response_payload, response_type)
+
         return response_type(response_payload)
 
+    wrapper_method.is_api_call = True
     return wrapper_method
@@ -16,6 +16,7 @@ class EnvironmentClientMixin:
 
     _production_base_url = ""
     _sandbox_base_url = ""
+    _base_url = None
 
     _scopes = []
     _production_scopes = []
@@ -30,13 +31,34 @@ class EnvironmentClientMixin:
     def base_url(self):
         """
         Returns the base URL of the current client according to the configured
-        environment.
+        environment, unless it has been set via ``set_base_url``.
         """
+        if self._base_url is not None:
+            return self._base_url
+
         _base_url = (
             self._production_base_url if self.production else self._sandbox_base_url
         )
         return _base_url
 
+    def set_base_url(self, base_url: str):
+        """
+        Sets the base URL of the API requests of the current client, e.g. to
+        send them to the emulator of :mod:`nbg.emulator` or through a proxy.
+
+        :param base_url: The base URL to use, or ``None`` to use the one of the
+                         configured environment.
+        :type base_url: string
+
+        ---
+        **Usage**
+
+        .. code-block:: python
+
+            client.set_base_url("http://127.0.0.1:8080")
+        """
+        self._base_url = base_url.rstrip("/") if base_url is not None else None
+
     @property
     def consent_base_url(self):
         """
@@ -87,6 +109,7 @@ class EnvironmentClientMixin:
 
         return {}
 
+    @decorators.api_call
     def create_sandbox(self, sandbox_id: str) -> dict:
         """
         Create a sandbox with the given ``sandbox_id``.
@@ -104,6 +127,7 @@ class EnvironmentClientMixin:
         data = {"sandboxId": sandbox_id}
         return self._api_request("POST", "sandbox", data)
 
+    @decorators.api_call
     def export_sandbox(self, sandbox_id: str) -> dict:
         """
         Returns all contents of the sandbox identified by the given `sandbox_id`.
@@ -120,6 +144,7 @@ class EnvironmentClientMixin:
         """
         return self._api_request("GET", f"sandbox/{sandbox_id}")
 
+    @decorators.api_call
     def import_sandbox(self, sandbox_id: str, data: dict) -> dict:
         """
         Imports the given `data` into the sandbox identified by the given `sandbox_id`.
@@ -139,6 +164,7 @@ class EnvironmentClientMixin:
         """
         return self._api_request("PUT", f"sandbox/{sandbox_id}", data)
 
+    @decorators.api_call
     def delete_sandbox(self, sandbox_id: str) -> bool:
         """
         Deletes the sandbox identified by the given `sandbox_id`.
@@ -41,9 +41,9 @@ class GenericResponseError(Exception):
         "3.1.1": "header.ID/header.application must be valid GUIDs",
     }
 
-    def __init__(self, response: Response):
+    def __init__(self, response: Response, body: dict = None):
         self.response = response
-        self.body = response.json()
+        self.body = response.json() if body is None else body
         self.message = self.body["Message"]
 
         code_pattern_match = re.match(r"Error ([1-9A-Z.]+)$", self.message)
@@ -65,10 +65,10 @@ class ResponseException(Exception):
     server indicates that an exception has been raised.
     """
 
-    def __init__(self, response: Response):
+    def __init__(self, response: Response, body: dict = None):
         self.response = response
 
-        json_data = response.json()["exception"]
+        json_data = (response.json() if body is None else body)["exception"]
 
         self.id = json_data["id"]
         self.sev = json_data["sev"]
@@ -105,6 +105,86 @@ class MissingResourceArguments(Exception):
         return exception_message
 
 
+class FrozenClientError(AttributeError):
+    """
+    This exception gets raised when trying to modify a user view of a client,
+    as returned by ``for_user``. User views are immutable, so that they can be
+    shared safely across threads.
+    """
+
+    def __init__(self, attribute_name: str):
+        self.attribute_name = attribute_name
+
+    def __str__(self):
+        return (
+            f"Cannot set {self.attribute_name}, as user views of NBG API clients "
+            f"are immutable. Use for_user() to get a view with other credentials."
+        )
+
+
+class RateLimitExceeded(Exception):
+    """
+    This exception gets raised when an API call would exceed the client-side
+    rate limit and the rate limiter is not allowed to wait for it.
+    """
+
+    def __init__(self, url_path: str, retry_after: float):
+        self.url_path = url_path
+        self.retry_after = retry_after
+
+    def __str__(self):
+        return (
+            f"Rate limit of {self.url_path} exceeded. "
+            f"Retry after {self.retry_after:.3f} seconds."
+        )
+
+
+class ConcurrencyLimitExceeded(Exception):
+    """
+    This exception gets raised when an API call would exceed the limit of
+    requests in flight to its endpoint and the concurrency limiter is not
+    allowed to queue it, its queue is full or it waited for too long.
+    """
+
+    def __init__(self, url_path: str, limit: int):
+        self.url_path = url_path
+        self.limit = limit
+
+    def __str__(self):
+        return f"Limit of {self.limit} requests in flight to {self.url_path} reached."
+
+
+class CircuitOpen(Exception):
+    """
+    This exception gets raised when an API call is rejected without being sent,
+    as the circuit of its endpoint is open after recent calls failed.
+    """
+
+    def __init__(self, url: str, retry_after: float):
+        self.url = url
+        self.retry_after = retry_after
+
+    def __str__(self):
+        return (
+            f"The circuit of {self.url} is open. "
+            f"Retry after {self.retry_after:.3f} seconds."
+        )
+
+
+class DeadlineExceeded(Exception):
+    """
+    This exception gets raised when an API call has no time left for another
+    attempt before its deadline.
+    """
+
+    def __init__(self, url_path: str, deadline: float):
+        self.url_path = url_path
+        self.deadline = deadline
+
+    def __str__(self):
+        return f"The deadline of {self.deadline} seconds of {self.url_path} passed."
+
+
 class NotAuthenticatedRequest(Exception):
     """
     This exception gets raised when a request is not authenticated. A common
@@ -0,0 +1,198 @@
+"""
+Hedging of read-only API calls, to cut their tail latency: when a call has not
+been answered within the usual latency of its endpoint, a second attempt is
+sent and the first answer of either attempt is used. A budget caps the extra
+requests, so that hedging cannot overload NBG APIs when they slow down.
+Hedging is opt-in and is enabled per client via ``set_hedging_policy``.
+"""
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import typing
+
+
+class HedgingPolicy:
+    """
+    Configures which API calls get hedged and when. Only calls to read-only
+    endpoints get hedged, e.g. ``accounts``, ``card_details`` or
+    ``account_transactions``, but never streamed calls.
+
+    The delay before hedging a call is the given ``percentile`` of the latency
+    of recent attempts to its endpoint, so that about 5% of the calls get
+    hedged by default. Each call earns ``budget`` hedges, up to ``max_hedges``,
+    and each hedge spends one, so that at most a ``budget`` fraction of calls
+    get hedged over time.
+
+    :param percentile: The percentile of recent latencies to wait for before
+                       hedging. Defaults to ``0.95``.
+    :type percentile: float
+    :param min_delay: The minimum seconds to wait before hedging. Defaults to
+                      ``0.05``.
+    :type min_delay: float
+    :param initial_delay: The seconds to wait before hedging calls to endpoints
+                          with fewer than ``min_samples`` latencies, or
+                          ``None`` to not hedge them. Defaults to ``None``.
+    :type initial_delay: float
+    :param min_samples: The latencies of an endpoint needed to hedge its calls.
+                        Defaults to ``20``.
+    :type min_samples: int
+    :param window_size: The number of recent latencies of each endpoint that
+                        the delay is computed from. Defaults to ``200``.
+    :type window_size: int
+    :param budget: The fraction of calls that may be hedged. Defaults to
+                   ``0.1``.
+    :type budget: float
+    :param max_hedges: The hedges that may be saved up, and then spent at once.
+                       Defaults to ``10``.
+    :type max_hedges: float
+    :param endpoints: The URL paths to hedge among the read-only ones of the
+                      client, e.g. ``{"account/transactions"}``. Defaults to
+                      all of them.
+    :type endpoints: set
+    :param max_workers: The threads sending the attempts of hedged calls of
+                        synchronous clients. Defaults to ``32``.
+    :type max_workers: int
+
+    ---
+    **Usage**
+
+    .. code-block:: python
+
+        from nbg.base.hedging import HedgingPolicy
+
+        client.set_hedging_policy(HedgingPolicy(percentile=0.9, budget=0.05))
+        client.hedging_policy.stats
+    """
+
+    def __init__(
+        self,
+        percentile: float = 0.95,
+        min_delay: float = 0.05,
+        initial_delay: float = None,
+        min_samples: int = 20,
+        window_size: int = 200,
+        budget: float = 0.1,
+        max_hedges: float = 10,
+        endpoints: typing.Iterable[str] = None,
+        max_workers: int = 32,
+    ):
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.initial_delay = initial_delay
+        self.min_samples = min_samples
+        self.window_size = window_size
+        self.budget = budget
+        self.max_hedges = max_hedges
+        self.endpoints = frozenset(endpoints) if endpoints is not None else None
+        self.max_workers = max_workers
+        self.calls = {}
+        self.hedged = {}
+        self.hedges_won = {}
+        self._latencies = {}
+        self._samples = {}
+        self._delays = {}
+        self._hedges = max_hedges
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """
+        Returns the thread pool sending the attempts of hedged calls of
+        synchronous clients, creating it on first use.
+        """
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        self.max_workers, thread_name_prefix="nbg-hedging"
+                    )
+
+        return self._executor
+
+    def _count(self, counters: dict, url_path: str):
+        counters[url_path] = counters.get(url_path, 0) + 1
+
+    def delay(self, url_path: str) -> typing.Optional[float]:
+        """
+        Returns the seconds to wait before hedging a new call to the given
+        read-only URL path, or ``None`` if it should not be hedged. Each call
+        earns its share of the budget.
+        """
+        if self.endpoints is not None and url_path not in self.endpoints:
+            return None
+
+        with self._lock:
+            self._count(self.calls, url_path)
+            self._hedges = min(self.max_hedges, self._hedges + self.budget)
+            delay = self._delays.get(url_path, self.initial_delay)
+
+        return None if delay is None else max(self.min_delay, delay)
+
+    def take_hedge(self, url_path: str) -> bool:
+        """
+        Spends a hedge of the budget on a call to the given URL path, if any is
+        left, and returns whether it was spent.
+        """
+        with self._lock:
+            if self._hedges < 1:
+                return False
+
+            self._hedges -= 1
+            self._count(self.hedged, url_path)
+            return True
+
+    def hedge_won(self, url_path: str):
+        """
+        Counts a hedge of a call to the given URL path that answered first.
+        """
+        with self._lock:
+            self._count(self.hedges_won, url_path)
+
+    def record(self, url_path: str, seconds: float):
+        """
+        Records the latency of a successful attempt of a call to the given URL
+        path, including attempts that answered after the other one.
+        """
+        with self._lock:
+            latencies = self._latencies.get(url_path)
+
+            if latencies is None:
+                latencies = self._latencies[url_path] = deque(maxlen=self.window_size)
+
+            latencies.append(seconds)
+            self._count(self._samples, url_path)
+
+            # Percentiles get recomputed every few latencies, rather than on
+            # every call.
+            if len(latencies) >= self.min_samples and self._samples[url_path] % 10 == 0:
+                ordered = sorted(latencies)
+                index = min(len(ordered) - 1, int(self.percentile * len(ordered)))
+                self._delays[url_path] = ordered[index]
+
+    @property
+    def stats(self) -> dict:
+        """
+        Returns the calls to each URL path that could be hedged, how many of
+        them got hedged, how many hedges answered first and the current delay
+        before hedging.
+        """
+        with self._lock:
+            return {
+                url_path: {
+                    "calls": calls,
+                    "hedged": self.hedged.get(url_path, 0),
+                    "hedges_won": self.hedges_won.get(url_path, 0),
+                    "delay": self._delays.get(url_path, self.initial_delay),
+                }
+                for url_path, calls in sorted(self.calls.items())
+            }
+
+    def close(self):
+        """
+        Shuts down the thread pool of the policy, if it has been created.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
@@ -0,0 +1,34 @@
+from . import hedging
+
+
+def test_delay_percentile():
+    hedging_policy = hedging.HedgingPolicy(min_delay=0.01, min_samples=20)
+
+    for latency in range(19):
+        hedging_policy.record("account/list", latency / 100)
+
+    assert hedging_policy.delay("account/list") is None
+
+    for latency in range(19, 100):
+        hedging_policy.record("account/list", latency / 100)
+
+    assert hedging_policy.delay("account/list") == 0.95
+    assert hedging_policy.delay("card/list") is None
+    assert hedging.HedgingPolicy(initial_delay=0).delay("card/list") == 0.05
+
+
+def test_budget():
+    hedging_policy = hedging.HedgingPolicy(
+        initial_delay=0.1, budget=0.5, max_hedges=1, endpoints={"account/list"}
+    )
+    hedges = 0
+
+    for _ in range(10):
+        hedging_policy.delay("account/list")
+        hedges += hedging_policy.take_hedge("account/list")
+
+    assert hedges == 5
+    assert hedging_policy.delay("card/list") is None
+    assert hedging_policy.stats == {
+        "account/list": {"calls": 10, "hedged": 5, "hedges_won": 0, "delay": 0.1}
+    }
@@ -0,0 +1,359 @@
+"""
+Priority lanes for the requests of a client, so that background work, e.g.
+nightly backfills of transactions, cannot hold up interactive calls in the
+connection pool. Each request takes a slot of a shared capacity through the
+lane of its client view. Priority scheduling is opt-in and is enabled per
+client via ``set_priority_scheduler``.
+"""
+
+from collections import deque
+import asyncio
+import threading
+import typing
+
+from requests.adapters import DEFAULT_POOLSIZE
+
+from . import exceptions
+from .concurrency import _Waiter
+
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+
+STRICT = "strict"
+WEIGHTED = "weighted"
+
+
+class Lane:
+    """
+    A named lane of a :class:`PriorityScheduler`.
+
+    :param name: The name of the lane, e.g. ``"interactive"``.
+    :type name: string
+    :param weight: The share of the slots that free up which the lane gets
+                   under weighted scheduling, relative to the other lanes
+                   waiting for them. Defaults to ``1``.
+    :type weight: float
+    :param reserved: The slots that only the lane may use, so that it gets
+                     them without waiting for other lanes. Defaults to ``0``.
+    :type reserved: int
+    :param max_share: The fraction of the capacity the lane may use at most.
+                      Defaults to all of it.
+    :type max_share: float
+    """
+
+    def __init__(
+        self, name: str, weight: float = 1, reserved: int = 0, max_share: float = None
+    ):
+        self.name = name
+        self.weight = weight
+        self.reserved = reserved
+        self.max_share = max_share
+
+    def __repr__(self):
+        return f"Lane({self.name!r}, weight={self.weight}, reserved={self.reserved})"
+
+
+class _LaneState:
+    """
+    The requests in flight and the calls waiting in a single lane.
+    """
+
+    def __init__(self, lane: Lane, capacity: int):
+        self.lane = lane
+        self.max_slots = (
+            capacity
+            if lane.max_share is None
+            else max(1, min(capacity, int(capacity * lane.max_share)))
+        )
+        self.in_flight = 0
+        self.waiters = deque()
+        self.virtual_time = 0.0
+        self.granted = 0
+        self.rejected = 0
+
+
+class LanePermit:
+    """
+    A slot of a lane for a single request, which must be released once its
+    response arrives or it fails.
+    """
+
+    __slots__ = ("scheduler", "lane")
+
+    def __init__(self, scheduler: "PriorityScheduler", lane: str):
+        self.scheduler = scheduler
+        self.lane = lane
+
+    def release(self):
+        """
+        Releases the slot, handing it over to the next waiting call.
+        """
+        self.scheduler._release(self.lane)
+
+
+class PriorityScheduler:
+    """
+    Shares the requests in flight of a client, i.e. its ``capacity``, among
+    named lanes. Clients send their requests through the lane returned by
+    :meth:`with_priority() <nbg.base.client.BaseClientMixin.with_priority>`,
+    or through the first lane by default.
+
+    Requests get a slot immediately while their lane is under its share and
+    there are free slots, other than the slots reserved for other lanes. Other
+    calls wait in their lane, and the slots that free up go to the lanes in
+    order of priority under ``strict`` scheduling, or in proportion to their
+    weights under ``weighted`` scheduling. Calls over the capacity raise
+    ``ConcurrencyLimitExceeded`` immediately when the scheduler is not
+    blocking, or after waiting for ``max_wait``.
+
+    By default, interactive calls have 2 reserved slots and get 9 slots out of
+    10 that free up, while background calls may use up to 80% of the
+    capacity, i.e. any spare capacity, without holding up interactive calls.
+
+    :param capacity: The requests in flight of all lanes, which should not
+                     exceed the connection limit of the client. Defaults to
+                     ``10``, the default connection limit.
+    :type capacity: int
+    :param lanes: The lanes, in order of priority. Defaults to an
+                  ``interactive`` and a ``background`` lane.
+    :type lanes: list
+    :param scheduling: Either ``"strict"`` or ``"weighted"``. Defaults to
+                       ``"weighted"``.
+    :type scheduling: string
+    :param blocking: Whether calls over the capacity wait for a slot, or raise
+                     ``ConcurrencyLimitExceeded`` immediately. Defaults to
+                     ``True``.
+    :type blocking: bool
+    :param max_wait: The most seconds a call may wait for a slot. Defaults to
+                     no limit.
+    :type max_wait: float
+
+    ---
+    **Usage**
+
+    .. code-block:: python
+
+        from nbg.base.priorities import Lane, PriorityScheduler
+
+        client.set_priority_scheduler(
+            PriorityScheduler(
+                capacity=20,
+                lanes=[
+                    Lane("interactive", weight=4, reserved=5),
+                    Lane("background", max_share=0.5),
+                ],
+            )
+        )
+        client.with_priority("background").backfill(...)
+    """
+
+    def __init__(
+        self,
+        capacity: int = DEFAULT_POOLSIZE,
+        lanes: typing.Iterable[Lane] = None,
+        scheduling: str = WEIGHTED,
+        blocking: bool = True,
+        max_wait: float = None,
+    ):
+        if scheduling not in (STRICT, WEIGHTED):
+            raise ValueError(f"Unknown scheduling: {scheduling}.")
+
+        if lanes is None:
+            lanes = [
+                Lane(INTERACTIVE, weight=9, reserved=2),
+                Lane(BACKGROUND, weight=1, max_share=0.8),
+            ]
+
+        self.capacity = capacity
+        self.scheduling = scheduling
+        self.blocking = blocking
+        self.max_wait = max_wait
+        self._lanes = {lane.name: _LaneState(lane, capacity) for lane in lanes}
+        self._in_flight = 0
+        self._virtual_time = 0.0
+        self._lock = threading.Lock()
+
+        if not self._lanes:
+            raise ValueError("A priority scheduler needs at least one lane.")
+
+    @property
+    def lanes(self) -> typing.List[Lane]:
+        """
+        Returns the lanes of the scheduler, in order of priority.
+        """
+        return [state.lane for state in self._lanes.values()]
+
+    @property
+    def default_lane(self) -> str:
+        """
+        Returns the name of the lane of calls without a priority, i.e. of the
+        first lane.
+        """
+        return next(iter(self._lanes))
+
+    def _lane(self, lane: typing.Optional[str]) -> _LaneState:
+        state = self._lanes.get(self.default_lane if lane is None else lane)
+
+        if state is None:
+            raise ValueError(f"Unknown priority lane: {lane}.")
+
+        return state
+
+    def _can_take(self, state: _LaneState) -> bool:
+        if state.in_flight >= state.max_slots:
+            return False
+
+        reserved = sum(
+            max(0, other.lane.reserved - other.in_flight)
+            for other in self._lanes.values()
+            if other is not state
+        )
+        return self._in_flight + reserved < self.capacity
+
+    def _take(self, state: _LaneState):
+        # Lanes advance their virtual time in inverse proportion to their
+        # weight, and the lane that is furthest behind gets the next slot.
+        state.virtual_time += 1 / state.lane.weight
+        state.in_flight += 1
+        state.granted += 1
+        self._in_flight += 1
+
+    def _dispatch(self):
+        while True:
+            candidates = [
+                state
+                for state in self._lanes.values()
+                if state.waiters and self._can_take(state)
+            ]
+
+            if not candidates:
+                return
+
+            if self.scheduling == STRICT:
+                state = candidates[0]
+            else:
+                state = min(candidates, key=lambda state: state.virtual_time)
+
+            self._virtual_time = state.virtual_time
+            self._take(state)
+            state.waiters.popleft().grant()
+
+    def _enqueue(
+        self,
+        lane: str,
+        url_path: str,
+        blocking: bool,
+        loop: asyncio.AbstractEventLoop = None,
+    ) -> typing.Tuple[LanePermit, typing.Optional[_Waiter]]:
+        with self._lock:
+            state = self._lane(lane)
+
+            if not state.waiters and self._can_take(state):
+                self._take(state)
+                return LanePermit(self, state.lane.name), None
+
+            if not blocking:
+                state.rejected += 1
+                raise exceptions.ConcurrencyLimitExceeded(url_path, state.max_slots)
+
+            if not state.waiters:
+                # Lanes that were idle do not catch up on the slots they did
+                # not use.
+                state.virtual_time = max(state.virtual_time, self._virtual_time)
+
+            waiter = _Waiter(loop)
+            state.waiters.append(waiter)
+            return None, waiter
+
+    def _abandon(self, lane: str, waiter: _Waiter) -> bool:
+        with self._lock:
+            state = self._lane(lane)
+
+            if waiter.granted:
+                state.in_flight -= 1
+                self._in_flight -= 1
+                self._dispatch()
+                return True
+
+            state.waiters.remove(waiter)
+            state.rejected += 1
+            return False
+
+    def acquire(
+        self, lane: str = None, url_path: str = None, blocking: bool = None
+    ) -> LanePermit:
+        """
+        Takes a slot of the given lane, or of the default one, for a request
+        to the given URL path, waiting for one if the scheduler is blocking.
+        ``blocking`` overrides the scheduler default.
+        """
+        blocking = self.blocking if blocking is None else blocking
+        permit, waiter = self._enqueue(lane, url_path, blocking)
+
+        if waiter is None:
+            return permit
+
+        lane = self._lane(lane).lane.name
+
+        if not waiter.event.wait(self.max_wait) and not waiter.granted:
+            self._abandon(lane, waiter)
+            raise exceptions.ConcurrencyLimitExceeded(
+                url_path, self._lane(lane).max_slots
+            )
+
+        return LanePermit(self, lane)
+
+    async def acquire_async(
+        self, lane: str = None, url_path: str = None, blocking: bool = None
+    ) -> LanePermit:
+        """
+        Takes a slot of the given lane, like :meth:`acquire`, but waits without
+        blocking the running event loop.
+        """
+        blocking = self.blocking if blocking is None else blocking
+        permit, waiter = self._enqueue(
+            lane, url_path, blocking, asyncio.get_event_loop()
+        )
+
+        if waiter is None:
+            return permit
+
+        lane = self._lane(lane).lane.name
+
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), self.max_wait)
+        except asyncio.TimeoutError:
+            if not self._abandon(lane, waiter):
+                raise exceptions.ConcurrencyLimitExceeded(
+                    url_path, self._lane(lane).max_slots
+                )
+        except asyncio.CancelledError:
+            self._abandon(lane, waiter)
+            raise
+
+        return LanePermit(self, lane)
+
+    def _release(self, lane: str):
+        with self._lock:
+            state = self._lanes[lane]
+            state.in_flight -= 1
+            self._in_flight -= 1
+            self._dispatch()
+
+    @property
+    def stats(self) -> dict:
+        """
+        Returns the requests in flight and the queued calls of each lane,
+        along with the slots it got and the calls it rejected.
+        """
+        with self._lock:
+            return {
+                name: {
+                    "in_flight": state.in_flight,
+                    "queued": len(state.waiters),
+                    "granted": state.granted,
+                    "rejected": state.rejected,
+                }
+                for name, state in self._lanes.items()
+            }
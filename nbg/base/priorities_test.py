@@ -0,0 +1,122 @@
+import asyncio
+
+import pytest
+
+from . import exceptions, priorities
+
+
+URL_PATH = "account/transactions"
+
+
+def _grant_order(
+    scheduler: priorities.PriorityScheduler, holding_lane: str, lanes: list
+) -> list:
+    """
+    Returns the lanes of the given calls in the order they got a slot, while
+    the capacity is taken by an earlier call of the holding lane.
+    """
+    order = []
+
+    async def call(lane: str):
+        permit = await scheduler.acquire_async(lane, URL_PATH)
+        order.append(lane)
+        await asyncio.sleep(0)
+        permit.release()
+
+    async def calls():
+        permit = scheduler.acquire(holding_lane, URL_PATH)
+        tasks = [asyncio.ensure_future(call(lane)) for lane in lanes]
+        await asyncio.sleep(0)
+        permit.release()
+        await asyncio.gather(*tasks)
+
+    loop = asyncio.new_event_loop()
+
+    try:
+        loop.run_until_complete(calls())
+    finally:
+        loop.close()
+
+    return order
+
+
+def test_reserved_capacity():
+    scheduler = priorities.PriorityScheduler(capacity=4, blocking=False)
+    background_permits = [scheduler.acquire("background") for _ in range(2)]
+
+    with pytest.raises(exceptions.ConcurrencyLimitExceeded):
+        scheduler.acquire("background", URL_PATH)
+
+    interactive_permits = [scheduler.acquire() for _ in range(2)]
+
+    assert scheduler.stats == {
+        "interactive": {"in_flight": 2, "queued": 0, "granted": 2, "rejected": 0},
+        "background": {"in_flight": 2, "queued": 0, "granted": 2, "rejected": 1},
+    }
+
+    for permit in background_permits + interactive_permits:
+        permit.release()
+
+    # Background calls soak up spare capacity up to their share.
+    scheduler = priorities.PriorityScheduler(capacity=20, blocking=False)
+
+    for _ in range(16):
+        scheduler.acquire("background")
+
+    with pytest.raises(exceptions.ConcurrencyLimitExceeded) as exception_info:
+        scheduler.acquire("background", URL_PATH)
+
+    assert exception_info.value.limit == 16
+
+
+def test_weighted_scheduling():
+    scheduler = priorities.PriorityScheduler(
+        capacity=1,
+        lanes=[priorities.Lane("interactive", weight=3), priorities.Lane("background")],
+    )
+    order = _grant_order(
+        scheduler, "interactive", ["background"] * 4 + ["interactive"] * 4
+    )
+
+    assert order[:4].count("interactive") == 3
+    assert sorted(order) == ["background"] * 4 + ["interactive"] * 4
+
+
+def test_strict_scheduling():
+    scheduler = priorities.PriorityScheduler(
+        capacity=1,
+        lanes=[priorities.Lane("interactive"), priorities.Lane("background")],
+        scheduling=priorities.STRICT,
+    )
+    order = _grant_order(
+        scheduler, "background", ["background"] * 2 + ["interactive"] * 2
+    )
+
+    assert order == ["interactive"] * 2 + ["background"] * 2
+    assert scheduler.stats["background"]["in_flight"] == 0
+
+
+def test_max_wait():
+    scheduler = priorities.PriorityScheduler(
+        capacity=1, lanes=[priorities.Lane("interactive")], max_wait=0.01
+    )
+    permit = scheduler.acquire()
+
+    with pytest.raises(exceptions.ConcurrencyLimitExceeded):
+        scheduler.acquire("interactive", URL_PATH)
+
+    permit.release()
+
+    assert scheduler.stats["interactive"]["queued"] == 0
+    assert scheduler.acquire()
+
+
+def test_invalid_configuration():
+    with pytest.raises(ValueError):
+        priorities.PriorityScheduler(scheduling="fifo")
+
+    with pytest.raises(ValueError):
+        priorities.PriorityScheduler(lanes=[])
+
+    with pytest.raises(ValueError):
+        priorities.PriorityScheduler().acquire("nightly")
@@ -0,0 +1,301 @@
+"""
+Client-side rate limiting of API calls with token buckets, so that bursts of
+requests stay under the quotas of NBG APIs instead of getting throttled. Rate
+limiting is opt-in and is enabled per client via ``set_rate_limiter``.
+"""
+
+import asyncio
+import threading
+import time
+import typing
+
+from . import exceptions, utils
+
+
+# Key, rate in tokens per second and capacity of a token bucket.
+BUCKET = typing.Tuple[str, float, float]
+
+GLOBAL_BUCKET = "*"
+
+
+def _refill(tokens: float, updated_at: float, now: float, rate: float, capacity: float):
+    return min(capacity, tokens + max(0.0, now - updated_at) * rate)
+
+
+class RateLimitBackend:
+    """
+    Base class for rate limit backends. Backends store the tokens of each
+    bucket and take tokens from several buckets atomically.
+    """
+
+    def take(self, buckets: typing.List[BUCKET]) -> float:
+        """
+        Takes a token from each one of the given buckets, only if all of them
+        have one. Returns ``0`` if the tokens were taken, or otherwise the
+        seconds until all buckets will have a token.
+        """
+        raise NotImplementedError()
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """
+    Stores token buckets in the memory of the current process, shared by all
+    of its threads.
+    """
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def take(self, buckets: typing.List[BUCKET]) -> float:
+        with self._lock:
+            now = time.monotonic()
+            wait = 0.0
+            refilled = []
+
+            for key, rate, capacity in buckets:
+                tokens, updated_at = self._buckets.get(key, (capacity, now))
+                tokens = _refill(tokens, updated_at, now, rate, capacity)
+                refilled.append((key, tokens))
+                wait = max(wait, (1 - tokens) / rate)
+
+            if wait > 0:
+                return wait
+
+            for key, tokens in refilled:
+                self._buckets[key] = (tokens - 1, now)
+
+            return 0.0
+
+
+class DiskRateLimitBackend(RateLimitBackend):
+    """
+    Stores token buckets in an SQLite database at the given path, so that all
+    processes of a host using the same database share the same rate limits.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._connections = utils.SQLiteConnections(path)
+        self._connections.get().execute(
+            "CREATE TABLE IF NOT EXISTS nbg_rate_limit ("
+            "key TEXT PRIMARY KEY, tokens REAL, updated_at REAL)"
+        )
+
+    def take(self, buckets: typing.List[BUCKET]) -> float:
+        connection = self._connections.get()
+        # Lock the database for writing before reading the buckets, so that
+        # concurrent processes cannot take the same tokens.
+        connection.execute("BEGIN IMMEDIATE")
+
+        try:
+            now = time.time()
+            wait = 0.0
+            refilled = []
+
+            for key, rate, capacity in buckets:
+                row = connection.execute(
+                    "SELECT tokens, updated_at FROM nbg_rate_limit WHERE key = ?",
+                    (key,),
+                ).fetchone()
+                tokens, updated_at = row if row is not None else (capacity, now)
+                tokens = _refill(tokens, updated_at, now, rate, capacity)
+                refilled.append((key, tokens - 1, now))
+                wait = max(wait, (1 - tokens) / rate)
+
+            if wait <= 0:
+                connection.executemany(
+                    "INSERT OR REPLACE INTO nbg_rate_limit (key, tokens, updated_at) "
+                    "VALUES (?, ?, ?)",
+                    refilled,
+                )
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+        connection.execute("COMMIT")
+        return max(wait, 0.0)
+
+
+class SharedMemoryRateLimitBackend(DiskRateLimitBackend):
+    """
+    Stores token buckets in an SQLite database on a memory-backed file system,
+    so that pre-forked processes of a host, e.g. web server workers, share the
+    same rate limits. Rate limiters with the same ``name`` are shared.
+    """
+
+    def __init__(self, name: str = "nbg"):
+        super().__init__(utils.shared_memory_path(f"{name}-rate-limit.sqlite3"))
+
+
+class RateLimiter:
+    """
+    Limits the rate of API calls with a global token bucket and a token bucket
+    per URL path. Each call takes a token from both buckets. Buckets refill at
+    their rate and hold up to their burst of tokens.
+
+    :param rate: The calls per second allowed across all URL paths, or ``None``
+                 for no global limit.
+    :type rate: float
+    :param burst: The calls allowed at once across all URL paths. Defaults to
+                  ``rate``.
+    :type burst: float
+    :param endpoint_rates: The calls per second of specific URL paths, either
+                           as a number or as a ``(rate, burst)`` tuple, e.g.
+                           ``{"account/transactions": (2, 5)}``.
+    :type endpoint_rates: dict
+    :param backend: Where to store token buckets. Defaults to a
+                    :class:`MemoryRateLimitBackend`.
+    :type backend: RateLimitBackend
+    :param blocking: Whether calls wait for a token, or raise
+                     ``RateLimitExceeded`` immediately. Defaults to ``True``.
+    :type blocking: bool
+    :param max_wait: The maximum seconds a blocking call waits, before raising
+                     ``RateLimitExceeded``. Defaults to no limit.
+    :type max_wait: float
+    :raises ValueError: If any of the rates is not positive.
+
+    ---
+    **Usage**
+
+    .. code-block:: python
+
+        from nbg.base.ratelimit import RateLimiter, SharedMemoryRateLimitBackend
+
+        client.set_rate_limiter(
+            RateLimiter(
+                rate=20,
+                endpoint_rates={"account/transactions": (5, 10)},
+                backend=SharedMemoryRateLimitBackend(),
+            )
+        )
+    """
+
+    def __init__(
+        self,
+        rate: typing.Optional[float] = None,
+        burst: float = None,
+        endpoint_rates: dict = None,
+        backend: RateLimitBackend = None,
+        blocking: bool = True,
+        max_wait: float = None,
+    ):
+        self.rate = rate
+        self.burst = burst if burst is not None else rate
+        self.endpoint_rates = endpoint_rates or {}
+
+        if rate is not None and rate <= 0:
+            raise ValueError(f"Invalid rate: {rate} calls per second.")
+
+        for url_path in self.endpoint_rates:
+            rate, _ = self._endpoint_rate(url_path)
+
+            if rate <= 0:
+                raise ValueError(
+                    f"Invalid rate of {url_path}: {rate} calls per second."
+                )
+
+        self.backend = backend or MemoryRateLimitBackend()
+        self.blocking = blocking
+        self.max_wait = max_wait
+        self.throttled = {}
+        self._lock = threading.Lock()
+
+    def buckets(self, url_path: str) -> typing.List[BUCKET]:
+        """
+        Returns the token buckets of the given URL path.
+        """
+        buckets = []
+
+        if self.rate is not None:
+            buckets.append((GLOBAL_BUCKET, self.rate, max(1, self.burst)))
+
+        if url_path in self.endpoint_rates:
+            rate, burst = self._endpoint_rate(url_path)
+            buckets.append((url_path, rate, max(1, burst)))
+
+        return buckets
+
+    def _endpoint_rate(self, url_path: str) -> typing.Tuple[float, float]:
+        endpoint_rate = self.endpoint_rates[url_path]
+
+        if isinstance(endpoint_rate, tuple):
+            return endpoint_rate
+
+        return endpoint_rate, endpoint_rate
+
+    def _wait(self, url_path: str, waited: float, blocking: bool) -> float:
+        """
+        Tries to take the tokens of a call and returns the seconds to wait
+        before trying again, or ``0`` if the tokens were taken.
+        """
+        buckets = self.buckets(url_path)
+
+        if not buckets:
+            return 0.0
+
+        wait = self.backend.take(buckets)
+
+        if wait <= 0:
+            return 0.0
+
+        with self._lock:
+            self.throttled[url_path] = self.throttled.get(url_path, 0) + 1
+
+        if not blocking or (
+            self.max_wait is not None and waited + wait > self.max_wait
+        ):
+            raise exceptions.RateLimitExceeded(url_path, wait)
+
+        return wait
+
+    def acquire(self, url_path: str, blocking: bool = None):
+        """
+        Takes the tokens of a call to the given URL path, waiting for them if
+        the limiter is blocking. ``blocking`` overrides the limiter default.
+        """
+        blocking = self.blocking if blocking is None else blocking
+        waited = 0.0
+
+        while True:
+            wait = self._wait(url_path, waited, blocking)
+
+            if wait <= 0:
+                return
+
+            time.sleep(wait)
+            waited += wait
+
+    async def acquire_async(self, url_path: str, blocking: bool = None):
+        """
+        Takes the tokens of a call to the given URL path, like :meth:`acquire`,
+        but waits without blocking the running event loop. Backends other than
+        the memory one take tokens in the default executor of the loop, as
+        they may wait for other processes.
+        """
+        blocking = self.blocking if blocking is None else blocking
+        in_memory = isinstance(self.backend, MemoryRateLimitBackend)
+        loop = asyncio.get_event_loop()
+        waited = 0.0
+
+        while True:
+            if in_memory:
+                wait = self._wait(url_path, waited, blocking)
+            else:
+                wait = await loop.run_in_executor(
+                    None, self._wait, url_path, waited, blocking
+                )
+
+            if wait <= 0:
+                return
+
+            await asyncio.sleep(wait)
+            waited += wait
+
+    @property
+    def stats(self) -> dict:
+        """
+        Returns the number of times calls of each URL path found no tokens.
+        """
+        with self._lock:
+            return dict(self.throttled)
@@ -0,0 +1,146 @@
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+
+import pytest
+
+from . import exceptions, ratelimit
+
+
+@pytest.fixture(params=["memory", "disk", "shared_memory"])
+def backend(request, tmp_path) -> ratelimit.RateLimitBackend:
+    if request.param == "memory":
+        backend = ratelimit.MemoryRateLimitBackend()
+    elif request.param == "disk":
+        backend = ratelimit.DiskRateLimitBackend(str(tmp_path / "rate.sqlite3"))
+    else:
+        backend = ratelimit.SharedMemoryRateLimitBackend(f"nbg-test-{tmp_path.name}")
+
+    yield backend
+
+    if request.param == "shared_memory":
+        os.remove(backend.path)
+
+
+def test_backend_take(backend: ratelimit.RateLimitBackend):
+    """
+    Ensure that buckets start full, refill at their rate and that tokens are
+    only taken when all buckets have one.
+    """
+    buckets = [("*", 10, 2), ("account/list", 10, 1)]
+
+    assert backend.take(buckets) == 0
+    assert 0 < backend.take(buckets) <= 0.1
+    assert backend.take([("*", 10, 2)]) == 0
+    assert backend.take([("*", 10, 2)]) > 0
+
+    time.sleep(0.2)
+
+    assert backend.take(buckets) == 0
+
+
+def test_backend_take_concurrently(backend: ratelimit.RateLimitBackend):
+    buckets = [("*", 0.001, 10)]
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        waits = list(executor.map(lambda _: backend.take(buckets), range(50)))
+
+    assert waits.count(0) == 10
+
+
+def _take_tokens(path: str) -> int:
+    backend = ratelimit.DiskRateLimitBackend(path)
+    return sum(backend.take([("*", 0.001, 10)]) == 0 for _ in range(10))
+
+
+def test_disk_backend_is_shared_across_processes(tmp_path):
+    path = str(tmp_path / "rate.sqlite3")
+    ratelimit.DiskRateLimitBackend(path)
+
+    with multiprocessing.Pool(4) as pool:
+        taken = pool.map(_take_tokens, [path] * 4)
+
+    assert sum(taken) == 10
+
+
+def test_rate_limiter_buckets():
+    rate_limiter = ratelimit.RateLimiter(
+        rate=10, endpoint_rates={"account/list": 1, "card/list": (2, 5)}
+    )
+
+    assert rate_limiter.buckets("account/list") == [
+        ("*", 10, 10),
+        ("account/list", 1, 1),
+    ]
+    assert rate_limiter.buckets("card/list") == [("*", 10, 10), ("card/list", 2, 5)]
+    assert rate_limiter.buckets("account/details") == [("*", 10, 10)]
+    assert ratelimit.RateLimiter().buckets("account/list") == []
+
+    with pytest.raises(ValueError):
+        ratelimit.RateLimiter(rate=0)
+
+    with pytest.raises(ValueError):
+        ratelimit.RateLimiter(endpoint_rates={"account/list": (0, 5)})
+
+
+def test_rate_limiter_fail_fast():
+    rate_limiter = ratelimit.RateLimiter(rate=1, blocking=False)
+    rate_limiter.acquire("account/list")
+
+    with pytest.raises(exceptions.RateLimitExceeded) as error:
+        rate_limiter.acquire("account/list")
+
+    assert 0 < error.value.retry_after <= 1
+    assert rate_limiter.stats == {"account/list": 1}
+
+
+def test_rate_limiter_blocking():
+    rate_limiter = ratelimit.RateLimiter(rate=50, burst=1)
+    started_at = time.monotonic()
+
+    for _ in range(3):
+        rate_limiter.acquire("account/list")
+
+    assert time.monotonic() - started_at >= 0.03
+
+    rate_limiter = ratelimit.RateLimiter(rate=0.1, max_wait=1)
+    rate_limiter.acquire("account/list")
+
+    with pytest.raises(exceptions.RateLimitExceeded):
+        rate_limiter.acquire("account/list")
+
+
+def test_rate_limiter_acquire_async(tmp_path):
+    """
+    Ensure that async calls wait for tokens without blocking the event loop,
+    and take them off the loop from backends that may block.
+    """
+    threads = set()
+
+    class RecordingBackend(ratelimit.DiskRateLimitBackend):
+        def take(self, buckets):
+            threads.add(threading.get_ident())
+            return super().take(buckets)
+
+    rate_limiter = ratelimit.RateLimiter(
+        rate=50, burst=1, backend=RecordingBackend(str(tmp_path / "rate.sqlite3"))
+    )
+
+    async def calls():
+        await asyncio.gather(
+            *[rate_limiter.acquire_async("account/list") for _ in range(3)]
+        )
+
+    loop = asyncio.new_event_loop()
+
+    try:
+        started_at = time.monotonic()
+        loop.run_until_complete(calls())
+    finally:
+        loop.close()
+
+    assert time.monotonic() - started_at >= 0.03
+    assert threads and threading.get_ident() not in threads
@@ -0,0 +1,200 @@
+"""
+Typed resources for the payloads of NBG API responses. Resources are dicts of
+the decoded payload and convert each field (e.g. dates and amounts) only when
+it gets accessed, so that they cost barely more memory than the payload
+itself. Being dicts, they can be serialised and modified like plain payloads,
+and fields that are not declared can still be accessed by their key.
+"""
+
+from collections.abc import Sequence
+from datetime import datetime
+from decimal import Decimal
+import re
+import typing
+
+from . import exceptions
+
+DATETIME_PATTERN = re.compile(
+    r"(\d{4})-(\d{2})-(\d{2})"
+    r"(?:[T ](\d{2}):(\d{2})(?::(\d{2})(?:\.(\d{1,6})\d*)?)?)?"
+    r"(Z|[+-]\d{2}:?\d{2})?$"
+)
+
+
+def parse_datetime(value: str) -> datetime:
+    """
+    Parses the ISO 8601 dates and datetimes returned by NBG APIs. Timezones
+    are ignored, as NBG APIs return all datetimes in the same timezone.
+    """
+    match = DATETIME_PATTERN.match(value)
+
+    if match is None:
+        raise ValueError(f"Invalid datetime: {value}")
+
+    year, month, day, hour, minute, second, fraction, _ = match.groups()
+    microsecond = int(fraction.ljust(6, "0")) if fraction else 0
+    return datetime(
+        int(year),
+        int(month),
+        int(day),
+        int(hour or 0),
+        int(minute or 0),
+        int(second or 0),
+        microsecond,
+    )
+
+
+def parse_decimal(value: typing.Union[str, float, int]) -> Decimal:
+    """
+    Parses amounts as decimals, without the rounding errors of floats.
+    """
+    return Decimal(str(value))
+
+
+CONVERTERS = {
+    datetime: parse_datetime,
+    Decimal: parse_decimal,
+}
+
+
+class Field:
+    """
+    Declares a field of a resource, which gets read from the given ``key`` of
+    the payload and converted to the given type when accessed. Missing fields
+    are ``None``, unless they are required.
+    """
+
+    def __init__(self, key: str, field_type: type = str, required: bool = False):
+        self.key = key
+        self.field_type = field_type
+        self.required = required
+        self.name = key
+        self._converter = CONVERTERS.get(field_type)
+
+    def __set_name__(self, owner: type, name: str):
+        self.name = name
+
+    def convert(self, value):
+        return self._converter(value) if self._converter else value
+
+    def __get__(self, instance: "Resource", owner: type):
+        if instance is None:
+            return self
+
+        try:
+            value = instance[self.key]
+        except KeyError:
+            if self.required:
+                raise exceptions.MissingResourceArguments(
+                    owner.__name__, [(self.name, self.field_type.__name__)]
+                )
+            return None
+
+        return None if value is None else self.convert(value)
+
+
+class ResourceField(Field):
+    """
+    Declares a field holding a nested resource.
+    """
+
+    def convert(self, value):
+        return self.field_type(value)
+
+
+class ListField(Field):
+    """
+    Declares a field holding a list of resources of the given type.
+    """
+
+    def __init__(self, key: str, item_type: type, required: bool = False):
+        super().__init__(key, list, required)
+        self.item_type = item_type
+
+    def convert(self, value):
+        return ResourceList(value, self.item_type)
+
+
+class ResourceList(Sequence):
+    """
+    A read-only list of resources, which wraps each item of the payload in its
+    resource type only when it gets accessed.
+    """
+
+    __slots__ = ("_items", "_item_type")
+
+    def __init__(self, items: list, item_type: type):
+        self._items = items
+        self._item_type = item_type
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return ResourceList(self._items[index], self._item_type)
+
+        return self._item_type(self._items[index])
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        item_type = self._item_type
+
+        for item in self._items:
+            yield item_type(item)
+
+    def __repr__(self):
+        return f"<ResourceList of {len(self)} {self._item_type.__name__}>"
+
+
+class Resource(dict):
+    """
+    Base class for typed resources. Subclasses declare their fields as
+    :class:`Field` class attributes.
+
+    Resources are dicts holding the top-level keys of their payload, so they
+    can be passed to ``json.dumps``, checked with ``isinstance(x, dict)`` and
+    modified like plain payloads. Nested payloads are shared, not copied.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, payload: dict = None):
+        super().__init__(payload if payload is not None else {})
+
+    def __repr__(self):
+        return f"{type(self).__name__}({dict.__repr__(self)})"
+
+    @classmethod
+    def fields(cls) -> typing.Dict[str, Field]:
+        """
+        Returns the declared fields of the resource by name.
+        """
+        return {
+            name: attribute
+            for klass in reversed(cls.__mro__)
+            for name, attribute in vars(klass).items()
+            if isinstance(attribute, Field)
+        }
+
+    @property
+    def payload(self) -> dict:
+        """
+        Returns the payload of the resource, i.e. the resource itself.
+        """
+        return self
+
+    def validate(self):
+        """
+        Raises ``MissingResourceArguments`` if any required fields are missing
+        from the payload.
+        """
+        missing_arguments = [
+            (name, field.field_type.__name__)
+            for name, field in self.fields().items()
+            if field.required and field.key not in self
+        ]
+
+        if missing_arguments:
+            raise exceptions.MissingResourceArguments(
+                type(self).__name__, missing_arguments
+            )
@@ -0,0 +1,160 @@
+from datetime import datetime
+from decimal import Decimal
+import asyncio
+import json
+
+import pytest
+
+from . import decorators, exceptions, resources
+
+
+class Transaction(resources.Resource):
+    __slots__ = ()
+
+    id = resources.Field("id", required=True)
+    amount = resources.Field("amount", Decimal)
+    date = resources.Field("date", datetime)
+
+
+class TransactionList(resources.Resource):
+    __slots__ = ()
+
+    transactions = resources.ListField("transactions", Transaction)
+
+
+@pytest.mark.parametrize(
+    "value,expected",
+    [
+        ("2020-01-02", datetime(2020, 1, 2)),
+        ("2020-01-02T03:04:05", datetime(2020, 1, 2, 3, 4, 5)),
+        ("2020-01-02T03:04:05.006Z", datetime(2020, 1, 2, 3, 4, 5, 6000)),
+        ("2020-01-02T03:04:05.1234567+02:00", datetime(2020, 1, 2, 3, 4, 5, 123456)),
+    ],
+)
+def test_parse_datetime(value: str, expected: datetime):
+    assert resources.parse_datetime(value) == expected
+
+
+def test_parse_datetime_invalid():
+    with pytest.raises(ValueError):
+        resources.parse_datetime("02/01/2020")
+
+
+def test_resource_fields():
+    """
+    Ensure that fields are converted on access, that missing optional fields
+    are None and that undeclared fields are accessible by key.
+    """
+    transaction = Transaction(
+        {"id": "1", "amount": 0.1, "date": "2020-01-02T00:00:00.000Z", "x": 1}
+    )
+
+    assert transaction.id == "1"
+    assert transaction.amount == Decimal("0.1")
+    assert transaction.date == datetime(2020, 1, 2)
+    assert transaction["x"] == 1
+    assert transaction == {
+        "id": "1",
+        "amount": 0.1,
+        "date": "2020-01-02T00:00:00.000Z",
+        "x": 1,
+    }
+    assert Transaction({"id": "2", "amount": None}).amount is None
+    assert Transaction({"id": "2"}).date is None
+
+
+def test_resource_is_lazy_and_slotted():
+    """
+    Ensure that resources hold their payload without copying nested payloads
+    or converting them and that they have no instance dictionary.
+    """
+    payload = {"transactions": [{"id": "1", "date": "not a date"}]}
+    transaction_list = TransactionList(payload)
+
+    assert transaction_list["transactions"] is payload["transactions"]
+    assert not hasattr(transaction_list, "__dict__")
+
+    transaction = transaction_list.transactions[0]
+
+    assert isinstance(transaction, Transaction)
+    assert transaction.payload == payload["transactions"][0]
+    assert transaction.id == "1"
+
+    with pytest.raises(ValueError):
+        transaction.date
+
+
+def test_resource_is_a_dict():
+    """
+    Ensure that resources can be used like the plain dicts of their payload.
+    """
+    payload = {"transactions": [{"id": "1", "amount": 0.1}]}
+    transaction_list = TransactionList(payload)
+
+    assert isinstance(transaction_list, dict)
+    assert json.loads(json.dumps(transaction_list)) == payload
+    assert repr(transaction_list) == f"TransactionList({payload!r})"
+
+    transaction = transaction_list.transactions[0]
+    transaction["amount"] = "0.2"
+
+    assert transaction.amount == Decimal("0.2")
+    assert payload["transactions"][0]["amount"] == 0.1
+    assert TransactionList(None) == {}
+
+
+def test_resource_list():
+    transactions = TransactionList(
+        {"transactions": [{"id": str(index)} for index in range(5)]}
+    ).transactions
+
+    assert len(transactions) == 5
+    assert [transaction.id for transaction in transactions] == list("01234")
+    assert [transaction.id for transaction in transactions[1:3]] == ["1", "2"]
+    assert transactions[-1].id == "4"
+
+
+def test_resource_required_fields():
+    transaction = Transaction({"amount": 1})
+
+    with pytest.raises(exceptions.MissingResourceArguments) as error:
+        transaction.id
+
+    assert "id (str)" in str(error.value)
+
+    with pytest.raises(exceptions.MissingResourceArguments):
+        transaction.validate()
+
+    Transaction({"id": "1"}).validate()
+
+
+def test_api_call():
+    """
+    Ensure that API calls return their annotated resource, for both regular
+    and asynchronous methods, and that they keep their docstrings.
+    """
+
+    @decorators.api_call
+    def transactions() -> TransactionList:
+        """Lists transactions."""
+        return {"transactions": []}
+
+    @decorators.api_call
+    def async_transactions() -> TransactionList:
+        async def request():
+            return {"transactions": [{"id": "1"}]}
+
+        return request()
+
+    assert isinstance(transactions(), TransactionList)
+    assert transactions.__doc__ == "Lists transactions."
+
+    loop = asyncio.new_event_loop()
+
+    try:
+        transaction_list = loop.run_until_complete(async_transactions())
+    finally:
+        loop.close()
+
+    assert isinstance(transaction_list, TransactionList)
+    assert transaction_list.transactions[0].id == "1"
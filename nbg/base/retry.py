@@ -0,0 +1,239 @@
+"""
+Retries of API calls that failed transiently, e.g. with a 503 response or a
+reset connection. Retries back off exponentially with full jitter, so that
+clients recovering from an incident do not stampede NBG APIs, and honor the
+``Retry-After`` header of responses. Retrying is opt-in and is enabled per
+client via ``set_retry_policy``.
+"""
+
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import random
+import threading
+import time
+import typing
+
+from requests import Response
+
+
+DEFAULT_RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Responses with these statuses were rejected before being processed, so
+# retrying them is safe even for calls that are not idempotent.
+UNPROCESSED_STATUSES = (429,)
+
+
+def retry_after(response: Response) -> typing.Optional[float]:
+    """
+    Returns the seconds to wait before retrying, as requested by the
+    ``Retry-After`` header of the given response, if any.
+    """
+    value = response.headers.get("Retry-After")
+
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class RetryPolicy:
+    """
+    Configures which failed API calls get retried and when.
+
+    :param max_retries: The maximum retries of each call. Defaults to ``3``.
+    :type max_retries: int
+    :param backoff_base: The maximum delay in seconds before the first retry,
+                         which doubles with every retry. Each delay is drawn
+                         uniformly between zero and its maximum (full jitter).
+                         Defaults to ``0.5``.
+    :type backoff_base: float
+    :param backoff_max: The upper bound of the maximum delay in seconds.
+                        Defaults to ``30``.
+    :type backoff_max: float
+    :param budget: The seconds each call may spend in total, including its
+                   retries. Calls are not retried once a retry would exceed
+                   their budget. Defaults to ``60``.
+    :type budget: float
+    :param retry_statuses: The response statuses that get retried.
+    :type retry_statuses: tuple
+    :param retry_exceptions: The exception classes that get retried. Defaults
+                             to the connection errors and timeouts of the HTTP
+                             library of the client.
+    :type retry_exceptions: tuple
+    :param endpoint_retries: The maximum retries of specific URL paths, e.g.
+                             ``{"account/transactions": 5}``, overriding
+                             ``max_retries``.
+    :type endpoint_retries: dict
+    :param retry_non_idempotent: Whether calls that are not idempotent, e.g.
+                                 ``delete_consent``, get retried after failures
+                                 that might have reached NBG. By default, they
+                                 are only retried when NBG did not process them.
+    :type retry_non_idempotent: bool
+
+    ---
+    **Usage**
+
+    .. code-block:: python
+
+        from nbg.base.retry import RetryPolicy
+
+        client.set_retry_policy(
+            RetryPolicy(max_retries=5, endpoint_retries={"account/list": 2})
+        )
+    """
+
+    def __init__(
+        self,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30,
+        budget: float = 60,
+        retry_statuses: typing.Tuple[int, ...] = DEFAULT_RETRY_STATUSES,
+        retry_exceptions: typing.Tuple[type, ...] = None,
+        endpoint_retries: dict = None,
+        retry_non_idempotent: bool = False,
+    ):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.budget = budget
+        self.retry_statuses = tuple(retry_statuses)
+        self.retry_exceptions = retry_exceptions
+        self.endpoint_retries = endpoint_retries or {}
+        self.retry_non_idempotent = retry_non_idempotent
+        self.retries = {}
+        self.exhausted = {}
+        self._lock = threading.Lock()
+
+    def _count(self, counters: dict, url_path: str):
+        with self._lock:
+            counters[url_path] = counters.get(url_path, 0) + 1
+
+    def max_retries_for(self, url_path: str) -> int:
+        """
+        Returns the maximum retries of calls to the given URL path.
+        """
+        return self.endpoint_retries.get(url_path, self.max_retries)
+
+    def backoff(self, retry: int) -> float:
+        """
+        Returns a random delay in seconds before the given retry, counting
+        from zero.
+        """
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** retry))
+
+    def start(
+        self,
+        url_path: str,
+        idempotent: bool = True,
+        retry_exceptions: typing.Tuple[type, ...] = (),
+        unsent_exceptions: typing.Tuple[type, ...] = (),
+    ) -> "RetryCall":
+        """
+        Returns the retry state of a new call to the given URL path.
+        ``unsent_exceptions`` are the exceptions raised when the request could
+        not reach NBG at all, which are safe to retry for any call.
+        """
+        if self.retry_exceptions is not None:
+            retry_exceptions = self.retry_exceptions
+
+        if not (idempotent or self.retry_non_idempotent):
+            retry_exceptions = tuple(
+                exception_class
+                for exception_class in unsent_exceptions
+                if issubclass(exception_class, retry_exceptions)
+            )
+
+        return RetryCall(self, url_path, idempotent, retry_exceptions)
+
+    @property
+    def stats(self) -> dict:
+        """
+        Returns the retries of each URL path and the number of its calls that
+        failed after exhausting their retries.
+        """
+        with self._lock:
+            url_paths = sorted(set(self.retries) | set(self.exhausted))
+            return {
+                url_path: {
+                    "retries": self.retries.get(url_path, 0),
+                    "exhausted": self.exhausted.get(url_path, 0),
+                }
+                for url_path in url_paths
+            }
+
+
+class RetryCall:
+    """
+    Tracks the retries of a single API call.
+    """
+
+    def __init__(
+        self,
+        policy: RetryPolicy,
+        url_path: str,
+        idempotent: bool,
+        retry_exceptions: typing.Tuple[type, ...],
+    ):
+        self.policy = policy
+        self.url_path = url_path
+        self.idempotent = idempotent
+        self.retry_exceptions = retry_exceptions
+        self.retry = 0
+        self.started_at = time.monotonic()
+
+    def _is_retryable(self, response: Response, exception: Exception) -> bool:
+        if exception is not None:
+            return isinstance(exception, self.retry_exceptions)
+
+        if response.status_code not in self.policy.retry_statuses:
+            return False
+
+        return (
+            self.idempotent
+            or self.policy.retry_non_idempotent
+            or response.status_code in UNPROCESSED_STATUSES
+        )
+
+    def next_delay(
+        self, response: Response = None, exception: Exception = None
+    ) -> typing.Optional[float]:
+        """
+        Returns the delay in seconds before retrying the call, given either its
+        response or the exception it raised, or ``None`` if it should not be
+        retried.
+        """
+        if not self._is_retryable(response, exception):
+            return None
+
+        policy = self.policy
+        delay = retry_after(response) if response is not None else None
+
+        if delay is None:
+            delay = policy.backoff(self.retry)
+
+        elapsed = time.monotonic() - self.started_at
+
+        if (
+            self.retry >= policy.max_retries_for(self.url_path)
+            or elapsed + delay > policy.budget
+        ):
+            policy._count(policy.exhausted, self.url_path)
+            return None
+
+        self.retry += 1
+        policy._count(policy.retries, self.url_path)
+        return delay
@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from unittest import mock
+
+from requests import Response
+import pytest
+
+from . import retry
+
+
+def _response(status_code: int, retry_after: str = None) -> Response:
+    response = Response()
+    response.status_code = status_code
+
+    if retry_after is not None:
+        response.headers["Retry-After"] = retry_after
+
+    return response
+
+
+def test_retry_after():
+    retry_at = datetime.now(timezone.utc) + timedelta(seconds=120)
+
+    assert retry.retry_after(_response(503)) is None
+    assert retry.retry_after(_response(503, "2.5")) == 2.5
+    assert 100 < retry.retry_after(_response(503, format_datetime(retry_at))) <= 120
+    assert retry.retry_after(_response(503, "soon")) is None
+
+
+def test_backoff_full_jitter():
+    policy = retry.RetryPolicy(backoff_base=1, backoff_max=5)
+
+    with mock.patch("random.uniform", side_effect=lambda low, high: high):
+        assert [policy.backoff(attempt) for attempt in range(5)] == [1, 2, 4, 5, 5]
+
+    assert all(0 <= policy.backoff(3) <= 5 for _ in range(100))
+
+
+def test_retry_call_limits():
+    """
+    Ensure that calls stop being retried after their maximum retries or when
+    a retry would exceed their budget.
+    """
+    policy = retry.RetryPolicy(max_retries=2, backoff_base=0)
+    retry_call = policy.start("account/list")
+
+    assert retry_call.next_delay(response=_response(503)) == 0
+    assert retry_call.next_delay(response=_response(500)) == 0
+    assert retry_call.next_delay(response=_response(503)) is None
+    assert retry_call.next_delay(response=_response(404)) is None
+
+    retry_call = retry.RetryPolicy(budget=10).start("account/list")
+
+    assert retry_call.next_delay(response=_response(503, "60")) is None
+    assert policy.stats == {"account/list": {"retries": 2, "exhausted": 1}}
+
+
+def test_retry_call_exceptions():
+    policy = retry.RetryPolicy(backoff_base=0)
+    retry_exceptions = (ConnectionError, TimeoutError)
+    unsent_exceptions = (ConnectionRefusedError,)
+
+    idempotent_call = policy.start(
+        "account/list", True, retry_exceptions, unsent_exceptions
+    )
+    non_idempotent_call = policy.start(
+        "consents/delete", False, retry_exceptions, unsent_exceptions
+    )
+
+    assert idempotent_call.next_delay(exception=TimeoutError()) == 0
+    assert idempotent_call.next_delay(exception=ValueError()) is None
+    assert non_idempotent_call.next_delay(exception=TimeoutError()) is None
+    assert non_idempotent_call.next_delay(exception=ConnectionRefusedError()) == 0
+    assert non_idempotent_call.next_delay(response=_response(503)) is None
+    assert non_idempotent_call.next_delay(response=_response(429)) == 0
+
+
+@pytest.mark.parametrize("retry_non_idempotent", [True, False])
+def test_retry_non_idempotent(retry_non_idempotent: bool):
+    policy = retry.RetryPolicy(
+        backoff_base=0, retry_non_idempotent=retry_non_idempotent
+    )
+    retry_call = policy.start("consents/delete", False, (TimeoutError,))
+    delay = retry_call.next_delay(exception=TimeoutError())
+
+    assert (delay == 0) is retry_non_idempotent
@@ -0,0 +1,256 @@
+"""
+Incremental parsing of NBG API responses, so that the records of large
+responses (e.g. transactions) can be processed while they are being
+downloaded, without holding the whole response in memory.
+"""
+
+import codecs
+import json
+import re
+import typing
+
+from requests import Response
+
+from . import exceptions
+from ..auth import signature
+
+
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+# Parser states
+TOP_START = "top-start"
+TOP_KEY = "top-key"
+TOP_VALUE = "top-value"
+PAYLOAD_START = "payload-start"
+PAYLOAD_KEY = "payload-key"
+PAYLOAD_VALUE = "payload-value"
+RECORDS = "records"
+DONE = "done"
+
+
+class IncompleteJSON(Exception):
+    """
+    Raised internally when the buffer does not hold a complete JSON value yet.
+    """
+
+
+class PayloadRecordParser:
+    """
+    Push parser for the JSON envelope of NBG API responses. Text is fed in
+    arbitrary chunks and the items of the ``records_key`` list of the response
+    payload are returned as soon as each one of them has been received. All
+    other fields of the response are kept and returned on :meth:`close`, without
+    the records.
+    """
+
+    def __init__(self, records_key: str):
+        self.records_key = records_key
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.position = 0
+        self.state = TOP_START
+        self.key = None
+        self.envelope = {}
+        self.payload = None
+        self.keys_parsed = 0
+        self.closed = False
+
+    def _skip_whitespace(self):
+        self.position = WHITESPACE.match(self.buffer, self.position).end()
+
+        if self.position >= len(self.buffer) and not self.closed:
+            raise IncompleteJSON()
+
+    def _peek(self) -> str:
+        self._skip_whitespace()
+        return self.buffer[self.position : self.position + 1]
+
+    def _expect(self, character: str):
+        next_character = self._peek()
+
+        if next_character != character:
+            raise ValueError(f"Expected {character!r} in JSON.")
+
+        self.position += 1
+
+    def _decode_value(self):
+        self._skip_whitespace()
+
+        try:
+            value, end = self.decoder.raw_decode(self.buffer, self.position)
+        except json.JSONDecodeError:
+            if self.closed:
+                raise
+            raise IncompleteJSON()
+
+        # A value at the very end of the buffer might continue in the next
+        # chunk, e.g. a number.
+        if end >= len(self.buffer) and not self.closed:
+            raise IncompleteJSON()
+
+        self.position = end
+        return value
+
+    def _decode_key(self) -> str:
+        if self.keys_parsed:
+            self._expect(",")
+
+        if self._peek() != '"':
+            raise ValueError("Expected a key in JSON object.")
+
+        key = self._decode_value()
+        self._expect(":")
+        return key
+
+    def _step(self) -> typing.List[dict]:
+        """
+        Parses the next token of the response. Each step either completes
+        and moves the parser to its next state, or raises ``IncompleteJSON``
+        without changing the state of the parser.
+        """
+        if self.state == TOP_START:
+            self._expect("{")
+            self.state = TOP_KEY
+        elif self.state in (TOP_KEY, PAYLOAD_KEY):
+            if self._peek() == "}":
+                self.position += 1
+                self.keys_parsed = 1 if self.state == PAYLOAD_KEY else 0
+                self.state = TOP_KEY if self.state == PAYLOAD_KEY else DONE
+            elif self.state == TOP_KEY:
+                self.key = self._decode_key()
+                self.keys_parsed += 1
+                self.state = PAYLOAD_START if self.key == "payload" else TOP_VALUE
+            else:
+                self.key = self._decode_key()
+                is_records = self.key == self.records_key and self._peek() == "["
+                self.keys_parsed += 1
+
+                if is_records:
+                    self.position += 1
+                    self.payload[self.key] = []
+                    self.state = RECORDS
+                else:
+                    self.state = PAYLOAD_VALUE
+        elif self.state == TOP_VALUE:
+            self.envelope[self.key] = self._decode_value()
+            self.state = TOP_KEY
+        elif self.state == PAYLOAD_START:
+            if self._peek() == "{":
+                self.position += 1
+                self.payload = {}
+                self.keys_parsed = 0
+                self.state = PAYLOAD_KEY
+            else:
+                self.envelope[self.key] = self._decode_value()
+                self.state = TOP_KEY
+        elif self.state == PAYLOAD_VALUE:
+            self.payload[self.key] = self._decode_value()
+            self.state = PAYLOAD_KEY
+        elif self.state == RECORDS:
+            character = self._peek()
+
+            if character == "]":
+                self.position += 1
+                self.state = PAYLOAD_KEY
+            else:
+                if character == ",":
+                    self.position += 1
+
+                return [self._decode_value()]
+        elif self.state == DONE:
+            if self._peek():
+                raise ValueError("Extra data after JSON.")
+
+        return []
+
+    def _parse(self) -> typing.List[dict]:
+        records = []
+
+        while self.state != DONE or self.position < len(self.buffer):
+            position = self.position
+
+            try:
+                records += self._step()
+            except IncompleteJSON:
+                self.position = position
+                break
+
+        return records
+
+    def feed(self, text: str) -> typing.List[dict]:
+        """
+        Feeds the given text to the parser and returns the records that have
+        been completely received so far.
+        """
+        self.buffer = self.buffer[self.position :] + text
+        self.position = 0
+        return self._parse()
+
+    def close(self) -> dict:
+        """
+        Signals the end of the text and returns the response envelope, without
+        the streamed records. Raises ``ValueError`` if the text was not valid
+        JSON.
+        """
+        self.closed = True
+
+        while self.state != DONE:
+            if self._step():
+                raise ValueError("Unexpected end of JSON.")
+
+        self._step()
+
+        if self.payload is not None:
+            self.envelope["payload"] = self.payload
+
+        return self.envelope
+
+
+def buffered_response(response: Response, data: dict) -> Response:
+    """
+    Returns a copy of the given streamed response, with the given data as its
+    body, so that it can be validated like a regular response.
+    """
+    copy = Response()
+    copy.status_code = response.status_code
+    copy.headers = response.headers
+    copy.url = response.url
+    copy.reason = response.reason
+    copy.request = response.request
+    copy.encoding = "utf-8"
+    copy._content = json.dumps(data).encode("utf-8")
+    return copy
+
+
+def iter_response_records(
+    response: Response,
+    records_key: str,
+    chunk_size: int = 16384,
+    verification: "signature.StreamingVerification" = None,
+) -> typing.Generator[dict, None, dict]:
+    """
+    Yields the records of the given streamed response as soon as they have
+    been received and returns the rest of the response envelope. The raw
+    chunks of the response are also fed to the given signature verification,
+    if any, which can only be checked by the caller once all records have been
+    yielded.
+    """
+    if response.status_code == 401:
+        raise exceptions.NotAuthenticatedRequest(response)
+
+    parser = PayloadRecordParser(records_key)
+    decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")()
+
+    try:
+        for chunk in response.iter_content(chunk_size):
+            if verification is not None:
+                verification.update(chunk)
+
+            yield from parser.feed(decoder.decode(chunk))
+
+        yield from parser.feed(decoder.decode(b"", final=True))
+        envelope = parser.close()
+    except ValueError:
+        raise exceptions.InvalidResponse(response, "Response body is not valid JSON.")
+
+    return envelope
@@ -0,0 +1,127 @@
+import io
+import json
+import random
+
+from requests import Response
+import pytest
+
+from . import exceptions, streaming
+
+RESPONSE_BODY = {
+    "exception": None,
+    "payload": {
+        "account": "8000123456",
+        "transactions": [
+            {"id": index, "amount": index * 1.5, "description": f'"Coffee" #{index}'}
+            for index in range(100)
+        ],
+        "count": 100,
+    },
+    "messages": [],
+}
+
+
+def _streamed_response(body: bytes, status_code: int = 200) -> Response:
+    response = Response()
+    response.status_code = status_code
+    response.encoding = "utf-8"
+    response.raw = io.BytesIO(body)
+    return response
+
+
+def _feed_in_chunks(text: str, records_key: str = "transactions"):
+    parser = streaming.PayloadRecordParser(records_key)
+    records = []
+    position = 0
+
+    while position < len(text):
+        chunk_size = random.randint(1, 50)
+        records += parser.feed(text[position : position + chunk_size])
+        position += chunk_size
+
+    return records, parser.close()
+
+
+@pytest.mark.parametrize("indent", [None, 2])
+def test_payload_record_parser(indent):
+    """
+    Ensure that records are parsed regardless of how the response is split in
+    chunks and that the rest of the envelope is returned on close.
+    """
+    text = json.dumps(RESPONSE_BODY, indent=indent)
+
+    for _ in range(20):
+        records, envelope = _feed_in_chunks(text)
+
+        assert records == RESPONSE_BODY["payload"]["transactions"]
+        assert envelope["payload"]["transactions"] == []
+        assert envelope["payload"]["count"] == 100
+        assert envelope["exception"] is None
+
+
+def test_payload_record_parser_yields_records_early():
+    """
+    Ensure that records are available before the whole response is received.
+    """
+    text = json.dumps(RESPONSE_BODY)
+    parser = streaming.PayloadRecordParser("transactions")
+
+    records = parser.feed(text[: len(text) // 2])
+
+    assert 0 < len(records) < 100
+
+
+def test_payload_record_parser_without_records():
+    """
+    Ensure that responses without records, e.g. errors, are returned as is.
+    """
+    body = {"payload": None, "exception": {"id": "1", "code": "42"}}
+    records, envelope = _feed_in_chunks(json.dumps(body))
+
+    assert records == []
+    assert envelope == body
+
+
+@pytest.mark.parametrize(
+    "text", ["", '{"payload": {"transactions": [{"id": 1}', '{"payload": 1} extra']
+)
+def test_payload_record_parser_invalid_json(text):
+    """
+    Ensure that invalid or truncated JSON raises ``ValueError`` on close.
+    """
+    parser = streaming.PayloadRecordParser("transactions")
+
+    with pytest.raises(ValueError):
+        parser.feed(text)
+        parser.close()
+
+
+def test_iter_response_records():
+    """
+    Ensure that records of streamed responses are yielded and the rest of the
+    envelope is returned.
+    """
+    body = json.dumps(RESPONSE_BODY).encode("utf-8")
+    records = streaming.iter_response_records(
+        _streamed_response(body), "transactions", chunk_size=64
+    )
+    yielded_records = []
+
+    with pytest.raises(StopIteration) as stop:
+        while True:
+            yielded_records.append(next(records))
+
+    assert yielded_records == RESPONSE_BODY["payload"]["transactions"]
+    assert stop.value.value["payload"]["account"] == "8000123456"
+
+
+def test_iter_response_records_errors():
+    """
+    Ensure that unauthenticated and invalid streamed responses raise the same
+    exceptions as regular responses.
+    """
+    with pytest.raises(exceptions.NotAuthenticatedRequest):
+        list(streaming.iter_response_records(_streamed_response(b"", 401), "items"))
+
+    with pytest.raises(exceptions.InvalidResponse):
+        list(streaming.iter_response_records(_streamed_response(b"{no"), "items"))
@@ -0,0 +1,466 @@
+"""
+Timing instrumentation of API calls. Each call that reaches NBG records how
+long it spent in each phase, from preparing and signing its request to
+decoding its response, and is passed to hooks once it completes, along with
+its URL path, status, request ID, response size and retries. Instrumentation
+is opt-in and is enabled per client via ``set_instrumentation``. Clients
+without instrumentation do not measure anything.
+"""
+
+import bisect
+import importlib
+import threading
+import time
+import typing
+
+
+# Phases of an API call, in the order they happen.
+PREPARE_BODY = "prepare_body"
+SIGN = "sign"
+HEADERS = "headers"
+AUTH = "auth"
+RATE_LIMIT = "rate_limit"
+TRANSFER = "transfer"
+RETRY_WAIT = "retry_wait"
+VERIFY = "verify"
+DECODE = "decode"
+
+PHASES = (
+    PREPARE_BODY,
+    SIGN,
+    HEADERS,
+    AUTH,
+    RATE_LIMIT,
+    TRANSFER,
+    RETRY_WAIT,
+    VERIFY,
+    DECODE,
+)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _import_optional(module_name: str):
+    try:
+        return importlib.import_module(module_name)
+    except ImportError:
+        raise ImportError(
+            f"{module_name} is required to export timings. It can be installed "
+            f"with: pip install nbg[telemetry]"
+        )
+
+
+class RequestTimings:
+    """
+    The timings of a single API call. Its phases are recorded in order as
+    ``(phase, offset, seconds)`` spans, where ``offset`` is the seconds from
+    the start of the call. Phases are repeated when calls are retried.
+    """
+
+    __slots__ = (
+        "method",
+        "url_path",
+        "request_id",
+        "status",
+        "response_size",
+        "retries",
+        "exception",
+        "started_at",
+        "duration",
+        "spans",
+        "_started",
+        "_last",
+    )
+
+    def __init__(self, method: str, url_path: str):
+        self.method = method
+        self.url_path = url_path
+        self.request_id = None
+        self.status = None
+        self.response_size = None
+        self.retries = 0
+        self.exception = None
+        self.started_at = time.time()
+        self.duration = None
+        self.spans = []
+        self._started = self._last = time.perf_counter()
+
+    def __repr__(self):
+        return (
+            f"RequestTimings({self.method} {self.url_path}, status={self.status}, "
+            f"duration={self.duration})"
+        )
+
+    def mark(self, phase: str):
+        """
+        Records that the given phase ended now, having started at the end of
+        the previous one.
+        """
+        now = time.perf_counter()
+        self.spans.append((phase, self._last - self._started, now - self._last))
+        self._last = now
+
+    def merge(self, other: "RequestTimings"):
+        """
+        Records the spans, retries, request ID and status of the given timings,
+        e.g. those of the attempt that answered a hedged call, as part of these.
+        """
+        offset = other._started - self._started
+        self.spans.extend(
+            (phase, offset + span_offset, seconds)
+            for phase, span_offset, seconds in other.spans
+        )
+        self.retries += other.retries
+        self.request_id = other.request_id
+        self.status = other.status
+        self._last = max(self._last, other._last)
+
+    def finish(self, exception: Exception = None):
+        self.exception = exception
+        self.duration = time.perf_counter() - self._started
+
+    @property
+    def phases(self) -> typing.Dict[str, float]:
+        """
+        Returns the total seconds spent in each phase of the call.
+        """
+        phases = {}
+
+        for phase, _, seconds in self.spans:
+            phases[phase] = phases.get(phase, 0.0) + seconds
+
+        return phases
+
+    def to_dict(self) -> dict:
+        return {
+            "method": self.method,
+            "url_path": self.url_path,
+            "request_id": self.request_id,
+            "status": self.status,
+            "response_size": self.response_size,
+            "retries": self.retries,
+            "exception": type(self.exception).__name__ if self.exception else None,
+            "duration": self.duration,
+            "phases": self.phases,
+        }
+
+
+class Instrumentation:
+    """
+    Passes the timings of each completed API call to hooks, i.e. callables
+    accepting a :class:`RequestTimings`. Hooks are called in the thread, or
+    the event loop, of the call and should return quickly. Exceptions raised
+    by hooks are counted in ``hook_errors`` and never fail the call.
+
+    :param hooks: The hooks to call.
+    :type hooks: list
+
+    ---
+    **Usage**
+
+    .. code-block:: python
+
+        from nbg.base.telemetry import Instrumentation, PrometheusExporter
+
+        prometheus_exporter = PrometheusExporter()
+        client.set_instrumentation(
+            Instrumentation(hooks=[prometheus_exporter, print])
+        )
+    """
+
+    def __init__(self, hooks: typing.Iterable[typing.Callable] = ()):
+        self.hooks = list(hooks)
+        self.hook_errors = 0
+
+    def add_hook(self, hook: typing.Callable[[RequestTimings], typing.Any]):
+        """
+        Adds a hook, which gets called with the timings of each API call.
+        """
+        self.hooks = self.hooks + [hook]
+
+    def remove_hook(self, hook: typing.Callable[[RequestTimings], typing.Any]):
+        """
+        Removes a hook added earlier.
+        """
+        self.hooks = [other_hook for other_hook in self.hooks if other_hook != hook]
+
+    def start(self, method: str, url_path: str) -> RequestTimings:
+        return RequestTimings(method, url_path)
+
+    def finish(self, timings: RequestTimings, exception: Exception = None):
+        """
+        Completes the given timings and passes them to all hooks.
+        """
+        timings.finish(exception)
+
+        # Hooks are replaced rather than mutated, so they can be iterated
+        # while other threads add or remove hooks.
+        for hook in self.hooks:
+            try:
+                hook(timings)
+            except Exception:
+                self.hook_errors += 1
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: tuple, values: tuple) -> str:
+    return ",".join(
+        f'{label}="{_escape(value)}"' for label, value in zip(labels, values)
+    )
+
+
+class _Histogram:
+    __slots__ = ("counts", "count", "sum")
+
+    def __init__(self, buckets: int):
+        self.counts = [0] * buckets
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, index: int, value: float):
+        if index < len(self.counts):
+            self.counts[index] += 1
+
+        self.count += 1
+        self.sum += value
+
+
+class PrometheusExporter:
+    """
+    A hook aggregating the timings of API calls into Prometheus metrics, which
+    are rendered in the Prometheus text exposition format, e.g. to be served
+    by the ``/metrics`` endpoint of an application. It has no dependencies.
+
+    The exported metrics, with ``prefix`` defaulting to ``nbg``, are:
+
+    * ``nbg_request_duration_seconds``: histogram of call durations, by
+      ``method``, ``url_path`` and ``status``.
+    * ``nbg_request_phase_seconds``: histogram of the time spent in each
+      phase, by ``url_path`` and ``phase``.
+    * ``nbg_request_retries_total``: counter of retries, by ``url_path``.
+    * ``nbg_response_size_bytes_total``: counter of response bytes, by
+      ``url_path``.
+
+    Given a concurrency limiter, the gauges ``nbg_concurrency_limit``,
+    ``nbg_concurrency_in_flight`` and ``nbg_concurrency_queued`` and the
+    counter ``nbg_concurrency_rejected_total`` export its state, by
+    ``url_path``, when rendering.
+
+    :param buckets: The upper bounds of the histogram buckets in seconds.
+    :type buckets: tuple
+    :param prefix: The prefix of the metric names.
+    :type prefix: string
+    :param concurrency_limiter: The concurrency limiter of the client, if any.
+    :type concurrency_limiter: nbg.base.concurrency.ConcurrencyLimiter
+
+    ---
+    **Usage**
+
+    .. code-block:: python
+
+        from nbg.base.telemetry import Instrumentation, PrometheusExporter
+
+        prometheus_exporter = PrometheusExporter()
+        client.set_instrumentation(Instrumentation(hooks=[prometheus_exporter]))
+
+        # e.g. in the view serving /metrics
+        body = prometheus_exporter.render()
+    """
+
+    content_type = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(
+        self,
+        buckets: typing.Sequence[float] = DEFAULT_BUCKETS,
+        prefix: str = "nbg",
+        concurrency_limiter=None,
+    ):
+        self.buckets = tuple(sorted(buckets))
+        self.prefix = prefix
+        self.concurrency_limiter = concurrency_limiter
+        self.durations = {}
+        self.phases = {}
+        self.retries = {}
+        self.response_sizes = {}
+        self._lock = threading.Lock()
+
+    def _observe(self, histograms: dict, labels: tuple, value: float):
+        histogram = histograms.get(labels)
+
+        if histogram is None:
+            histogram = histograms[labels] = _Histogram(len(self.buckets))
+
+        histogram.observe(bisect.bisect_left(self.buckets, value), value)
+
+    def __call__(self, timings: RequestTimings):
+        url_path = timings.url_path
+        status = timings.status if timings.status is not None else "error"
+        phases = timings.phases
+
+        with self._lock:
+            labels = (timings.method, url_path, status)
+            self._observe(self.durations, labels, timings.duration)
+
+            for phase, seconds in phases.items():
+                self._observe(self.phases, (url_path, phase), seconds)
+
+            self.retries[url_path] = self.retries.get(url_path, 0) + timings.retries
+
+            if timings.response_size is not None:
+                self.response_sizes[url_path] = (
+                    self.response_sizes.get(url_path, 0) + timings.response_size
+                )
+
+    def _render_histograms(
+        self, lines: list, name: str, help: str, labels: tuple, histograms: dict
+    ):
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} histogram")
+
+        for values, histogram in sorted(histograms.items(), key=str):
+            label_string = _labels(labels, values)
+            cumulative_count = 0
+
+            for bucket, count in zip(self.buckets, histogram.counts):
+                cumulative_count += count
+                lines.append(
+                    f'{name}_bucket{{{label_string},le="{bucket}"}} {cumulative_count}'
+                )
+
+            lines.append(f'{name}_bucket{{{label_string},le="+Inf"}} {histogram.count}')
+            lines.append(f"{name}_sum{{{label_string}}} {histogram.sum}")
+            lines.append(f"{name}_count{{{label_string}}} {histogram.count}")
+
+    def _render_counters(
+        self, lines: list, name: str, help: str, counters: dict, type: str = "counter"
+    ):
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} {type}")
+
+        for url_path, value in sorted(counters.items()):
+            lines.append(f"{name}{{{_labels(('url_path',), (url_path,))}}} {value}")
+
+    def _render_concurrency(self, lines: list, stats: dict):
+        prefix = self.prefix
+
+        for key, name, help, type in (
+            ("limit", "limit", "Limit of requests in flight.", "gauge"),
+            ("in_flight", "in_flight", "Requests in flight.", "gauge"),
+            ("queued", "queued", "Calls waiting for a request slot.", "gauge"),
+            ("rejected", "rejected_total", "Calls rejected over the limit.", "counter"),
+        ):
+            self._render_counters(
+                lines,
+                f"{prefix}_concurrency_{name}",
+                help,
+                {url_path: endpoint[key] for url_path, endpoint in stats.items()},
+                type,
+            )
+
+    def render(self) -> str:
+        """
+        Returns the metrics in the Prometheus text exposition format.
+        """
+        prefix = self.prefix
+        lines = []
+
+        with self._lock:
+            self._render_histograms(
+                lines,
+                f"{prefix}_request_duration_seconds",
+                "Duration of NBG API calls.",
+                ("method", "url_path", "status"),
+                self.durations,
+            )
+            self._render_histograms(
+                lines,
+                f"{prefix}_request_phase_seconds",
+                "Time spent in each phase of NBG API calls.",
+                ("url_path", "phase"),
+                self.phases,
+            )
+            self._render_counters(
+                lines,
+                f"{prefix}_request_retries_total",
+                "Retries of NBG API calls.",
+                self.retries,
+            )
+            self._render_counters(
+                lines,
+                f"{prefix}_response_size_bytes_total",
+                "Size of NBG API responses.",
+                self.response_sizes,
+            )
+
+        if self.concurrency_limiter is not None:
+            self._render_concurrency(lines, self.concurrency_limiter.stats)
+
+        return "\n".join(lines) + "\n"
+
+
+class OpenTelemetryExporter:
+    """
+    A hook exporting each API call as an OpenTelemetry span, with a child span
+    for each one of its phases. Spans are created after the call completes,
+    with the times it started and ended, as children of the span that was
+    current when the call completed. It requires the ``opentelemetry-api``
+    package, which can be installed with the ``telemetry`` extra.
+
+    :param tracer: The tracer to create spans with. Defaults to the ``nbg``
+                   tracer of the global tracer provider.
+    :type tracer: opentelemetry.trace.Tracer
+
+    ---
+    **Usage**
+
+    .. code-block:: python
+
+        from nbg.base.telemetry import Instrumentation, OpenTelemetryExporter
+
+        client.set_instrumentation(Instrumentation(hooks=[OpenTelemetryExporter()]))
+    """
+
+    def __init__(self, tracer=None):
+        self.trace = _import_optional("opentelemetry.trace")
+        self.tracer = tracer or self.trace.get_tracer("nbg")
+
+    def __call__(self, timings: RequestTimings):
+        trace = self.trace
+        started_at = int(timings.started_at * 1e9)
+        attributes = {
+            "http.request.method": timings.method,
+            "url.path": timings.url_path,
+            "nbg.retries": timings.retries,
+        }
+
+        if timings.request_id is not None:
+            attributes["nbg.request_id"] = timings.request_id
+
+        if timings.status is not None:
+            attributes["http.response.status_code"] = timings.status
+
+        if timings.response_size is not None:
+            attributes["http.response.body.size"] = timings.response_size
+
+        span = self.tracer.start_span(
+            f"NBG {timings.method} {timings.url_path}",
+            kind=trace.SpanKind.CLIENT,
+            attributes=attributes,
+            start_time=started_at,
+        )
+        context = trace.set_span_in_context(span)
+
+        for phase, offset, seconds in timings.spans:
+            phase_span = self.tracer.start_span(
+                phase, context=context, start_time=started_at + int(offset * 1e9)
+            )
+            phase_span.end(end_time=started_at + int((offset + seconds) * 1e9))
+
+        if timings.exception is not None:
+            span.record_exception(timings.exception)
+            span.set_status(trace.Status(trace.StatusCode.ERROR))
+
+        span.end(end_time=started_at + int(timings.duration * 1e9))
@@ -0,0 +1,124 @@
+import pytest
+
+from . import concurrency, telemetry
+
+
+def _timings(url_path: str = "account/list", status: int = 200):
+    timings = telemetry.RequestTimings("POST", url_path)
+    timings.status = status
+    timings.response_size = 512
+    timings.mark(telemetry.PREPARE_BODY)
+    timings.mark(telemetry.TRANSFER)
+    timings.mark(telemetry.RETRY_WAIT)
+    timings.mark(telemetry.TRANSFER)
+    timings.retries = 1
+    timings.finish()
+    return timings
+
+
+def test_request_timings():
+    timings = _timings()
+
+    assert [phase for phase, _, _ in timings.spans] == [
+        telemetry.PREPARE_BODY,
+        telemetry.TRANSFER,
+        telemetry.RETRY_WAIT,
+        telemetry.TRANSFER,
+    ]
+    assert list(timings.phases) == [
+        telemetry.PREPARE_BODY,
+        telemetry.TRANSFER,
+        telemetry.RETRY_WAIT,
+    ]
+
+    offsets = [offset for _, offset, _ in timings.spans]
+
+    assert offsets == sorted(offsets)
+    assert timings.duration >= sum(timings.phases.values())
+    assert timings.to_dict()["retries"] == 1
+
+
+def test_instrumentation_hooks():
+    """
+    Ensure that hooks get called with the timings of each call and that
+    failing hooks do not affect other hooks.
+    """
+    recorded_timings = []
+
+    def failing_hook(timings):
+        raise ValueError()
+
+    instrumentation = telemetry.Instrumentation(hooks=[failing_hook])
+    instrumentation.add_hook(recorded_timings.append)
+    timings = instrumentation.start("POST", "account/list")
+    instrumentation.finish(timings, exception=KeyError())
+
+    assert recorded_timings == [timings]
+    assert isinstance(timings.exception, KeyError)
+    assert instrumentation.hook_errors == 1
+
+    instrumentation.remove_hook(failing_hook)
+    instrumentation.finish(timings)
+
+    assert instrumentation.hook_errors == 1
+
+
+def test_prometheus_exporter():
+    prometheus_exporter = telemetry.PrometheusExporter(buckets=(0.5, 1))
+    prometheus_exporter(_timings())
+    prometheus_exporter(_timings("card/list", None))
+    lines = prometheus_exporter.render().splitlines()
+
+    assert "# TYPE nbg_request_duration_seconds histogram" in lines
+    assert (
+        'nbg_request_duration_seconds_bucket{method="POST",url_path="account/list",'
+        'status="200",le="0.5"} 1'
+    ) in lines
+    assert (
+        'nbg_request_duration_seconds_count{method="POST",url_path="card/list",'
+        'status="error"} 1'
+    ) in lines
+    assert (
+        'nbg_request_phase_seconds_count{url_path="account/list",phase="transfer"} 1'
+    ) in lines
+    assert 'nbg_request_retries_total{url_path="account/list"} 1' in lines
+    assert 'nbg_response_size_bytes_total{url_path="card/list"} 512' in lines
+
+
+def test_prometheus_exporter_concurrency():
+    concurrency_limiter = concurrency.ConcurrencyLimiter(initial_limit=4)
+    concurrency_limiter.acquire("account/list")
+    prometheus_exporter = telemetry.PrometheusExporter(
+        concurrency_limiter=concurrency_limiter
+    )
+    lines = prometheus_exporter.render().splitlines()
+
+    assert "# TYPE nbg_concurrency_limit gauge" in lines
+    assert 'nbg_concurrency_limit{url_path="account/list"} 4' in lines
+    assert 'nbg_concurrency_in_flight{url_path="account/list"} 1' in lines
+    assert 'nbg_concurrency_queued{url_path="account/list"} 0' in lines
+    assert 'nbg_concurrency_rejected_total{url_path="account/list"} 0' in lines
+
+
+def test_opentelemetry_exporter():
+    pytest.importorskip("opentelemetry.sdk")
+
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+        InMemorySpanExporter,
+    )
+
+    span_exporter = InMemorySpanExporter()
+    tracer_provider = TracerProvider()
+    tracer_provider.add_span_processor(SimpleSpanProcessor(span_exporter))
+    opentelemetry_exporter = telemetry.OpenTelemetryExporter(
+        tracer_provider.get_tracer("nbg")
+    )
+    opentelemetry_exporter(_timings())
+    spans = {span.name: span for span in span_exporter.get_finished_spans()}
+
+    assert spans["NBG POST account/list"].attributes["nbg.retries"] == 1
+    assert spans["transfer"].parent.span_id == (
+        spans["NBG POST account/list"].context.span_id
+    )
@@ -0,0 +1,107 @@
+"""
+Timeouts and deadlines of API calls, so that a stuck connection cannot hold a
+worker forever. Each attempt of a call has a connect and a read timeout, and
+each call may have a total deadline, which caps the timeouts of its attempts
+and stops its retries once it has passed. Clients have a default timeout, set
+via ``set_timeout``, which can be overridden for some calls via
+``with_timeout``.
+"""
+
+import time
+import typing
+
+from . import exceptions
+
+
+class Timeout:
+    """
+    The timeouts of API calls in seconds. ``None`` means no timeout.
+
+    :param connect: The seconds to wait for a connection to NBG. Defaults to
+                    ``10``.
+    :type connect: float
+    :param read: The seconds to wait for each read of the response, i.e. for
+                 the server to answer and between the chunks of its body, but
+                 not for the whole body. Defaults to ``60``.
+    :type read: float
+    :param total: The deadline of each call, including its retries and the
+                  waits between them. Each attempt waits at most for the time
+                  left until the deadline, for connecting and for each read.
+                  Defaults to ``None``.
+    :type total: float
+
+    ---
+    **Usage**
+
+    .. code-block:: python
+
+        from nbg.base.timeouts import Timeout
+
+        client.set_timeout(Timeout(connect=3.05, read=20, total=30))
+    """
+
+    def __init__(self, connect: float = 10, read: float = 60, total: float = None):
+        self.connect = connect
+        self.read = read
+        self.total = total
+
+    def __repr__(self):
+        return f"Timeout(connect={self.connect}, read={self.read}, total={self.total})"
+
+    def start(self, url_path: str) -> "Deadline":
+        """
+        Returns the deadline of a new call to the given URL path.
+        """
+        return Deadline(self, url_path)
+
+
+def _cap(timeout: typing.Optional[float], remaining: float) -> float:
+    return remaining if timeout is None else min(timeout, remaining)
+
+
+class Deadline:
+    """
+    Tracks the time left for a single API call.
+    """
+
+    def __init__(self, timeout: Timeout, url_path: str):
+        self.timeout = timeout
+        self.url_path = url_path
+        self.expires_at = (
+            time.monotonic() + timeout.total if timeout.total is not None else None
+        )
+
+    @property
+    def remaining(self) -> typing.Optional[float]:
+        """
+        Returns the seconds left until the deadline, or ``None`` if the call
+        has no deadline.
+        """
+        if self.expires_at is None:
+            return None
+
+        return self.expires_at - time.monotonic()
+
+    def allows(self, delay: float) -> bool:
+        """
+        Returns whether the call can wait for the given seconds, e.g. before a
+        retry, and still have time left for another attempt.
+        """
+        remaining = self.remaining
+        return remaining is None or delay < remaining
+
+    def timeouts(self) -> typing.Tuple[typing.Optional[float], typing.Optional[float]]:
+        """
+        Returns the connect and read timeouts of the next attempt of the call,
+        capped at the time left. Raises ``DeadlineExceeded`` if there is none.
+        """
+        remaining = self.remaining
+        timeout = self.timeout
+
+        if remaining is None:
+            return timeout.connect, timeout.read
+
+        if remaining <= 0:
+            raise exceptions.DeadlineExceeded(self.url_path, timeout.total)
+
+        return _cap(timeout.connect, remaining), _cap(timeout.read, remaining)
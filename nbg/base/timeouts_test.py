@@ -0,0 +1,40 @@
+from unittest import mock
+
+import pytest
+
+from . import exceptions, timeouts
+
+
+@pytest.fixture
+def clock():
+    with mock.patch.object(timeouts.time, "monotonic") as monotonic:
+        monotonic.return_value = 1000.0
+        yield monotonic
+
+
+def test_deadline_timeouts(clock):
+    deadline = timeouts.Timeout(connect=3, read=None, total=10).start("account/list")
+
+    assert deadline.timeouts() == (3, 10)
+    assert deadline.allows(9)
+    assert not deadline.allows(10)
+
+    clock.return_value += 8
+
+    assert deadline.timeouts() == (2, 2)
+
+    clock.return_value += 2
+
+    with pytest.raises(exceptions.DeadlineExceeded) as exception_info:
+        deadline.timeouts()
+
+    assert exception_info.value.url_path == "account/list"
+
+
+def test_no_deadline(clock):
+    deadline = timeouts.Timeout(connect=None, read=None).start("account/list")
+    clock.return_value += 10 ** 6
+
+    assert deadline.remaining is None
+    assert deadline.timeouts() == (None, None)
+    assert deadline.allows(10 ** 6)
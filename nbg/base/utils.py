@@ -4,15 +4,15 @@ Generic utilities used by the base client of all NBG APIs.
 
 from datetime import datetime
 import json
+import os
+import sqlite3
+import tempfile
+import threading
 
 from requests import Request, Response
 
-from . import exceptions
-
-
-def _serialize_datetime(datetime_instance: datetime) -> str:
-    iso_datetime = datetime_instance.isoformat(timespec="milliseconds")
-    return f"{iso_datetime}Z"
+from . import codec, exceptions
+from .codec import _serialize_datetime
 
 
 def serialize_request_payload(data: dict) -> dict:
@@ -20,6 +20,10 @@ def serialize_request_payload(data: dict) -> dict:
     Serializes the request payload to match the format requested by
     NBG APIs. Serializations:
       - datetime: (Z-suffixed ISO format)
+
+    Clients no longer use this, as :func:`encode_request_body` serializes
+    datetimes while encoding the body. It is kept for code that prepares
+    payloads by itself.
     """
     payload = data.copy()
 
@@ -30,26 +34,34 @@ def serialize_request_payload(data: dict) -> dict:
     return payload
 
 
-def validate_response(response: Response) -> dict:
+def encode_request_body(body: dict, json_codec: codec.JSONCodec = None) -> bytes:
+    """
+    Encodes the request body as compact JSON with the given codec, or the
+    fastest one installed. The encoded body is both signed and sent as is, so
+    that the signature always matches the bytes on the wire.
+    """
+    return (json_codec or codec.get_codec()).dumps(body)
+
+
+def validate_response(response: Response, json_codec: codec.JSONCodec = None) -> dict:
     """
     Validates that the given response is valid JSON and it contains all required
-    fields.
+    fields. The response gets decoded with the given codec, or the fastest one
+    installed.
     """
     if response.status_code == 401:
         raise exceptions.NotAuthenticatedRequest(response)
 
     try:
-        data = response.json()
-    except json.JSONDecodeError:
+        data = (json_codec or codec.get_codec()).loads(response.content)
+    except ValueError:
         exception = exceptions.InvalidResponse(
             response, "Response body is not valid JSON."
         )
         raise exception
 
-    required_keys = ("exception", "payload", "Message")
-    any_of_the_required_keys_in_body = any([key in data for key in required_keys])
-
-    if not any_of_the_required_keys_in_body:
+    if "payload" not in data and "exception" not in data and "Message" not in data:
+        required_keys = ("exception", "payload", "Message")
         missing_keys = ", ".join([key for key in required_keys if key not in data])
         exception = exceptions.InvalidResponse(
             response,
@@ -58,3 +70,35 @@ def validate_response(response: Response) -> dict:
         raise exception
 
     return data
+
+
+def shared_memory_path(filename: str) -> str:
+    """
+    Returns the path of the given file on a memory-backed file system
+    (``/dev/shm`` where available), so that it can be shared by all processes
+    of a host without touching the disk.
+    """
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(directory, filename)
+
+
+class SQLiteConnections:
+    """
+    Opens a connection to the SQLite database at the given path for each
+    thread and process, as SQLite connections cannot be shared across threads
+    or inherited by forked processes.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+    def get(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+
+        return connection
@@ -4,7 +4,7 @@ import json
 from requests import Response
 import pytest
 
-from . import exceptions, utils
+from . import codec, exceptions, utils
 
 
 def _get_dummy_response(body, status_code=200) -> Response:
@@ -69,3 +69,25 @@ def test_validate_response_with_invalid_json():
         utils.validate_response(invalid_response)
 
     assert str(exception_info.value) == "Response body is not valid JSON."
+
+
+def test_encode_request_body():
+    body = {"header": {"ID": "request-id"}, "payload": {"name": "Ελλάδα"}}
+    encoded_body = utils.encode_request_body(body, codec.StandardJSONCodec())
+
+    assert encoded_body == (
+        b'{"header":{"ID":"request-id"},"payload":{"name":"\\u0395\\u03bb\\u03bb'
+        b'\\u03ac\\u03b4\\u03b1"}}'
+    )
+    assert json.loads(encoded_body) == body
+    assert json.loads(utils.encode_request_body(body)) == body
+
+
+def test_validate_response_with_codec():
+    response_body = {"payload": {"amount": 1.5, "date": "2020-01-01"}}
+    valid_response = _get_dummy_response(response_body)
+
+    for json_codec in (codec.StandardJSONCodec(), codec.get_codec()):
+        validated_response = utils.validate_response(valid_response, json_codec)
+
+        assert validated_response == response_body
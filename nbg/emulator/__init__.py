@@ -0,0 +1,10 @@
+"""
+Offline emulator of the NBG APIs, for load tests and benchmarks of
+integrations without hitting the quotas of the NBG sandbox. It requires
+``aiohttp``, which can be installed with the ``emulator`` extra, and can be
+run with ``python -m nbg.emulator``.
+"""
+
+from .data import DataProfile, SandboxData
+from .latency import Latency
+from .server import Emulator, RunningEmulator
@@ -0,0 +1,109 @@
+"""
+Runs the emulator of the NBG APIs.
+
+    $ python -m nbg.emulator --port 8080 --latency lognormal:0.05,0.5
+"""
+
+import argparse
+import json
+
+from .data import DataProfile, SandboxData
+from .latency import Latency, parse_latencies
+from .server import Emulator
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m nbg.emulator", description="Emulator of the NBG APIs."
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Worker processes sharing the port, each with its own state.",
+    )
+    parser.add_argument("--base-path", default="")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--accounts", type=int, default=2)
+    parser.add_argument("--foreign-currency-accounts", type=int, default=1)
+    parser.add_argument("--cards", type=int, default=2)
+    parser.add_argument("--beneficiaries", type=int, default=3)
+    parser.add_argument(
+        "--transactions",
+        type=int,
+        default=200,
+        help="Transactions of each account and card.",
+    )
+    parser.add_argument(
+        "--import",
+        dest="imports",
+        action="append",
+        default=[],
+        metavar="SANDBOX_ID=PATH",
+        help="Serve the sandbox exported to the given JSON file.",
+    )
+    parser.add_argument(
+        "--latency",
+        help="Latency of responses, e.g. 0.05, uniform:0.01,0.1 or lognormal:0.05,0.5.",
+    )
+    parser.add_argument(
+        "--endpoint-latency",
+        action="append",
+        default=[],
+        metavar="URL_PATH=LATENCY",
+        help="Latency of an endpoint, e.g. account/transactions=normal:0.3,0.05.",
+    )
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--access-token", action="append", dest="access_tokens")
+    parser.add_argument("--strict-consents", action="store_true")
+    parser.add_argument("--no-signatures", action="store_true")
+    parser.add_argument(
+        "--certificate-out",
+        help="Write the certificate of response signatures to the given path.",
+    )
+    arguments = parser.parse_args(arguments)
+
+    sandboxes = {}
+
+    for spec in arguments.imports:
+        sandbox_id, _, path = spec.partition("=")
+
+        with open(path) as export_file:
+            sandboxes[sandbox_id] = SandboxData.from_export(
+                sandbox_id, json.load(export_file)
+            )
+
+    emulator = Emulator(
+        sandboxes=sandboxes,
+        seed=arguments.seed,
+        profile=DataProfile(
+            accounts=arguments.accounts,
+            foreign_currency_accounts=arguments.foreign_currency_accounts,
+            cards=arguments.cards,
+            beneficiaries=arguments.beneficiaries,
+            transactions=arguments.transactions,
+        ),
+        latency=Latency.parse(arguments.latency) if arguments.latency else None,
+        endpoint_latencies=parse_latencies(arguments.endpoint_latency),
+        error_rate=arguments.error_rate,
+        sign_responses=not arguments.no_signatures,
+        access_tokens=arguments.access_tokens,
+        strict_consents=arguments.strict_consents,
+        base_path=arguments.base_path,
+    )
+
+    if arguments.certificate_out and emulator.certificate is not None:
+        with open(arguments.certificate_out, "wb") as certificate_file:
+            certificate_file.write(emulator.certificate)
+
+    print(
+        f"Emulating NBG APIs on http://{arguments.host}:{arguments.port}"
+        f"{emulator.base_path} with {arguments.workers} worker(s)"
+    )
+    emulator.run(arguments.host, arguments.port, arguments.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+"""
+Sandbox data served by the emulator. Users are generated deterministically
+from a seed on first use, so that every worker of an emulator and every run
+of a benchmark serves the same data, or imported from an export.
+"""
+
+from datetime import datetime, timedelta
+import bisect
+import random
+import typing
+
+from ..base.codec import _serialize_datetime
+
+
+ACCOUNT_KEYS = (
+    "account",
+    "iban",
+    "alias",
+    "currency",
+    "product",
+    "ledgerBalance",
+    "availableBalance",
+)
+ACCOUNT_DETAILS_KEYS = ACCOUNT_KEYS + ("openingDate",)
+CARD_KEYS = ("cardNumber", "number", "product", "currency", "expirationDate")
+CARD_DETAILS_KEYS = CARD_KEYS + ("creditLimit", "availableBalance")
+
+DESCRIPTIONS = (
+    "ΠΛΗΡΩΜΗ ΜΕ ΚΑΡΤΑ",
+    "ΑΝΑΛΗΨΗ ΑΠΟ ATM",
+    "ΜΕΤΑΦΟΡΑ ΠΡΟΣ ΛΟΓΑΡΙΑΣΜΟ",
+    "ΚΑΤΑΘΕΣΗ ΜΙΣΘΟΔΟΣΙΑΣ",
+    "ΠΛΗΡΩΜΗ ΛΟΓΑΡΙΑΣΜΟΥ ΔΕΗ",
+    "ΠΛΗΡΩΜΗ ΛΟΓΑΡΙΑΣΜΟΥ ΚΙΝΗΤΗΣ",
+    "ΑΓΟΡΑ ΣΟΥΠΕΡ ΜΑΡΚΕΤ",
+    "ΧΡΕΩΣΗ ΠΡΟΜΗΘΕΙΑΣ",
+)
+NAMES = (
+    "ΠΑΠΑΔΟΠΟΥΛΟΣ ΓΕΩΡΓΙΟΣ",
+    "ΝΙΚΟΛΑΟΥ ΜΑΡΙΑ",
+    "ACME HELLAS AE",
+    "ΔΕΗ ΑΕ",
+)
+FOREIGN_CURRENCIES = ("USD", "GBP", "CHF")
+
+
+class DataProfile:
+    """
+    The size of the generated data of each user, which determines the size of
+    the payloads served by the emulator.
+
+    :param accounts: The domestic accounts of each user.
+    :type accounts: int
+    :param foreign_currency_accounts: The foreign currency accounts of each user.
+    :type foreign_currency_accounts: int
+    :param cards: The cards of each user.
+    :type cards: int
+    :param beneficiaries: The beneficiaries of each account.
+    :type beneficiaries: int
+    :param transactions: The transactions of each account and card.
+    :type transactions: int
+    :param scheduled_payments: The scheduled payments of each domestic account.
+    :type scheduled_payments: int
+    :param standing_orders: The standing orders of each domestic account.
+    :type standing_orders: int
+    :param period_end: The datetime of the latest transactions.
+    :type period_end: datetime
+    :param period_days: The days over which transactions are spread.
+    :type period_days: int
+    """
+
+    def __init__(
+        self,
+        accounts: int = 2,
+        foreign_currency_accounts: int = 1,
+        cards: int = 2,
+        beneficiaries: int = 3,
+        transactions: int = 200,
+        scheduled_payments: int = 3,
+        standing_orders: int = 2,
+        period_end: datetime = datetime(2021, 1, 1),
+        period_days: int = 730,
+    ):
+        self.accounts = accounts
+        self.foreign_currency_accounts = foreign_currency_accounts
+        self.cards = cards
+        self.beneficiaries = beneficiaries
+        self.transactions = transactions
+        self.scheduled_payments = scheduled_payments
+        self.standing_orders = standing_orders
+        self.period_end = period_end
+        self.period_days = period_days
+
+
+def _iban(bank_account: int) -> str:
+    bban = f"0110{bank_account % 1000:03d}{bank_account:016d}"
+    # Check digits of ISO 13616, with "GR" converted to digits.
+    check_digits = 98 - int(f"{bban}162700") % 97
+    return f"GR{check_digits:02d}{bban}"
+
+
+def _amount(rng: random.Random, low: float, high: float) -> float:
+    return round(rng.uniform(low, high), 2)
+
+
+class _Generator:
+    """
+    Generates the data of a single user from a seeded random generator.
+    """
+
+    def __init__(self, rng: random.Random, profile: DataProfile):
+        self.rng = rng
+        self.profile = profile
+        self.period_start = profile.period_end - timedelta(days=profile.period_days)
+
+    def datetime(self) -> datetime:
+        seconds = self.rng.uniform(0, self.profile.period_days * 86400)
+        return self.period_start + timedelta(seconds=int(seconds))
+
+    def transactions(self, prefix: str, currency: str, balance: float) -> list:
+        rng = self.rng
+        dates = sorted(self.datetime() for _ in range(self.profile.transactions))
+        transactions = []
+
+        for index, date in enumerate(dates):
+            amount = _amount(rng, -250, 100) if rng.random() < 0.9 else 1500.0
+            balance = round(balance + amount, 2)
+            transactions.append(
+                {
+                    "id": f"{prefix}{index:08d}",
+                    "amount": amount,
+                    "currency": currency,
+                    "date": _serialize_datetime(date),
+                    "valueDate": _serialize_datetime(
+                        date + timedelta(days=rng.randint(0, 2))
+                    ),
+                    "description": rng.choice(DESCRIPTIONS),
+                    "balance": balance,
+                }
+            )
+
+        return transactions
+
+    def beneficiaries(self) -> list:
+        rng = self.rng
+        return [
+            {
+                "name": rng.choice(NAMES),
+                "iban": _iban(rng.randrange(10 ** 10, 10 ** 11)),
+                "alias": f"Beneficiary {index + 1}",
+                "bank": "NBG",
+            }
+            for index in range(self.profile.beneficiaries)
+        ]
+
+    def account(self, currency: str, product: str) -> dict:
+        rng = self.rng
+        number = rng.randrange(10 ** 10, 10 ** 11)
+        balance = _amount(rng, 100, 20000)
+        return {
+            "account": str(number),
+            "iban": _iban(number),
+            "alias": product,
+            "currency": currency,
+            "product": product,
+            "ledgerBalance": balance,
+            "availableBalance": balance,
+            "openingDate": _serialize_datetime(self.period_start),
+            "beneficiaries": self.beneficiaries(),
+            "transactions": self.transactions(f"{number}-", currency, balance),
+        }
+
+    def scheduled_payments(self, currency: str) -> list:
+        rng = self.rng
+        return [
+            {
+                "id": f"SP{rng.randrange(10 ** 8):08d}",
+                "amount": _amount(rng, 10, 500),
+                "currency": currency,
+                "executionDate": _serialize_datetime(self.datetime()),
+                "beneficiary": rng.choice(NAMES),
+                "description": rng.choice(DESCRIPTIONS),
+            }
+            for _ in range(self.profile.scheduled_payments)
+        ]
+
+    def standing_orders(self, currency: str) -> list:
+        rng = self.rng
+        return [
+            {
+                "id": f"SO{rng.randrange(10 ** 8):08d}",
+                "amount": _amount(rng, 10, 500),
+                "currency": currency,
+                "frequency": rng.choice(("MONTHLY", "QUARTERLY", "YEARLY")),
+                "startDate": _serialize_datetime(self.period_start),
+                "endDate": _serialize_datetime(self.profile.period_end),
+                "beneficiary": rng.choice(NAMES),
+                "description": rng.choice(DESCRIPTIONS),
+            }
+            for _ in range(self.profile.standing_orders)
+        ]
+
+    def card(self) -> dict:
+        rng = self.rng
+        number = f"4{rng.randrange(10 ** 14, 10 ** 15)}"
+        credit_limit = float(rng.choice((1000, 2500, 5000)))
+        return {
+            "cardNumber": number,
+            "number": f"{number[:4]}********{number[-4:]}",
+            "product": rng.choice(("VISA CLASSIC", "MASTERCARD GOLD")),
+            "currency": "EUR",
+            "expirationDate": _serialize_datetime(
+                self.profile.period_end + timedelta(days=3 * 365)
+            ),
+            "creditLimit": credit_limit,
+            "availableBalance": credit_limit,
+            "transactions": self.transactions(f"{number[-4:]}-", "EUR", 0.0),
+        }
+
+    def user(self) -> dict:
+        profile = self.profile
+        accounts = []
+
+        for index in range(profile.accounts):
+            product = "Savings Account" if index % 2 else "Current Account"
+            account = self.account("EUR", product)
+            account["scheduledPayments"] = self.scheduled_payments("EUR")
+            account["standingOrders"] = self.standing_orders("EUR")
+            accounts.append(account)
+
+        return {
+            "accounts": accounts,
+            "foreignCurrencyAccounts": [
+                self.account(
+                    FOREIGN_CURRENCIES[index % len(FOREIGN_CURRENCIES)],
+                    "Foreign Currency Account",
+                )
+                for index in range(profile.foreign_currency_accounts)
+            ],
+            "cards": [self.card() for _ in range(profile.cards)],
+        }
+
+
+class SandboxData:
+    """
+    The data of a sandbox, i.e. its users with their accounts, cards and
+    transactions. Sandboxes without imported users generate each user on
+    first use, from the seed, the sandbox ID and the user ID.
+
+    :param sandbox_id: The ID of the sandbox.
+    :type sandbox_id: string
+    :param seed: The seed of generated users.
+    :type seed: int
+    :param profile: The size of generated users.
+    :type profile: DataProfile
+    :param users: Imported users, by user ID. Sandboxes with imported users do
+                  not generate any other users.
+    :type users: dict
+
+    ---
+    **Usage**
+
+    .. code-block:: python
+
+        from nbg.emulator import DataProfile, SandboxData
+
+        sandbox_data = SandboxData("sandbox-id", profile=DataProfile(transactions=5000))
+        sandbox_data.user("your_user_id")["accounts"]
+    """
+
+    def __init__(
+        self,
+        sandbox_id: str = "",
+        seed: int = 0,
+        profile: DataProfile = None,
+        users: dict = None,
+    ):
+        self.sandbox_id = sandbox_id
+        self.seed = seed
+        self.profile = profile or DataProfile()
+        self.generated = users is None
+        self.users = dict(users or {})
+        self._dates = {}
+
+    @classmethod
+    def from_export(cls, sandbox_id: str, data: dict) -> "SandboxData":
+        """
+        Returns the sandbox of the given export, as returned by :meth:`export`.
+        """
+        users = data.get("users") or {}
+
+        for user in users.values():
+            for kind in ("accounts", "foreignCurrencyAccounts", "cards"):
+                for record in user.setdefault(kind, []):
+                    record.get("transactions", []).sort(key=lambda t: t["date"])
+
+        return cls(sandbox_id, users=users)
+
+    def export(self) -> dict:
+        """
+        Returns all users of the sandbox that have been generated or imported.
+        """
+        return {"sandboxId": self.sandbox_id, "users": self.users}
+
+    def user(self, user_id: str) -> typing.Optional[dict]:
+        """
+        Returns the data of the given user, generating it if needed.
+        """
+        user = self.users.get(user_id)
+
+        if user is None and self.generated:
+            rng = random.Random(f"{self.seed}:{self.sandbox_id}:{user_id}")
+            user = self.users[user_id] = _Generator(rng, self.profile).user()
+
+        return user
+
+    def between(
+        self, records: list, date_key: str, date_from: str, date_to: str
+    ) -> list:
+        """
+        Returns the records whose ``date_key`` is within the given serialized
+        datetimes. Records must be sorted by ``date_key``.
+        """
+        if not (date_from or date_to):
+            return records
+
+        dates = self._dates.get(id(records))
+
+        if dates is None:
+            dates = self._dates[id(records)] = [record[date_key] for record in records]
+
+        start = bisect.bisect_left(dates, date_from) if date_from else 0
+        end = bisect.bisect_right(dates, date_to) if date_to else len(dates)
+        return records[start:end]
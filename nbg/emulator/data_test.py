@@ -0,0 +1,58 @@
+from . import data
+
+
+def test_generated_users_are_deterministic():
+    profile = data.DataProfile(accounts=3, cards=1, transactions=50)
+    sandbox_data = data.SandboxData("sandbox-id", seed=1, profile=profile)
+    user = sandbox_data.user("user")
+
+    assert user == data.SandboxData("sandbox-id", 1, profile).user("user")
+    assert user != data.SandboxData("sandbox-id", 2, profile).user("user")
+    assert len(user["accounts"]) == 3
+    assert len(user["cards"]) == 1
+    assert len(user["accounts"][0]["transactions"]) == 50
+
+
+def test_generated_ibans_are_valid():
+    user = data.SandboxData().user("user")
+
+    for account in user["accounts"]:
+        iban = account["iban"]
+        rearranged = iban[4:] + "1627" + iban[2:4]
+
+        assert len(iban) == 27
+        assert int(rearranged) % 97 == 1
+
+
+def test_between():
+    sandbox_data = data.SandboxData()
+    transactions = sandbox_data.user("user")["accounts"][0]["transactions"]
+    date_from = "2020-01-01T00:00:00.000Z"
+    date_to = "2020-06-30T23:59:59.999Z"
+    selected = sandbox_data.between(transactions, "date", date_from, date_to)
+
+    assert selected == [
+        transaction
+        for transaction in transactions
+        if date_from <= transaction["date"] <= date_to
+    ]
+    assert sandbox_data.between(transactions, "date", None, None) is transactions
+
+
+def test_export_and_import():
+    """
+    Ensure that imported sandboxes serve exactly their exported users.
+    """
+    sandbox_data = data.SandboxData("sandbox-id")
+    sandbox_data.user("user")
+    transactions = sandbox_data.users["user"]["accounts"][0]["transactions"]
+    transactions.reverse()
+
+    imported_sandbox_data = data.SandboxData.from_export(
+        "other-sandbox-id", sandbox_data.export()
+    )
+
+    assert imported_sandbox_data.user("other-user") is None
+    assert imported_sandbox_data.user("user")["accounts"][0]["transactions"] == (
+        sorted(transactions, key=lambda transaction: transaction["date"])
+    )
@@ -0,0 +1,100 @@
+"""
+Latency distributions of emulated responses.
+"""
+
+import math
+import random
+import typing
+
+
+class Latency:
+    """
+    A distribution of response latencies in seconds.
+
+    :param distribution: One of ``"constant"``, ``"uniform"``, ``"normal"``,
+                         ``"lognormal"`` or ``"exponential"``.
+    :type distribution: string
+    :param parameters: The parameters of the distribution in seconds:
+                       ``constant``: the latency.
+                       ``uniform``: the minimum and maximum latency.
+                       ``normal``: the mean and standard deviation.
+                       ``lognormal``: the median and the shape (sigma).
+                       ``exponential``: the mean.
+    :type parameters: float
+
+    ---
+    **Usage**
+
+    .. code-block:: python
+
+        from nbg.emulator import Latency
+
+        Latency("lognormal", 0.05, 0.5)
+        Latency.parse("uniform:0.01,0.2")
+    """
+
+    distributions = ("constant", "uniform", "normal", "lognormal", "exponential")
+
+    def __init__(self, distribution: str = "constant", *parameters: float):
+        if distribution not in self.distributions:
+            raise ValueError(f"Unknown latency distribution: {distribution}.")
+
+        self.distribution = distribution
+        self.parameters = parameters or (0.0,)
+        self.rng = random.Random()
+
+    def __repr__(self):
+        parameters = ",".join(str(parameter) for parameter in self.parameters)
+        return f"Latency({self.distribution}:{parameters})"
+
+    @classmethod
+    def parse(cls, spec: str) -> "Latency":
+        """
+        Returns the latency of the given ``distribution:parameters`` spec,
+        e.g. ``"normal:0.1,0.02"``. A number alone is a constant latency.
+        """
+        distribution, _, parameters = spec.partition(":")
+
+        if not parameters:
+            try:
+                return cls("constant", float(distribution))
+            except ValueError:
+                pass
+
+        return cls(
+            distribution, *(float(parameter) for parameter in parameters.split(","))
+        )
+
+    def sample(self) -> float:
+        """
+        Returns a random latency of the distribution, which is never negative.
+        """
+        rng = self.rng
+        parameters = self.parameters
+        distribution = self.distribution
+
+        if distribution == "constant":
+            latency = parameters[0]
+        elif distribution == "uniform":
+            latency = rng.uniform(parameters[0], parameters[1])
+        elif distribution == "normal":
+            latency = rng.gauss(parameters[0], parameters[1])
+        elif distribution == "lognormal":
+            latency = rng.lognormvariate(math.log(parameters[0]), parameters[1])
+        else:
+            latency = rng.expovariate(1 / parameters[0])
+
+        return max(0.0, latency)
+
+
+def parse_latencies(specs: typing.Iterable[str]) -> typing.Dict[str, Latency]:
+    """
+    Returns the latencies of the given ``url_path=spec`` strings by URL path.
+    """
+    latencies = {}
+
+    for spec in specs:
+        url_path, _, latency_spec = spec.partition("=")
+        latencies[url_path] = Latency.parse(latency_spec)
+
+    return latencies
@@ -0,0 +1,670 @@
+"""
+The HTTP server of the emulator, built on ``aiohttp``. Responses of read-only
+endpoints are encoded and signed once per sandbox and request payload, and
+then served from memory, so that the emulator can serve thousands of requests
+per second on a single core.
+"""
+
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+import asyncio
+import multiprocessing
+import random
+import threading
+import typing
+import uuid
+
+from aiohttp import web
+
+from ..auth import signature
+from ..base import codec
+from . import data
+from .latency import Latency
+
+
+TOKEN_PATH = "connect/token"
+
+USER_NOT_FOUND = "EMU-001"
+ACCOUNT_NOT_FOUND = "EMU-002"
+CARD_NOT_FOUND = "EMU-003"
+INVALID_CONSENT = "EMU-004"
+INVALID_SIGNATURE = "EMU-005"
+SANDBOX_NOT_FOUND = "EMU-006"
+
+# Parses detached signatures, to check their format without a certificate.
+_signature_parser = signature.JWSVerifier(b"")
+
+
+class EmulatedError(Exception):
+    """
+    Raised by endpoints to answer with an error, either as a generic error
+    ``Message`` with an error code of ``GenericResponseError``, or as an
+    ``exception`` of the response envelope.
+    """
+
+    def __init__(self, code: str, description: str = None, status: int = 200):
+        self.code = code
+        self.description = description
+        self.status = status
+
+    def envelope(self) -> dict:
+        if self.description is None:
+            return {"Message": f"Error {self.code}"}
+
+        exception = {
+            "id": str(uuid.uuid4()),
+            "sev": "ERROR",
+            "desc": self.description,
+            "cat": "BUSINESS",
+            "code": self.code,
+        }
+        return {"payload": None, "exception": exception}
+
+
+def generate_signing_key() -> typing.Tuple[bytes, bytes]:
+    """
+    Returns a new RSA private key and a self-signed X.509 certificate of its
+    public key, both PEM-encoded.
+    """
+    from cryptography import x509
+    from cryptography.hazmat.backends import default_backend
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from cryptography.x509.oid import NameOID
+
+    key = rsa.generate_private_key(65537, 2048, default_backend())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "NBG API emulator")])
+    now = datetime.now(timezone.utc)
+    certificate = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - timedelta(days=1))
+        .not_valid_after(now + timedelta(days=365))
+        .sign(key, hashes.SHA256(), default_backend())
+    )
+    private_key = key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+    return private_key, certificate.public_bytes(serialization.Encoding.PEM)
+
+
+def _find(records: list, key: str, value: str, code: str, name: str) -> dict:
+    for record in records:
+        if record.get(key) == value:
+            return record
+
+    raise EmulatedError(code, f"{name} {value} was not found.")
+
+
+def _view(record: dict, keys: tuple) -> dict:
+    return {key: record[key] for key in keys if key in record}
+
+
+class Emulator:
+    """
+    Emulates the NBG APIs served by :class:`AccountInformationPSD2Client
+    <nbg.account_information.AccountInformationPSD2Client>`, along with their
+    consent and sandbox endpoints, offline. Requests are validated like NBG
+    does, i.e. their ``header``, user ID, access token, consent and signature,
+    and responses use the same envelopes and detached signatures.
+
+    :param sandboxes: The data of each sandbox, by sandbox ID. Requests to
+                      other sandboxes get generated data.
+    :type sandboxes: dict
+    :param seed: The seed of generated data.
+    :type seed: int
+    :param profile: The size of generated data.
+    :type profile: nbg.emulator.DataProfile
+    :param latency: The latency of responses. Defaults to no latency.
+    :type latency: nbg.emulator.Latency
+    :param endpoint_latencies: The latencies of specific URL paths, e.g.
+                               ``{"account/transactions": Latency("constant", 1)}``.
+    :type endpoint_latencies: dict
+    :param error_rate: The fraction of requests answered with ``503``.
+    :type error_rate: float
+    :param sign_responses: Whether responses get signed, with the key of
+                           ``certificate``. Defaults to ``True``.
+    :type sign_responses: bool
+    :param access_tokens: The access tokens accepted, besides those issued by
+                          the token endpoint of the emulator. Defaults to
+                          accepting any access token.
+    :type access_tokens: list
+    :param strict_consents: Whether consent IDs must have been requested from
+                            the emulator. Defaults to accepting any consent ID.
+    :type strict_consents: bool
+    :param tpp_certificate: The TPP certificate to verify request signatures
+                            with. Without it, only their format is checked.
+    :type tpp_certificate: bytes
+    :param base_path: The path under which the endpoints are served.
+    :type base_path: string
+    :param cache_size: The number of encoded responses kept in memory.
+    :type cache_size: int
+
+    ---
+    **Usage**
+
+    .. code-block:: python
+
+        from nbg.emulator import Emulator, Latency
+
+        emulator = Emulator(latency=Latency("lognormal", 0.05, 0.5))
+
+        with emulator.start() as running_emulator:
+            client.set_base_url(running_emulator.url)
+            client.set_nbg_certificate(emulator.certificate)
+            client.accounts(user_id="your_user_id")
+    """
+
+    def __init__(
+        self,
+        sandboxes: typing.Dict[str, data.SandboxData] = None,
+        seed: int = 0,
+        profile: data.DataProfile = None,
+        latency: Latency = None,
+        endpoint_latencies: typing.Dict[str, Latency] = None,
+        error_rate: float = 0.0,
+        sign_responses: bool = True,
+        access_tokens: typing.Iterable[str] = None,
+        strict_consents: bool = False,
+        tpp_certificate: bytes = None,
+        base_path: str = "",
+        cache_size: int = 4096,
+    ):
+        self.sandboxes = dict(sandboxes or {})
+        self.seed = seed
+        self.profile = profile or data.DataProfile()
+        self.latency = latency
+        self.endpoint_latencies = endpoint_latencies or {}
+        self.error_rate = error_rate
+        self.access_tokens = set(access_tokens) if access_tokens is not None else None
+        self.strict_consents = strict_consents
+        self.tpp_verifier = (
+            signature.JWSVerifier(tpp_certificate) if tpp_certificate else None
+        )
+        self.base_path = base_path.rstrip("/")
+        self.cache_size = cache_size
+        self.consents = {}
+        self.requests = {}
+        self.private_key = self.certificate = self.signer = None
+
+        if sign_responses:
+            self.private_key, self.certificate = generate_signing_key()
+            self.signer = signature.JWSSigner(self.private_key)
+
+        self.json_codec = codec.get_codec()
+        self._responses = OrderedDict()
+        self._rng = random.Random()
+        self.endpoints = {
+            "account/list": self._accounts,
+            "account/beneficiaries": self._beneficiaries,
+            "account/details": self._account_details,
+            "account/transactions": self._account_transactions,
+            "card/list": self._cards,
+            "card/details": self._card_details,
+            "card/transactions": self._card_transactions,
+            "foreign-currency-account/list": self._accounts,
+            "foreign-currency-account/beneficiaries": self._beneficiaries,
+            "foreign-currency-account/details": self._account_details,
+            "foreign-currency-account/transactions": self._account_transactions,
+            "scheduled-payments/list": self._scheduled_payments,
+            "standing-orders/list": self._standing_orders,
+        }
+        self.consent_endpoints = {
+            "consents/request-access": self._request_consent,
+            "consents/info": self._consent_information,
+            "consents/delete": self._delete_consent,
+        }
+
+    @property
+    def stats(self) -> dict:
+        """
+        Returns the number of requests received for each URL path.
+        """
+        return dict(self.requests)
+
+    def sandbox(self, sandbox_id: str) -> data.SandboxData:
+        """
+        Returns the data of the given sandbox, generating it if needed.
+        """
+        sandbox = self.sandboxes.get(sandbox_id)
+
+        if sandbox is None:
+            sandbox = self.sandboxes[sandbox_id] = data.SandboxData(
+                sandbox_id, self.seed, self.profile
+            )
+
+        return sandbox
+
+    def _user(self, sandbox: data.SandboxData, payload: dict) -> dict:
+        user_id = payload.get("userId")
+
+        if not user_id:
+            raise EmulatedError("2.2.1", status=400)
+
+        user = sandbox.user(user_id)
+
+        if user is None:
+            raise EmulatedError(USER_NOT_FOUND, f"User {user_id} was not found.")
+
+        return user
+
+    def _account_records(self, url_path: str, user: dict) -> list:
+        if url_path.startswith("foreign-currency-account/"):
+            return user["foreignCurrencyAccounts"]
+
+        return user["accounts"]
+
+    def _accounts(self, sandbox, url_path: str, payload: dict) -> dict:
+        accounts = self._account_records(url_path, self._user(sandbox, payload))
+        return {"accounts": [_view(account, data.ACCOUNT_KEYS) for account in accounts]}
+
+    def _account(self, sandbox, url_path: str, payload: dict, key: str) -> dict:
+        accounts = self._account_records(url_path, self._user(sandbox, payload))
+        return _find(accounts, key, payload.get(key), ACCOUNT_NOT_FOUND, "Account")
+
+    def _beneficiaries(self, sandbox, url_path: str, payload: dict) -> dict:
+        account = self._account(sandbox, url_path, payload, "iban")
+        return {"beneficiaries": account.get("beneficiaries", [])}
+
+    def _account_details(self, sandbox, url_path: str, payload: dict) -> dict:
+        account = self._account(sandbox, url_path, payload, "account")
+        return _view(account, data.ACCOUNT_DETAILS_KEYS)
+
+    def _account_transactions(self, sandbox, url_path: str, payload: dict) -> dict:
+        account = self._account(sandbox, url_path, payload, "account")
+        transactions = sandbox.between(
+            account.get("transactions", []),
+            "date",
+            payload.get("dateFrom"),
+            payload.get("dateTo"),
+        )
+        return {"account": account["account"], "transactions": transactions}
+
+    def _card(self, sandbox, payload: dict) -> dict:
+        cards = self._user(sandbox, payload)["cards"]
+        card_number = payload.get("cardNumber")
+        return _find(cards, "cardNumber", card_number, CARD_NOT_FOUND, "Card")
+
+    def _cards(self, sandbox, url_path: str, payload: dict) -> dict:
+        cards = self._user(sandbox, payload)["cards"]
+        return {"cards": [_view(card, data.CARD_KEYS) for card in cards]}
+
+    def _card_details(self, sandbox, url_path: str, payload: dict) -> dict:
+        return _view(self._card(sandbox, payload), data.CARD_DETAILS_KEYS)
+
+    def _card_transactions(self, sandbox, url_path: str, payload: dict) -> dict:
+        card = self._card(sandbox, payload)
+        transactions = sandbox.between(
+            card.get("transactions", []),
+            "date",
+            payload.get("dateFrom"),
+            payload.get("dateTo"),
+        )
+        return {"cardNumber": card["cardNumber"], "transactions": transactions}
+
+    def _scheduled_payments(self, sandbox, url_path: str, payload: dict) -> dict:
+        account = self._account(sandbox, url_path, payload, "account")
+        return {"payments": account.get("scheduledPayments", [])}
+
+    def _standing_orders(self, sandbox, url_path: str, payload: dict) -> dict:
+        account = self._account(sandbox, url_path, payload, "account")
+        return {"standingOrders": account.get("standingOrders", [])}
+
+    def _request_consent(self, sandbox, payload: dict) -> dict:
+        consent_id = str(uuid.uuid4())
+        self.consents[consent_id] = {
+            "consentId": consent_id,
+            "applicationId": payload.get("applicationId"),
+            "status": "Authorized",
+        }
+        return {"consentId": consent_id, "status": "AwaitingAuthorization"}
+
+    def _consent(self, payload: dict) -> dict:
+        consent_id = payload.get("consentId")
+        consent = self.consents.get(consent_id)
+
+        if consent is None:
+            raise EmulatedError(INVALID_CONSENT, f"Consent {consent_id} was not found.")
+
+        return consent
+
+    def _consent_information(self, sandbox, payload: dict) -> dict:
+        return dict(self._consent(payload), userId=payload.get("userId"))
+
+    def _delete_consent(self, sandbox, payload: dict) -> dict:
+        consent = self._consent(payload)
+
+        if payload.get("tanNumber") == "smsotp":
+            return {"consentId": consent["consentId"], "status": "TanSent"}
+
+        consent["status"] = "Revoked"
+        return {"consentId": consent["consentId"], "status": "Revoked"}
+
+    def _sandbox_request(self, method: str, url_path: str, payload) -> typing.Any:
+        self._responses.clear()
+
+        if url_path == "sandbox":
+            sandbox_id = (payload or {}).get("sandboxId")
+            self.sandboxes[sandbox_id] = data.SandboxData(
+                sandbox_id, self.seed, self.profile
+            )
+            return {"sandboxId": sandbox_id}
+
+        sandbox_id = url_path.split("/", 1)[1]
+
+        if method == "PUT":
+            self.sandboxes[sandbox_id] = data.SandboxData.from_export(
+                sandbox_id, payload or {}
+            )
+            return {"sandboxId": sandbox_id}
+
+        if sandbox_id not in self.sandboxes:
+            raise EmulatedError(
+                SANDBOX_NOT_FOUND, f"Sandbox {sandbox_id} was not found."
+            )
+
+        if method == "DELETE":
+            del self.sandboxes[sandbox_id]
+            return True
+
+        return self.sandboxes[sandbox_id].export()
+
+    def _check_consent(self, headers: typing.Mapping):
+        if headers.get("X-Consent-Check") != "true":
+            return
+
+        consent_id = headers.get("Consent-Id")
+
+        if not consent_id:
+            raise EmulatedError(INVALID_CONSENT, "The consent ID is missing.")
+
+        if self.strict_consents:
+            consent = self.consents.get(consent_id)
+
+            if consent is None or consent["status"] != "Authorized":
+                raise EmulatedError(
+                    INVALID_CONSENT, f"Consent {consent_id} is not authorized."
+                )
+
+    def _check_signature(self, headers: typing.Mapping, body: bytes):
+        if headers.get("X-Certificate-Check") != "true":
+            return
+
+        detached_signature = headers.get("Signature") or ""
+
+        try:
+            if self.tpp_verifier is not None:
+                valid = self.tpp_verifier.verify(detached_signature, body)
+            else:
+                _signature_parser.split(detached_signature)
+                valid = True
+        except ValueError:
+            valid = False
+
+        if not valid:
+            raise EmulatedError(INVALID_SIGNATURE, "The request signature is invalid.")
+
+    def _encode(self, status: int, envelope) -> typing.Tuple[int, bytes, dict]:
+        body = self.json_codec.dumps(envelope)
+        headers = {}
+
+        if self.signer is not None and status < 400:
+            headers["Signature"] = self.signer.detached_signature(body)
+
+        return status, body, headers
+
+    def _cache(self, key, response: tuple) -> tuple:
+        self._responses[key] = response
+
+        if len(self._responses) > self.cache_size:
+            self._responses.popitem(last=False)
+
+        return response
+
+    def respond(
+        self, method: str, url_path: str, headers: typing.Mapping, body: bytes
+    ) -> typing.Tuple[int, bytes, dict]:
+        """
+        Returns the status, body and headers of the response to the given
+        request, after its access token has been checked.
+        """
+        try:
+            request_body = self.json_codec.loads(body) if body else None
+        except ValueError:
+            request_body = None
+
+        try:
+            if not isinstance(request_body, dict):
+                raise EmulatedError("2.1.1", status=400)
+
+            header = request_body.get("header")
+
+            if not isinstance(header, dict):
+                raise EmulatedError("1.1.1", status=400)
+
+            if not header.get("application"):
+                raise EmulatedError("1.1.3", status=400)
+
+            try:
+                uuid.UUID(str(header.get("ID")))
+            except ValueError:
+                raise EmulatedError("3.1.1", status=400)
+
+            self._check_signature(headers, body)
+            payload = request_body.get("payload")
+
+            if url_path == "sandbox" or url_path.startswith("sandbox/"):
+                response_payload = self._sandbox_request(method, url_path, payload)
+                return self._encode(
+                    200, {"payload": response_payload, "exception": None}
+                )
+
+            if method != "POST":
+                raise EmulatedError("1.1.0", status=405)
+
+            sandbox = self.sandbox(headers.get("sandbox_id", ""))
+            consent_endpoint = self.consent_endpoints.get(url_path)
+
+            if consent_endpoint is not None:
+                response_payload = consent_endpoint(sandbox, payload or {})
+                return self._encode(
+                    200, {"payload": response_payload, "exception": None}
+                )
+
+            endpoint = self.endpoints.get(url_path)
+
+            if endpoint is None:
+                return self._encode(404, {"Message": "Error 1.2"})
+
+            self._check_consent(headers)
+            key = (sandbox.sandbox_id, url_path, self.json_codec.dumps(payload))
+            response = self._responses.get(key)
+
+            if response is not None:
+                return response
+
+            response_payload = endpoint(sandbox, url_path, payload or {})
+            return self._cache(
+                key,
+                self._encode(200, {"payload": response_payload, "exception": None}),
+            )
+        except EmulatedError as error:
+            return self._encode(error.status, error.envelope())
+
+    def _authorized(self, request: web.Request) -> bool:
+        authorization = request.headers.get("Authorization", "")
+        scheme, _, access_token = authorization.partition(" ")
+
+        if scheme != "Bearer" or not access_token:
+            return False
+
+        return self.access_tokens is None or access_token in self.access_tokens
+
+    async def _token(self, request: web.Request) -> web.Response:
+        form = await request.post()
+
+        if form.get("grant_type") not in ("authorization_code", "refresh_token"):
+            return web.json_response({"error": "unsupported_grant_type"}, status=400)
+
+        access_token = uuid.uuid4().hex
+
+        if self.access_tokens is not None:
+            self.access_tokens.add(access_token)
+
+        return web.json_response(
+            {
+                "access_token": access_token,
+                "refresh_token": uuid.uuid4().hex,
+                "expires_in": 3600,
+                "token_type": "Bearer",
+            }
+        )
+
+    async def handle(self, request: web.Request) -> web.Response:
+        url_path = request.match_info["url_path"]
+        self.requests[url_path] = self.requests.get(url_path, 0) + 1
+        latency = self.endpoint_latencies.get(url_path, self.latency)
+
+        if latency is not None:
+            delay = latency.sample()
+
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+        if self.error_rate and self._rng.random() < self.error_rate:
+            return web.Response(status=503, text="Service Unavailable")
+
+        if url_path == TOKEN_PATH:
+            return await self._token(request)
+
+        if not self._authorized(request):
+            return web.json_response(
+                {"Message": "Authorization has been denied for this request."},
+                status=401,
+            )
+
+        body = await request.read()
+        status, response_body, headers = self.respond(
+            request.method, url_path, request.headers, body
+        )
+        return web.Response(
+            body=response_body,
+            status=status,
+            headers=headers,
+            content_type="application/json",
+        )
+
+    def app(self) -> web.Application:
+        """
+        Returns the ``aiohttp`` application of the emulator.
+        """
+        app = web.Application(client_max_size=64 * 1024 ** 2)
+        app.router.add_route("*", f"{self.base_path}/{{url_path:.*}}", self.handle)
+        return app
+
+    def start(self, host: str = "127.0.0.1", port: int = 0) -> "RunningEmulator":
+        """
+        Starts serving the emulator in a background thread, e.g. for tests and
+        benchmarks of synchronous clients. Port ``0`` picks a free port.
+        """
+        return RunningEmulator(self, host, port)
+
+    def run(self, host: str = "127.0.0.1", port: int = 8080, workers: int = 1):
+        """
+        Serves the emulator until interrupted. Multiple worker processes share
+        the same port, and each one keeps its own consents and sandboxes.
+        """
+        if workers <= 1:
+            web.run_app(self.app(), host=host, port=port, access_log=None, print=None)
+            return
+
+        context = multiprocessing.get_context(
+            "fork" if "fork" in multiprocessing.get_all_start_methods() else None
+        )
+        processes = [
+            context.Process(target=self._run_worker, args=(host, port), daemon=True)
+            for _ in range(workers)
+        ]
+
+        for process in processes:
+            process.start()
+
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.terminate()
+
+    def _run_worker(self, host: str, port: int):
+        try:
+            web.run_app(
+                self.app(),
+                host=host,
+                port=port,
+                reuse_port=True,
+                access_log=None,
+                print=None,
+            )
+        except KeyboardInterrupt:
+            pass
+
+
+class RunningEmulator:
+    """
+    An emulator served in a background thread, until :meth:`stop` is called
+    or its context exits. ``url`` is the base URL of the emulated API.
+    """
+
+    def __init__(self, emulator: Emulator, host: str, port: int):
+        self.emulator = emulator
+        self.url = None
+        self.loop = asyncio.new_event_loop()
+        self._started = threading.Event()
+        self._exception = None
+        self._thread = threading.Thread(
+            target=self._serve, args=(host, port), daemon=True
+        )
+        self._thread.start()
+        self._started.wait()
+
+        if self._exception is not None:
+            raise self._exception
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def _serve(self, host: str, port: int):
+        asyncio.set_event_loop(self.loop)
+        runner = web.AppRunner(self.emulator.app(), access_log=None)
+
+        try:
+            self.loop.run_until_complete(runner.setup())
+            self.loop.run_until_complete(web.TCPSite(runner, host, port).start())
+        except Exception as exception:
+            self._exception = exception
+            self._started.set()
+            return
+
+        host, port = runner.addresses[0][:2]
+        self.url = f"http://{host}:{port}{self.emulator.base_path}"
+        self._started.set()
+        self.loop.run_forever()
+        self.loop.run_until_complete(runner.cleanup())
+        self.loop.close()
+
+    def stop(self):
+        """
+        Stops serving the emulator.
+        """
+        if self._thread.is_alive():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join()
@@ -0,0 +1,204 @@
+from datetime import datetime
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from .. import account_information, aio, resources
+from ..base import exceptions
+from . import data, latency, server
+
+
+@pytest.fixture(scope="module")
+def emulator() -> server.Emulator:
+    return server.Emulator(profile=data.DataProfile(transactions=100))
+
+
+@pytest.fixture(scope="module")
+def running_emulator(emulator: server.Emulator) -> server.RunningEmulator:
+    with emulator.start() as running_emulator:
+        yield running_emulator
+
+
+@pytest.fixture(scope="module")
+def tpp_private_key() -> bytes:
+    private_key, _ = server.generate_signing_key()
+    return private_key
+
+
+@pytest.fixture
+def client(
+    emulator: server.Emulator,
+    running_emulator: server.RunningEmulator,
+    tpp_private_key: bytes,
+) -> account_information.AccountInformationPSD2Client:
+    client = account_information.AccountInformationPSD2Client(
+        client_id="client-id", client_secret="client-secret"
+    )
+    client.set_base_url(running_emulator.url)
+    client.set_nbg_certificate(emulator.certificate)
+    client.set_tpp_private_key(tpp_private_key)
+    client.set_access_token("access-token")
+    client.set_consent_id("consent-id")
+    client.set_sandbox("sandbox-id")
+    yield client
+    client.close()
+
+
+def test_endpoints(client: account_information.AccountInformationPSD2Client):
+    """
+    Ensure that the emulator serves every endpoint of the client with signed
+    responses, which the client verifies.
+    """
+    date_from = datetime(2020, 1, 1)
+    date_to = datetime(2020, 12, 31)
+    accounts = client.accounts("user").accounts
+    account = accounts[0]
+
+    assert len(accounts) == 2
+    assert client.account_details("user", account.account).opening_date
+    assert client.account_beneficiaries("user", account.iban).beneficiaries
+
+    transactions = client.account_transactions(
+        "user", account.account, date_from, date_to
+    ).transactions
+
+    assert 0 < len(transactions) < 100
+    assert all(date_from <= transaction.date <= date_to for transaction in transactions)
+    assert list(
+        client.iter_account_transactions("user", account.account, date_from, date_to)
+    ) == [transaction.payload for transaction in transactions]
+
+    card = client.cards("user").cards[0]
+
+    assert client.card_details("user", card.card_number).credit_limit
+    assert client.card_transactions(
+        "user", card.card_number, date_from, date_to
+    ).transactions
+
+    foreign_currency_account = client.foreign_currency_accounts("user").accounts[0]
+
+    assert foreign_currency_account.currency != "EUR"
+    assert client.foreign_currency_account_transactions(
+        "user", foreign_currency_account.account, date_from, date_to
+    ).transactions
+    assert client.scheduled_payments("user", account.account, date_from, date_to)
+    assert client.standing_orders("user", account.account, date_from, date_to)
+
+
+def test_response_exceptions(client: account_information.AccountInformationPSD2Client):
+    with pytest.raises(exceptions.ResponseException) as exception_info:
+        client.account_details("user", "unknown-account")
+
+    assert exception_info.value.code == server.ACCOUNT_NOT_FOUND
+
+    with pytest.raises(exceptions.GenericResponseError) as exception_info:
+        client.accounts("")
+
+    assert exception_info.value.code == "2.2.1"
+
+
+def test_sandboxes_and_consents(
+    client: account_information.AccountInformationPSD2Client,
+):
+    client.create_sandbox("new-sandbox-id")
+    export = client.export_sandbox("new-sandbox-id")
+    export["users"] = {"imported-user": {"accounts": [], "cards": []}}
+    client.import_sandbox("new-sandbox-id", export)
+    user_client = client.for_user(
+        "access-token", consent_id="consent-id", sandbox_id="new-sandbox-id"
+    )
+
+    assert len(user_client.accounts("imported-user").accounts) == 0
+
+    with pytest.raises(exceptions.ResponseException):
+        user_client.accounts("user")
+
+    consent_id = client.generate_consent()["consentId"]
+
+    assert client.get_consent_information(consent_id, "user")["status"] == (
+        "Authorized"
+    )
+    assert client.delete_consent(consent_id, "user", "123456")["status"] == "Revoked"
+    assert client.delete_sandbox("new-sandbox-id") is True
+
+
+def test_not_authenticated():
+    emulator = server.Emulator(access_tokens=["access-token"], sign_responses=False)
+    client = account_information.AccountInformationPSD2Client(
+        client_id="client-id", client_secret="client-secret"
+    )
+
+    with emulator.start() as running_emulator:
+        client.set_base_url(running_emulator.url)
+        client.set_access_token("other-access-token")
+
+        with pytest.raises(exceptions.NotAuthenticatedRequest):
+            client.accounts("user")
+
+        client.set_access_token("access-token")
+
+        assert isinstance(client.accounts("user"), resources.AccountList)
+
+
+def test_strict_consents_and_request_signatures(tpp_private_key: bytes):
+    tpp_certificate = server.generate_signing_key()[1]
+    emulator = server.Emulator(strict_consents=True, tpp_certificate=tpp_certificate)
+    client = account_information.AccountInformationPSD2Client(
+        client_id="client-id", client_secret="client-secret"
+    )
+    client.set_access_token("access-token")
+    client.set_tpp_private_key(tpp_private_key)
+    client.set_response_verification(False)
+
+    with emulator.start() as running_emulator:
+        client.set_base_url(running_emulator.url)
+
+        with pytest.raises(exceptions.ResponseException) as exception_info:
+            client.accounts("user")
+
+        assert exception_info.value.code == server.INVALID_SIGNATURE
+
+        client.set_tpp_private_key(None)
+        client.set_consent_id("unknown-consent-id")
+
+        with pytest.raises(exceptions.ResponseException) as exception_info:
+            client.accounts("user")
+
+        assert exception_info.value.code == server.INVALID_CONSENT
+
+        client.set_consent_id(client.generate_consent()["consentId"])
+
+        assert client.accounts("user").accounts
+
+
+def test_async_client(running_emulator: server.RunningEmulator):
+    async def accounts():
+        async with aio.AccountInformationPSD2Client(
+            client_id="client-id", client_secret="client-secret"
+        ) as client:
+            client.set_base_url(running_emulator.url)
+            client.set_access_token("access-token")
+            return await asyncio.gather(
+                *[client.accounts(f"user-{index}") for index in range(20)]
+            )
+
+    loop = asyncio.new_event_loop()
+
+    try:
+        account_lists = loop.run_until_complete(accounts())
+    finally:
+        loop.close()
+
+    assert len({account_list.accounts[0].iban for account_list in account_lists}) == 20
+
+
+def test_latency():
+    assert latency.Latency.parse("0.25").sample() == 0.25
+    assert 0.1 <= latency.Latency.parse("uniform:0.1,0.2").sample() <= 0.2
+    assert latency.Latency("lognormal", 0.05, 0.5).sample() > 0
+    assert latency.parse_latencies(["card/list=exponential:0.1"])["card/list"]
+
+    with pytest.raises(ValueError):
+        latency.Latency.parse("pareto:1")
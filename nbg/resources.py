@@ -0,0 +1,183 @@
+"""
+Typed resources returned by the endpoints of the Account Information API.
+Fields are converted lazily, when accessed, and fields that are not declared
+here can still be accessed by their payload key, e.g. ``account["alias"]``.
+"""
+
+from datetime import datetime
+from decimal import Decimal
+
+from .base.resources import Field, ListField, Resource
+
+
+class Account(Resource):
+    """
+    A domestic or foreign currency account.
+    """
+
+    __slots__ = ()
+
+    account = Field("account")
+    iban = Field("iban")
+    alias = Field("alias")
+    currency = Field("currency")
+    product = Field("product")
+    ledger_balance = Field("ledgerBalance", Decimal)
+    available_balance = Field("availableBalance", Decimal)
+
+
+class AccountDetails(Account):
+    """
+    The details of a domestic or foreign currency account.
+    """
+
+    __slots__ = ()
+
+    opening_date = Field("openingDate", datetime)
+
+
+class AccountList(Resource):
+    """
+    The accounts of a user.
+    """
+
+    __slots__ = ()
+
+    accounts = ListField("accounts", Account)
+
+
+class Beneficiary(Resource):
+    """
+    A beneficiary of an account.
+    """
+
+    __slots__ = ()
+
+    name = Field("name")
+    iban = Field("iban")
+    alias = Field("alias")
+    bank = Field("bank")
+
+
+class BeneficiaryList(Resource):
+    """
+    The beneficiaries of an account.
+    """
+
+    __slots__ = ()
+
+    beneficiaries = ListField("beneficiaries", Beneficiary)
+
+
+class Transaction(Resource):
+    """
+    A transaction of an account or card.
+    """
+
+    __slots__ = ()
+
+    id = Field("id")
+    amount = Field("amount", Decimal)
+    currency = Field("currency")
+    date = Field("date", datetime)
+    value_date = Field("valueDate", datetime)
+    description = Field("description")
+    balance = Field("balance", Decimal)
+
+
+class TransactionList(Resource):
+    """
+    The transactions of an account or card in a time period.
+    """
+
+    __slots__ = ()
+
+    account = Field("account")
+    transactions = ListField("transactions", Transaction)
+
+
+class Card(Resource):
+    """
+    A card of a user.
+    """
+
+    __slots__ = ()
+
+    card_number = Field("cardNumber")
+    number = Field("number")
+    product = Field("product")
+    currency = Field("currency")
+    expiration_date = Field("expirationDate", datetime)
+
+
+class CardDetails(Card):
+    """
+    The details of a card.
+    """
+
+    __slots__ = ()
+
+    credit_limit = Field("creditLimit", Decimal)
+    available_balance = Field("availableBalance", Decimal)
+
+
+class CardList(Resource):
+    """
+    The cards of a user.
+    """
+
+    __slots__ = ()
+
+    cards = ListField("cards", Card)
+
+
+class ScheduledPayment(Resource):
+    """
+    A scheduled payment of an account.
+    """
+
+    __slots__ = ()
+
+    id = Field("id")
+    amount = Field("amount", Decimal)
+    currency = Field("currency")
+    execution_date = Field("executionDate", datetime)
+    beneficiary = Field("beneficiary")
+    description = Field("description")
+
+
+class ScheduledPaymentList(Resource):
+    """
+    The scheduled payments of an account in a time period.
+    """
+
+    __slots__ = ()
+
+    payments = ListField("payments", ScheduledPayment)
+
+
+class StandingOrder(Resource):
+    """
+    A standing order of an account.
+    """
+
+    __slots__ = ()
+
+    id = Field("id")
+    amount = Field("amount", Decimal)
+    currency = Field("currency")
+    frequency = Field("frequency")
+    start_date = Field("startDate", datetime)
+    end_date = Field("endDate", datetime)
+    beneficiary = Field("beneficiary")
+    description = Field("description")
+
+
+class StandingOrderList(Resource):
+    """
+    The standing orders of an account in a time period.
+    """
+
+    __slots__ = ()
+
+    standing_orders = ListField("standingOrders", StandingOrder)
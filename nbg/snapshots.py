@@ -0,0 +1,251 @@
+"""
+Concurrent snapshots of all Account Information API resources of a user.
+
+A snapshot resolves the dependency graph of the API: the accounts, cards and
+foreign currency accounts of the user are listed first and, as soon as each
+list arrives, the details, beneficiaries and transactions of every listed item
+are fetched concurrently, with bounded parallelism.
+"""
+
+from collections.abc import Mapping
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+import asyncio
+import typing
+
+
+class SnapshotStep:
+    """
+    A single API call of a snapshot. Calls that list resources can expand
+    to further calls for each one of the listed resources.
+    """
+
+    __slots__ = ("resource", "identifier", "method_name", "kwargs", "expand")
+
+    def __init__(
+        self,
+        resource: str,
+        method_name: str,
+        kwargs: dict,
+        identifier: str = None,
+        expand: typing.Callable[[dict], typing.List["SnapshotStep"]] = None,
+    ):
+        self.resource = resource
+        self.identifier = identifier
+        self.method_name = method_name
+        self.kwargs = kwargs
+        self.expand = expand
+
+    @property
+    def key(self) -> tuple:
+        return (self.resource, self.identifier)
+
+    def children(self, payload: dict) -> typing.List["SnapshotStep"]:
+        return self.expand(payload) if self.expand else []
+
+
+class Snapshot:
+    """
+    The consolidated result of a snapshot. Resources that list items (e.g.
+    ``accounts``) are stored as returned by the API, while resources of
+    individual items (e.g. ``account_details``) are stored in dictionaries,
+    keyed by account or card number. Failed calls are reported in ``errors``,
+    keyed by ``(resource, identifier)``.
+    """
+
+    def __init__(self):
+        self.resources = {}
+        self.errors = {}
+
+    def __getitem__(self, resource: str):
+        return self.resources[resource]
+
+    @property
+    def is_complete(self) -> bool:
+        """
+        Returns whether all API calls of the snapshot succeeded.
+        """
+        return not self.errors
+
+    def add(self, step: SnapshotStep, payload: dict):
+        if step.identifier is None:
+            self.resources[step.resource] = payload
+        else:
+            self.resources.setdefault(step.resource, {})[step.identifier] = payload
+
+    def add_error(self, step: SnapshotStep, exception: Exception):
+        self.errors[step.key] = exception
+
+
+def _list_items(payload: dict, key: str) -> typing.List[dict]:
+    items = payload.get(key) if isinstance(payload, Mapping) else None
+    return items if isinstance(items, list) else []
+
+
+def _item_identifier(item: dict, *keys: str) -> str:
+    for key in keys:
+        if item.get(key):
+            return item[key]
+
+    return None
+
+
+def snapshot_steps(
+    user_id: str, date_from: datetime, date_to: datetime
+) -> typing.List[SnapshotStep]:
+    """
+    Returns the root steps of the snapshot of the given user.
+    """
+    period = {"date_from": date_from, "date_to": date_to}
+
+    def account_steps(payload: dict) -> typing.List[SnapshotStep]:
+        steps = []
+
+        for item in _list_items(payload, "accounts"):
+            account = _item_identifier(item, "account", "number")
+            iban = item.get("iban")
+            kwargs = {"user_id": user_id, "account": account}
+            steps += [
+                SnapshotStep("account_details", "account_details", kwargs, account),
+                SnapshotStep(
+                    "account_transactions",
+                    "account_transactions",
+                    dict(kwargs, **period),
+                    account,
+                ),
+            ]
+
+            if iban:
+                steps.append(
+                    SnapshotStep(
+                        "account_beneficiaries",
+                        "account_beneficiaries",
+                        {"user_id": user_id, "iban": iban},
+                        account,
+                    )
+                )
+
+        return steps
+
+    def card_steps(payload: dict) -> typing.List[SnapshotStep]:
+        steps = []
+
+        for item in _list_items(payload, "cards"):
+            card_number = _item_identifier(item, "cardNumber", "number")
+            kwargs = {"user_id": user_id, "card_number": card_number}
+            steps += [
+                SnapshotStep("card_details", "card_details", kwargs, card_number),
+                SnapshotStep(
+                    "card_transactions",
+                    "card_transactions",
+                    dict(kwargs, **period),
+                    card_number,
+                ),
+            ]
+
+        return steps
+
+    def foreign_currency_account_steps(payload: dict) -> typing.List[SnapshotStep]:
+        steps = []
+
+        for item in _list_items(payload, "accounts"):
+            account = _item_identifier(item, "account", "number")
+            kwargs = {"user_id": user_id, "account": account}
+            steps += [
+                SnapshotStep(
+                    "foreign_currency_account_details",
+                    "foreign_currency_account_details",
+                    kwargs,
+                    account,
+                ),
+                SnapshotStep(
+                    "foreign_currency_account_beneficiaries",
+                    "foreign_currency_account_beneficiaries",
+                    kwargs,
+                    account,
+                ),
+                SnapshotStep(
+                    "foreign_currency_account_transactions",
+                    "foreign_currency_account_transactions",
+                    dict(kwargs, **period),
+                    account,
+                ),
+            ]
+
+        return steps
+
+    user_kwargs = {"user_id": user_id}
+    return [
+        SnapshotStep("accounts", "accounts", user_kwargs, expand=account_steps),
+        SnapshotStep("cards", "cards", user_kwargs, expand=card_steps),
+        SnapshotStep(
+            "foreign_currency_accounts",
+            "foreign_currency_accounts",
+            user_kwargs,
+            expand=foreign_currency_account_steps,
+        ),
+    ]
+
+
+def take_snapshot(
+    client, user_id: str, date_from: datetime, date_to: datetime, max_workers: int
+) -> Snapshot:
+    """
+    Takes the snapshot of the given user on a pool of ``max_workers`` threads.
+    """
+    snapshot = Snapshot()
+
+    def call(step: SnapshotStep):
+        return getattr(client, step.method_name)(**step.kwargs)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = {
+            executor.submit(call, step): step
+            for step in snapshot_steps(user_id, date_from, date_to)
+        }
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                step = pending.pop(future)
+
+                try:
+                    payload = future.result()
+                except Exception as e:
+                    snapshot.add_error(step, e)
+                    continue
+
+                snapshot.add(step, payload)
+
+                for child in step.children(payload):
+                    pending[executor.submit(call, child)] = child
+
+    return snapshot
+
+
+async def take_snapshot_async(
+    client, user_id: str, date_from: datetime, date_to: datetime, max_concurrency: int
+) -> Snapshot:
+    """
+    Takes the snapshot of the given user on the running event loop, with at
+    most ``max_concurrency`` requests in flight.
+    """
+    snapshot = Snapshot()
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run(step: SnapshotStep):
+        try:
+            async with semaphore:
+                payload = await getattr(client, step.method_name)(**step.kwargs)
+        except Exception as e:
+            snapshot.add_error(step, e)
+            return
+
+        snapshot.add(step, payload)
+        await asyncio.gather(*[run(child) for child in step.children(payload)])
+
+    await asyncio.gather(
+        *[run(step) for step in snapshot_steps(user_id, date_from, date_to)]
+    )
+    return snapshot
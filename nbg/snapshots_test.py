@@ -0,0 +1,108 @@
+from datetime import datetime
+import asyncio
+import time
+
+from . import snapshots
+
+LATENCY = 0.05
+
+
+def _payload(method_name: str, kwargs: dict) -> dict:
+    if method_name == "card_details":
+        raise RuntimeError("Card details are down")
+
+    if method_name == "accounts":
+        return {"accounts": [{"account": "1", "iban": "GR1"}, {"account": "2"}]}
+
+    if method_name == "cards":
+        return {"cards": [{"cardNumber": "4111"}]}
+
+    if method_name == "foreign_currency_accounts":
+        return {"accounts": [{"account": "3"}]}
+
+    return {"method": method_name, "kwargs": kwargs}
+
+
+class DummyClient:
+    """
+    Client that answers every endpoint of the snapshot after a fixed latency.
+    """
+
+    def __init__(self):
+        self.calls = []
+
+    def __getattr__(self, method_name):
+        def call(**kwargs):
+            self.calls.append(method_name)
+            time.sleep(LATENCY)
+            return _payload(method_name, kwargs)
+
+        return call
+
+
+class AsyncDummyClient(DummyClient):
+    def __getattr__(self, method_name):
+        async def call(**kwargs):
+            self.calls.append(method_name)
+            await asyncio.sleep(LATENCY)
+            return _payload(method_name, kwargs)
+
+        return call
+
+
+def _assert_snapshot(snapshot: snapshots.Snapshot, calls: list):
+    assert snapshot["accounts"]["accounts"][0]["account"] == "1"
+    assert set(snapshot["account_details"]) == {"1", "2"}
+    assert set(snapshot["account_beneficiaries"]) == {"1"}
+    assert snapshot["account_beneficiaries"]["1"]["kwargs"]["iban"] == "GR1"
+    assert snapshot["account_transactions"]["2"]["kwargs"]["date_to"] == datetime(
+        2020, 12, 31
+    )
+    assert set(snapshot["card_transactions"]) == {"4111"}
+    assert set(snapshot["foreign_currency_account_transactions"]) == {"3"}
+    assert "card_details" not in snapshot.resources
+    assert not snapshot.is_complete
+    assert list(snapshot.errors) == [("card_details", "4111")]
+    assert len(calls) == 13
+
+
+def test_take_snapshot():
+    """
+    Ensure that snapshots consolidate all resources, report failures per
+    resource and take about as long as their critical path.
+    """
+    client = DummyClient()
+    started_at = time.monotonic()
+    snapshot = snapshots.take_snapshot(
+        client, "user", datetime(2020, 1, 1), datetime(2020, 12, 31), max_workers=16
+    )
+    elapsed = time.monotonic() - started_at
+
+    _assert_snapshot(snapshot, client.calls)
+    assert elapsed < 13 * LATENCY / 2
+
+
+def test_take_snapshot_async():
+    """
+    Ensure that asynchronous snapshots behave like the threaded ones.
+    """
+    client = AsyncDummyClient()
+    loop = asyncio.new_event_loop()
+
+    try:
+        started_at = time.monotonic()
+        snapshot = loop.run_until_complete(
+            snapshots.take_snapshot_async(
+                client,
+                "user",
+                datetime(2020, 1, 1),
+                datetime(2020, 12, 31),
+                max_concurrency=16,
+            )
+        )
+        elapsed = time.monotonic() - started_at
+    finally:
+        loop.close()
+
+    _assert_snapshot(snapshot, client.calls)
+    assert elapsed < 13 * LATENCY / 2
@@ -0,0 +1,414 @@
+"""
+Columnar tables of transactions, for analytics over the responses of the
+transaction endpoints of the Account Information API.
+
+Columns are built straight from the response payload into contiguous typed
+buffers of the standard library, so that they can be exported to NumPy and
+Arrow without copying them and aggregated with vectorized operations.
+NumPy and Arrow are only needed for the exports and can be installed with the
+``analytics`` extra.
+"""
+
+from array import array
+from datetime import datetime, timedelta
+import importlib
+import typing
+
+from .base import resources
+
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+# NumPy interprets the smallest 64-bit integer as ``NaT``.
+NAT = -(2 ** 63)
+
+AMOUNT = "amount"
+DATETIME = "datetime"
+CATEGORICAL = "categorical"
+STRING = "string"
+
+# Payload key, column name and kind of each column of a transaction table.
+TRANSACTION_COLUMNS = (
+    ("id", "id", STRING),
+    ("amount", "amount", AMOUNT),
+    ("currency", "currency", CATEGORICAL),
+    ("date", "date", DATETIME),
+    ("valueDate", "value_date", DATETIME),
+    ("description", "description", CATEGORICAL),
+)
+
+
+def _import_optional(module_name: str):
+    try:
+        return importlib.import_module(module_name)
+    except ImportError:
+        raise ImportError(
+            f"{module_name} is required to export transaction tables. "
+            f"It can be installed with: pip install nbg[analytics]"
+        )
+
+
+class Column:
+    """
+    A column of a table, holding its values in a typed buffer. Missing values
+    are stored as ``null_value`` and tracked in an Arrow-compatible validity
+    bitmap, which is only allocated once the first value is missing.
+    """
+
+    __slots__ = ("values", "validity", "null_value")
+
+    def __init__(self, typecode: str, null_value):
+        self.values = array(typecode)
+        self.validity = None
+        self.null_value = null_value
+
+    def __len__(self):
+        return len(self.values)
+
+    def append(self, value):
+        index = len(self.values)
+
+        if value is None:
+            if self.validity is None:
+                self.validity = bytearray(b"\xff" * (index >> 3))
+                self.validity.append((1 << (index & 7)) - 1)
+            elif index >> 3 >= len(self.validity):
+                self.validity.append(0)
+
+            self.values.append(self.null_value)
+            return
+
+        if self.validity is not None:
+            if index >> 3 >= len(self.validity):
+                self.validity.append(0)
+
+            self.validity[index >> 3] |= 1 << (index & 7)
+
+        self.values.append(value)
+
+    def truncate(self, length: int):
+        """
+        Drops the values from ``length`` onwards, e.g. those of a row that
+        could not be appended in full.
+        """
+        if len(self.values) > length:
+            del self.values[length:]
+
+        if self.validity is not None:
+            size = (length + 7) >> 3
+
+            if len(self.validity) > size:
+                del self.validity[size:]
+
+            # Bits past the end must stay unset, as missing values only
+            # leave them as is.
+            if length & 7:
+                self.validity[size - 1] &= (1 << (length & 7)) - 1
+
+    @property
+    def null_count(self) -> int:
+        if self.validity is None:
+            return 0
+
+        return len(self.values) - sum(bin(byte).count("1") for byte in self.validity)
+
+    def is_valid(self, index: int) -> bool:
+        if self.validity is None:
+            return True
+
+        return bool(self.validity[index >> 3] & (1 << (index & 7)))
+
+
+class DictionaryColumn(Column):
+    """
+    A dictionary-encoded column, holding the code of each value and the list
+    of distinct values, in order of appearance.
+    """
+
+    __slots__ = ("categories", "_codes")
+
+    def __init__(self):
+        super().__init__("i", -1)
+        self.categories = []
+        self._codes = {}
+
+    def append(self, value):
+        if value is None:
+            super().append(None)
+            return
+
+        code = self._codes.get(value)
+
+        if code is None:
+            code = self._codes[value] = len(self.categories)
+            self.categories.append(value)
+
+        super().append(code)
+
+    def truncate(self, length: int):
+        super().truncate(length)
+
+        # Codes follow the order of appearance, so the categories that only
+        # the dropped values used are the last ones.
+        used = max(self.values, default=-1) + 1
+
+        for category in self.categories[used:]:
+            del self._codes[category]
+
+        del self.categories[used:]
+
+    def __getitem__(self, index: int):
+        code = self.values[index]
+        return None if code < 0 else self.categories[code]
+
+
+class TransactionTable:
+    """
+    A columnar table of transactions. Amounts are stored as fixed-point
+    integers in units of ``1 / amount_scale`` or, if ``amount_scale`` is
+    ``None``, as floats. Dates are stored as microseconds since the epoch and
+    categorical fields, e.g. currencies, are dictionary-encoded.
+
+    :param amount_scale: The units of fixed-point amounts per unit of currency.
+                         Defaults to ``100``, i.e. cents.
+    :type amount_scale: int
+
+    ---
+    **Usage**
+
+    .. code-block:: python
+
+        from nbg.tables import TransactionTable
+
+        table = TransactionTable.from_payload(
+            client.account_transactions(
+                user_id="your_user_id",
+                account="8000123456",
+                date_from=datetime(2020, 1, 1),
+                date_to=datetime(2020, 12, 31),
+            )
+        )
+        columns = table.to_numpy()
+        total = columns["amount"].sum() / table.amount_scale
+    """
+
+    columns_spec = TRANSACTION_COLUMNS
+
+    def __init__(self, amount_scale: typing.Optional[int] = 100):
+        self.amount_scale = amount_scale
+        self.columns = {}
+
+        for _, name, kind in self.columns_spec:
+            if kind == AMOUNT:
+                self.columns[name] = (
+                    Column("d", float("nan"))
+                    if amount_scale is None
+                    else Column("q", 0)
+                )
+            elif kind == DATETIME:
+                self.columns[name] = Column("q", NAT)
+            elif kind == CATEGORICAL:
+                self.columns[name] = DictionaryColumn()
+            else:
+                self.columns[name] = []
+
+        self._datetimes = {}
+
+    def __len__(self):
+        return len(self.columns["amount"])
+
+    def __getitem__(self, name: str) -> typing.Union[Column, list]:
+        return self.columns[name]
+
+    @classmethod
+    def from_records(
+        cls,
+        records: typing.Iterable[typing.Mapping],
+        amount_scale: typing.Optional[int] = 100,
+    ) -> "TransactionTable":
+        """
+        Builds a table from the given transaction records, e.g. those yielded
+        by ``iter_account_transactions``.
+        """
+        table = cls(amount_scale)
+        table.extend(records)
+        return table
+
+    @classmethod
+    def from_payload(
+        cls,
+        payload: typing.Mapping,
+        records_key: str = "transactions",
+        amount_scale: typing.Optional[int] = 100,
+    ) -> "TransactionTable":
+        """
+        Builds a table from the ``records_key`` list of the given response
+        payload, e.g. the one returned by ``account_transactions``.
+        """
+        return cls.from_records(payload.get(records_key) or [], amount_scale)
+
+    def _amount(self, value) -> typing.Union[int, float, None]:
+        if value is None:
+            return None
+
+        if self.amount_scale is None:
+            return float(value)
+
+        return round(float(value) * self.amount_scale)
+
+    def _datetime(self, value) -> typing.Optional[int]:
+        if value is None:
+            return None
+
+        if isinstance(value, datetime):
+            return (value.replace(tzinfo=None) - EPOCH) // MICROSECOND
+
+        # Transactions of the same day share their dates, so they are only
+        # parsed once per table.
+        microseconds = self._datetimes.get(value)
+
+        if microseconds is None:
+            parsed_value = resources.parse_datetime(value)
+            microseconds = (parsed_value - EPOCH) // MICROSECOND
+            self._datetimes[value] = microseconds
+
+        return microseconds
+
+    def append(self, record: typing.Mapping):
+        """
+        Appends a transaction record to the table. If the record cannot be
+        appended in full, e.g. because one of its dates is invalid, the table
+        is left as it was.
+
+        Columns cannot grow while they are exported by :meth:`to_numpy` or
+        :meth:`to_arrow`, so appending raises ``BufferError`` until the
+        exported arrays are deleted.
+        """
+        length = len(self)
+
+        try:
+            for key, name, kind in self.columns_spec:
+                value = record.get(key)
+
+                if kind == AMOUNT:
+                    value = self._amount(value)
+                elif kind == DATETIME:
+                    value = self._datetime(value)
+
+                self.columns[name].append(value)
+        except BaseException as exception:
+            for column in self.columns.values():
+                if isinstance(column, Column):
+                    column.truncate(length)
+                else:
+                    del column[length:]
+
+            if isinstance(exception, BufferError):
+                raise BufferError(
+                    "Transaction tables cannot grow while their columns are "
+                    "exported. Delete the arrays returned by to_numpy() or "
+                    "to_arrow(), or copy them, before appending."
+                ) from exception
+
+            raise
+
+    def extend(self, records: typing.Iterable[typing.Mapping]):
+        """
+        Appends the given transaction records to the table.
+        """
+        for record in records:
+            self.append(record)
+
+    def to_numpy(self) -> dict:
+        """
+        Returns the columns of the table as NumPy arrays, which share their
+        memory with the table, so the table cannot grow while they exist.
+        Missing dates are ``NaT``, missing float amounts are ``NaN`` and
+        categorical columns hold the codes of their values in
+        ``table[name].categories``, or ``-1`` if missing.
+        """
+        numpy = _import_optional("numpy")
+        arrays = {}
+
+        for _, name, kind in self.columns_spec:
+            column = self.columns[name]
+
+            if kind == AMOUNT:
+                dtype = numpy.float64 if self.amount_scale is None else numpy.int64
+                arrays[name] = numpy.frombuffer(column.values, dtype=dtype)
+            elif kind == DATETIME:
+                arrays[name] = numpy.frombuffer(column.values, dtype="datetime64[us]")
+            elif kind == CATEGORICAL:
+                arrays[name] = numpy.frombuffer(column.values, dtype=numpy.int32)
+            else:
+                arrays[name] = numpy.array(column, dtype=object)
+
+        return arrays
+
+    def to_structured_array(self):
+        """
+        Returns the table as a NumPy structured array, with one record per
+        transaction. Unlike :meth:`to_numpy`, this interleaves the columns
+        into a single new buffer.
+        """
+        numpy = _import_optional("numpy")
+        arrays = self.to_numpy()
+        structured_array = numpy.empty(
+            len(self),
+            dtype=[(name, column_array.dtype) for name, column_array in arrays.items()],
+        )
+
+        for name, column_array in arrays.items():
+            structured_array[name] = column_array
+
+        return structured_array
+
+    def to_arrow(self):
+        """
+        Returns the table as an Arrow record batch. Fixed-width columns share
+        their memory with the table, which cannot grow while they exist,
+        categorical columns become dictionary arrays and the scale of
+        fixed-point amounts is stored in the ``amount_scale`` metadata of the
+        schema.
+        """
+        pyarrow = _import_optional("pyarrow")
+        length = len(self)
+        names = []
+        arrays = []
+
+        def from_column(arrow_type, column: Column):
+            validity = column.validity
+            buffers = [
+                None if validity is None else pyarrow.py_buffer(validity),
+                pyarrow.py_buffer(column.values),
+            ]
+            return pyarrow.Array.from_buffers(
+                arrow_type, length, buffers, null_count=column.null_count
+            )
+
+        for _, name, kind in self.columns_spec:
+            column = self.columns[name]
+
+            if kind == AMOUNT:
+                amount_type = (
+                    pyarrow.float64() if self.amount_scale is None else pyarrow.int64()
+                )
+                arrays.append(from_column(amount_type, column))
+            elif kind == DATETIME:
+                arrays.append(from_column(pyarrow.timestamp("us"), column))
+            elif kind == CATEGORICAL:
+                arrays.append(
+                    pyarrow.DictionaryArray.from_arrays(
+                        from_column(pyarrow.int32(), column),
+                        pyarrow.array(column.categories, pyarrow.string()),
+                    )
+                )
+            else:
+                arrays.append(pyarrow.array(column, pyarrow.string()))
+
+            names.append(name)
+
+        metadata = {"amount_scale": str(self.amount_scale)}
+        record_batch = pyarrow.RecordBatch.from_arrays(arrays, names=names)
+        return record_batch.replace_schema_metadata(metadata)
@@ -0,0 +1,144 @@
+from datetime import datetime
+
+import pytest
+
+from . import resources, tables
+
+
+RECORDS = [
+    {
+        "id": "1",
+        "amount": 0.29,
+        "currency": "EUR",
+        "date": "2020-01-02T00:00:00.000Z",
+        "description": "ΠΛΗΡΩΜΗ ΜΕ ΚΑΡΤΑ",
+    },
+    {"id": "2", "amount": None, "description": "ΠΛΗΡΩΜΗ ΜΕ ΚΑΡΤΑ"},
+    {
+        "id": "3",
+        "amount": "-12.50",
+        "currency": "USD",
+        "date": datetime(2020, 1, 3),
+        "valueDate": "2020-01-04",
+    },
+]
+
+
+def test_transaction_table_columns():
+    """
+    Ensure that amounts become fixed-point integers, dates become microseconds
+    since the epoch and categorical fields get dictionary-encoded.
+    """
+    table = tables.TransactionTable.from_payload(
+        resources.TransactionList({"transactions": RECORDS})
+    )
+
+    assert len(table) == 3
+    assert table["id"] == ["1", "2", "3"]
+    assert list(table["amount"].values) == [29, 0, -1250]
+    assert list(table["date"].values) == [
+        (datetime(2020, 1, 2) - tables.EPOCH) // tables.MICROSECOND,
+        tables.NAT,
+        (datetime(2020, 1, 3) - tables.EPOCH) // tables.MICROSECOND,
+    ]
+    assert table["currency"].categories == ["EUR", "USD"]
+    assert list(table["currency"].values) == [0, -1, 1]
+    assert table["description"].categories == ["ΠΛΗΡΩΜΗ ΜΕ ΚΑΡΤΑ"]
+
+
+def test_transaction_table_float_amounts():
+    table = tables.TransactionTable.from_records(RECORDS, amount_scale=None)
+
+    assert table["amount"].values[0] == 0.29
+    assert table["amount"].values[2] == -12.5
+
+
+def test_column_validity():
+    """
+    Ensure that the validity bitmap is only allocated once a value is missing
+    and that it tracks missing values across bytes.
+    """
+    column = tables.Column("q", 0)
+
+    for value in range(9):
+        column.append(value)
+
+    assert column.validity is None
+    assert column.null_count == 0
+
+    column.append(None)
+
+    for value in range(7):
+        column.append(value)
+
+    column.append(None)
+
+    assert len(column.validity) == 3
+    assert column.null_count == 2
+    assert [index for index in range(18) if not column.is_valid(index)] == [9, 17]
+
+
+def test_transaction_table_append_is_atomic():
+    """
+    Ensure that rows which cannot be appended in full, e.g. while a column is
+    exported, leave every column as it was.
+    """
+    table = tables.TransactionTable.from_records(RECORDS)
+    record = {"id": "4", "amount": 1, "currency": "GBP", "date": "2020-01-05"}
+    exported_values = memoryview(table["date"].values)
+
+    with pytest.raises(BufferError, match="exported"):
+        table.append(record)
+
+    exported_values.release()
+
+    with pytest.raises(ValueError):
+        table.append(dict(record, valueDate="not a date"))
+
+    assert {len(column) for column in table.columns.values()} == {3}
+    assert table["currency"].categories == ["EUR", "USD"]
+    assert table["amount"].null_count == 1
+    assert [table["amount"].is_valid(index) for index in range(8)] == [
+        True,
+        False,
+        True,
+    ] + [False] * 5
+
+    table.append(record)
+
+    assert len(table) == 4
+    assert table["currency"][3] == "GBP"
+    assert table["date"].is_valid(3)
+
+
+def test_transaction_table_to_numpy():
+    numpy = pytest.importorskip("numpy")
+    table = tables.TransactionTable.from_records(RECORDS)
+    columns = table.to_numpy()
+
+    assert columns["amount"].sum() == -1221
+    assert numpy.isnat(columns["date"][1])
+    assert columns["date"][0] == numpy.datetime64("2020-01-02T00:00:00")
+    assert numpy.shares_memory(
+        columns["amount"], numpy.frombuffer(table["amount"].values, numpy.int64)
+    )
+    assert table.to_structured_array()["currency"].tolist() == [0, -1, 1]
+
+    with pytest.raises(BufferError):
+        table.extend(RECORDS)
+
+    del columns
+    table.extend(RECORDS)
+
+    assert len(table) == 6
+
+
+def test_transaction_table_to_arrow():
+    pytest.importorskip("pyarrow")
+    table = tables.TransactionTable.from_records(RECORDS)
+    record_batch = table.to_arrow()
+
+    assert record_batch.num_rows == 3
+    assert record_batch.column(1).to_pylist() == [29, None, -1250]
+    assert record_batch.column(2).to_pylist() == ["EUR", None, "USD"]
+    assert record_batch.schema.metadata == {b"amount_scale": b"100"}
@@ -0,0 +1,251 @@
+"""
+Parallel fetching of long time periods from the endpoints of the Account
+Information API that accept a ``date_from``/``date_to`` range.
+
+The period is split into consecutive windows, which are fetched concurrently.
+The size of each new window adapts to the responses observed so far: it
+shrinks when responses are large or slow and grows when they are sparse.
+The responses are stitched back in chronological order into a single payload
+and records returned by two adjacent windows are de-duplicated.
+"""
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+import asyncio
+import json
+import time
+import typing
+
+
+WINDOWED_ENDPOINTS = (
+    "account_transactions",
+    "card_transactions",
+    "foreign_currency_account_transactions",
+    "scheduled_payments",
+    "standing_orders",
+)
+
+WINDOW = typing.Tuple[datetime, datetime]
+
+
+class WindowPolicy:
+    """
+    Configures the size of the windows in which a time period gets split.
+
+    :param initial: The size of the first windows. Defaults to 30 days.
+    :type initial: timedelta
+    :param minimum: The smallest allowed window. Defaults to 1 day.
+    :type minimum: timedelta
+    :param maximum: The largest allowed window. Defaults to 365 days.
+    :type maximum: timedelta
+    :param max_records: Windows shrink to half their size after a response with
+                        more records than this. Defaults to ``1000``.
+    :type max_records: int
+    :param min_records: Windows grow to double their size after a response with
+                        fewer records than this. Defaults to ``100``.
+    :type min_records: int
+    :param slow_seconds: Windows shrink to half their size after a response that
+                         took longer than this. Defaults to ``5``.
+    :type slow_seconds: float
+    """
+
+    def __init__(
+        self,
+        initial: timedelta = timedelta(days=30),
+        minimum: timedelta = timedelta(days=1),
+        maximum: timedelta = timedelta(days=365),
+        max_records: int = 1000,
+        min_records: int = 100,
+        slow_seconds: float = 5,
+    ):
+        self.initial = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.max_records = max_records
+        self.min_records = min_records
+        self.slow_seconds = slow_seconds
+
+    def next_size(self, size: timedelta, records: int, seconds: float) -> timedelta:
+        """
+        Returns the size of the next window, given the number of records and
+        the duration of a response for a window of the given size.
+        """
+        if records > self.max_records or seconds > self.slow_seconds:
+            return max(self.minimum, size / 2)
+
+        if records < self.min_records:
+            return min(self.maximum, size * 2)
+
+        return size
+
+
+def count_records(payload: dict) -> int:
+    """
+    Returns the number of records in the list fields of the given payload.
+    """
+    return sum(len(value) for value in payload.values() if isinstance(value, list))
+
+
+def record_key(record) -> str:
+    """
+    Returns the key used to de-duplicate records at window boundaries. Two
+    records are considered the same when all of their fields are equal.
+    """
+    return json.dumps(record, sort_keys=True, default=str)
+
+
+def stitch(payloads: typing.List[dict], key: typing.Callable = record_key) -> dict:
+    """
+    Stitches the payloads of consecutive windows into a single payload, of the
+    same type as the first one, e.g. a ``TransactionList`` resource. List fields
+    get concatenated, dropping records that have already been returned by the
+    previous window, while all other fields are kept from the first payload.
+    """
+    stitched = {}
+    previous_keys = {}
+
+    for payload in payloads:
+        for field, value in payload.items():
+            if not isinstance(value, list):
+                stitched.setdefault(field, value)
+                continue
+
+            records = stitched.setdefault(field, [])
+            seen_keys = previous_keys.get(field, set())
+            window_keys = set()
+
+            for record in value:
+                item_key = key(record)
+                window_keys.add(item_key)
+
+                if item_key not in seen_keys:
+                    records.append(record)
+
+            previous_keys[field] = window_keys
+
+    if payloads and type(payloads[0]) is not dict:
+        return type(payloads[0])(stitched)
+
+    return stitched
+
+
+class _Windows:
+    """
+    Generates consecutive windows of a time period, sized by a policy and the
+    responses observed so far.
+    """
+
+    def __init__(self, date_from: datetime, date_to: datetime, policy: WindowPolicy):
+        self.cursor = date_from
+        self.date_to = date_to
+        self.policy = policy
+        self.size = policy.initial
+        self.started = False
+        self.results = []
+
+    @property
+    def exhausted(self) -> bool:
+        return self.started and self.cursor >= self.date_to
+
+    def next(self) -> WINDOW:
+        self.started = True
+        window = (self.cursor, min(self.cursor + self.size, self.date_to))
+        self.cursor = window[1]
+        return window
+
+    def observe(self, window: WINDOW, payload: dict, seconds: float):
+        records = count_records(payload)
+        self.size = self.policy.next_size(window[1] - window[0], records, seconds)
+        self.results.append((window, payload))
+
+    def stitch(self, key: typing.Callable) -> dict:
+        results = sorted(self.results, key=lambda result: result[0])
+        payloads = [payload for window, payload in results]
+        return stitch(payloads, key)
+
+
+def fetch_windowed(
+    call: typing.Callable,
+    date_from: datetime,
+    date_to: datetime,
+    policy: WindowPolicy = None,
+    max_workers: int = 4,
+    key: typing.Callable = record_key,
+) -> dict:
+    """
+    Fetches the given time period in windows on a pool of ``max_workers``
+    threads. ``call`` receives the ``date_from`` and ``date_to`` of each window
+    and returns its payload.
+    """
+    windows = _Windows(date_from, date_to, policy or WindowPolicy())
+
+    def timed_call(window: WINDOW):
+        started_at = time.monotonic()
+        payload = call(date_from=window[0], date_to=window[1])
+        return payload, time.monotonic() - started_at
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = {}
+
+        while pending or not windows.exhausted:
+            while len(pending) < max_workers and not windows.exhausted:
+                window = windows.next()
+                pending[executor.submit(timed_call, window)] = window
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                window = pending.pop(future)
+
+                try:
+                    payload, seconds = future.result()
+                except Exception:
+                    for pending_future in pending:
+                        pending_future.cancel()
+                    raise
+
+                windows.observe(window, payload, seconds)
+
+    return windows.stitch(key)
+
+
+async def fetch_windowed_async(
+    call: typing.Callable,
+    date_from: datetime,
+    date_to: datetime,
+    policy: WindowPolicy = None,
+    max_concurrency: int = 4,
+    key: typing.Callable = record_key,
+) -> dict:
+    """
+    Fetches the given time period in windows on the running event loop, with
+    at most ``max_concurrency`` windows in flight. ``call`` receives the
+    ``date_from`` and ``date_to`` of each window and returns an awaitable of
+    its payload.
+    """
+    windows = _Windows(date_from, date_to, policy or WindowPolicy())
+
+    async def timed_call(window: WINDOW):
+        started_at = time.monotonic()
+        payload = await call(date_from=window[0], date_to=window[1])
+        return payload, time.monotonic() - started_at
+
+    pending = {}
+
+    try:
+        while pending or not windows.exhausted:
+            while len(pending) < max_concurrency and not windows.exhausted:
+                window = windows.next()
+                pending[asyncio.ensure_future(timed_call(window))] = window
+
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+
+            for future in done:
+                window = pending.pop(future)
+                payload, seconds = future.result()
+                windows.observe(window, payload, seconds)
+    finally:
+        for future in pending:
+            future.cancel()
+
+    return windows.stitch(key)
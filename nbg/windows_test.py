@@ -0,0 +1,127 @@
+from datetime import datetime, timedelta
+import asyncio
+import threading
+
+import pytest
+
+from . import resources, windows
+
+
+def _transactions(date_from: datetime, date_to: datetime, per_day: int) -> dict:
+    """
+    Returns a payload with ``per_day`` transactions for each day of the given
+    period, including both of its ends.
+    """
+    transactions = []
+    day = date_from
+
+    while day <= date_to:
+        transactions += [
+            {"date": day.isoformat(), "index": index} for index in range(per_day)
+        ]
+        day += timedelta(days=1)
+
+    return {"accountNumber": "8000123456", "transactions": transactions}
+
+
+def test_window_policy_next_size():
+    """
+    Ensure that windows shrink after large or slow responses, grow after
+    sparse ones and stay within their bounds.
+    """
+    policy = windows.WindowPolicy(
+        minimum=timedelta(days=2),
+        maximum=timedelta(days=40),
+        max_records=100,
+        min_records=10,
+        slow_seconds=1,
+    )
+    size = timedelta(days=30)
+
+    assert policy.next_size(size, 101, 0.1) == timedelta(days=15)
+    assert policy.next_size(size, 50, 2) == timedelta(days=15)
+    assert policy.next_size(size, 5, 0.1) == timedelta(days=40)
+    assert policy.next_size(size, 50, 0.1) == size
+    assert policy.next_size(timedelta(days=3), 500, 0.1) == timedelta(days=2)
+
+
+def test_stitch_deduplicates_window_boundaries():
+    """
+    Ensure that records returned by two adjacent windows appear only once.
+    """
+    first = {"accountNumber": "1", "transactions": [{"id": 1}, {"id": 2}]}
+    second = {"accountNumber": "1", "transactions": [{"id": 2}, {"id": 3}]}
+    third = {"accountNumber": "1", "transactions": [{"id": 3}, {"id": 4}]}
+
+    assert windows.stitch([first, second, third]) == {
+        "accountNumber": "1",
+        "transactions": [{"id": 1}, {"id": 2}, {"id": 3}, {"id": 4}],
+    }
+
+    stitched = windows.stitch([resources.TransactionList(first), second])
+
+    assert isinstance(stitched, resources.TransactionList)
+    assert [transaction.id for transaction in stitched.transactions] == [1, 2, 3]
+
+
+def test_fetch_windowed():
+    """
+    Ensure that windowed fetching covers the whole period, in order and
+    without duplicates, while adapting the window sizes to the responses.
+    """
+    date_from = datetime(2018, 1, 1)
+    date_to = datetime(2020, 12, 31)
+    requested_windows = []
+    lock = threading.Lock()
+
+    def call(date_from: datetime, date_to: datetime) -> dict:
+        with lock:
+            requested_windows.append((date_from, date_to))
+
+        return _transactions(date_from, date_to, per_day=1)
+
+    policy = windows.WindowPolicy(initial=timedelta(days=10), min_records=20)
+    payload = windows.fetch_windowed(call, date_from, date_to, policy, 4)
+
+    assert payload == _transactions(date_from, date_to, per_day=1)
+    assert requested_windows[0] == (date_from, date_from + timedelta(days=10))
+    assert max(end - start for start, end in requested_windows) > timedelta(days=10)
+    assert sorted(requested_windows)[-1][1] == date_to
+
+
+def test_fetch_windowed_raises_errors():
+    """
+    Ensure that a failing window fails the whole fetch.
+    """
+
+    def call(date_from: datetime, date_to: datetime) -> dict:
+        if date_from.month == 3:
+            raise RuntimeError("Window failed")
+
+        return _transactions(date_from, date_to, per_day=1)
+
+    with pytest.raises(RuntimeError):
+        windows.fetch_windowed(call, datetime(2020, 1, 1), datetime(2020, 12, 31))
+
+
+def test_fetch_windowed_async():
+    """
+    Ensure that asynchronous windowed fetching behaves like the threaded one.
+    """
+    date_from = datetime(2019, 1, 1)
+    date_to = datetime(2020, 12, 31)
+
+    async def call(date_from: datetime, date_to: datetime) -> dict:
+        await asyncio.sleep(0)
+        return _transactions(date_from, date_to, per_day=3)
+
+    loop = asyncio.new_event_loop()
+
+    try:
+        payload = loop.run_until_complete(
+            windows.fetch_windowed_async(call, date_from, date_to)
+        )
+    finally:
+        loop.close()
+
+    assert payload == _transactions(date_from, date_to, per_day=3)